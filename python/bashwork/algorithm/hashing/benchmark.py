@@ -0,0 +1,95 @@
+'''
+Placement Benchmark
+------------------------------------------------------------
+
+A comparison of the key placement engines in this package:
+
+* `ConsistentHash` - the karger ring with virtual nodes
+* `JumpHash` - jump consistent hash over numbered buckets
+* `RendezvousHash` - highest random weight hashing
+
+For each engine, this reports the time per lookup, the size of the
+structures used to place keys, and the fraction of keys that move
+when a node is added and when the last node is removed::
+
+    python -m bashwork.algorithm.hashing.benchmark
+'''
+import sys
+import time
+from bashwork.algorithm.hashing.consistent_hash import ConsistentHash
+from bashwork.algorithm.hashing.jump_hash import JumpHash
+from bashwork.algorithm.hashing.rendezvous_hash import RendezvousHash
+
+
+def get_memory(engine):
+    ''' Estimate the bytes used by the placement structures
+    of the supplied engine (the containers and their keys).
+
+    :param engine: The engine to get the memory usage of
+    :returns: The estimated number of bytes used
+    '''
+    total = 0
+    for name in ['circle', 'mapping', 'nodes']:
+        value = getattr(engine, name, None)
+        if value is None: continue
+        total += sys.getsizeof(value)
+        total += sum(sys.getsizeof(v) for v in value)
+    return total
+
+
+def get_movement(before, after):
+    ''' Compute the fraction of the keys that were placed on
+    a different node.
+
+    :param before: The node of each key before the change
+    :param after: The node of each key after the change
+    :returns: The fraction of the keys that moved
+    '''
+    moved = sum(1 for b, a in zip(before, after) if b != a)
+    return moved / float(len(before))
+
+
+def benchmark(name, factory, nodes, keys):
+    ''' Benchmark a single placement engine.
+
+    :param name: The name of the engine
+    :param factory: A method to create an empty engine
+    :param nodes: The nodes to place the keys on
+    :param keys: The keys to place
+    :returns: A tuple of the benchmark results
+    '''
+    engine = factory()
+    for node in nodes:
+        engine.add_node(node)
+
+    start  = time.time()
+    placed = engine.get_nodes(keys)
+    lookup = (time.time() - start) / len(keys) * 1e6
+    memory = get_memory(engine)
+
+    engine.add_node('extra-node')
+    added = get_movement(placed, engine.get_nodes(keys))
+    engine.del_node('extra-node')
+    engine.del_node(nodes[-1])
+    removed = get_movement(placed, engine.get_nodes(keys))
+    return (name, lookup, memory, added, removed)
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    nodes = ["cache{}.host.com".format(i) for i in range(count)]
+    keys  = ["key-{}".format(i) for i in range(20000)]
+    engines = [
+        ('consistent', lambda: ConsistentHash(replicas=100)),
+        ('jump',       lambda: JumpHash()),
+        ('rendezvous', lambda: RendezvousHash()),
+    ]
+
+    print "{:<12}{:>12}{:>12}{:>12}{:>12}".format(
+        'engine', 'us/lookup', 'bytes', 'add-moved', 'del-moved')
+    print "-" * 60
+    for name, factory in engines:
+        print "{:<12}{:>12.2f}{:>12}{:>12.4f}{:>12.4f}".format(
+            *benchmark(name, factory, nodes, keys))
+    print "-" * 60
+    print "ideal movement\t{:.4f}".format(1.0 / (count + 1))
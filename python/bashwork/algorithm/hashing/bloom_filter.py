@@ -1,20 +1,164 @@
-class AbstractBloomFilter(object):
+'''
+Bloom Filters
+------------------------------------------------------------
+
+This is a collection of bloom filter variants that are all backed
+by a single contiguous `bytearray` and share the same indexing
+scheme. Instead of running a collection of independent hash
+functions, a single digest is computed per value and split into
+two halves that are combined with the Kirsch-Mitzenmacher double
+hashing trick::
+
+    g_i(x) = h1(x) + i * (h2(x) mod (m - 1) + 1) mod m
+
+The stride is never zero, so the `k` probes of a value cannot all
+land on the same bucket. This gives the same asymptotic false positive rate as using `k`
+independent hashes while only paying for one digest. The filters
+can be sized directly from an expected element count::
+
+    filter = BloomFilter.create(capacity=1000000, error_rate=0.001)
+    filter.insert_many(keys)
+    seen = filter.contains_many(keys)
+'''
+import math
+import struct
+from hashlib import md5, sha1
+
+#------------------------------------------------------------
+# helper methods
+#------------------------------------------------------------
+
+def get_optimal_size(capacity, error_rate):
+    ''' Given the expected number of elements and the
+    requested false positive rate, compute the optimal
+    number of bits for the filter::
+
+        m = -n * ln(p) / ln(2)^2
+
+    :param capacity: The expected number of elements
+    :param error_rate: The requested false positive rate
+    :returns: The optimal number of bits to use
     '''
-    Best choice of hash count is 4 for small differences
-    and 3 for larger sizes with the crossover around 128.
+    size = -capacity * math.log(error_rate) / (math.log(2) ** 2)
+    return max(8, int(math.ceil(size)))
 
-    Keep an in memory heap of pure/empty buckets which
-    gets updated on the fly as bucket counts are updated
-    during unraveling.
+
+def get_optimal_hashes(capacity, size):
+    ''' Given the expected number of elements and the
+    number of bits in the filter, compute the optimal
+    number of hashes to use::
+
+        k = m / n * ln(2)
+
+    :param capacity: The expected number of elements
+    :param size: The number of bits in the filter
+    :returns: The optimal number of hashes to use
+    '''
+    return max(1, int(round(float(size) / capacity * math.log(2))))
+
+
+def double_hasher(value):
+    ''' The default hash method for the bloom filters which
+    returns the two 64 bit halves of an md5 digest.
+
+    :param value: The value to hash
+    :returns: A tuple of (h1, h2)
+    '''
+    return struct.unpack('<QQ', md5(value).digest())
+
+
+def get_stride(h2, size):
+    ''' Given the second hash of a value, compute the non
+    zero stride between its probes in a filter of the supplied
+    size.
+
+    :param h2: The second hash of the value
+    :param size: The number of buckets in the filter
+    :returns: The stride between the probes
+    '''
+    return h2 % (size - 1) + 1 if size > 1 else 1
+
+
+def check_hasher(value):
+    ''' The default check hash for the invertible bloom filter
+    which is independent of the hashes used for the indexes.
+
+    :param value: The value to hash
+    :returns: A 64 bit check hash of the value
+    '''
+    return struct.unpack('<Q', sha1(value).digest()[:8])[0]
+
+
+def encode_key(value):
+    ''' Encode the supplied string as an integer that can be
+    summed with XOR. A marker byte is prepended so that leading
+    null bytes survive the round trip.
+
+    :param value: The string to encode
+    :returns: The encoded integer
+    '''
+    return int(('\x01' + value).encode('hex'), 16)
+
+
+def decode_key(value):
+    ''' Decode the supplied integer back into the string
+    that was encoded with `encode_key`.
+
+    :param value: The integer to decode
+    :returns: The decoded string or None if it is invalid
     '''
+    if not value: return None
+    encoded = '%x' % value
+    encoded = ('0' * (len(encoded) & 1)) + encoded
+    decoded = encoded.decode('hex')
+    return decoded[1:] if decoded[0] == '\x01' else None
+
+#------------------------------------------------------------
+# classes
+#------------------------------------------------------------
+
+class AbstractBloomFilter(object):
+    ''' The base bloom filter which manages the underlying
+    bucket array and the double hashing of the values to
+    the bucket indexes.
+    '''
+
+    @classmethod
+    def create(klass, capacity, error_rate=0.01, **kwargs):
+        ''' Create a new instance of the bloom filter that
+        is sized for the supplied capacity and error rate.
+
+        :param capacity: The expected number of elements
+        :param error_rate: The requested false positive rate
+        :returns: An initialized bloom filter instance
+        '''
+        assert (capacity > 0)
+        assert (0 < error_rate < 1)
+
+        size   = get_optimal_size(capacity, error_rate)
+        hashes = get_optimal_hashes(capacity, size)
+        return klass(size=size, hashes=hashes, **kwargs)
 
     def __init__(self, **kwargs):
         ''' Initialize the bloom filter instance.
 
-        :param hashers: The collection of hashers to hash with
+        :param size: The number of buckets in the filter (default 1024)
+        :param hashes: The number of hashes to use per value (default 3)
+        :param hasher: A method that returns two integer hashes for a value
         '''
-        self.hashers = kwargs.get('hashers', [])
-        self.keys    = []
+        self.size   = max(1, kwargs.get('size', 1024))
+        self.hashes = max(1, kwargs.get('hashes', 3))
+        self.hasher = kwargs.get('hasher', double_hasher)
+        self.keys   = self.create_buckets(self.size)
+
+    def create_buckets(self, size):
+        ''' Create the underlying bucket storage for the filter.
+        This can be overloaded to supply a different storage.
+
+        :param size: The number of buckets to create
+        :returns: The initialized bucket storage
+        '''
+        return bytearray(size)
 
     def get_hash_keys(self, value):
         ''' Given a new value, return the resulting hash
@@ -23,22 +167,80 @@ class AbstractBloomFilter(object):
         :param value: The value to get hash keys for
         :returns: The N hash keys for that value
         '''
-        for hasher in self.hashers:
-            yield hasher.hash(value)
+        h1, h2 = self.hasher(value)
+        size = self.size
+        step = get_stride(h2, size)
+        return [(h1 + i * step) % size for i in xrange(self.hashes)]
+
+    def __contains__(self, value): return self.contains(value)
+
 
 class BloomFilter(AbstractBloomFilter):
+    ''' A standard bloom filter that stores one bit per
+    bucket packed eight to a byte.
+    '''
 
-    def insert(self, value):
+    def create_buckets(self, size):
+        ''' Create the underlying packed bit storage.
+
+        :param size: The number of bits to create
+        :returns: The initialized bit storage
         '''
+        return bytearray((size + 7) >> 3)
+
+    def insert(self, value):
+        ''' Add the supplied value to the filter.
+
+        :param value: The value to add to the filter
         '''
+        keys = self.keys
         for key in self.get_hash_keys(value):
-            self.keys[key] = 0x1
+            keys[key >> 3] |= 1 << (key & 7)
 
-    def contains(self, value):
+    def insert_many(self, values):
+        ''' Add all of the supplied values to the filter.
+
+        :param values: The collection of values to add
         '''
+        keys, hasher = self.keys, self.hasher
+        size, steps  = self.size, xrange(self.hashes)
+        for value in values:
+            h1, h2 = hasher(value)
+            h2 = get_stride(h2, size)
+            for i in steps:
+                key = (h1 + i * h2) % size
+                keys[key >> 3] |= 1 << (key & 7)
+
+    def contains(self, value):
+        ''' Check if the supplied value may be in the filter.
+
+        :param value: The value to check for
+        :returns: False if definitely absent, True if possibly present
         '''
-        return all(self.keys[key] for key in self.get_hash_keys(value))
+        keys = self.keys
+        return all(keys[key >> 3] & (1 << (key & 7))
+            for key in self.get_hash_keys(value))
+
+    def contains_many(self, values):
+        ''' Check if each of the supplied values may be in the filter.
 
+        :param values: The collection of values to check for
+        :returns: A list of the membership result for each value
+        '''
+        keys, hasher = self.keys, self.hasher
+        size, steps  = self.size, xrange(self.hashes)
+        results = []
+        for value in values:
+            h1, h2 = hasher(value)
+            h2 = get_stride(h2, size)
+            found  = True
+            for i in steps:
+                key = (h1 + i * h2) % size
+                if not keys[key >> 3] & (1 << (key & 7)):
+                    found = False
+                    break
+            results.append(found)
+        return results
 
     def remove(self, value):
         ''' Removes the bits specified by the
@@ -48,16 +250,57 @@ class BloomFilter(AbstractBloomFilter):
 
         :param value: The value to remove from the table
         '''
-        for key in self.get_hashes(value):
-            self.keys[key] &= key
+        keys = self.keys
+        for key in self.get_hash_keys(value):
+            keys[key >> 3] &= ~(1 << (key & 7)) & 0xff
+
+    @property
+    def cardinality(self):
+        ''' Returns the number of set bits in the filter.
+
+        :returns: The number of set bits in the filter
+        '''
+        return sum(bin(byte).count('1') for byte in self.keys)
+
 
 class CountingBloomFilter(AbstractBloomFilter):
+    ''' A bloom filter that stores a saturating byte
+    counter per bucket so that values can be removed.
+    '''
 
     def insert(self, value):
+        ''' Add the supplied value to the filter.
+
+        :param value: The value to add to the filter
         '''
-        '''
+        keys = self.keys
         for key in self.get_hash_keys(value):
-            self.keys[key] += 1
+            if keys[key] < 0xff: keys[key] += 1
+
+    def insert_many(self, values):
+        ''' Add all of the supplied values to the filter.
+
+        :param values: The collection of values to add
+        '''
+        for value in values:
+            self.insert(value)
+
+    def contains(self, value):
+        ''' Check if the supplied value may be in the filter.
+
+        :param value: The value to check for
+        :returns: False if definitely absent, True if possibly present
+        '''
+        keys = self.keys
+        return all(keys[key] for key in self.get_hash_keys(value))
+
+    def contains_many(self, values):
+        ''' Check if each of the supplied values may be in the filter.
+
+        :param values: The collection of values to check for
+        :returns: A list of the membership result for each value
+        '''
+        return [self.contains(value) for value in values]
 
     def remove(self, value):
         ''' Removes the bits specified by the
@@ -67,35 +310,278 @@ class CountingBloomFilter(AbstractBloomFilter):
 
         :param value: The value to remove from the table
         '''
+        keys = self.keys
         for key in self.get_hash_keys(value):
-            self.keys[key] -= 1
+            if 0 < keys[key] < 0xff: keys[key] -= 1
+
 
 class InvertibleBloomFilter(AbstractBloomFilter):
+    ''' An invertible bloom lookup table where each cell
+    stores a (count, key_sum, value_sum, hash_sum) tuple with
+    one word per field. The sums are the XOR of all the keys
+    (and values) that hash to the cell and the hash sum is used
+    to verify that a cell with a count of one is really pure.
+
+    Best choice of hash count is 4 for small differences
+    and 3 for larger sizes with the crossover around 128.
+
+    Two filters of the same shape can be subtracted so that
+    all the common entries cancel out, leaving a filter that
+    only needs to be sized to the difference of the sets::
+
+        local  = InvertibleBloomFilter.create(difference=100)
+        remote = InvertibleBloomFilter.create(difference=100)
+        local.insert_many(local_set)
+        remote.insert_many(remote_set)   # on the other replica
+
+        added, removed, ok = local.subtract(remote).decode()
+
+    Keep an in memory heap of pure/empty buckets which
+    gets updated on the fly as bucket counts are updated
+    during unraveling.
+    '''
+
+    @classmethod
+    def create(klass, difference, **kwargs):
+        ''' Create a new instance of the filter that is sized
+        to decode the supplied number of differences.
+
+        :param difference: The expected size of the set difference
+        :returns: An initialized invertible bloom filter instance
+        '''
+        assert (difference > 0)
+
+        hashes = 4 if difference <= 128 else 3
+        factor = 2.0 if difference <= 128 else 1.5
+        size   = int(math.ceil(difference * factor)) + 8 * hashes
+        return klass(size=size, hashes=hashes, **kwargs)
+
+    def __init__(self, **kwargs):
+        ''' Initialize the invertible bloom filter instance.
+
+        :param size: The number of cells in the filter (default 1024)
+        :param hashes: The number of hashes to use per value (default 3)
+        :param hasher: A method that returns two integer hashes for a value
+        :param checker: A method that returns the check hash for a value
+        '''
+        hashes = max(1, kwargs.get('hashes', 3))
+        size   = max(hashes, kwargs.get('size', 1024))
+        kwargs['size'] = size + (-size % hashes) # one partition per hash
+        super(InvertibleBloomFilter, self).__init__(**kwargs)
+        self.checker    = kwargs.get('checker', check_hasher)
+        self.key_sums   = [0] * self.size
+        self.value_sums = [0] * self.size
+        self.hash_sums  = [0] * self.size
+
+    def create_buckets(self, size):
+        ''' Create the underlying signed counter storage.
+
+        :param size: The number of counters to create
+        :returns: The initialized counter storage
+        '''
+        return [0] * size
+
+    def get_hash_keys(self, value):
+        ''' Given a new value, return the resulting hash
+        codes for that value. Each hash is mapped into its own
+        partition of the cells so a value never hashes to the
+        same cell twice (which would cancel the XOR sums).
+
+        :param value: The value to get hash keys for
+        :returns: The N hash keys for that value
+        '''
+        h1, h2 = self.hasher(value)
+        width  = self.size // self.hashes
+        return [i * width + (h1 + i * h2) % width for i in xrange(self.hashes)]
+
+    #------------------------------------------------------------
+    # update methods
+    #------------------------------------------------------------
+
+    def __update(self, key, value, count):
+        ''' Apply the supplied count of the entry to all of
+        the cells that the key hashes to.
+
+        :param key: The key of the entry to update
+        :param value: The value of the entry to update
+        :param count: The count to apply to each cell
+        '''
+        encoded = encode_key(key)
+        evalue  = encode_key(value) if value is not None else 0
+        checked = self.checker(key)
+        for idx in self.get_hash_keys(key):
+            self.keys[idx]       += count
+            self.key_sums[idx]   ^= encoded
+            self.value_sums[idx] ^= evalue
+            self.hash_sums[idx]  ^= checked
+
+    def insert(self, key, value=None):
+        ''' Add the supplied entry to the filter.
+
+        :param key: The key to add to the filter
+        :param value: The optional value to store with the key
+        '''
+        self.__update(key, value, 1)
 
-    # [(count, key_sum, value_sum)] -> word per field
+    def insert_many(self, keys):
+        ''' Add all of the supplied keys to the filter.
+
+        :param keys: The collection of keys to add
+        '''
+        for key in keys:
+            self.__update(key, None, 1)
+
+    def remove(self, key, value=None):
+        ''' Removes the supplied entry from the filter.
+
+        ..note:: This is only safe if the entry was inserted
+
+        :param key: The key to remove from the table
+        :param value: The value that was stored with the key
+        '''
+        self.__update(key, value, -1)
+
+    #------------------------------------------------------------
+    # query methods
+    #------------------------------------------------------------
+
+    def __is_pure(self, idx):
+        ''' Check if the cell at the supplied index contains
+        exactly one entry (inserted or removed).
+
+        :param idx: The index of the cell to check
+        :returns: True if the cell is pure, False otherwise
+        '''
+        if self.keys[idx] not in (1, -1): return False
+        key = decode_key(self.key_sums[idx])
+        return key is not None and self.hash_sums[idx] == self.checker(key)
+
+    def __is_empty(self, idx):
+        return not (self.keys[idx] or self.key_sums[idx] or self.hash_sums[idx])
+
+    def contains(self, key):
+        ''' Check if the supplied key may be in the filter.
+
+        :param key: The key to check for
+        :returns: False if definitely absent, True if possibly present
+        '''
+        return all(not self.__is_empty(idx) for idx in self.get_hash_keys(key))
 
     def get(self, key):
-        pass
+        ''' Attempt to retrieve the value stored for the supplied
+        key. This can fail if none of the cells for the key are pure.
+
+        :param key: The key to retrieve the value for
+        :returns: The value of the key or None if it cannot be found
+        '''
+        encoded = encode_key(key)
+        for idx in self.get_hash_keys(key):
+            if self.__is_empty(idx): return None
+            if self.keys[idx] == 1 and self.key_sums[idx] == encoded:
+                return decode_key(self.value_sums[idx])
+        return None
 
     def list(self):
-        pass
+        ''' Attempt to list all the entries in the filter. This
+        does not modify the current filter.
 
-    def insert(self, value):
+        :returns: A list of (key, value) entries that could be decoded
         '''
+        added, removed, _ = self.copy().decode(values=True)
+        return added
+
+    #------------------------------------------------------------
+    # reconciliation methods
+    #------------------------------------------------------------
+
+    def copy(self):
+        ''' Create a deep copy of the current filter.
+
+        :returns: A copy of the current filter
         '''
-        for key in self.get_hash_keys(value):
-            self.keys[key] += 1
+        return self.deserialize(self.serialize(),
+            hasher=self.hasher, checker=self.checker)
 
-    def remove(self, value):
-        ''' Removes the bits specified by the
-        given input.
+    def subtract(self, other):
+        ''' Subtract the supplied filter from the current one
+        so that only the set difference of the two remains.
 
-        ..note:: This is not a safe operation!
+        :param other: The filter to subtract from this one
+        :returns: A new filter of the difference of the two filters
+        '''
+        assert (self.size == other.size), "filters must be the same size"
+        assert (self.hashes == other.hashes), "filters must use the same hashes"
 
-        :param value: The value to remove from the table
+        result = self.copy()
+        for idx in xrange(self.size):
+            result.keys[idx]       -= other.keys[idx]
+            result.key_sums[idx]   ^= other.key_sums[idx]
+            result.value_sums[idx] ^= other.value_sums[idx]
+            result.hash_sums[idx]  ^= other.hash_sums[idx]
+        return result
+
+    def decode(self, values=False):
+        ''' Peel all the pure cells out of the filter to recover
+        the entries it contains. When called on the result of
+        `subtract` this yields the entries only in the left filter
+        and the entries only in the right filter.
+
+        ..note:: This empties the current filter as it decodes
+
+        :param values: True to return (key, value) entries
+        :returns: (added, removed, success) of the decoded entries
+        '''
+        added, removed = [], []
+        pure = [idx for idx in xrange(self.size) if self.__is_pure(idx)]
+        while pure:
+            idx = pure.pop()
+            if not self.__is_pure(idx): continue
+
+            count = self.keys[idx]
+            key   = decode_key(self.key_sums[idx])
+            value = decode_key(self.value_sums[idx])
+            entry = (key, value) if values else key
+            (added if count > 0 else removed).append(entry)
+            self.__update(key, value, -count)
+            pure.extend(i for i in self.get_hash_keys(key) if self.__is_pure(i))
+
+        success = all(self.__is_empty(idx) for idx in xrange(self.size))
+        return added, removed, success
+
+    #------------------------------------------------------------
+    # serialization methods
+    #------------------------------------------------------------
+
+    def serialize(self):
+        ''' Serialize the current instance into a simple form
+        that can be transmitted over the wire.
+
+        :returns: The serialized form of the current instance.
+        '''
+        return {
+            'size'       : self.size,
+            'hashes'     : self.hashes,
+            'counts'     : list(self.keys),
+            'key_sums'   : list(self.key_sums),
+            'value_sums' : list(self.value_sums),
+            'hash_sums'  : list(self.hash_sums),
+        }
+
+    @classmethod
+    def deserialize(klass, payload, **kwargs):
+        ''' Given a serialized payload, convert it to an instance
+        of the current type.
+
+        :param klass: The current type to convert to
+        :param payload: The payload to convert to a type instance
+        :returns: An instance of the current type
         '''
-        for key in self.get_hashes(value):
-            self.keys[key] -= 1
+        instance = klass(size=payload['size'], hashes=payload['hashes'], **kwargs)
+        instance.keys       = list(payload['counts'])
+        instance.key_sums   = list(payload['key_sums'])
+        instance.value_sums = list(payload['value_sums'])
+        instance.hash_sums  = list(payload['hash_sums'])
+        return instance
 
 # cardinality estimation based on 0s like bitcoin
 # send bloom and cardinality
@@ -25,9 +25,42 @@ there is a good mixture in the circle::
     key  = "{}:{}:{}".format(mid, aid, cid)
     node = circle.get_node(key)
     return node
+
+The ring can also bound the load of each node so that no node
+receives more than `load_factor` times its fair share of the keys
+(Mirrokni et al., Consistent Hashing with Bounded Loads). When a
+node is full, the key simply continues clockwise to the next node
+that has capacity::
+
+    circle = ConsistentHash(replicas=10, load_factor=1.25)
+    circle.add_node("cache1", weight=2)
+    node = circle.assign(key)     # assigns the key
+    node = circle.get_node(key)   # looks it up without assigning it
+    circle.release(key)           # when the key is evicted
+
+Before a membership change, `diff` can report which ranges of the
+ring are moving between nodes so they can be warmed ahead of time::
+
+    future = circle.copy()
+    future.add_node("cache9")
+    for start, end, old, new in future.diff(circle):
+        warm(new, start, end)
 '''
-from hashlib import sha256
-from bisect import bisect_right, insort_right
+import math
+import struct
+from hashlib import md5
+from bisect import bisect_left, bisect_right, insort_right
+
+
+def hash_key(value):
+    ''' The default hash method for the ring which returns
+    the first 64 bits of an md5 digest as an integer so that
+    the ring comparisons are simple integer comparisons.
+
+    :param value: The value to hash
+    :returns: The 64 bit hash of the value
+    '''
+    return struct.unpack('>Q', md5(value).digest()[:8])[0]
 
 
 class ConsistentHash(object):
@@ -35,24 +68,46 @@ class ConsistentHash(object):
     manager of some node type.
     '''
 
-    def __init__(self, replicas=3, hasher=None):
+    def __init__(self, replicas=3, hasher=None, load_factor=None):
         ''' Initialize a new instance of the circle
 
         :param replicas: The number of virtual replicas to use
         :param hasher: The hash method to use
+        :param load_factor: The bound on a node's share of the keys (c > 1)
         '''
+        assert load_factor is None or load_factor > 1.0
+
         self.circle   = list() # sorted hash keys
         self.mapping  = dict() # hash-key => node
+        self.weights  = dict() # node => weight
+        self.loads    = dict() # node => assigned key count
+        self.assigned = dict() # key => node (bounded loads only)
+        self.total_weight = 0  # sum of the weights
+        self.total_load   = 0  # sum of the loads
         self.replicas = max(1, replicas)
-        self.hasher   = hasher or (lambda x: sha256(x).digest())
+        self.hasher   = hasher or hash_key
+        self.load_factor = load_factor
 
-    def add_node(self, node):
+    def __node_keys(self, node):
+        weight = self.weights.get(node, 1)
+        return [self.hasher("{}:{}".format(node, idx))
+            for idx in range(self.replicas * weight)]
+
+    #------------------------------------------------------------
+    # membership methods
+    #------------------------------------------------------------
+
+    def add_node(self, node, weight=1):
         ''' Given a node, add it to the circle
 
         :param node: The node to add to the circle
+        :param weight: The relative share of keys for the node (default 1)
         '''
-        for idx in range(self.replicas):
-            key = self.hasher("{}:{}".format(node, idx))
+        if node in self.weights: self.del_node(node)
+        self.weights[node] = max(1, int(weight))
+        self.loads[node] = 0
+        self.total_weight += self.weights[node]
+        for key in self.__node_keys(node):
             self.mapping[key] = node
             insort_right(self.circle, key)
 
@@ -61,14 +116,48 @@ class ConsistentHash(object):
 
         :param node: The node to remove from the circle
         '''
-        for idx in range(self.replicas):
-            key = self.hasher("{}:{}".format(node, idx))
-            if key in self.mapping:
+        if node not in self.weights: return
+        for key in self.__node_keys(node):
+            if self.mapping.get(key) == node:
                 del self.mapping[key]
-                self.circle.remove(key)
+                del self.circle[bisect_left(self.circle, key)]
+        self.total_weight -= self.weights.pop(node)
+        self.total_load   -= self.loads.pop(node)
+        self.assigned = dict((k, n) for k, n in self.assigned.items() if n != node)
+
+    def copy(self):
+        ''' Create a copy of the current circle membership
+        (without any assigned keys).
+
+        :returns: A copy of the current circle
+        '''
+        result = self.__class__(self.replicas, self.hasher, self.load_factor)
+        result.circle  = list(self.circle)
+        result.mapping = dict(self.mapping)
+        result.weights = dict(self.weights)
+        result.loads   = dict((node, 0) for node in self.weights)
+        result.total_weight = self.total_weight
+        return result
+
+    #------------------------------------------------------------
+    # lookup methods
+    #------------------------------------------------------------
+
+    def get_capacity(self, node):
+        ''' Retrieve the maximum number of keys the supplied node
+        can be assigned before keys start to overflow it.
+
+        :param node: The node to get the capacity of
+        :returns: The capacity of the node
+        '''
+        weight = self.weights[node] / float(self.total_weight)
+        return int(math.ceil(self.load_factor * (self.total_load + 1) * weight))
 
     def get_node(self, key):
-        ''' Given a key, return the node this key belongs to
+        ''' Given a key, return the node this key belongs to.
+        With bounded loads, this is the node the key is assigned
+        to, or the node `assign` would pick for it now; the lookup
+        itself never assigns the key.
 
         :param key: The key to find the best node for
         :returns: The node the key should attatch to or None
@@ -76,6 +165,11 @@ class ConsistentHash(object):
         if len(self.circle) == 0:
             return None
 
+        if self.load_factor:
+            if key in self.assigned:
+                return self.assigned[key]
+            return self.__probe(self.hasher(key))
+
         key = self.hasher(key)
         if key in self.mapping:
             return self.mapping[key]
@@ -84,6 +178,110 @@ class ConsistentHash(object):
         end = 0 if end >= len(self.circle) else end
         return self.mapping[self.circle[end]]
 
+    def get_nodes(self, keys):
+        ''' Given a collection of keys, return the nodes each key
+        belongs to. The hashed keys are sorted and merged against
+        the circle in a single pass.
+
+        :param keys: The keys to find the best nodes for
+        :returns: The list of nodes for each of the keys
+        '''
+        keys = list(keys)
+        if not self.circle or self.load_factor:
+            return [self.get_node(key) for key in keys]
+
+        circle, size = self.circle, len(self.circle)
+        hashes = sorted((self.hasher(key), idx) for idx, key in enumerate(keys))
+        nodes  = [None] * len(keys)
+        end    = bisect_left(circle, hashes[0][0]) if hashes else 0
+        for hashed, idx in hashes:
+            while end < size and circle[end] < hashed:
+                end += 1
+            nodes[idx] = self.mapping[circle[end if end < size else 0]]
+        return nodes
+
+    #------------------------------------------------------------
+    # bounded load methods
+    #------------------------------------------------------------
+
+    def __probe(self, hashed):
+        size  = len(self.circle)
+        start = bisect_left(self.circle, hashed)
+        for step in xrange(size):
+            node = self.mapping[self.circle[(start + step) % size]]
+            if self.loads[node] < self.get_capacity(node):
+                break
+        return node
+
+    def assign(self, key):
+        ''' Assign the supplied key to the first node clockwise
+        of it that is still under its capacity. The key counts
+        against the node until it is released.
+
+        :param key: The key to assign to a node
+        :returns: The node the key was assigned to
+        '''
+        if key in self.assigned:
+            return self.assigned[key]
+        if not self.circle:
+            return None
+
+        node = self.__probe(self.hasher(key))
+        self.loads[node] += 1
+        self.total_load  += 1
+        self.assigned[key] = node
+        return node
+
+    def assign_many(self, keys):
+        ''' Assign each of the supplied keys to a node.
+
+        :param keys: The keys to assign to nodes
+        :returns: The list of nodes for each of the keys
+        '''
+        return [self.assign(key) for key in keys]
+
+    def release(self, key):
+        ''' Release the supplied key from the node it was
+        assigned to so the node regains the capacity.
+
+        :param key: The key to release
+        '''
+        node = self.assigned.pop(key, None)
+        if node in self.loads:
+            self.loads[node] -= 1
+            self.total_load  -= 1
+
+    #------------------------------------------------------------
+    # rebalancing methods
+    #------------------------------------------------------------
+
+    def __owner(self, key):
+        end = bisect_left(self.circle, key)
+        return self.mapping[self.circle[end if end < len(self.circle) else 0]]
+
+    def diff(self, old_ring):
+        ''' Given the previous version of the circle, report which
+        ranges of the hash space have moved between nodes. Each range
+        is (start, end] and the final range wraps around the circle
+        when start > end.
+
+        :param old_ring: The previous version of the circle
+        :returns: A list of (start, end, old_node, new_node) ranges
+        '''
+        if not self.circle or not old_ring.circle:
+            return []
+
+        points = sorted(set(self.circle) | set(old_ring.circle))
+        ranges = []
+        for idx, end in enumerate(points):
+            start = points[idx - 1]
+            old, new = old_ring.__owner(end), self.__owner(end)
+            if old == new: continue
+            if ranges and ranges[-1][1] == start and ranges[-1][2:] == (old, new):
+                ranges[-1] = (ranges[-1][0], end, old, new)
+            else: ranges.append((start, end, old, new))
+        return ranges
+
 
 # ------------------------------------------------------------
 # load testing example
@@ -94,22 +292,27 @@ if __name__ == "__main__":
 
     c = 10
     s = 100000
-    m = ConsistentHash(replicas=5)
-    for i in range(c):
-        m.add_node("cache{}.host.com".format(i))
-
-    hits = defaultdict(int)
-    for i in range(s):
-        hits[m.get_node(urandom(15))] += 1
-    hits = { k : v/float(s) for k,v in hits.items() }
-    for k,v in hits.items():
-        print "{}\t{}".format(k, v)
-
-    mean = sum(hits.values()) / c
-    vary = sum((v - mean)**2 for v in hits.values()) / c 
-    stdv = vary**.5
-
-    print "-" * 30
-    print "mean\t\t{}".format(mean)
-    print "variance\t{}".format(vary)
-    print "std-deviation\t{}".format(stdv)
+    for factor in [None, 1.25]:
+        m = ConsistentHash(replicas=5, load_factor=factor)
+        for i in range(c):
+            m.add_node("cache{}.host.com".format(i))
+
+        hits = defaultdict(int)
+        lookup = m.assign_many if factor else m.get_nodes
+        for node in lookup(urandom(15) for i in range(s)):
+            hits[node] += 1
+        hits = { k : v/float(s) for k,v in hits.items() }
+        print "=" * 30
+        print "load-factor	{}".format(factor)
+        print "-" * 30
+        for k,v in hits.items():
+            print "{}\t{}".format(k, v)
+
+        mean = sum(hits.values()) / c
+        vary = sum((v - mean)**2 for v in hits.values()) / c 
+        stdv = vary**.5
+
+        print "-" * 30
+        print "mean\t\t{}".format(mean)
+        print "variance\t{}".format(vary)
+        print "std-deviation\t{}".format(stdv)
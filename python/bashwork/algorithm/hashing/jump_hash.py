@@ -0,0 +1,91 @@
+'''
+Jump Consistent Hash
+------------------------------------------------------------
+
+This is an implementation of Lamping and Veach's jump consistent
+hash (A Fast, Minimal Memory, Consistent Hash Algorithm). Given a
+64 bit key and a number of buckets, it computes the bucket for the
+key in O(ln n) time without storing any ring at all. When a bucket
+is added, only `1/n` of the keys move to the new bucket.
+
+The trade off is that buckets are numbered, so nodes can only be
+cheaply added or removed at the end of the list. This makes it a
+good fit for numbered shards::
+
+    shards = JumpHash()
+    for node in nodes:
+        shards.add_node(node)
+
+    node = shards.get_node(key)
+'''
+from bashwork.algorithm.hashing.consistent_hash import hash_key
+
+
+def jump_hash(key, buckets):
+    ''' Given a 64 bit key, return the bucket in the range
+    [0, buckets) that the key belongs to.
+
+    :param key: The 64 bit integer key to place
+    :param buckets: The number of buckets to place the key in
+    :returns: The bucket the key belongs to
+    '''
+    bucket, jump = -1, 0
+    while jump < buckets:
+        bucket = jump
+        key  = (key * 2862933555777941757 + 1) & 0xffffffffffffffff
+        jump = int((bucket + 1) * (float(1 << 31) / float((key >> 33) + 1)))
+    return bucket
+
+
+class JumpHash(object):
+    ''' A jump consistent hash manager of some node type
+    with the same interface as the `ConsistentHash` circle.
+    '''
+
+    def __init__(self, hasher=None):
+        ''' Initialize a new instance of the jump hash
+
+        :param hasher: The hash method to use (returns a 64 bit integer)
+        '''
+        self.nodes  = list() # bucket => node
+        self.hasher = hasher or hash_key
+
+    def add_node(self, node):
+        ''' Given a node, add it as the last bucket
+
+        :param node: The node to add to the buckets
+        '''
+        if node not in self.nodes:
+            self.nodes.append(node)
+
+    def del_node(self, node):
+        ''' Given a node, remove it from the buckets. If this is
+        not the last bucket, the last node is moved into its place,
+        so the keys of both nodes are moved.
+
+        :param node: The node to remove from the buckets
+        '''
+        if node not in self.nodes: return
+        index = self.nodes.index(node)
+        self.nodes[index] = self.nodes[-1]
+        self.nodes.pop()
+
+    def get_node(self, key):
+        ''' Given a key, return the node this key belongs to
+
+        :param key: The key to find the best node for
+        :returns: The node the key should attatch to or None
+        '''
+        if not self.nodes: return None
+        return self.nodes[jump_hash(self.hasher(key), len(self.nodes))]
+
+    def get_nodes(self, keys):
+        ''' Given a collection of keys, return the nodes each
+        key belongs to.
+
+        :param keys: The keys to find the best nodes for
+        :returns: The list of nodes for each of the keys
+        '''
+        if not self.nodes: return [None for key in keys]
+        nodes, hasher, size = self.nodes, self.hasher, len(self.nodes)
+        return [nodes[jump_hash(hasher(key), size)] for key in keys]
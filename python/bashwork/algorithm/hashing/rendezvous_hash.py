@@ -0,0 +1,107 @@
+'''
+Rendezvous Hash
+------------------------------------------------------------
+
+This is an implementation of Thaler and Ravishankar's highest
+random weight (HRW) hashing. Every node is scored against the key
+and the key belongs to the node with the highest score. Since every
+node is scored, the next best nodes are a natural choice for the
+replicas of the key and only the keys of a removed node move::
+
+    circle = RendezvousHash()
+    for node in nodes:
+        circle.add_node(node)
+
+    node     = circle.get_node(key)
+    replicas = circle.get_replicas(key, count=3)
+
+Rather than hashing the node and key together for every score,
+each node hash is computed once and mixed with the key hash using
+the splitmix64 finalizer. Nodes can be weighted with the logarithmic
+method of Schindelhauer and Schomaker.
+'''
+import math
+import heapq
+from bashwork.algorithm.hashing.consistent_hash import hash_key
+
+MASK64 = 0xffffffffffffffff
+
+
+def mix_hash(value):
+    ''' The splitmix64 finalizer which scrambles the bits of
+    a 64 bit integer.
+
+    :param value: The 64 bit value to mix
+    :returns: The mixed 64 bit value
+    '''
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & MASK64
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & MASK64
+    return value ^ (value >> 31)
+
+
+class RendezvousHash(object):
+    ''' A rendezvous hash manager of some node type with the
+    same interface as the `ConsistentHash` circle.
+    '''
+
+    def __init__(self, hasher=None):
+        ''' Initialize a new instance of the rendezvous hash
+
+        :param hasher: The hash method to use (returns a 64 bit integer)
+        '''
+        self.nodes   = dict() # node => (hash, weight)
+        self.hasher  = hasher or hash_key
+
+    def add_node(self, node, weight=1):
+        ''' Given a node, add it to the candidates
+
+        :param node: The node to add to the candidates
+        :param weight: The relative share of keys for the node (default 1)
+        '''
+        self.nodes[node] = (self.hasher(str(node)), float(weight))
+
+    def del_node(self, node):
+        ''' Given a node, remove it from the candidates
+
+        :param node: The node to remove from the candidates
+        '''
+        self.nodes.pop(node, None)
+
+    def get_scores(self, key):
+        ''' Given a key, return the score of every node
+
+        :param key: The key to score the nodes for
+        :returns: A generator of (score, node)
+        '''
+        hashed = self.hasher(key)
+        for node, (seed, weight) in self.nodes.iteritems():
+            score = (mix_hash(seed ^ hashed) + 0.5) / 18446744073709551616.0
+            yield (-weight / math.log(score), node)
+
+    def get_node(self, key):
+        ''' Given a key, return the node this key belongs to
+
+        :param key: The key to find the best node for
+        :returns: The node the key should attatch to or None
+        '''
+        if not self.nodes: return None
+        return max(self.get_scores(key))[1]
+
+    def get_nodes(self, keys):
+        ''' Given a collection of keys, return the nodes each
+        key belongs to.
+
+        :param keys: The keys to find the best nodes for
+        :returns: The list of nodes for each of the keys
+        '''
+        return [self.get_node(key) for key in keys]
+
+    def get_replicas(self, key, count):
+        ''' Given a key, return the top nodes that the key
+        should be replicated to in order of preference.
+
+        :param key: The key to find the best nodes for
+        :param count: The number of replicas to return
+        :returns: The list of the best nodes for the key
+        '''
+        return [node for _, node in heapq.nlargest(count, self.get_scores(key))]
@@ -0,0 +1,117 @@
+#!/usr/bin/env python
+import unittest
+from bashwork.algorithm.hashing.bloom_filter import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class BloomFilterTest(unittest.TestCase):
+    ''' Code to validate that the bloom filter implementations are correct.
+    '''
+
+    def test_optimal_sizing(self):
+        ''' Test that the filter is sized correctly '''
+        self.assertEqual(9586, get_optimal_size(1000, 0.01))
+        self.assertEqual(7, get_optimal_hashes(1000, 9586))
+
+        bloom = BloomFilter.create(1000, 0.01)
+        self.assertEqual(9586, bloom.size)
+        self.assertEqual(7, bloom.hashes)
+        self.assertEqual(1199, len(bloom.keys))
+
+    def test_bloom_filter(self):
+        ''' Test that the bloom filter works correctly '''
+        bloom = BloomFilter.create(1000, 0.01)
+        values = [str(i) for i in range(1000)]
+        for value in values:
+            bloom.insert(value)
+        self.assertTrue(all(bloom.contains(v) for v in values))
+        self.assertTrue('500' in bloom)
+
+        missing = [str(i) for i in range(1000, 11000)]
+        errors = sum(bloom.contains_many(missing))
+        self.assertTrue(errors < 200)
+
+    def test_bloom_filter_batch(self):
+        ''' Test that the bloom filter batch methods work correctly '''
+        bloom1 = BloomFilter.create(1000, 0.01)
+        bloom2 = BloomFilter.create(1000, 0.01)
+        values = [str(i) for i in range(1000)]
+        bloom1.insert_many(values)
+        for value in values:
+            bloom2.insert(value)
+        self.assertEqual(bloom1.keys, bloom2.keys)
+        self.assertEqual([True] * 1000, bloom1.contains_many(values))
+        self.assertEqual([bloom1.contains(str(i)) for i in range(2000)],
+            bloom1.contains_many(str(i) for i in range(2000)))
+
+    def test_bloom_filter_stride(self):
+        ''' Test that the probes never collapse onto one bucket '''
+        bloom = BloomFilter(size=64, hashes=4, hasher=lambda value: (5, 128))
+        self.assertEqual(4, len(set(bloom.get_hash_keys('value'))))
+        bloom.insert_many(['value'])
+        self.assertEqual(4, bloom.cardinality)
+        self.assertEqual([True], bloom.contains_many(['value']))
+
+    def test_bloom_filter_remove(self):
+        ''' Test that the bloom filter remove works correctly '''
+        bloom = BloomFilter(size=64, hashes=3)
+        bloom.insert('value')
+        self.assertTrue(bloom.cardinality <= 3)
+        bloom.remove('value')
+        self.assertEqual(0, bloom.cardinality)
+        self.assertFalse(bloom.contains('value'))
+
+    def test_counting_bloom_filter(self):
+        ''' Test that the counting bloom filter works correctly '''
+        bloom = CountingBloomFilter.create(100, 0.01)
+        bloom.insert_many(['a', 'b', 'c'])
+        self.assertEqual([True, True, True], bloom.contains_many(['a', 'b', 'c']))
+        bloom.remove('b')
+        self.assertTrue(bloom.contains('a'))
+        self.assertFalse(bloom.contains('b'))
+        self.assertTrue(bloom.contains('c'))
+
+    def test_invertible_bloom_filter(self):
+        ''' Test that the invertible bloom filter works correctly '''
+        bloom = InvertibleBloomFilter.create(10)
+        bloom.insert('a', 'value-a')
+        bloom.insert('b')
+        self.assertEqual('value-a', bloom.get('a'))
+        self.assertEqual(None, bloom.get('c'))
+        self.assertTrue(bloom.contains('b'))
+        self.assertEqual([('a', 'value-a'), ('b', None)], sorted(bloom.list()))
+        bloom.remove('b')
+        self.assertEqual([('a', 'value-a')], bloom.list())
+
+    def test_invertible_bloom_filter_decode(self):
+        ''' Test that the invertible bloom filter can decode a difference '''
+        common = [str(i) for i in range(5000)]
+        local  = InvertibleBloomFilter.create(50)
+        remote = InvertibleBloomFilter.create(50)
+        local.insert_many(common + ['local-%d' % i for i in range(20)])
+        remote.insert_many(common + ['remote-%d' % i for i in range(30)])
+
+        added, removed, success = local.subtract(remote).decode()
+        self.assertTrue(success)
+        self.assertEqual(sorted('local-%d' % i for i in range(20)), sorted(added))
+        self.assertEqual(sorted('remote-%d' % i for i in range(30)), sorted(removed))
+
+        payload = InvertibleBloomFilter.deserialize(remote.serialize())
+        added, removed, success = local.subtract(payload).decode()
+        self.assertTrue(success)
+        self.assertEqual(30, len(removed))
+
+    def test_invertible_bloom_filter_overflow(self):
+        ''' Test that the invertible bloom filter reports a failed decode '''
+        local  = InvertibleBloomFilter(size=8, hashes=4)
+        remote = InvertibleBloomFilter(size=8, hashes=4)
+        local.insert_many(str(i) for i in range(100))
+        added, removed, success = local.subtract(remote).decode()
+        self.assertFalse(success)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
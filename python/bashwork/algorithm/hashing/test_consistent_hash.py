@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+import unittest
+from collections import Counter
+from bashwork.algorithm.hashing.consistent_hash import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class ConsistentHashTest(unittest.TestCase):
+    ''' Code to validate that the consistent hash implementation is correct.
+    '''
+
+    def setUp(self):
+        ''' Initialize the test fixture '''
+        self.keys = ['key-%d' % i for i in range(2000)]
+
+    def test_membership(self):
+        ''' Test that nodes can be added and removed '''
+        circle = ConsistentHash(replicas=10)
+        self.assertEqual(None, circle.get_node('key'))
+        circle.add_node('a')
+        circle.add_node('b', weight=3)
+        self.assertEqual(40, len(circle.circle))
+        self.assertEqual(sorted(circle.circle), circle.circle)
+
+        circle.del_node('b')
+        self.assertEqual(10, len(circle.circle))
+        self.assertEqual(set(['a']), set(circle.get_nodes(self.keys)))
+        circle.del_node('missing')
+
+    def test_get_nodes(self):
+        ''' Test that the batch lookup matches the single lookup '''
+        circle = ConsistentHash(replicas=20)
+        for node in 'abcde':
+            circle.add_node(node)
+        self.assertEqual([circle.get_node(k) for k in self.keys],
+            circle.get_nodes(self.keys))
+        self.assertEqual([], circle.get_nodes([]))
+
+    def test_weighted_nodes(self):
+        ''' Test that weighted nodes receive more keys '''
+        circle = ConsistentHash(replicas=50)
+        circle.add_node('small')
+        circle.add_node('large', weight=4)
+        counts = Counter(circle.get_nodes(self.keys))
+        self.assertTrue(counts['large'] > 2 * counts['small'])
+
+    def test_bounded_load(self):
+        ''' Test that the bounded load never exceeds the capacity '''
+        circle = ConsistentHash(replicas=2, load_factor=1.25)
+        for node in 'abcde':
+            circle.add_node(node)
+        nodes = circle.assign_many(self.keys)
+        counts = Counter(nodes)
+        self.assertTrue(max(counts.values()) <= 1.25 * 2000 / 5 + 1)
+        self.assertEqual(nodes[10], circle.get_node(self.keys[10]))
+        self.assertEqual(2000, sum(circle.loads.values()))
+        self.assertEqual(2000, circle.total_load)
+
+        circle.release(self.keys[10])
+        self.assertEqual(1999, sum(circle.loads.values()))
+        self.assertEqual(1999, circle.total_load)
+
+        circle.del_node('a')
+        self.assertEqual(sum(circle.loads.values()), circle.total_load)
+        self.assertEqual(4, circle.total_weight)
+
+    def test_bounded_lookup(self):
+        ''' Test that a bounded lookup does not assign the key '''
+        circle = ConsistentHash(replicas=2, load_factor=1.25)
+        for node in 'abcde':
+            circle.add_node(node)
+        node = circle.get_node('missing')
+        self.assertEqual([node], circle.get_nodes(['missing']))
+        self.assertEqual(0, circle.total_load)
+        self.assertEqual({}, circle.assigned)
+        self.assertEqual(node, circle.assign('missing'))
+        self.assertEqual(1, circle.total_load)
+
+    def test_diff(self):
+        ''' Test that the diff reports the moved ranges '''
+        before = ConsistentHash(replicas=10)
+        for node in 'abcd':
+            before.add_node(node)
+        after = before.copy()
+        after.add_node('e')
+
+        ranges = after.diff(before)
+        self.assertTrue(ranges)
+        self.assertTrue(all(new == 'e' for _, _, old, new in ranges))
+        self.assertEqual([], after.diff(after))
+
+        moved = set(k for k in self.keys if before.get_node(k) != after.get_node(k))
+        for key in self.keys:
+            hashed = after.hasher(key)
+            inside = any((s < hashed <= e) if s < e else (hashed > s or hashed <= e)
+                for s, e, _, _ in ranges)
+            self.assertEqual(key in moved, inside)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
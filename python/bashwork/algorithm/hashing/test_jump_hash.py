@@ -0,0 +1,46 @@
+#!/usr/bin/env python
+import unittest
+from collections import Counter
+from bashwork.algorithm.hashing.jump_hash import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class JumpHashTest(unittest.TestCase):
+    ''' Code to validate that the jump hash implementation is correct.
+    '''
+
+    def test_jump_hash(self):
+        ''' Test that the jump hash returns valid buckets '''
+        self.assertEqual(0, jump_hash(0, 1))
+        self.assertEqual(-1, jump_hash(1, 0))
+        for key in range(1000):
+            self.assertTrue(0 <= jump_hash(key, 10) < 10)
+
+    def test_key_movement(self):
+        ''' Test that only the keys of the new bucket move '''
+        keys = range(5000)
+        before = [jump_hash(key * 7919, 10) for key in keys]
+        after  = [jump_hash(key * 7919, 11) for key in keys]
+        for b, a in zip(before, after):
+            self.assertTrue(a == b or a == 10)
+
+    def test_jump_hash_nodes(self):
+        ''' Test that the node interface works correctly '''
+        shards = JumpHash()
+        self.assertEqual(None, shards.get_node('key'))
+        for node in 'abcde':
+            shards.add_node(node)
+        keys   = ['key-%d' % i for i in range(2000)]
+        counts = Counter(shards.get_nodes(keys))
+        self.assertEqual(set('abcde'), set(counts))
+        self.assertEqual([shards.get_node(k) for k in keys], shards.get_nodes(keys))
+
+        shards.del_node('b')
+        self.assertEqual(['a', 'e', 'c', 'd'], shards.nodes)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
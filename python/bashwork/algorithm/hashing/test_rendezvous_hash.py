@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+import unittest
+from collections import Counter
+from bashwork.algorithm.hashing.rendezvous_hash import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class RendezvousHashTest(unittest.TestCase):
+    ''' Code to validate that the rendezvous hash implementation is correct.
+    '''
+
+    def setUp(self):
+        ''' Initialize the test fixture '''
+        self.keys = ['key-%d' % i for i in range(2000)]
+
+    def test_rendezvous_hash(self):
+        ''' Test that the node interface works correctly '''
+        circle = RendezvousHash()
+        self.assertEqual(None, circle.get_node('key'))
+        for node in 'abcde':
+            circle.add_node(node)
+        before = circle.get_nodes(self.keys)
+        self.assertEqual(set('abcde'), set(before))
+
+        circle.del_node('c')
+        after = circle.get_nodes(self.keys)
+        for b, a in zip(before, after):
+            self.assertTrue(a == b or b == 'c')
+
+    def test_get_replicas(self):
+        ''' Test that the replicas are the best nodes '''
+        circle = RendezvousHash()
+        for node in 'abcde':
+            circle.add_node(node)
+        for key in self.keys[:100]:
+            replicas = circle.get_replicas(key, 3)
+            self.assertEqual(3, len(set(replicas)))
+            self.assertEqual(circle.get_node(key), replicas[0])
+
+    def test_weighted_nodes(self):
+        ''' Test that weighted nodes receive more keys '''
+        circle = RendezvousHash()
+        circle.add_node('small')
+        circle.add_node('large', weight=3)
+        counts = Counter(circle.get_nodes(self.keys))
+        self.assertTrue(counts['large'] > 2 * counts['small'])
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
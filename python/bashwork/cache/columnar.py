@@ -0,0 +1,190 @@
+'''
+Columnar File Cache
+------------------------------------------------------------
+
+This is a cache for numeric datasets (numpy arrays, dictionaries
+of arrays, and pandas data frames) that stores every column as a
+raw, 64 byte aligned buffer after a small json header. Instead of
+reading the data into fresh memory, the columns are mapped with
+`numpy.memmap`, so loading is constant time and the pages are
+shared between every process that maps the same file::
+
+    cache = ColumnarFileCache(root='cache')
+    cache.save('features', frame)
+    frame = cache.load('features')
+    price = cache.load_columns('features', ['price'])['price']
+
+The file is laid out as::
+
+    [magic:8][header length:4][json header][padding]
+    [column 0][padding][column 1][padding]...
+
+Only fixed width dtypes can be stored; object columns (such as
+python strings) raise a `TypeError`.
+
+..note:: `load_columns` never copies the data, however pandas may
+   consolidate the columns of a data frame into a new block when
+   the frame is built in `load`.
+'''
+import os
+import json
+import struct
+import numpy as np
+import pandas as pd
+from bashwork.cache.common import FileCache
+
+#-----------------------------------------------------------
+# Columnar Cache
+#-----------------------------------------------------------
+
+class ColumnarFileCache(FileCache):
+    ''' A cache that persists numeric columns as raw aligned
+    buffers that are memory mapped when loaded.
+    '''
+
+    MAGIC     = 'BWCOLS01'
+    ALIGNMENT = 64
+    INDEX     = '__index__'
+    __length  = struct.Struct('<I')
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the cache.
+        '''
+        super(ColumnarFileCache, self).__init__(ext=".cols", **kwargs)
+
+    #------------------------------------------------------------
+    # helpers
+    #------------------------------------------------------------
+
+    def __align(self, offset):
+        return offset + (-offset % self.ALIGNMENT)
+
+    def __get_columns(self, data):
+        ''' Given a dataset, return its kind and its columns.
+
+        :param data: The dataset to get the columns of
+        :returns: A tuple of (kind, [(name, array)])
+        '''
+        if isinstance(data, pd.DataFrame):
+            columns = [(name, data[name].values) for name in data.columns]
+            index   = data.index
+            if not (isinstance(index, pd.RangeIndex) and
+                index.equals(pd.RangeIndex(len(index)))):
+                columns.append((self.INDEX, index.values))
+            return 'frame', columns
+        if isinstance(data, dict):
+            return 'dict', [(name, np.asarray(data[name])) for name in sorted(data)]
+        return 'array', [('data', np.asarray(data))]
+
+    def __read_header(self, path):
+        ''' Read the header of the supplied cache file.
+
+        :param path: The full path of the cache file
+        :returns: The decoded header
+        '''
+        with open(path, 'rb') as handle:
+            if handle.read(len(self.MAGIC)) != self.MAGIC:
+                raise IOError("%s is not a columnar cache file" % path)
+            length, = self.__length.unpack(handle.read(self.__length.size))
+            return json.loads(handle.read(length))
+
+    #------------------------------------------------------------
+    # cache methods
+    #------------------------------------------------------------
+
+    def save(self, path, data):
+        ''' Given a path and some data to cache, cache
+        that data.
+
+        :param path: The path to store the data at
+        :param data: The data to store at the supplied path
+        '''
+        kind, columns = self.__get_columns(data)
+        for name, array in columns:
+            if array.dtype.hasobject:
+                raise TypeError("column %s has a non fixed width dtype" % name)
+
+        header = { 'kind': kind, 'columns': [] }
+        offset = 0
+        for name, array in columns:
+            header['columns'].append({
+                'name'  : name,
+                'dtype' : array.dtype.str,
+                'shape' : list(array.shape),
+                'offset': offset,
+            })
+            offset = self.__align(offset + array.nbytes)
+
+        prefix, start = len(self.MAGIC) + self.__length.size, 0
+        while True: # shifting the offsets can grow the header
+            encoded = json.dumps(dict(header, columns=[dict(c, offset=c['offset'] + start)
+                for c in header['columns']]))
+            if prefix + len(encoded) <= start: break
+            start = self.__align(prefix + len(encoded))
+        header  = json.loads(encoded)
+        encoded = encoded.ljust(start - prefix)
+
+        path = os.path.join(self.root, path + self.ext)
+        with open(path + '.tmp', 'wb') as handle:
+            handle.write(self.MAGIC)
+            handle.write(self.__length.pack(len(encoded)))
+            handle.write(encoded)
+            for column, (name, array) in zip(header['columns'], columns):
+                handle.seek(column['offset'])
+                np.ascontiguousarray(array).tofile(handle)
+        os.rename(path + '.tmp', path)
+
+    def get_columns(self, path):
+        ''' Retrieve the names of the columns stored at the path.
+
+        :param path: The path to get the columns of
+        :returns: The list of the column names
+        '''
+        header = self.__read_header(os.path.join(self.root, path + self.ext))
+        return [column['name'] for column in header['columns']
+            if column['name'] != self.INDEX]
+
+    def load_columns(self, path, columns=None):
+        ''' Given a path, map the requested columns without
+        reading or copying any of the data.
+
+        :param path: The path to load from the cache
+        :param columns: The columns to load (default all)
+        :returns: A dictionary of column name to memmap
+        '''
+        path   = os.path.join(self.root, path + self.ext)
+        header = self.__read_header(path)
+        wanted = set(columns) if columns is not None else None
+        mapped = {}
+        for column in header['columns']:
+            if wanted is not None and column['name'] not in wanted:
+                continue
+            shape = tuple(column['shape'])
+            if not np.prod(shape):
+                mapped[column['name']] = np.empty(shape, dtype=column['dtype'])
+            else: mapped[column['name']] = np.memmap(path, mode='r',
+                dtype=np.dtype(str(column['dtype'])), offset=column['offset'], shape=shape)
+        if wanted is not None and wanted - set(mapped):
+            raise KeyError("missing columns %s" % sorted(wanted - set(mapped)))
+        return mapped
+
+    def load(self, path, columns=None):
+        ''' Given a path, attempt to load the supplied
+        data at the path.
+
+        :param path: The path to load from the cache
+        :param columns: The columns to load (default all)
+        :returns: The data (if it exists) at the cache
+        '''
+        header = self.__read_header(os.path.join(self.root, path + self.ext))
+        names  = [c['name'] for c in header['columns'] if c['name'] != self.INDEX]
+        names  = names if columns is None else list(columns)
+        index  = [c['name'] for c in header['columns'] if c['name'] == self.INDEX]
+        mapped = self.load_columns(path, names + index)
+
+        if header['kind'] == 'array':
+            return mapped['data']
+        if header['kind'] == 'dict':
+            return mapped
+        index = mapped.pop(self.INDEX, None)
+        return pd.DataFrame(mapped, columns=names, index=index, copy=False)
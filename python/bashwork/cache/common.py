@@ -1,7 +1,10 @@
 import os
 import json
+import time
+import functools
 import pandas as pd
 import msgpack as msgpack
+from bashwork.cache.flight import SingleFlight, file_lock, null_lock, LOCK_EXT
 
 try:
     import cPickle as pickle
@@ -43,6 +46,15 @@ class Cache(object):
         '''
         raise NotImplementedError("load")
 
+    def age(self, path):
+        ''' Given a path, return the number of seconds since
+        the data at the path was saved.
+
+        :param path: The path to get the age of
+        :returns: The age of the data in seconds
+        '''
+        raise NotImplementedError("age")
+
 
 class FileCache(Cache):
     ''' A base class cache that can be used to supply
@@ -65,6 +77,25 @@ class FileCache(Cache):
         path = os.path.join(self.root, path + self.ext)
         return os.path.exists(path)
 
+    def age(self, path):
+        ''' Given a path, return the number of seconds since
+        the data at the path was saved.
+
+        :param path: The path to get the age of
+        :returns: The age of the data in seconds
+        '''
+        path = os.path.join(self.root, path + self.ext)
+        return time.time() - os.path.getmtime(path)
+
+    def keys(self):
+        ''' Retrieve all the paths that are stored in the cache.
+
+        :returns: The list of the stored paths
+        '''
+        names = [name for name in os.listdir(self.root) if not name.endswith(LOCK_EXT)]
+        if not self.ext: return names
+        return [name[:-len(self.ext)] for name in names if name.endswith(self.ext)]
+
     @staticmethod
     def convert(cache_a, cache_b):
         ''' Given two cache functions, convert
@@ -76,7 +107,7 @@ class FileCache(Cache):
         '''
         name_a = cache_a.__class__.__name__
         name_b = cache_b.__class__.__name__
-        for path in os.listdir(cache_a.root):
+        for path in cache_a.keys():
             log.debug("converting file %s from %s to %s", path, name_a, name_b)
             data = cache_a.load(path)
             cache_b.save(path, data)
@@ -210,21 +241,58 @@ class PandasFileCache(FileCache):
         path = os.path.join(self.root, path + self.ext)
         return pd.read_hdf(path)
 
-def cacheable(key_format):
+def cacheable(key_format, single_flight=False, ttl=None,
+    stale_while_revalidate=False, lock=False):
     ''' A helper method to cache expensive methods
     of a class method. The key format should use all
     the params of the input to the function.
- 
+
+    With `single_flight`, concurrent misses of the same key
+    in a process wait for the first caller to compute the value
+    instead of all computing it. With `lock`, the computation also
+    holds a lock file under the cache root so that only one process
+    computes the value (so the cache must have a root directory). With a `ttl`, entries older than the ttl are
+    recomputed, and with `stale_while_revalidate` the stale entry is
+    returned while it is recomputed in the background.
+
     :param key_format: The format of the key to cache
+    :param single_flight: True to coalesce concurrent misses
+    :param ttl: The number of seconds an entry is fresh (default forever)
+    :param stale_while_revalidate: True to serve stale entries while refreshing
+    :param lock: True to lock across processes while computing
     :returns: A decorated class method
+    :raises ValueError: If locking a cache without a root directory
     '''
+    group = SingleFlight()
+
     def _cacheable(func):
-        def wrapper(self, *args):
-            key = key_format.format(*args)
-            if not self.cache.exists(key):
+        def is_fresh(cache, key):
+            if not cache.exists(key): return False
+            return ttl is None or cache.age(key) <= ttl
+
+        def compute(self, key, args):
+            path = os.path.join(self.cache.root, key + LOCK_EXT) if lock else None
+            with (file_lock(path) if lock else null_lock()):
+                if (single_flight or lock) and is_fresh(self.cache, key):
+                    return self.cache.load(key) # filled while we waited
                 result = func(self, *args)
                 self.cache.save(key, result)
                 return result
-            return self.cache.load(key)
+
+        @functools.wraps(func)
+        def wrapper(self, *args):
+            if lock and getattr(self.cache, 'root', None) is None:
+                raise ValueError("a locked cache must have a root directory")
+            key = key_format.format(*args)
+            if self.cache.exists(key):
+                if ttl is None or self.cache.age(key) <= ttl:
+                    return self.cache.load(key)
+                if stale_while_revalidate:
+                    stale = self.cache.load(key) # before the refresh can replace it
+                    group.spawn((id(self.cache), key), compute, self, key, args)
+                    return stale
+            if single_flight:
+                return group.do((id(self.cache), key), compute, self, key, args)
+            return compute(self, key, args)
         return wrapper
     return _cacheable
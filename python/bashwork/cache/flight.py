@@ -0,0 +1,176 @@
+'''
+Single Flight
+------------------------------------------------------------
+
+When many threads miss the same cache key at the same time, they
+will all compute the same expensive value and race to write it.
+A single flight group makes sure that only one caller (the leader)
+computes the value for a key while the other callers for that key
+wait for the leader and share its result::
+
+    group  = SingleFlight()
+    result = group.do(key, expensive, *args)
+
+To coordinate between processes as well, the leader can hold an
+exclusive lock file while it computes the value::
+
+    with file_lock(path + LOCK_EXT):
+        if not cache.exists(key):
+            cache.save(key, expensive())
+
+The lock files are left in place (removing a lock file that another
+process is waiting on breaks the lock), so file caches skip every
+name ending in `LOCK_EXT` when they list their keys.
+'''
+import os
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError: fcntl = None # pragma: no cover
+
+LOCK_EXT = '.lock' # the suffix of the lock files
+
+#-----------------------------------------------------------
+# Logging
+#-----------------------------------------------------------
+
+import logging
+log = logging.getLogger(__name__)
+
+#-----------------------------------------------------------
+# Single Flight
+#-----------------------------------------------------------
+
+class FlightCall(object):
+    ''' The state of a single in flight call.
+    '''
+
+    __slots__ = ['event', 'result', 'error']
+
+    def __init__(self):
+        ''' Initialize a new instance of the call.
+        '''
+        self.event  = threading.Event()
+        self.result = None
+        self.error  = None
+
+
+class SingleFlight(object):
+    ''' A group of calls where only one call per key is
+    in flight at any given time.
+    '''
+
+    def __init__(self):
+        ''' Initialize a new instance of the group.
+        '''
+        self.lock  = threading.Lock()
+        self.calls = {} # key => FlightCall
+
+    def do(self, key, function, *args, **kwargs):
+        ''' Call the supplied function unless a call for the
+        same key is already in flight, in which case wait for
+        that call and return its result (or raise its error).
+
+        :param key: The key to deduplicate the calls by
+        :param function: The function to call
+        :returns: The result of the function
+        '''
+        with self.lock:
+            call = self.calls.get(key)
+            leader = call is None
+            if leader:
+                call = self.calls[key] = FlightCall()
+
+        if not leader:
+            call.event.wait()
+            if call.error: raise call.error
+            return call.result
+        return self.__lead(key, call, function, *args, **kwargs)
+
+    def __lead(self, key, call, function, *args, **kwargs):
+        ''' Run the call that was registered for the key and
+        hand its result to the waiting callers.
+
+        :param key: The key the call was registered under
+        :param call: The registered call
+        :param function: The function to call
+        :returns: The result of the function
+        '''
+        try:
+            call.result = function(*args, **kwargs)
+            return call.result
+        except Exception as ex:
+            call.error = ex
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+            call.event.set()
+
+    def spawn(self, key, function, *args, **kwargs):
+        ''' Call the supplied function in a background thread
+        unless a call for the same key is already in flight.
+
+        :param key: The key to deduplicate the calls by
+        :param function: The function to call
+        :returns: True if a new call was started, False otherwise
+        '''
+        with self.lock: # register before releasing so only one thread starts
+            if key in self.calls: return False
+            call = self.calls[key] = FlightCall()
+
+        def background():
+            try: self.__lead(key, call, function, *args, **kwargs)
+            except Exception: log.exception("background call for %s failed", key)
+
+        thread = threading.Thread(target=background)
+        thread.daemon = True
+        thread.start()
+        return True
+
+    def in_flight(self, key):
+        ''' Check if a call for the supplied key is in flight.
+
+        :param key: The key to check for
+        :returns: True if a call is in flight, False otherwise
+        '''
+        with self.lock:
+            return key in self.calls
+
+#-----------------------------------------------------------
+# File Locks
+#-----------------------------------------------------------
+
+@contextmanager
+def file_lock(path):
+    ''' Hold an exclusive advisory lock on the supplied path
+    for the duration of the context. On systems without `fcntl`
+    this does not lock anything.
+
+    example::
+
+        with file_lock('cache/key.lock'):
+            ...
+
+    :param path: The path of the lock file
+    '''
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+
+    with open(path, 'a') as handle:
+        if fcntl: fcntl.flock(handle.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl: fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def null_lock(path=None):
+    ''' A lock that does not lock anything, for when the
+    file lock is disabled.
+    '''
+    yield
@@ -0,0 +1,418 @@
+'''
+In Memory Caches
+------------------------------------------------------------
+
+These are thread safe, in process caches that follow the same
+`save`/`load`/`exists` contract as the file caches. They can be
+bounded by the number of entries, by the (estimated) number of
+bytes they hold, or both, and evict with one of the following
+policies:
+
+* `LRUMemoryCache` - evict the least recently used entry
+* `LFUMemoryCache` - evict the least frequently used entry
+* `TTLMemoryCache` - expire entries after a fixed time to live
+
+A memory cache can be placed in front of any other cache as a
+two level cache so hot keys never touch the disk::
+
+    cache = TieredCache(
+        memory=LRUMemoryCache(size=10000),
+        backing=JsonFileCache(root='cache'))
+    print cache.stats
+'''
+import sys
+import time
+import threading
+from collections import OrderedDict
+from bashwork.cache.common import Cache
+
+
+#-----------------------------------------------------------
+# Statistics
+#-----------------------------------------------------------
+
+class CacheStats(object):
+    ''' A collection of the statistics for a single cache.
+    '''
+
+    __slots__ = ['hits', 'misses', 'evictions', 'rejected']
+
+    def __init__(self):
+        ''' Initialize a new instance of the statistics.
+        '''
+        self.hits      = 0
+        self.misses    = 0
+        self.evictions = 0
+        self.rejected  = 0 # values larger than the cache
+
+    @property
+    def hit_rate(self):
+        ''' Returns the fraction of the lookups that were hits.
+
+        :returns: The current hit rate of the cache
+        '''
+        total = self.hits + self.misses
+        return self.hits / float(total) if total else 0.0
+
+    def to_dict(self):
+        ''' Returns the statistics as a dictionary.
+
+        :returns: The statistics as a dictionary
+        '''
+        return dict((name, getattr(self, name)) for name in self.__slots__)
+
+    def __repr__(self):
+        return "<CacheStats hits={} misses={} evictions={} rejected={}>".format(
+            self.hits, self.misses, self.evictions, self.rejected)
+
+#-----------------------------------------------------------
+# Memory Caches
+#-----------------------------------------------------------
+
+class MemoryCache(Cache):
+    ''' A base class for the in memory caches which manages
+    the storage, locking, bounds, and statistics. The eviction
+    policy is supplied by the subclasses by overloading the
+    `on_insert`, `on_access`, `on_remove` and `get_victim` hooks.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the cache.
+
+        :param size: The maximum number of entries (default 1024)
+        :param max_bytes: The maximum number of bytes (default unbounded)
+        :param sizer: A method to estimate the bytes of a value
+        '''
+        self.size      = kwargs.get('size', 1024)
+        self.max_bytes = kwargs.get('max_bytes', None)
+        self.sizer     = kwargs.get('sizer', sys.getsizeof)
+        self.lock      = threading.RLock()
+        self.stats     = CacheStats()
+        self.data      = {} # key => value
+        self.sizes     = {} # key => bytes
+        self.saved     = {} # key => save time
+        self.total     = 0  # total bytes
+
+    #------------------------------------------------------------
+    # policy hooks
+    #------------------------------------------------------------
+
+    def on_insert(self, path):
+        ''' Called when a new key is inserted into the cache.
+
+        :param path: The key that was inserted
+        '''
+        raise NotImplementedError("on_insert")
+
+    def on_access(self, path):
+        ''' Called when an existing key is read from the cache.
+
+        :param path: The key that was read
+        '''
+        raise NotImplementedError("on_access")
+
+    def on_remove(self, path):
+        ''' Called when a key is removed from the cache.
+
+        :param path: The key that was removed
+        '''
+        raise NotImplementedError("on_remove")
+
+    def get_victim(self):
+        ''' Retrieve the next key that should be evicted.
+
+        :returns: The key to evict next
+        '''
+        raise NotImplementedError("get_victim")
+
+    def is_expired(self, path):
+        ''' Check if the supplied key has expired.
+
+        :param path: The key to check for expiration
+        :returns: True if the key is expired, False otherwise
+        '''
+        return False
+
+    #------------------------------------------------------------
+    # cache methods
+    #------------------------------------------------------------
+
+    def save(self, path, data):
+        ''' Given a path and some data to cache, cache
+        that data. Data larger than the byte bound is never
+        cached (it would evict every other entry) and is only
+        counted in the rejected statistics.
+
+        :param path: The path to store the data at
+        :param data: The data to store at the supplied path
+        '''
+        size = self.sizer(data) if self.max_bytes else 0
+        with self.lock:
+            if path in self.data:
+                self.remove(path)
+            if self.max_bytes and size > self.max_bytes:
+                self.stats.rejected += 1
+                return
+            self.__enforce_bounds(size)
+            self.data[path]  = data
+            self.sizes[path] = size
+            self.saved[path] = time.time()
+            self.total += size
+            self.on_insert(path)
+
+    def load(self, path):
+        ''' Given a path, attempt to load the supplied
+        data at the path.
+
+        :param path: The path to load from the cache
+        :returns: The data (if it exists) at the cache
+        :raises KeyError: If the path is not in the cache
+        '''
+        with self.lock:
+            if path in self.data:
+                if not self.is_expired(path):
+                    self.stats.hits += 1
+                    self.on_access(path)
+                    return self.data[path]
+                self.__evict(path)
+            self.stats.misses += 1
+        raise KeyError(path)
+
+    def exists(self, path):
+        ''' Given a path, determine if the supplied cache
+        exists.
+
+        :param path: The path to test for existance
+        :return: True if exists False otherwise
+        '''
+        with self.lock:
+            return path in self.data and not self.is_expired(path)
+
+    def age(self, path):
+        ''' Given a path, return the number of seconds since
+        the data at the path was saved.
+
+        :param path: The path to get the age of
+        :returns: The age of the data in seconds
+        '''
+        with self.lock:
+            return time.time() - self.saved[path]
+
+    def remove(self, path):
+        ''' Remove the supplied path from the cache if it exists.
+
+        :param path: The path to remove from the cache
+        '''
+        with self.lock:
+            if path in self.data:
+                self.on_remove(path)
+                self.total -= self.sizes.pop(path)
+                del self.saved[path]
+                del self.data[path]
+
+    def clear(self):
+        ''' Remove all the entries from the cache.
+        '''
+        with self.lock:
+            for path in list(self.data):
+                self.remove(path)
+
+    def __evict(self, path):
+        self.stats.evictions += 1
+        self.remove(path)
+
+    def __enforce_bounds(self, size):
+        ''' Evict entries until there is room for a new entry
+        of the supplied size.
+        '''
+        while self.data and (len(self.data) >= self.size or
+            (self.max_bytes and self.total + size > self.max_bytes)):
+            self.__evict(self.get_victim())
+
+    def __len__(self): return len(self.data)
+    def __contains__(self, path): return self.exists(path)
+
+
+class LRUMemoryCache(MemoryCache):
+    ''' A memory cache that evicts the least recently
+    used entry first.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the cache.
+        '''
+        super(LRUMemoryCache, self).__init__(**kwargs)
+        self.order = OrderedDict()
+
+    def on_insert(self, path): self.order[path] = None
+    def on_remove(self, path): del self.order[path]
+    def get_victim(self):      return next(iter(self.order))
+
+    def on_access(self, path):
+        del self.order[path]
+        self.order[path] = None
+
+
+class LFUMemoryCache(MemoryCache):
+    ''' A memory cache that evicts the least frequently
+    used entry first (ties are broken by least recent use).
+    Every operation is O(1) by keeping a bucket of keys for
+    each use count.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the cache.
+        '''
+        super(LFUMemoryCache, self).__init__(**kwargs)
+        self.counts   = {} # key => use count
+        self.buckets  = {} # use count => ordered keys
+        self.min_count = 0
+
+    def __unlink(self, path):
+        count  = self.counts.pop(path)
+        bucket = self.buckets[count]
+        del bucket[path]
+        if not bucket:
+            del self.buckets[count]
+        return count
+
+    def __link(self, path, count):
+        self.counts[path] = count
+        self.buckets.setdefault(count, OrderedDict())[path] = None
+
+    def on_insert(self, path):
+        self.__link(path, 1)
+        self.min_count = 1
+
+    def on_access(self, path):
+        count = self.__unlink(path)
+        self.__link(path, count + 1)
+        if self.min_count == count and count not in self.buckets:
+            self.min_count = count + 1
+
+    def on_remove(self, path):
+        self.__unlink(path)
+
+    def get_victim(self):
+        if self.min_count not in self.buckets:
+            self.min_count = min(self.buckets)
+        return next(iter(self.buckets[self.min_count]))
+
+
+class TTLMemoryCache(MemoryCache):
+    ''' A memory cache that expires every entry after
+    a fixed time to live. When the cache is full, the entry
+    closest to expiring is evicted first.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the cache.
+
+        :param ttl: The time to live of each entry in seconds (default 60)
+        :param clock: The method to retrieve the current time
+        '''
+        super(TTLMemoryCache, self).__init__(**kwargs)
+        self.ttl     = kwargs.get('ttl', 60)
+        self.clock   = kwargs.get('clock', time.time)
+        self.expires = OrderedDict() # key => expire time
+
+    def on_insert(self, path):
+        self.expires[path] = self.clock() + self.ttl
+        self.__purge()
+
+    def on_access(self, path): pass
+    def on_remove(self, path): del self.expires[path]
+    def get_victim(self):      return next(iter(self.expires))
+
+    def is_expired(self, path):
+        return self.expires[path] <= self.clock()
+
+    def __purge(self):
+        ''' Evict all of the entries that have already expired,
+        which are always at the front of the expiration order.
+        '''
+        now = self.clock()
+        while self.expires:
+            path, expires = next(self.expires.iteritems())
+            if expires > now: break
+            self.stats.evictions += 1
+            self.remove(path)
+
+#-----------------------------------------------------------
+# Tiered Caches
+#-----------------------------------------------------------
+
+class TieredCache(Cache):
+    ''' A two level cache that places a memory cache in front
+    of another (usually file backed) cache. Reads are served
+    from memory when possible and populate the memory cache
+    when they are not. Writes go through to both levels.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the cache.
+
+        :param memory: The memory cache to serve hot keys from
+        :param backing: The cache to fall back to
+        '''
+        self.memory  = kwargs.get('memory') or LRUMemoryCache()
+        self.backing = kwargs['backing']
+
+    @property
+    def root(self):
+        ''' Returns the root of the backing cache.
+
+        :returns: The root of the backing cache
+        :raises AttributeError: If the backing cache has no root
+        '''
+        return self.backing.root
+
+    @property
+    def stats(self):
+        ''' Returns the statistics of the memory level.
+
+        :returns: The statistics of the memory level
+        '''
+        return self.memory.stats
+
+    def save(self, path, data):
+        ''' Given a path and some data to cache, cache
+        that data.
+
+        :param path: The path to store the data at
+        :param data: The data to store at the supplied path
+        '''
+        self.backing.save(path, data)
+        self.memory.save(path, data)
+
+    def load(self, path):
+        ''' Given a path, attempt to load the supplied
+        data at the path.
+
+        :param path: The path to load from the cache
+        :returns: The data (if it exists) at the cache
+        '''
+        try:
+            return self.memory.load(path)
+        except KeyError:
+            data = self.backing.load(path)
+            self.memory.save(path, data)
+            return data
+
+    def exists(self, path):
+        ''' Given a path, determine if the supplied cache
+        exists.
+
+        :param path: The path to test for existance
+        :return: True if exists False otherwise
+        '''
+        return self.memory.exists(path) or self.backing.exists(path)
+
+    def age(self, path):
+        ''' Given a path, return the number of seconds since
+        the data at the path was saved.
+
+        :param path: The path to get the age of
+        :returns: The age of the data in seconds
+        '''
+        return self.backing.age(path)
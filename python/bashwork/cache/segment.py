@@ -0,0 +1,373 @@
+'''
+Segment File Cache
+------------------------------------------------------------
+
+This is a log structured cache that appends every entry to a
+small number of segment files instead of writing a file per key.
+It keeps the `save`/`load`/`exists` contract of the other file
+caches, so it can be used with `cacheable` unchanged::
+
+    cache = SegmentFileCache(root='cache', segment_size=64 << 20)
+    cache.save('key', data)
+    data = cache.load('key')
+
+Each record in a segment is laid out as::
+
+    [key length:4][value length:4][crc32:4][key][value]
+
+A value length of `0xffffffff` marks a deleted key. The location
+of every live key is kept in an in memory index that is rebuilt on
+start from the `.index` hint file of each sealed segment (or by
+scanning the segment when the hint is missing). Reads are served
+from a memory map of the segment, so `load_buffer` can return the
+stored bytes without copying them.
+
+Overwritten and deleted records are garbage that is reclaimed by
+`compact`, which copies the live records of the sealed segments
+into new segments. This can be run in a background thread with
+`start_compaction`.
+'''
+import os
+import time
+import zlib
+import mmap
+import struct
+import threading
+from bashwork.cache.common import FileCache
+
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
+#-----------------------------------------------------------
+# Logging
+#-----------------------------------------------------------
+
+import logging
+log = logging.getLogger(__name__)
+
+#-----------------------------------------------------------
+# Segment Cache
+#-----------------------------------------------------------
+
+class SegmentFileCache(FileCache):
+    ''' A cache that persists the supplied data to a collection
+    of append only segment files.
+    '''
+
+    __header    = struct.Struct('<III')
+    __tombstone = 0xffffffff
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the cache.
+
+        :param root: The directory to store the segments in
+        :param segment_size: The size to roll a segment at (default 64MB)
+        :param dumps: The method to serialize a value (default pickle)
+        :param loads: The method to deserialize a value (default pickle)
+        '''
+        super(SegmentFileCache, self).__init__(ext=".log", **kwargs)
+        self.segment_size = kwargs.get('segment_size', 64 << 20)
+        self.dumps   = kwargs.get('dumps', lambda d: pickle.dumps(d, pickle.HIGHEST_PROTOCOL))
+        self.loads   = kwargs.get('loads', pickle.loads)
+        self.lock    = threading.RLock()
+        self.index   = {} # key => (segment, offset, length)
+        self.times   = {} # key => save time (this process only)
+        self.garbage = {} # segment => dead bytes
+        self.maps    = {} # segment => mmap
+        self.active  = None
+        self.handle  = None
+        self.thread  = None
+        self.running = threading.Event()
+
+        if not os.path.exists(self.root):
+            os.makedirs(self.root)
+        segments = self.get_segments()
+        for segment in segments:
+            self.__load_segment(segment)
+        self.__open_segment(segments[-1] if segments else 0)
+
+    #------------------------------------------------------------
+    # segment helpers
+    #------------------------------------------------------------
+
+    def get_segment_path(self, segment, ext=None):
+        ''' Retrieve the path to the supplied segment.
+
+        :param segment: The identifier of the segment
+        :param ext: The extension of the file (default the log)
+        :returns: The path to the segment file
+        '''
+        name = "segment-%08d%s" % (segment, ext or self.ext)
+        return os.path.join(self.root, name)
+
+    def get_segments(self):
+        ''' Retrieve the identifiers of the segments on disk.
+
+        :returns: The sorted list of segment identifiers
+        '''
+        names = (name for name in os.listdir(self.root)
+            if name.startswith('segment-') and name.endswith(self.ext))
+        return sorted(int(name[8:-len(self.ext)]) for name in names)
+
+    def __open_segment(self, segment):
+        ''' Open the supplied segment as the active segment.
+        '''
+        if self.handle: self.__seal_segment()
+        hint = self.get_segment_path(segment, '.index')
+        if os.path.exists(hint): os.remove(hint) # stale once appended to
+        self.active = segment
+        self.handle = open(self.get_segment_path(segment), 'ab')
+        self.garbage.setdefault(segment, 0)
+
+    def __seal_segment(self):
+        ''' Close the active segment and write its index hint,
+        which is the list of its records without the values.
+        '''
+        self.handle.close()
+        self.handle = None
+        self.maps.pop(self.active, None)
+        hint = list(self.__scan_segment(self.active))
+        with open(self.get_segment_path(self.active, '.index'), 'wb') as handle:
+            pickle.dump(hint, handle, pickle.HIGHEST_PROTOCOL)
+
+    def __load_segment(self, segment):
+        ''' Add the records of the supplied segment to the index,
+        preferring the hint file when it exists.
+        '''
+        self.garbage.setdefault(segment, 0)
+        hint = self.get_segment_path(segment, '.index')
+        if os.path.exists(hint):
+            with open(hint, 'rb') as handle:
+                records = pickle.load(handle)
+        else: records = self.__scan_segment(segment)
+
+        for key, offset, length in records:
+            if length == self.__tombstone:
+                self.__remove_index(key)
+                self.garbage[segment] += self.__header.size + len(key)
+            else: self.__add_index(key, segment, offset, length)
+
+    def __scan_segment(self, segment):
+        ''' Iterate over the valid records in the supplied segment,
+        stopping at the first truncated or corrupt record.
+        '''
+        mapped = self.__get_map(segment)
+        offset, size = 0, len(mapped) if mapped else 0
+        while offset + self.__header.size <= size:
+            klength, vlength, crc = self.__header.unpack_from(mapped, offset)
+            start = offset + self.__header.size
+            value = 0 if vlength == self.__tombstone else vlength
+            if start + klength + value > size: break
+            if zlib.crc32(mapped[start:start + klength + value]) & 0xffffffff != crc:
+                log.warning("corrupt record in segment %d at %d", segment, offset)
+                break
+            key = mapped[start:start + klength]
+            yield key, start + klength, vlength
+            offset = start + klength + value
+
+    def __get_map(self, segment, end=0):
+        ''' Retrieve the memory map of the supplied segment that
+        covers at least the supplied end offset.
+        '''
+        mapped = self.maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            if segment == self.active and self.handle:
+                self.handle.flush()
+            with open(self.get_segment_path(segment), 'rb') as handle:
+                if not os.fstat(handle.fileno()).st_size: return None
+                mapped = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+            self.maps[segment] = mapped # old maps live while referenced
+        return mapped
+
+    def __add_index(self, key, segment, offset, length):
+        self.__remove_index(key)
+        self.index[key] = (segment, offset, length)
+
+    def __remove_index(self, key):
+        if key in self.index:
+            segment, _, length = self.index.pop(key)
+            self.garbage[segment] += self.__header.size + len(key) + length
+
+    def __append(self, key, value):
+        ''' Append a record to the active segment.
+
+        :param key: The key of the record
+        :param value: The value of the record (or None to delete)
+        :returns: The offset of the value in the active segment
+        '''
+        if self.handle.tell() >= self.segment_size:
+            self.__open_segment(self.active + 1)
+
+        length = self.__tombstone if value is None else len(value)
+        crc    = zlib.crc32(key + (value or '')) & 0xffffffff
+        offset = self.handle.tell()
+        self.handle.write(self.__header.pack(len(key), length, crc))
+        self.handle.write(key)
+        if value: self.handle.write(value)
+        return offset + self.__header.size + len(key)
+
+    #------------------------------------------------------------
+    # cache methods
+    #------------------------------------------------------------
+
+    def save(self, path, data):
+        ''' Given a path and some data to cache, cache
+        that data.
+
+        :param path: The path to store the data at
+        :param data: The data to store at the supplied path
+        '''
+        value = self.dumps(data)
+        with self.lock:
+            offset = self.__append(path, value)
+            self.__add_index(path, self.active, offset, len(value))
+            self.times[path] = time.time()
+
+    def load_buffer(self, path):
+        ''' Given a path, return a zero copy view of the
+        serialized data at that path.
+
+        :param path: The path to load from the cache
+        :returns: A read only buffer of the serialized data
+        '''
+        with self.lock:
+            if path not in self.index:
+                raise IOError("no cache entry for %s" % path)
+            segment, offset, length = self.index[path]
+            return buffer(self.__get_map(segment, offset + length), offset, length)
+
+    def load(self, path):
+        ''' Given a path, attempt to load the supplied
+        data at the path.
+
+        :param path: The path to load from the cache
+        :returns: The data (if it exists) at the cache
+        '''
+        return self.loads(str(self.load_buffer(path)))
+
+    def exists(self, path):
+        ''' Given a path, determine if the supplied cache
+        exists.
+
+        :param path: The path to test for existance
+        :return: True if exists False otherwise
+        '''
+        return path in self.index
+
+    def age(self, path):
+        ''' Given a path, return the number of seconds since
+        the data at the path was saved. For entries saved by another
+        process, this is the age of the segment holding the entry.
+
+        :param path: The path to get the age of
+        :returns: The age of the data in seconds
+        '''
+        if path in self.times:
+            return time.time() - self.times[path]
+        segment = self.index[path][0]
+        return time.time() - os.path.getmtime(self.get_segment_path(segment))
+
+    def remove(self, path):
+        ''' Remove the supplied path from the cache.
+
+        :param path: The path to remove from the cache
+        '''
+        with self.lock:
+            if path in self.index:
+                self.__append(path, None)
+                self.__remove_index(path)
+                self.times.pop(path, None)
+                self.garbage[self.active] += self.__header.size + len(path)
+
+    def keys(self):
+        ''' Retrieve all the paths that are stored in the cache.
+
+        :returns: The list of the stored paths
+        '''
+        return list(self.index)
+
+    def close(self):
+        ''' Stop compaction, seal the active segment, and
+        release all the memory maps.
+        '''
+        self.stop_compaction()
+        with self.lock:
+            if self.handle: self.__seal_segment()
+            self.maps = {} # unmapped once the buffers are released
+
+    #------------------------------------------------------------
+    # compaction methods
+    #------------------------------------------------------------
+
+    def get_garbage_ratio(self, segment):
+        ''' Retrieve the fraction of the supplied segment that
+        is taken by overwritten or deleted records.
+
+        :param segment: The segment to check
+        :returns: The garbage ratio of the segment
+        '''
+        size = os.path.getsize(self.get_segment_path(segment))
+        return self.garbage.get(segment, 0) / float(size) if size else 0.0
+
+    def compact(self, threshold=0.5):
+        ''' Rewrite the live records of every sealed segment whose
+        garbage ratio is above the supplied threshold into the active
+        segment and delete the old segments.
+
+        :param threshold: The garbage ratio to compact at (default 0.5)
+        :returns: The list of segments that were compacted
+        '''
+        with self.lock:
+            victims = [segment for segment in self.get_segments()
+                if segment != self.active and self.get_garbage_ratio(segment) >= threshold]
+            if not victims: return []
+
+            oldest = min(s for s in self.get_segments() if s not in victims)
+            self.__open_segment(self.active + 1)
+            for segment in victims:
+                records = self.__get_map(segment)
+                for key, offset, length in self.__scan_segment(segment):
+                    if length == self.__tombstone:
+                        if oldest < segment and key not in self.index:
+                            self.__append(key, None) # still shadows an older record
+                    elif self.index.get(key) == (segment, offset, length):
+                        value  = records[offset:offset + length]
+                        offset = self.__append(key, value)
+                        self.index[key] = (self.active, offset, length)
+
+            self.__open_segment(self.active + 1) # seal the compacted records
+            for segment in victims:
+                log.debug("removing compacted segment %d", segment)
+                self.maps.pop(segment, None)
+                del self.garbage[segment]
+                for ext in [self.ext, '.index']:
+                    path = self.get_segment_path(segment, ext)
+                    if os.path.exists(path): os.remove(path)
+            return victims
+
+    def start_compaction(self, interval=60, threshold=0.5):
+        ''' Start a background thread that compacts the segments
+        at the supplied interval.
+
+        :param interval: The number of seconds between compactions
+        :param threshold: The garbage ratio to compact at (default 0.5)
+        '''
+        def compactor():
+            while not self.running.wait(interval):
+                try: self.compact(threshold)
+                except Exception: log.exception("failed to compact segments")
+
+        self.running.clear()
+        self.thread = threading.Thread(target=compactor, name="segment-compactor")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop_compaction(self):
+        ''' Stop the background compaction thread if it is running.
+        '''
+        if self.thread:
+            self.running.set()
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import pandas as pd
+from bashwork.cache.columnar import ColumnarFileCache
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class ColumnarFileCacheTest(unittest.TestCase):
+    ''' Code to validate that the columnar file cache is correct.
+    '''
+
+    def setUp(self):
+        ''' Initialize the test fixture '''
+        self.root  = tempfile.mkdtemp()
+        self.cache = ColumnarFileCache(root=self.root)
+
+    def tearDown(self):
+        ''' Cleanup the test fixture '''
+        shutil.rmtree(self.root)
+
+    def test_array(self):
+        ''' Test that arrays are saved and mapped correctly '''
+        array = np.arange(1000, dtype=np.float32).reshape(100, 10)
+        self.cache.save('array', array)
+        self.assertTrue(self.cache.exists('array'))
+        loaded = self.cache.load('array')
+        self.assertTrue(isinstance(loaded, np.memmap))
+        self.assertTrue((array == loaded).all())
+        self.assertEqual(0, loaded.offset % ColumnarFileCache.ALIGNMENT)
+
+    def test_dict(self):
+        ''' Test that dictionaries of arrays are saved correctly '''
+        data = { 'a': np.arange(10), 'b': np.ones(3, dtype=np.bool_), 'c': np.array([]) }
+        self.cache.save('dict', data)
+        loaded = self.cache.load('dict')
+        self.assertEqual(['a', 'b', 'c'], sorted(loaded))
+        for name in data:
+            self.assertTrue((data[name] == loaded[name]).all())
+        self.assertEqual(['b'], list(self.cache.load_columns('dict', ['b'])))
+
+    def test_frame(self):
+        ''' Test that data frames are saved and loaded correctly '''
+        frame = pd.DataFrame({
+            'price': np.random.rand(50),
+            'count': np.arange(50),
+            'when' : pd.date_range('2016-01-01', periods=50),
+        }, index=np.arange(100, 150))
+        self.cache.save('frame', frame)
+        self.assertEqual(['count', 'price', 'when'], sorted(self.cache.get_columns('frame')))
+
+        loaded = self.cache.load('frame')
+        pd.util.testing.assert_frame_equal(frame, loaded[frame.columns])
+
+        subset = self.cache.load('frame', columns=['price'])
+        self.assertEqual(['price'], list(subset.columns))
+        self.assertEqual(list(frame.index), list(subset.index))
+        self.assertRaises(KeyError, self.cache.load_columns, 'frame', ['missing'])
+
+    def test_object_columns(self):
+        ''' Test that object columns are rejected '''
+        frame = pd.DataFrame({ 'name': ['a', 'b'] })
+        self.assertRaises(TypeError, self.cache.save, 'frame', frame)
+        self.assertFalse(self.cache.exists('frame'))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
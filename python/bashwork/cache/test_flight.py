@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+import os
+import time
+import shutil
+import tempfile
+import threading
+import unittest
+from bashwork.cache.flight import *
+from bashwork.cache.common import cacheable, FileCache, JsonFileCache
+from bashwork.cache.memory import LRUMemoryCache, TieredCache
+from bashwork.decorator.cache_result import pickle_cache_result
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class Service(object):
+    ''' A simple service used to test the cacheable decorator '''
+
+    def __init__(self, cache):
+        self.cache, self.calls = cache, 0
+
+    @cacheable("value-{}", single_flight=True)
+    def compute(self, value):
+        self.calls += 1
+        time.sleep(0.05)
+        return value * 2
+
+    @cacheable("stale-{}", ttl=0.5, stale_while_revalidate=True)
+    def revalidate(self, value):
+        self.calls += 1
+        return self.calls
+
+    @cacheable("locked-{}", lock=True)
+    def locked(self, value):
+        self.calls += 1
+        return value * 2
+
+
+def run_threads(count, target):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(target()))
+        for _ in range(count)]
+    for thread in threads: thread.start()
+    for thread in threads: thread.join()
+    return results
+
+
+class SingleFlightTest(unittest.TestCase):
+    ''' Code to validate that the single flight group is correct.
+    '''
+
+    def test_single_flight(self):
+        ''' Test that concurrent calls are coalesced '''
+        group, calls = SingleFlight(), []
+        def compute():
+            calls.append(1)
+            time.sleep(0.05)
+            return 42
+        results = run_threads(10, lambda: group.do('key', compute))
+        self.assertEqual([42] * 10, results)
+        self.assertEqual(1, len(calls))
+        self.assertFalse(group.in_flight('key'))
+
+    def test_single_flight_error(self):
+        ''' Test that errors are shared with the waiting callers '''
+        group = SingleFlight()
+        def compute(): raise ValueError("failed")
+        self.assertRaises(ValueError, group.do, 'key', compute)
+        self.assertFalse(group.in_flight('key'))
+
+    def test_spawn(self):
+        ''' Test that concurrent spawns only start one call '''
+        group, calls, release = SingleFlight(), [], threading.Event()
+        def compute():
+            calls.append(1)
+            release.wait()
+        started = run_threads(20, lambda: group.spawn('key', compute))
+        self.assertEqual(1, started.count(True))
+        self.assertTrue(group.in_flight('key'))
+        release.set()
+        deadline = time.time() + 5
+        while group.in_flight('key') and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(1, len(calls))
+
+    def test_file_lock_keys(self):
+        ''' Test that the lock files are not listed as cache keys '''
+        root = tempfile.mkdtemp()
+        try:
+            open(os.path.join(root, 'value'), 'w').close()
+            with file_lock(os.path.join(root, 'value' + LOCK_EXT)): pass
+            self.assertEqual(['value'], FileCache(root=root).keys())
+        finally: shutil.rmtree(root)
+
+    def test_file_lock(self):
+        ''' Test that the file lock can be acquired and released '''
+        root = tempfile.mkdtemp()
+        try:
+            path = os.path.join(root, 'locks', 'key.lock')
+            with file_lock(path): pass
+            with file_lock(path): pass
+            self.assertTrue(os.path.exists(path))
+        finally: shutil.rmtree(root)
+
+    def test_cacheable_single_flight(self):
+        ''' Test that cacheable coalesces concurrent misses '''
+        service = Service(LRUMemoryCache())
+        results = run_threads(10, lambda: service.compute(4))
+        self.assertEqual([8] * 10, results)
+        self.assertEqual(1, service.calls)
+        self.assertEqual(8, service.compute(4))
+        self.assertEqual(1, service.calls)
+
+    def test_cacheable_stale_while_revalidate(self):
+        ''' Test that cacheable serves stale values while refreshing '''
+        service = Service(LRUMemoryCache())
+        self.assertEqual(1, service.revalidate(1))
+        self.assertEqual(1, service.revalidate(1))
+        time.sleep(0.6)
+        self.assertEqual(1, service.revalidate(1))
+        deadline = time.time() + 5  # wait for the background refresh
+        while service.cache.load('stale-1') != 2 and time.time() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(2, service.cache.load('stale-1'))
+
+    def test_cacheable_lock_needs_root(self):
+        ''' Test that cacheable only locks caches with a root '''
+        self.assertRaises(ValueError, Service(LRUMemoryCache()).locked, 1)
+        tiered = TieredCache(backing=LRUMemoryCache())
+        self.assertRaises(ValueError, Service(tiered).locked, 1)
+
+        root = tempfile.mkdtemp()
+        try:
+            service = Service(TieredCache(backing=JsonFileCache(root=root)))
+            self.assertEqual(4, service.locked(2))
+            self.assertEqual(4, service.locked(2))
+            self.assertEqual(1, service.calls)
+            self.assertTrue(os.path.exists(os.path.join(root, 'locked-2' + LOCK_EXT)))
+        finally: shutil.rmtree(root)
+
+    def test_cache_result_single_flight(self):
+        ''' Test that cache_result coalesces concurrent misses '''
+        root  = tempfile.mkdtemp()
+        calls = []
+        try:
+            @pickle_cache_result(os.path.join(root, 'result'), single_flight=True, lock=True)
+            def compute():
+                calls.append(1)
+                time.sleep(0.05)
+                return 'result'
+            self.assertEqual(['result'] * 5, run_threads(5, compute))
+            self.assertEqual(1, len(calls))
+        finally: shutil.rmtree(root)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python
+import unittest
+from bashwork.cache.memory import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class DictCache(Cache):
+    ''' A simple backing cache used to test the tiered cache '''
+
+    def __init__(self):
+        self.data, self.loads = {}, 0
+
+    def save(self, path, data): self.data[path] = data
+    def exists(self, path): return path in self.data
+    def load(self, path):
+        self.loads += 1
+        return self.data[path]
+
+
+class MemoryCacheTest(unittest.TestCase):
+    ''' Code to validate that the memory caches are correct.
+    '''
+
+    def test_lru_cache(self):
+        ''' Test that the lru cache evicts correctly '''
+        cache = LRUMemoryCache(size=2)
+        cache.save('a', 1)
+        cache.save('b', 2)
+        self.assertEqual(1, cache.load('a'))
+        cache.save('c', 3)
+        self.assertTrue(cache.exists('a'))
+        self.assertFalse(cache.exists('b'))
+        self.assertRaises(KeyError, cache.load, 'b')
+        self.assertEqual({'hits': 1, 'misses': 1, 'evictions': 1, 'rejected': 0},
+            cache.stats.to_dict())
+        self.assertEqual(0.5, cache.stats.hit_rate)
+
+    def test_lfu_cache(self):
+        ''' Test that the lfu cache evicts correctly '''
+        cache = LFUMemoryCache(size=2)
+        cache.save('a', 1)
+        cache.save('b', 2)
+        cache.load('a'); cache.load('a'); cache.load('b')
+        cache.save('c', 3)
+        self.assertEqual(['a', 'c'], sorted(cache.data))
+        cache.save('d', 4)
+        self.assertEqual(['a', 'd'], sorted(cache.data))
+        cache.remove('a')
+        cache.save('e', 5)
+        cache.save('f', 6)
+        self.assertEqual(['e', 'f'], sorted(cache.data))
+
+    def test_ttl_cache(self):
+        ''' Test that the ttl cache expires correctly '''
+        clock = [0]
+        cache = TTLMemoryCache(ttl=10, clock=lambda: clock[0])
+        cache.save('a', 1)
+        clock[0] = 5
+        cache.save('b', 2)
+        self.assertEqual(1, cache.load('a'))
+        clock[0] = 12
+        self.assertRaises(KeyError, cache.load, 'a')
+        self.assertEqual(2, cache.load('b'))
+        clock[0] = 20
+        cache.save('c', 3)
+        self.assertEqual(['c'], list(cache.data))
+        self.assertEqual(2, cache.stats.evictions)
+
+    def test_byte_bound(self):
+        ''' Test that the byte bound evicts correctly '''
+        cache = LRUMemoryCache(max_bytes=10, sizer=len)
+        cache.save('a', 'x' * 4)
+        cache.save('b', 'x' * 4)
+        cache.save('c', 'x' * 4)
+        self.assertEqual(['b', 'c'], sorted(cache.data))
+        self.assertEqual(8, cache.total)
+        cache.save('c', 'x' * 11)
+        self.assertEqual(['b'], sorted(cache.data))
+        self.assertEqual(4, cache.total)
+        self.assertEqual(1, cache.stats.rejected)
+        self.assertEqual(1, cache.stats.evictions)
+        cache.clear()
+        self.assertEqual(0, cache.total)
+        self.assertEqual(0, len(cache))
+
+    def test_tiered_cache(self):
+        ''' Test that the tiered cache works correctly '''
+        backing = DictCache()
+        backing.save('a', 1)
+        cache = TieredCache(memory=LRUMemoryCache(size=10), backing=backing)
+        self.assertTrue(cache.exists('a'))
+        self.assertEqual(1, cache.load('a'))
+        self.assertEqual(1, cache.load('a'))
+        self.assertEqual(1, backing.loads)
+        cache.save('b', 2)
+        self.assertEqual(2, backing.data['b'])
+        self.assertEqual(2, cache.load('b'))
+        self.assertEqual(2, cache.stats.hits)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+import os
+import shutil
+import tempfile
+import unittest
+from bashwork.cache.segment import SegmentFileCache
+from bashwork.cache.common import cacheable
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class SegmentFileCacheTest(unittest.TestCase):
+    ''' Code to validate that the segment file cache is correct.
+    '''
+
+    def setUp(self):
+        ''' Initialize the test fixture '''
+        self.root = tempfile.mkdtemp()
+
+    def tearDown(self):
+        ''' Cleanup the test fixture '''
+        shutil.rmtree(self.root)
+
+    def test_save_and_load(self):
+        ''' Test that the cache saves and loads correctly '''
+        cache = SegmentFileCache(root=self.root)
+        self.assertFalse(cache.exists('a'))
+        self.assertRaises(IOError, cache.load, 'a')
+        cache.save('a', {'value': 1})
+        cache.save('b', [1, 2, 3])
+        cache.save('a', {'value': 2})
+        self.assertTrue(cache.exists('a'))
+        self.assertEqual({'value': 2}, cache.load('a'))
+        self.assertEqual([1, 2, 3], cache.load('b'))
+        self.assertEqual(['a', 'b'], sorted(cache.keys()))
+
+        cache.remove('b')
+        self.assertFalse(cache.exists('b'))
+        cache.close()
+
+    def test_load_buffer(self):
+        ''' Test that the raw buffer is returned correctly '''
+        cache = SegmentFileCache(root=self.root, dumps=str, loads=str)
+        cache.save('a', 'value')
+        self.assertEqual('value', str(cache.load_buffer('a')))
+        cache.close()
+
+    def test_recovery(self):
+        ''' Test that the index is rebuilt after a restart '''
+        cache = SegmentFileCache(root=self.root, segment_size=64)
+        for i in range(20):
+            cache.save('key-%d' % (i % 5), i)
+        cache.remove('key-0')
+        cache.close()
+        self.assertTrue(len(cache.get_segments()) > 1)
+
+        os.remove(cache.get_segment_path(0, '.index'))
+        cache = SegmentFileCache(root=self.root, segment_size=64)
+        self.assertEqual(['key-1', 'key-2', 'key-3', 'key-4'], sorted(cache.keys()))
+        self.assertEqual(19, cache.load('key-4'))
+        cache.save('key-5', 5)
+        cache.close()
+
+        cache = SegmentFileCache(root=self.root, segment_size=64)
+        self.assertEqual(5, cache.load('key-5'))
+        cache.close()
+
+    def test_compaction(self):
+        ''' Test that the compaction reclaims garbage '''
+        cache = SegmentFileCache(root=self.root, segment_size=128)
+        for i in range(100):
+            cache.save('key-%d' % (i % 5), i)
+        cache.remove('key-0')
+        before = cache.get_segments()
+        compacted = cache.compact(threshold=0.5)
+        self.assertTrue(compacted)
+        self.assertTrue(len(cache.get_segments()) < len(before))
+        self.assertEqual([96, 97, 98, 99], [cache.load('key-%d' % i) for i in range(1, 5)])
+        cache.close()
+
+        cache = SegmentFileCache(root=self.root)
+        self.assertEqual(['key-1', 'key-2', 'key-3', 'key-4'], sorted(cache.keys()))
+        self.assertEqual(99, cache.load('key-4'))
+        cache.close()
+
+    def test_cacheable(self):
+        ''' Test that the cache works with cacheable '''
+        class Service(object):
+            def __init__(self, cache): self.cache, self.calls = cache, 0
+
+            @cacheable("value-{}")
+            def compute(self, value):
+                self.calls += 1
+                return value * 2
+
+        service = Service(SegmentFileCache(root=self.root))
+        self.assertEqual(4, service.compute(2))
+        self.assertEqual(4, service.compute(2))
+        self.assertEqual(1, service.calls)
+        service.cache.close()
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -2,33 +2,51 @@
 # -*- coding: latin-1 -*-
 import os
 import functools
+from bashwork.cache.flight import SingleFlight, file_lock, null_lock, LOCK_EXT
 
 try:
     import cPickle as pickle
 except ImportError:
     import pickle
 
-def cache_result(path, test, load, dump):
+def cache_result(path, test, load, dump, single_flight=False, lock=False):
     ''' Given a computationally intensive operation,
     cache the result to file after it is completed and
     check if the cached version exists before doing the
     calculation again. If the cache exists, load and return
     that.
 
+    With `single_flight`, concurrent callers that miss the cache
+    wait for the first caller to compute the result instead of all
+    computing it. With `lock`, the computation also holds the lock
+    file `path + '.lock'` so only one process computes the result.
+
     :param path: The path to cache the result to
     :param test: The function to test if data is in cache
     :param load: The function to load data from cache
     :param dump: The function to dump data to the cache
+    :param single_flight: True to coalesce concurrent misses
+    :param lock: True to lock across processes while computing
     :returns: A cache decorated function
     '''
+    group = SingleFlight()
+
     def method_catch(method):
+        def compute(*parameters):
+            with (file_lock(path + LOCK_EXT) if lock else null_lock()):
+                if (single_flight or lock) and test(path):
+                    return load(path) # filled while we waited
+                result = method(*parameters)
+                dump(path, result)
+                return result
+
         @functools.wraps(method)
         def wrapper(*parameters):
             if test(path):
                 return load(path)
-            result = method(*parameters)
-            dump(path, result)
-            return result
+            if single_flight:
+                return group.do(path, compute, *parameters)
+            return compute(*parameters)
         return wrapper
     return method_catch
 
@@ -49,7 +67,7 @@ def memory_cache_result(path):
 
     return cache_result(path, test, load, dump) 
 
-def pickle_cache_result(path):
+def pickle_cache_result(path, **kwargs):
     ''' Given a computationally intensive operation,
     cache the result to file after it is completed and
     check if the cached version exists before doing the
@@ -57,17 +75,20 @@ def pickle_cache_result(path):
     that.
 
     :param path: The path to cache the result to
+    :param single_flight: True to coalesce concurrent misses
+    :param lock: True to lock across processes while computing
     :returns: A cache decorated function
     '''
     def test(path):
         return os.path.exists(path)
 
     def load(path):
-        with open(p, 'rb') as handle:
+        with open(path, 'rb') as handle:
             return pickle.load(handle)
 
     def dump(path, data):
-        with open(path, 'wb') as handle:
+        with open(path + '.tmp', 'wb') as handle:
             pickle.dump(data, handle)
+        os.rename(path + '.tmp', path) # readers never see a partial file
 
-    return cache_result(path, test, load, dump) 
+    return cache_result(path, test, load, dump, **kwargs) 
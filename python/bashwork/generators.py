@@ -172,6 +172,22 @@ def gen_skip(stream, count):
         return count > 0
     return gen_drop_while(stream, predicate)
 
+def gen_batches(stream, size):
+    ''' Given a stream of data, group the elements into
+    lists of the supplied size (the last may be shorter).
+
+    :param stream: A stream of entries to group
+    :param size: The number of elements in each batch
+    :returns: A stream of lists of entries
+    '''
+    batch = []
+    for entry in stream:
+        batch.append(entry)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch: yield batch
+
 def gen_count(start, step=1):
     ''' Generate an infinite count of numbers
     with the supplied step size starting at the
@@ -399,6 +415,7 @@ def gen_deserialized_file(handle, deserializer=pickle.load):
         try:
             entry = deserializer(handle)
             yield entry
+        except EOFError: break
         except GeneratorExit: pass
 
 def gen_split_strings(stream, seperator=','):
@@ -0,0 +1,468 @@
+'''
+Decision Tree
+------------------------------------------------------------
+
+The tree is trained by finding the split with the best information
+gain at every node. Rather than re-partitioning the dataset for
+every candidate value, each field is sorted once at the root (or
+binned into a fixed number of quantile buckets) and every threshold
+is scored from a cumulative count of the classes::
+
+    tree = DecisionTree.train((values, labels), ['age', 'income'])
+    tree = DecisionTree.train((values, labels), names, bins=255, processes=4)
+    print tree.classify([37, 58000])
+
+For scoring large batches, the tree (or the rules it was exported
+to) can be compiled to flat node arrays that are evaluated for the
+whole batch one level at a time::
+
+    labels = tree.classify_many(batch)
+    labels = compile_rules(tree_to_rules(tree), names).classify_many(batch)
+
+When a pool of processes is requested, the top of the tree is split
+in the current process and the subtrees below it are built by the
+pool, which shares the dataset with the forked processes instead of
+pickling it to them.
+'''
+import re
+import numpy as np
+from multiprocessing.pool import Pool, ApplyResult
+from bashwork.structure.tree.binary import BinaryNode
+from bashwork.ml.utility.information import encode_labels
+from bashwork.ml.utility.information import bin_dataset, best_sorted_split, best_binned_split
+
+class DecisionTree(BinaryNode):
+    ''' Represents a simple decision tree. Each node in this tree
+    should have the following attributes:
+
+    * name  - a graphical name for this field
+    * label - the label of this node (if this is a leaf)
+    * field - the field to split on (if this is a tree node)
+    * value - the value of the field to split with (if this is a tree node)
+    '''
+
+    def classify(self, entry):
+        ''' Classify a new entry with the current tree
+        
+        :param entry: The entry to classify
+        :returns: The label of the new entry
+        '''
+        values = getattr(entry, 'values', entry)
+        node = self
+        while not node.is_leaf_node():
+            go_right = values[node['field']] > node.value
+            node = node.right if go_right else node.left
+        return node['label']
+
+    def compile(self):
+        ''' Lower the tree to flat node arrays that classify a
+        whole batch at once. The tree should be compiled again if
+        it is changed after this.
+
+        :returns: The compiled tree
+        '''
+        self.compiled = CompiledTree.from_trees([self])
+        return self.compiled
+
+    def classify_many(self, entries):
+        ''' Classify a batch of entries with the compiled tree.
+
+        :param entries: The (n, fields) entries to classify
+        :returns: The label of each entry
+        '''
+        compiled = getattr(self, 'compiled', None) or self.compile()
+        return compiled.classify_many(entries)
+
+    def __str__(self):
+        if self['label'] is not None: return str(self['label'])
+        return "{}[{}] => {}".format(self['name'], self['field'], self.value)
+
+    @classmethod
+    def train(klass, dataset, attributes, threshold=0.01, **kwargs):
+        ''' Given a dataset, train a new decision tree
+        with the supplied parameters.
+        
+        :param dataset: The training (values, labels) or entries
+        :param attributes: The attribute names
+        :param threshold: The gain threshold to cut off at
+        :param bins: The number of quantile bins per field (default exact)
+        :param min_size: The smallest node that can be split (default 2)
+        :param max_depth: The maximum depth of the tree (default None)
+        :param max_features: The fields to try at each node (default all)
+        :param seed: The seed of the field sampling
+        :param processes: The processes to build subtrees with (default None)
+        :returns: A newly trained decision tree
+        '''
+        if isinstance(dataset, tuple):
+            values, labels = dataset
+        else: values, labels = [e.values for e in dataset], [e.label for e in dataset]
+        builder = TreeBuilder(klass, np.asarray(values, dtype=np.float64), labels,
+            attributes, threshold=threshold, **kwargs)
+        return builder.build_tree(kwargs.get('processes', None))
+
+#------------------------------------------------------------#
+# tree builder
+#------------------------------------------------------------#
+
+BUILDERS = {} # the builders shared with the forked processes
+
+def build_subtree(arguments):
+    ''' Build a subtree with a shared builder. This is a module
+    function so it can be sent to a process pool.
+
+    :param arguments: The (builder key, rows, depth, seed) to build
+    :returns: The built subtree
+    '''
+    key, rows, depth, seed = arguments
+    builder = BUILDERS[key]
+    builder.random = np.random.RandomState(seed) # every fork starts with the same state
+    return builder.build(rows, None, depth)
+
+class TreeBuilder(object):
+    ''' Builds a decision tree from a presorted or a binned
+    dataset. In the presorted mode, every node keeps the rows of
+    each field in sorted order, which are partitioned stably for
+    the children so the dataset is only ever sorted once.
+    '''
+
+    def __init__(self, klass, values, labels, attributes, **kwargs):
+        '''
+        :param klass: The decision tree class to build
+        :param values: The (n, fields) values of the dataset
+        :param labels: The labels of the dataset
+        :param attributes: The attribute names
+        :param edges: The thresholds of the bins of an already binned dataset
+        :param binned: The (n, fields) bins of an already binned dataset
+        '''
+        self.klass      = klass
+        self.values     = values
+        self.attributes = attributes
+        self.threshold  = kwargs.get('threshold', 0.01)
+        self.min_size   = kwargs.get('min_size', 2)
+        self.max_depth  = kwargs.get('max_depth', None)
+        self.features   = kwargs.get('max_features', None)
+        self.random     = np.random.RandomState(kwargs.get('seed', None))
+        self.classes, self.codes = encode_labels(labels)
+        self.bins = kwargs.get('bins', None)
+        if kwargs.get('binned', None) is not None:   # binned once by the caller
+            self.edges, self.binned = kwargs['edges'], kwargs['binned']
+            self.orders = None
+        elif self.bins:
+            self.edges, self.binned = bin_dataset(values, self.bins)
+            self.orders = None
+        else: self.orders = [np.argsort(values[:, f], kind='mergesort')
+            for f in xrange(values.shape[1])]
+
+    def build_tree(self, processes=None):
+        ''' Build the tree of the whole dataset.
+
+        :param processes: The processes to build subtrees with
+        :returns: The root of the trained tree
+        '''
+        rows = np.arange(len(self.values))
+        if not processes:
+            return self.build(rows, self.orders, 0)
+
+        key = id(self)
+        BUILDERS[key] = self # set before the fork
+        try:
+            pool = Pool(processes)
+            try:
+                depth = int(np.ceil(np.log2(processes))) + 1
+                return self.resolve(self.build(rows, self.orders, 0, (pool, key, depth)))
+            finally:
+                pool.close()
+                pool.join()
+        finally: del BUILDERS[key]
+
+    def resolve(self, node):
+        ''' Replace the subtrees that were sent to the pool
+        with their built results.
+
+        :param node: The node to resolve
+        :returns: The resolved node
+        '''
+        if isinstance(node, ApplyResult): return node.get()
+        if node is not None and not node.is_leaf_node():
+            node.left, node.right = self.resolve(node.left), self.resolve(node.right)
+        return node
+
+    def find_split(self, rows, orders):
+        ''' Find the best split of the supplied rows.
+
+        :param rows: The rows of the node
+        :param orders: The sorted rows of each field (presorted)
+        :returns: The best (gain, value, field)
+        '''
+        count, best = len(self.classes), (None, None, None)
+        fields = xrange(self.values.shape[1])
+        if self.features and self.features < len(fields):
+            fields = np.sort(self.random.choice(len(fields), self.features, replace=False))
+        for field in fields:
+            if orders is not None:
+                order = orders[field]
+                gain, value = best_sorted_split(self.values[order, field], self.codes[order], count)
+            else: gain, value = best_binned_split(self.binned[rows, field],
+                self.codes[rows], self.edges[field], count)
+            if gain is not None and (best[0] is None or gain > best[0]):
+                best = (gain, value, field)
+        return best
+
+    def build(self, rows, orders, depth, parallel=None):
+        ''' Build the subtree of the supplied rows.
+
+        :param rows: The rows of the subtree
+        :param orders: The sorted rows of each field (default from rows)
+        :param depth: The depth of the subtree
+        :param parallel: The (pool, key, depth) to send subtrees to
+        :returns: The subtree (or a pending result)
+        '''
+        if not len(rows): return None                             # break if we have no data
+        if parallel and depth == parallel[2]:
+            seed = self.random.randint(1 << 31)
+            return parallel[0].apply_async(build_subtree, [(parallel[1], rows, depth, seed)])
+
+        counts = np.bincount(self.codes[rows], minlength=len(self.classes))
+        label  = self.classes[counts.argmax()]
+        if ((counts > 0).sum() == 1 or len(rows) < self.min_size or  # if the groups are pure
+            (self.max_depth is not None and depth >= self.max_depth)):
+            return self.klass(label=label)                        # create a leaf label node
+
+        if orders is None and self.orders is not None:
+            member = np.zeros(len(self.values), dtype=bool)
+            member[rows] = True
+            orders = [order[member[order]] for order in self.orders]
+
+        (gain, value, field) = self.find_split(rows, orders)      # find the best split point
+        if gain is None or gain < self.threshold:                 # unless the gain is too low
+            return self.klass(label=label)
+
+        node = self.klass(field=field, value=value, name=self.attributes[field])
+        lorders = rorders = None
+        if orders is not None:
+            sides   = [self.values[order, field] <= value for order in orders]
+            lorders = [order[side] for order, side in zip(orders, sides)]
+            rorders = [order[~side] for order, side in zip(orders, sides)]
+        goes_left  = self.values[rows, field] <= value
+        node.left  = self.build(rows[goes_left], lorders, depth + 1, parallel)
+        node.right = self.build(rows[~goes_left], rorders, depth + 1, parallel)
+        return node
+
+#------------------------------------------------------------#
+# compiled trees
+#------------------------------------------------------------#
+
+class CompiledForest(object):
+    ''' One or more trees lowered to flat parallel node arrays,
+    which evaluate a whole batch of entries one level at a time
+    instead of walking the node objects for every entry:
+
+    - `feature[i]` is the field node i splits on (-1 for a leaf)
+    - `threshold[i]` goes to `left[i]` if `value <= threshold[i]`
+    - `right[i]` is the other child of node i
+    - `value[i]` is the value of the leaf node i
+    - `roots[t]` is the root node of tree t
+    '''
+
+    @classmethod
+    def from_arrays(klass, trees):
+        ''' Create a new forest by concatenating the node arrays
+        of a collection of trees, whose child indexes are local.
+
+        :param trees: The (feature, threshold, left, right, value) of each tree
+        :returns: The compiled forest
+        '''
+        sizes  = [len(tree[0]) for tree in trees]
+        roots  = np.concatenate(([0], np.cumsum(sizes)[:-1])).astype(np.int32)
+        arrays = [np.concatenate([tree[index] for tree in trees]) for index in xrange(5)]
+        offset = np.repeat(roots, sizes)
+        for child in (2, 3):
+            arrays[child] = np.where(arrays[child] >= 0, arrays[child] + offset, -1)
+        return klass(*(arrays + [roots]))
+
+    @classmethod
+    def from_trees(klass, trees, leaf_value=None):
+        ''' Create a new forest from trained decision trees.
+
+        :param trees: The decision trees to compile
+        :param leaf_value: The method to get the value of a leaf (default label)
+        :returns: The compiled forest
+        '''
+        leaf_value = leaf_value or (lambda node: node['label'])
+        def lower(tree):
+            arrays, stack = ([], [], [], [], []), [(tree, -1, None)]
+            while stack:
+                node, parent, side = stack.pop()
+                index = len(arrays[0])
+                if parent >= 0: arrays[side][parent] = index
+                leaf = node.is_leaf_node()
+                arrays[0].append(-1 if leaf else node['field'])
+                arrays[1].append(0.0 if leaf else node.value)
+                arrays[2].append(-1)
+                arrays[3].append(-1)
+                arrays[4].append(leaf_value(node) if leaf else 0.0)
+                if not leaf:
+                    stack.append((node.right, index, 3))
+                    stack.append((node.left, index, 2))
+            return [np.array(arrays[0], dtype=np.int32), np.array(arrays[1], dtype=np.float64),
+                np.array(arrays[2], dtype=np.int32), np.array(arrays[3], dtype=np.int32),
+                np.array(arrays[4])]
+        return klass.from_arrays([lower(tree) for tree in trees])
+
+    def __init__(self, feature, threshold, left, right, value, roots, block=65536):
+        '''
+        :param feature: The field of each node (-1 for leaves)
+        :param threshold: The split value of each node
+        :param left: The left child of each node
+        :param right: The right child of each node
+        :param value: The value of each leaf
+        :param roots: The root node of each tree
+        :param block: The number of rows to evaluate at once
+        '''
+        self.feature   = np.asarray(feature, dtype=np.int32)
+        self.threshold = np.asarray(threshold, dtype=np.float64)
+        self.left      = np.asarray(left, dtype=np.int32)
+        self.right     = np.asarray(right, dtype=np.int32)
+        self.value     = np.asarray(value)
+        self.roots     = np.asarray(roots, dtype=np.int32)
+        self.block     = block
+
+    def apply(self, entries):
+        ''' Find the leaf every entry reaches in every tree.
+
+        :param entries: The (n, fields) entries to evaluate
+        :returns: The (n, trees) leaf indexes
+        '''
+        entries = np.atleast_2d(np.asarray(entries, dtype=np.float64))
+        leaves  = np.empty((len(entries), len(self.roots)), dtype=np.int32)
+        for start in xrange(0, len(entries), self.block):
+            block = entries[start:start + self.block]
+            rows  = np.arange(len(block))[:, None]
+            nodes = np.tile(self.roots, (len(block), 1))
+            while True:
+                feature = self.feature[nodes]
+                inner   = feature >= 0
+                if not inner.any(): break
+                go_left = block[rows, np.maximum(feature, 0)] <= self.threshold[nodes]
+                nodes   = np.where(inner, np.where(go_left, self.left[nodes], self.right[nodes]), nodes)
+            leaves[start:start + len(block)] = nodes
+        return leaves
+
+    def predict(self, entries):
+        ''' Find the leaf value every entry reaches in every tree.
+
+        :param entries: The (n, fields) entries to evaluate
+        :returns: The (n, trees) leaf values
+        '''
+        return self.value[self.apply(entries)]
+
+    def __len__(self): return len(self.roots)
+
+
+class CompiledTree(CompiledForest):
+    ''' A single decision tree lowered to flat node arrays.
+    '''
+
+    def classify_many(self, entries):
+        ''' Classify a batch of entries with the tree.
+
+        :param entries: The (n, fields) entries to classify
+        :returns: The label of each entry
+        '''
+        return self.predict(entries)[:, 0]
+
+    def classify(self, entry):
+        ''' Classify a new entry with the tree.
+
+        :param entry: The entry to classify
+        :returns: The label of the new entry
+        '''
+        return self.classify_many([getattr(entry, 'values', entry)])[0]
+
+#------------------------------------------------------------#
+# helper methods
+#------------------------------------------------------------#
+
+def tree_to_rules(tree):
+    ''' Given a decision tree, covert the tree
+    to a collection of rules. The thresholds are written with
+    `repr` so the rules compile back to the exact same splits.
+    
+    :param tree: The tree to convert to rules
+    :returns: A list of the rules encoded in the tree
+    '''
+    rules = []
+    def rule_builder(node, rule):
+        if not node.is_leaf_node():
+            value = repr(float(node.value))
+            rule_builder(node.left,  rule + "%s <= %s, " % (node['name'], value))
+            rule_builder(node.right, rule + "%s >  %s, " % (node['name'], value))
+        else: rules.append(rule[0:-2] + " -> " + str(node['label']))
+    rule_builder(tree, "")
+    return rules
+
+RULE_REGEX = re.compile(r'^(.+?) (<=|>) +(\S+)$')
+
+def rules_to_tree(rules, attributes, klass=DecisionTree):
+    ''' Given the rules of a decision tree, convert the
+    rules back to a tree (the values keep the precision of
+    the rules and the labels are strings).
+
+    :param rules: The rules from `tree_to_rules`
+    :param attributes: The attribute names
+    :param klass: The decision tree class to build
+    :returns: The decision tree of the rules
+    '''
+    fields, root = dict((name, field) for field, name in enumerate(attributes)), klass()
+    for rule in rules:
+        conditions, label = rule.rsplit(' -> ', 1)
+        node = root
+        for condition in filter(None, conditions.split(', ')):
+            name, operator, value = RULE_REGEX.match(condition).groups()
+            if node['field'] is None:
+                node['field'], node['name'], node.value = fields[name], name, float(value)
+            side = 'left' if operator == '<=' else 'right'
+            if getattr(node, side) is None: setattr(node, side, klass())
+            node = getattr(node, side)
+        node['label'] = label
+    return root
+
+def compile_rules(rules, attributes):
+    ''' Given the rules of a decision tree, lower them to
+    flat node arrays that classify a whole batch at once.
+
+    :param rules: The rules from `tree_to_rules`
+    :param attributes: The attribute names
+    :returns: The compiled tree of the rules
+    '''
+    return rules_to_tree(rules, attributes).compile()
+
+def tree_to_graphviz(tree):
+    ''' Helper method to convert a tree to a graphviz
+    document.
+    
+    :param tree: The tree to process
+    :returns: A graphviz representation of the tree
+    '''
+    def get_tree_nodes(node, c):
+        if not node.is_leaf_node():
+            n = '\tnode%d [label ="%s"];\n' % (c, node['name'])
+            (c, l) = get_tree_nodes(node.left,  c + 1)
+            (c, r) = get_tree_nodes(node.right, c + 1)
+            return (c, n + l + r)
+        else: return (c, '\tnode%d [label ="%s"];\n' % (c, node['label']))
+
+    def get_tree_links(node, count):
+        if node.is_leaf_node(): return (count, "")
+        n  = '\tnode%d -> node%d [label="<= %0.2f"]\n' % (count, count + 1, node.value)
+        (c, l) = get_tree_links(node.left,  count+1)
+        n += '\tnode%d -> node%d [label="> %0.2f"]\n'  % (count, c+1, node.value)
+        (c, r) = get_tree_links(node.right, c+1)
+        return (c, n + l + r)
+
+    graph  = "digraph G\n{\n\tnode  [shape = diamond];\n"
+    graph += '\tedge  [color="#2554c7"];\n'
+    graph += get_tree_nodes(tree, 0)[1]
+    graph += "\n\n"
+    graph += get_tree_links(tree, 0)[1]
+    return graph + "}"
@@ -3,42 +3,186 @@
 Kernels must be decomposable into the product of some
 function mapped to each of the input vectors.
 
+Every kernel can be called with a single pair of vectors, or
+asked for the Gram block between two sets of vectors, which is
+computed with a handful of matrix operations instead of a python
+loop over the pairs::
+
+    gaussian(1.5)(a, b)            # a scalar
+    gaussian(1.5).gram(A, B)       # a (len(A), len(B)) matrix
+
+When training needs the same kernel rows over and over, a
+`KernelCache` keeps the most recently used rows of the Gram
+matrix of a dataset within a bounded amount of memory. Training
+that walks the whole dataset in order every round would evict
+every row before it is used again, so the cache can instead pin
+the first rows it fits and stream the rest through a small LRU.
+
 http://crsouza.blogspot.com/2010/03/kernel-functions-for-machine-learning.html
 '''
 import numpy as np
+from bashwork.cache.memory import LRUMemoryCache
+from bashwork.ml.utility.distance import sqeuclidean, pairwise
+
+#------------------------------------------------------------
+# kernel
+#------------------------------------------------------------
+
+class Kernel(object):
+    ''' A kernel that can be evaluated on a single pair of
+    vectors or on every pair of two blocks of vectors.
+    '''
+
+    def __init__(self, pair, block=None):
+        '''
+        :param pair: The function to compare two vectors with
+        :param block: The function to compare two blocks with (default loop)
+        '''
+        self.pair  = pair
+        self.block = block or (lambda A, B: np.array([[pair(a, b) for b in B] for a in A]))
+
+    def gram(self, A, B=None):
+        ''' Compute the kernel between every row of A and
+        every row of B.
+
+        :param A: The (n, d) left vectors
+        :param B: The (m, d) right vectors (default A)
+        :returns: The (n, m) Gram block
+        '''
+        A = np.atleast_2d(np.asarray(A, dtype=np.float64))
+        B = A if B is None else np.atleast_2d(np.asarray(B, dtype=np.float64))
+        return self.block(A, B)
+
+    def __call__(self, a, b): return self.pair(a, b)
+
+
+def as_kernel(function):
+    ''' Wrap a plain pair function as a kernel.
+
+    :param function: The kernel or pair function to wrap
+    :returns: The kernel for the function
+    '''
+    return function if isinstance(function, Kernel) else Kernel(function)
+
+def __sums(A, B):
+    return B.sum(axis=1)[None, :] - A.sum(axis=1)[:, None]
+
+#------------------------------------------------------------
+# kernels
+#------------------------------------------------------------
 
 def dot_product():
-    return lambda a, b: np.dot(a, b)
+    return Kernel(lambda a, b: np.dot(a, b),
+        lambda A, B: A.dot(B.T))
 
 def linear(c=0.0):
-    return lambda a, b: np.dot(a, b) + c
+    return Kernel(lambda a, b: np.dot(a, b) + c,
+        lambda A, B: A.dot(B.T) + c)
 
 def gaussian(sigma):
-    return lambda a, b: np.exp(-np.linalg.norm(b - a) ** 2 / (2 * sigma ** 2))
+    return Kernel(lambda a, b: np.exp(-sqeuclidean(a, b) / (2 * sigma ** 2)),
+        lambda A, B: np.exp(-pairwise(A, B, 'sqeuclidean') / (2 * sigma ** 2)))
 
 def gaussian_gamma(gamma):
-    return lambda a, b: np.exp(-gamma * np.linalg.norm(b - a) ** 2)
+    return Kernel(lambda a, b: np.exp(-gamma * sqeuclidean(a, b)),
+        lambda A, B: np.exp(-gamma * pairwise(A, B, 'sqeuclidean')))
 
 def rational_quadradic(c=0.0):
-    def kernel(a, b):
-        normal = np.linalg.norm(b - a) ** 2
+    def kernel(normal):
         return 1.0 - (normal / (normal + c))
-    return kernel
+    return Kernel(lambda a, b: kernel(sqeuclidean(a, b)),
+        lambda A, B: kernel(pairwise(A, B, 'sqeuclidean')))
 
 def multiquadradic(c=0.0):
-    return lambda a, b:np.sqrt((b - a).sum() ** 2 + c ** 2)
+    return Kernel(lambda a, b:np.sqrt((b - a).sum() ** 2 + c ** 2),
+        lambda A, B: np.sqrt(__sums(A, B) ** 2 + c ** 2))
 
 def inverse_multiquadradic(c=0.0):
-    return lambda a, b: 1.0 / np.sqrt((b - a).sum() ** 2 + c ** 2)
+    return Kernel(lambda a, b: 1.0 / np.sqrt((b - a).sum() ** 2 + c ** 2),
+        lambda A, B: 1.0 / np.sqrt(__sums(A, B) ** 2 + c ** 2))
 
 def exponential(sigma):
-    return lambda a, b: np.exp((b - a).sum() / (-2 * sigma * sigma))
+    return Kernel(lambda a, b: np.exp((b - a).sum() / (-2 * sigma * sigma)),
+        lambda A, B: np.exp(__sums(A, B) / (-2 * sigma * sigma)))
 
 def laplacian(sigma):
-    return lambda a, b: np.exp((b - a).sum() / -sigma)
+    return Kernel(lambda a, b: np.exp((b - a).sum() / -sigma),
+        lambda A, B: np.exp(__sums(A, B) / -sigma))
 
 def sigmoid(alpha=1.0, c=0.0):
-    return lambda a, b: np.tanh(alpha * np.dot(a, b) + c)
+    return Kernel(lambda a, b: np.tanh(alpha * np.dot(a, b) + c),
+        lambda A, B: np.tanh(alpha * A.dot(B.T) + c))
 
 def polynomial(d, alpha=1.0, c=0):
-    return lambda a, b: (alpha * np.dot(a, b) + c) ** d
+    return Kernel(lambda a, b: (alpha * np.dot(a, b) + c) ** d,
+        lambda A, B: (alpha * A.dot(B.T) + c) ** d)
+
+#------------------------------------------------------------
+# cache
+#------------------------------------------------------------
+
+class KernelCache(object):
+    ''' A bounded LRU cache of the rows of the Gram matrix of
+    a dataset. A miss computes the block of the following rows
+    in a single Gram call, since training usually walks the
+    dataset in order.
+
+    With `pin`, a dataset larger than the cache keeps its first
+    `size - block` rows for good and only the rest go through the
+    LRU, so a walk over the whole dataset still reuses them.
+    '''
+
+    def __init__(self, kernel, dataset, **kwargs):
+        '''
+        :param kernel: The kernel to compute the rows with
+        :param dataset: The (n, d) dataset to cache the rows of
+        :param size: The maximum number of rows to cache (default 1024)
+        :param block: The number of rows to compute per miss (default 64)
+        :param pin: True to pin the first rows of the dataset (default False)
+        '''
+        self.kernel  = as_kernel(kernel)
+        self.dataset = np.atleast_2d(np.asarray(dataset, dtype=np.float64))
+        self.block   = kwargs.get('block', 64)
+        size = kwargs.get('size', 1024)
+        self.pinned  = 0
+        if kwargs.get('pin', False) and len(self.dataset) > size:
+            self.pinned = max(0, size - self.block)
+        self.fixed   = None # the (pinned, n) pinned rows
+        self.filled  = np.zeros(self.pinned, dtype=bool)
+        self.rows    = LRUMemoryCache(size=size - self.pinned)
+        self.stats   = self.rows.stats
+
+    def get_row(self, index):
+        ''' Retrieve the kernel of a row against every row
+        of the dataset.
+
+        :param index: The index of the row to retrieve
+        :returns: The (n,) kernel values of the row
+        '''
+        if index < self.pinned:
+            return self.__get_pinned(index)
+
+        try: return self.rows.load(index)
+        except KeyError: pass
+
+        stop  = min(index + min(self.block, self.rows.size), len(self.dataset))
+        block = self.kernel.gram(self.dataset[index:stop], self.dataset)
+        for offset in xrange(len(block) - 1, -1, -1):   # keep index most recent
+            self.rows.save(index + offset, block[offset])
+        return block[0]
+
+    def __get_pinned(self, index):
+        if self.filled[index]:
+            self.stats.hits += 1
+            return self.fixed[index]
+
+        self.stats.misses += 1
+        if self.fixed is None:
+            self.fixed = np.empty((self.pinned, len(self.dataset)))
+        stop = min(index + self.block, self.pinned)
+        self.fixed[index:stop] = self.kernel.gram(self.dataset[index:stop], self.dataset)
+        self.filled[index:stop] = True
+        return self.fixed[index]
+
+    def __getitem__(self, index): return self.get_row(index)
+    def __len__(self): return int(self.filled.sum()) + len(self.rows)
@@ -1,24 +1,64 @@
 '''
-.. todo::
-   - http://en.wikipedia.org/wiki/Ball_tree
+K Nearest Neighbors
+------------------------------------------------------------
+
+The neighbors are found with a vantage point tree (a metric tree)
+that is built over the dataset on the first query, so any metric
+distance can be used and each query only visits a fraction of the
+dataset::
+
+    knn = KNearestNeighbors(dataset, distance.chebyshev)
+    label  = knn.get_label(entry, k=5)
+    labels = knn.get_labels(entries, k=5)
+
+When most of the dataset would be visited anyway (high dimensional
+data), the batches can instead be scored with the blockwise pairwise
+distances by naming the metric and using `method='brute'`.
 '''
+import numpy as np
 from collections import Counter
-from bashwork.ml.distance import manhattan_distance
+from bashwork.ml.utility.distance import manhattan, nearest, POINT_METRICS
+from bashwork.structure.tree.vptree import VPTree
 
 class KNearestNeighbors(object):
-    ''' A naive implementation of K Nearest Neighbors that
-    recomputes the distance to each entry in the dataset
-    every time a request is made.
+    ''' An implementation of K Nearest Neighbors that indexes
+    the dataset with a vantage point tree.
     '''
 
-    def __init__(self, dataset, distance):
+    def __init__(self, dataset, distance=None, leaf_size=16, method='tree'):
         ''' Initialize a new instance of KNearestNeighbors class
         
         :param dataset: The training dataset
-        :param distance: The distance function to use
+        :param distance: The metric distance function (or name) to use
+        :param leaf_size: The number of entries in each tree leaf
+        :param method: 'tree' to use the index, 'brute' to scan in blocks
+        '''
+        self.dataset   = dataset
+        self.distance  = distance or manhattan
+        self.leaf_size = leaf_size
+        self.method    = method
+        self.tree      = None
+        self.values    = None
+
+    def get_values(self):
+        ''' Retrieve the values of the dataset as a matrix.
+
+        :returns: The (n, d) matrix of the dataset values
+        '''
+        if self.values is None:
+            self.values = np.array([d.values for d in self.dataset])
+        return self.values
+
+    def get_index(self):
+        ''' Retrieve the metric tree over the dataset, building
+        it if it does not exist yet.
+
+        :returns: The tree index of the dataset
         '''
-        self.dataset  = dataset
-        self.distance = distance or manhattan_distance
+        if self.tree is None:
+            distance  = POINT_METRICS.get(self.distance, self.distance)
+            self.tree = VPTree(self.get_values(), distance, leaf_size=self.leaf_size)
+        return self.tree
 
     def get_neighbors(self, entry, k=1):
         ''' Retrieve the K nearest neighbors of the supplied
@@ -26,11 +66,24 @@ class KNearestNeighbors(object):
         
         :param entry: The entry to label
         :param k: The number of neighbors to test
-        :returns: The K nearest neighbors to the supplied entry
+        :returns: The K nearest (distance, entry) to the supplied entry
         '''
-        values = entry.values
-        neighbors = sorted((self.distance(d.values, values), d) for d in self.dataset)
-        return neighbors[0:k]
+        return self.get_neighbors_many([entry], k)[0]
+
+    def get_neighbors_many(self, entries, k=1):
+        ''' Retrieve the K nearest neighbors of each of the
+        supplied entries.
+        
+        :param entries: The entries to label
+        :param k: The number of neighbors to test
+        :returns: A list of the K nearest neighbors for each entry
+        '''
+        values = np.array([entry.values for entry in entries])
+        if self.method == 'brute':
+            distances, indexes = nearest(values, self.get_values(), k, self.distance)
+        else: distances, indexes = self.get_index().query_many(values, k)
+        return [[(d, self.dataset[i]) for d, i in zip(ds, ids)]
+            for ds, ids in zip(distances, indexes)]
 
     def get_label(self, entry, k=1):
         ''' Retrieve the associated label of the given
@@ -41,5 +94,16 @@ class KNearestNeighbors(object):
         :returns: The label of the resulting entry
         '''
         entries = self.get_neighbors(entry, k)
-        counter = Counter(entries)
-        return counter.most_common(1)[0][0].label
+        counter = Counter(e.label for _, e in entries)
+        return counter.most_common(1)[0][0]
+
+    def get_labels(self, entries, k=1):
+        ''' Retrieve the associated labels of the given
+        entries based on their K nearest neighbors.
+        
+        :param entries: The entries to label
+        :param k: The number of neighbors to test
+        :returns: The labels of the supplied entries
+        '''
+        return [Counter(e.label for _, e in neighbors).most_common(1)[0][0]
+            for neighbors in self.get_neighbors_many(entries, k)]
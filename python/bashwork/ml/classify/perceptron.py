@@ -1,11 +1,43 @@
 '''
+The perceptrons can either be trained with the `train` method
+over an in memory dataset, or incrementally with `partial_train`
+over mini-batches that are streamed from disk. The batches can be
+dense arrays, CSR matrices, or raw named features that are hashed
+to a fixed number of columns::
+
+    hasher  = FeatureHasher(size=1 << 20)
+    neuron  = AveragedPerceptron(hasher=hasher)
+    entries = gen_deserialized_file(open('clicks.pickle', 'rb'))
+    batches = gen_batches(entries, 10000)
+    neuron.train_stream((
+        [features for features, _ in batch],
+        [label for _, label in batch]) for batch in batches)
+    labels  = neuron.predict_many(hasher.transform(tests))
+
 .. todo::
-   - voted, average
+   - voted
    - multiclass
 '''
 import random
 import numpy as np
+from itertools import izip
 from bashwork.ml.classify import kernel
+from bashwork.ml.classify.kernel import KernelCache
+from bashwork.structure.sparse import CSRMatrix
+
+def iter_rows(entries):
+    ''' Given a batch of entries, generate the (columns, values)
+    of each row without densifying a sparse batch.
+
+    :param entries: A CSR matrix or a dense (n, d) array
+    :returns: A generator of (columns, values) for each row
+    '''
+    if isinstance(entries, CSRMatrix):
+        for row in xrange(entries.shape[0]):
+            yield entries.get_row(row)
+    else:
+        for entry in entries:
+            yield slice(None), entry
 
 class Perceptron(object):
 
@@ -15,12 +47,15 @@ class Perceptron(object):
         :param size: The size of the neuron (weights)
         :param rate: The learning rate of the system
         :param kernel: The underlying kernel to use for comparison
+        :param hasher: The feature hasher for raw entries (default None)
         '''
-        self.size    = kwargs.get('size')
+        self.hasher  = kwargs.get('hasher', None)
+        self.size    = kwargs.get('size', self.hasher and self.hasher.size)
         self.weights = kwargs.get('weights', np.zeros(self.size, 'd'))
         self.rate    = kwargs.get('rate', 1.0)
         self.bias    = kwargs.get('bias', 0.0)
         self.kernel  = kwargs.get('kernel', kernel.dot_product())
+        self.steps   = 0
 
     def get_label(self, value):
         ''' A method that can be overriden to decide
@@ -56,6 +91,76 @@ class Perceptron(object):
         prediction = self.kernel(self.weights, entry) + self.bias
         return self.get_label(prediction)
 
+    #------------------------------------------------------------
+    # streaming
+    #------------------------------------------------------------
+
+    def get_entries(self, entries):
+        ''' Convert a batch of entries to a CSR matrix or
+        a dense array, hashing them if they are raw features.
+
+        :param entries: The batch of entries to convert
+        :returns: The converted batch of entries
+        '''
+        if isinstance(entries, (CSRMatrix, np.ndarray)):
+            return entries
+        if self.hasher: return self.hasher.transform(entries)
+        return np.asarray(entries, dtype=np.float64)
+
+    def update(self, columns, values, errors):
+        ''' Update the weights of the supplied columns after
+        a wrong prediction.
+
+        :param columns: The columns of the entry
+        :param values: The values of the entry
+        :param errors: The error of the prediction
+        '''
+        self.weights[columns] += self.rate * errors * values
+        self.bias += errors
+
+    def partial_train(self, entries, labels):
+        ''' Given a single batch of the dataset, make one pass
+        over it to update the underlying weights. Only the non
+        zero columns of each entry are touched.
+
+        :param entries: The batch to train with (dense, CSR, or raw)
+        :param labels: The expected label of each entry
+        '''
+        for (columns, values), expect in izip(iter_rows(self.get_entries(entries)), labels):
+            actual = self.get_label(np.dot(self.weights[columns], values) + self.bias)
+            if actual != expect:
+                self.update(columns, values, expect - actual)
+            self.steps += 1
+
+    partial_fit = partial_train
+
+    def train_stream(self, batches):
+        ''' Given a stream of (entries, labels) batches, train
+        the perceptron with each of them in turn.
+
+        :param batches: The stream of batches to train with
+        '''
+        for entries, labels in batches:
+            self.partial_train(entries, labels)
+
+    def get_weights(self):
+        ''' Retrieve the weights to predict a batch with.
+
+        :returns: The (weights, bias) of the perceptron
+        '''
+        return self.weights, self.bias
+
+    def predict_many(self, entries):
+        ''' Given a batch of entries, predict the label
+        of each of them.
+
+        :param entries: The batch to predict (dense, CSR, or raw)
+        :returns: The predicted label of each entry
+        '''
+        weights, bias = self.get_weights()
+        entries = self.get_entries(entries)
+        return self.get_label(entries.dot(weights) + bias)
+
 class RandomPerceptron(Perceptron):
     ''' Just like the regular perceptron, except we
     use a random sampling of the dataset to train with
@@ -96,6 +201,8 @@ class AveragedPerceptron(Perceptron):
         self.iterations  = 0
         self.weights_acc = np.zeros(self.weights.shape, 'd')
         self.bias_acc    = 0.0
+        self.weights_lazy = np.zeros(self.weights.shape, 'd')
+        self.bias_lazy    = 0.0
 
     def train(self, dataset, rounds=1):
         ''' Given a dataset, train the perceptron the
@@ -122,23 +229,141 @@ class AveragedPerceptron(Perceptron):
         #self.bias    = self.bias_acc / self.iterations
         #self.weights = self.weights_acc / self.iterations
 
+    def update(self, columns, values, errors):
+        ''' Update the weights of the supplied columns after a
+        wrong prediction. The average is computed lazily: each
+        update is also accumulated scaled by the current step, so
+        the average is `weights - lazy / steps` and no step has to
+        touch the columns that were not updated.
+
+        :param columns: The columns of the entry
+        :param values: The values of the entry
+        :param errors: The error of the prediction
+        '''
+        change = self.rate * errors * values
+        self.weights[columns] += change
+        self.weights_lazy[columns] += self.steps * change
+        self.bias += errors
+        self.bias_lazy += self.steps * errors
+
+    def get_weights(self):
+        ''' Retrieve the averaged weights of the streamed batches.
+
+        :returns: The averaged (weights, bias) of the perceptron
+        '''
+        if not self.steps: return self.weights, self.bias
+        return (self.weights - self.weights_lazy / self.steps,
+            self.bias - self.bias_lazy / self.steps)
+
 class KernelPerceptron(Perceptron):
+    ''' The dual form of the perceptron, which keeps a coefficient
+    for every entry it got wrong (the support set) instead of a
+    weight vector, so it can learn in the space of the kernel.
+    '''
 
-    def train(self, dataset, rounds):
-        ''' Given a dataset, train the perceptron the
-        number of rounds to update the underlying weights.
+    def __init__(self, **kwargs):
+        ''' Create a new instance of the KernelPerceptron.
+
+        :param kernel: The kernel to compare entries with
+        :param cache_size: The number of kernel rows to cache (default 1024)
+        :param block: The number of kernel rows to compute at once (default 64)
+        :param memory: The memory budget of a prediction block (default 64MB)
+        '''
+        super(KernelPerceptron, self).__init__(**kwargs)
+        self.kernel       = kernel.as_kernel(self.kernel)
+        self.cache_size   = kwargs.get('cache_size', 1024)
+        self.block        = kwargs.get('block', 64)
+        self.memory       = kwargs.get('memory', 64 << 20)
+        self.support      = None
+        self.coefficients = np.zeros(0)
+
+    def train(self, dataset, rounds=1):
+        ''' Given a dataset, train the perceptron the number of
+        rounds. The kernel rows of the dataset are computed in
+        blocks and kept in a cache between the rounds, which pins
+        the first rows when the dataset is larger than the cache.
 
         :param dataset: The dataset to train with (values, expected)
         :param rounds: The number of rounds to train with this set
         '''
+        entries = np.array([entry for entry, _ in dataset], dtype=np.float64)
+        labels  = np.array([expect for _, expect in dataset])
+        weights = np.zeros(len(entries))
+        cache   = KernelCache(self.kernel, entries, size=self.cache_size, block=self.block, pin=True)
+        if self.support is not None:
+            offset = self.kernel.gram(entries, self.support).dot(self.coefficients)
+        else: offset = np.zeros(len(entries))
+
         for _ in range(rounds):
-            entry, expect = random.choice(dataset)
-            actual = self.predict(entry)
-            if actual != expect:
-                classify = lambda x: classify(x) + expect * self.kernel(entry, x) + expect
+            for index in xrange(len(entries)):
+                value  = np.dot(weights, cache[index]) + offset[index] + self.bias
+                actual = self.get_label(value)
+                errors = labels[index] - actual # 0 if correct, no update
+                if errors:
+                    weights[index] += self.rate * errors
+                    self.bias += errors
+        self.add_support(entries, weights)
+
+    def partial_train(self, entries, labels):
+        ''' Given a single batch of the dataset, make one pass
+        over it to update the support set. The batch is compared
+        against the current support set in one Gram block.
+
+        :param entries: The (n, d) batch to train with
+        :param labels: The expected label of each entry
+        '''
+        entries = np.atleast_2d(np.asarray(entries, dtype=np.float64))
+        weights = np.zeros(len(entries))
+        values  = self.decision_many(entries) - self.bias
+        for index, expect in enumerate(labels):
+            self.steps += 1
+            actual = self.get_label(values[index] + self.bias)
             errors = expect - actual # 0 if correct, no update
-            self.weights += self.learn_rate * errors * self.kernel(entry)
-            self.bias += errors
+            if errors:
+                weights[index] = self.rate * errors
+                values[index + 1:] += weights[index] * self.kernel.gram(
+                    entries[index + 1:], entries[index:index + 1])[:, 0]
+                self.bias += errors
+        self.add_support(entries, weights)
+
+    partial_fit = partial_train
+
+    def add_support(self, entries, weights):
+        ''' Add the entries with a non zero weight to the support set.
+
+        :param entries: The (n, d) entries to add
+        :param weights: The coefficient of each entry
+        '''
+        chosen = np.flatnonzero(weights)
+        if self.support is None:
+            self.support = entries[chosen]
+        else: self.support = np.vstack((self.support, entries[chosen]))
+        self.coefficients = np.concatenate((self.coefficients, weights[chosen]))
+
+    def decision_many(self, entries):
+        ''' Compute the decision value of each entry against the
+        support set, a block of entries at a time.
+
+        :param entries: The (n, d) entries to compute
+        :returns: The decision value of each entry
+        '''
+        entries = np.atleast_2d(np.asarray(entries, dtype=np.float64))
+        values  = np.zeros(len(entries)) + self.bias
+        if self.support is None or not len(self.support): return values
+        step = max(1, self.memory // (8 * len(self.support)))
+        for start in xrange(0, len(entries), step):
+            block = self.kernel.gram(entries[start:start + step], self.support)
+            values[start:start + step] += block.dot(self.coefficients)
+        return values
+
+    def predict_many(self, entries):
+        ''' Given a batch of entries, predict the label of each
+        of them with a single pass over the support set.
+
+        :param entries: The (n, d) entries to predict
+        :returns: The predicted label of each entry
+        '''
+        return self.get_label(self.decision_many(entries))
 
     def predict(self, entry):
         ''' Given a new entry, predict what label should
@@ -147,7 +372,7 @@ class KernelPerceptron(Perceptron):
         :param entry: The entry to predict the label for
         :returns: The predicted label for the entry
         '''
-        return self.get_label(self.classify(entry))
+        return self.predict_many([entry])[0]
 
 if __name__ == "__main__":
     # these are simple logic gates, note we cannot learn xor!
@@ -156,7 +381,7 @@ if __name__ == "__main__":
     #training = [ (np.array([0,0]), -1), (np.array([0,1]), 1), (np.array([1,0]), 1), (np.array([1,1]), -1) ]
     #neuron = Perceptron(size=2)
     neuron = AveragedPerceptron(size=2)
-    #neuron   = KernelPerceptron(kernel=lambda x: x*x, size=2, rate=0.2)
+    #neuron   = KernelPerceptron(kernel=kernel.polynomial(2, c=1), rate=0.2)
     neuron.train(training, rounds=100)
 
     label = lambda x: 0 if x < 0 else 1
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from collections import namedtuple
+from bashwork.ml.classify.decision_tree import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class DecisionTreeTest(unittest.TestCase):
+    ''' Code to validate that the decision tree is correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(11)
+        self.values = random.rand(600, 3)
+        self.values[:, 2] = random.randint(4, size=600)
+        self.labels = np.where(self.values[:, 0] > 0.6, 'a',
+            np.where(self.values[:, 2] >= 2, 'b', 'c'))
+        self.names  = ['x', 'noise', 'level']
+
+    def test_train_exact(self):
+        ''' Test that the presorted tree learns the dataset '''
+        tree = DecisionTree.train((self.values, self.labels), self.names)
+        actual = [tree.classify(entry) for entry in self.values]
+        self.assertEqual(list(self.labels), actual)
+        self.assertEqual('x', tree['name'])
+        self.assertEqual(3, len(tree_to_rules(tree)))
+        self.assertTrue(tree_to_graphviz(tree).startswith('digraph G'))
+
+    def test_classify_many(self):
+        ''' Test that the compiled tree matches the tree nodes '''
+        tree = DecisionTree.train((self.values, self.labels), self.names, bins=8)
+        expect = [tree.classify(entry) for entry in self.values]
+        self.assertEqual(expect, list(tree.classify_many(self.values)))
+        compiled = tree.compile()
+        self.assertTrue(tree.compiled is compiled)
+        self.assertEqual(expect[0], compiled.classify(self.values[0]))
+        leaf = DecisionTree.train((self.values[:1], ['a']), self.names)
+        self.assertEqual(['a', 'a'], list(leaf.classify_many(self.values[:2])))
+
+    def test_compile_rules(self):
+        ''' Test that the rules compile to the same tree '''
+        tree  = DecisionTree.train((self.values, self.labels), self.names, max_depth=3)
+        rules = tree_to_rules(tree)
+        self.assertEqual(rules, tree_to_rules(rules_to_tree(rules, self.names)))
+        compiled = compile_rules(rules, self.names)
+        expect = [tree.classify(entry) for entry in self.values]
+        self.assertEqual(expect, list(compiled.classify_many(self.values)))
+
+        tree  = DecisionTree.train((self.values, self.labels), self.names)
+        rules = tree_to_rules(tree)
+        expect = [tree.classify(entry) for entry in self.values]
+        self.assertEqual(expect, list(compile_rules(rules, self.names).classify_many(self.values)))
+
+    def test_train_binned(self):
+        ''' Test that the binned tree learns the dataset '''
+        tree = DecisionTree.train((self.values, self.labels), self.names, bins=32)
+        actual = np.array([tree.classify(entry) for entry in self.values])
+        self.assertTrue((actual == self.labels).mean() > 0.97)
+
+    def test_train_limits(self):
+        ''' Test that the tree respects the size limits '''
+        tree = DecisionTree.train((self.values, self.labels), self.names, max_depth=1)
+        self.assertEqual(1, tree.height())
+        tree = DecisionTree.train((self.values, self.labels), self.names, min_size=1000)
+        self.assertTrue(tree.is_leaf_node())
+        self.assertEqual('a', DecisionTree.train((self.values[:1], ['a']), self.names)['label'])
+
+    def test_train_entries(self):
+        ''' Test that a dataset of entries can be trained '''
+        Entry = namedtuple('Entry', ['values', 'label'])
+        entries = [Entry(v, l) for v, l in zip(self.values, self.labels)]
+        tree = DecisionTree.train(entries, self.names)
+        self.assertEqual(entries[5].label, tree.classify(entries[5]))
+
+    def test_train_parallel(self):
+        ''' Test that the pool builds the same tree '''
+        serial = DecisionTree.train((self.values, self.labels), self.names)
+        pooled = DecisionTree.train((self.values, self.labels), self.names, processes=2)
+        self.assertEqual(tree_to_rules(serial), tree_to_rules(pooled))
+
+    def test_parallel_subtree_seeds(self):
+        ''' Test that every pooled subtree draws its own fields '''
+        class RecordPool(object):
+            def __init__(self): self.tasks = []
+            def apply_async(self, function, arguments):
+                self.tasks.append(arguments[0])
+        pool = RecordPool()
+        builder = TreeBuilder(DecisionTree, self.values, self.labels, self.names,
+            max_features=2, seed=3)
+        builder.build(np.arange(len(self.values)), builder.orders, 0, (pool, id(builder), 1))
+        seeds = [task[3] for task in pool.tasks]
+        self.assertEqual(2, len(seeds))
+        self.assertNotEqual(seeds[0], seeds[1])
+
+        BUILDERS[id(builder)] = builder
+        try: # the same seed builds the same subtree in any worker
+            first  = tree_to_rules(build_subtree(pool.tasks[0]))
+            build_subtree(pool.tasks[1])
+            self.assertEqual(first, tree_to_rules(build_subtree(pool.tasks[0])))
+        finally: del BUILDERS[id(builder)]
+
+class CompiledForestTest(unittest.TestCase):
+    ''' Code to validate that the compiled trees are correct.
+    '''
+
+    def test_from_trees(self):
+        ''' Test that the compiled trees match the tree nodes '''
+        random = np.random.RandomState(6)
+        values = random.rand(300, 3)
+        labels = (values[:, 0] * 3 + values[:, 2] * 2).astype(int)
+        trees  = [DecisionTree.train((values, labels), list('abc')),
+            DecisionTree.train((values[:100], labels[:100]), list('abc'), max_depth=2)]
+        forest = CompiledForest.from_trees(trees)
+        tests  = random.rand(50, 3)
+        expect = [[tree.classify(entry) for tree in trees] for entry in tests]
+        self.assertEqual(expect, forest.predict(tests).tolist())
+        self.assertEqual(2, len(forest))
+        forest.block = 7
+        self.assertEqual(expect, forest.predict(tests).tolist())
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from bashwork.ml.classify.kernel import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class KernelTest(unittest.TestCase):
+    ''' Code to validate that the kernel functions are correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(3)
+        self.left  = random.rand(6, 3)
+        self.right = random.rand(4, 3)
+
+    def test_gram_matches_pairs(self):
+        ''' Test that every gram block matches the pair kernel '''
+        kernels = [dot_product(), linear(1.0), gaussian(1.5), gaussian_gamma(0.5),
+            rational_quadradic(1.0), multiquadradic(1.0), inverse_multiquadradic(1.0),
+            exponential(2.0), laplacian(2.0), sigmoid(0.5, 0.1), polynomial(3, c=1.0)]
+        for kernel in kernels:
+            expect = [[kernel(a, b) for b in self.right] for a in self.left]
+            actual = kernel.gram(self.left, self.right)
+            self.assertEqual((6, 4), actual.shape)
+            self.assertTrue(np.allclose(expect, actual))
+
+    def test_as_kernel(self):
+        ''' Test that plain functions can be used as kernels '''
+        kernel = as_kernel(lambda a, b: np.dot(a, b) ** 2)
+        self.assertTrue(np.allclose(self.left.dot(self.left.T) ** 2, kernel.gram(self.left)))
+        self.assertTrue(as_kernel(kernel) is kernel)
+
+    def test_kernel_cache(self):
+        ''' Test that the kernel cache is bounded and reuses rows '''
+        kernel = gaussian(1.0)
+        cache  = KernelCache(kernel, self.left, size=3, block=2)
+        expect = kernel.gram(self.left)
+        for index in [0, 1, 0, 5, 2, 3]:
+            self.assertTrue(np.allclose(expect[index], cache[index]))
+        self.assertEqual(3, len(cache))
+        self.assertEqual(3, cache.stats.hits)
+        self.assertEqual(3, cache.stats.misses)
+
+    def test_kernel_cache_pinned(self):
+        ''' Test that a pinned cache reuses rows across full walks '''
+        kernel  = gaussian(1.0)
+        dataset = np.random.RandomState(1).normal(size=(40, 3))
+        expect  = kernel.gram(dataset)
+        caches  = [KernelCache(kernel, dataset, size=16, block=4, pin=pin) for pin in (False, True)]
+        for cache in caches:
+            for _ in xrange(3):
+                for index in xrange(len(dataset)):
+                    self.assertTrue(np.allclose(expect[index], cache[index]))
+            self.assertTrue(len(cache) <= 16)
+        self.assertEqual(30, caches[0].stats.misses) # every block again each walk
+        self.assertEqual(24, caches[1].stats.misses) # the pinned rows only once
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
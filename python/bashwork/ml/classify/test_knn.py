@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from collections import namedtuple
+from bashwork.ml.utility import distance
+from bashwork.ml.classify.knn import KNearestNeighbors
+
+Entry = namedtuple('Entry', ['values', 'label'])
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class KNearestNeighborsTest(unittest.TestCase):
+    ''' Code to validate that the knn implementation is correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(8)
+        points = np.vstack([random.randn(50, 2), random.randn(50, 2) + 10])
+        labels = ['a'] * 50 + ['b'] * 50
+        self.dataset = [Entry(p, l) for p, l in zip(points, labels)]
+
+    def test_get_neighbors(self):
+        ''' Test that the neighbors are found with the index '''
+        knn = KNearestNeighbors(self.dataset, distance.euclidean)
+        entry = self.dataset[3]
+        neighbors = knn.get_neighbors(entry, k=3)
+        self.assertEqual(3, len(neighbors))
+        self.assertEqual(0.0, neighbors[0][0])
+        self.assertTrue(neighbors[0][1] is entry)
+        expect = sorted(distance.euclidean(d.values, entry.values) for d in self.dataset)
+        self.assertTrue(np.allclose(expect[:3], [d for d, _ in neighbors]))
+
+    def test_get_labels(self):
+        ''' Test that the entries are labeled correctly '''
+        knn = KNearestNeighbors(self.dataset, distance.chebyshev)
+        entries = [Entry(np.array([0.5, 0.0]), None), Entry(np.array([9.0, 11.0]), None)]
+        self.assertEqual('a', knn.get_label(entries[0], k=5))
+        self.assertEqual(['a', 'b'], knn.get_labels(entries, k=5))
+        self.assertEqual(2, len(knn.get_neighbors_many(entries, k=4)))
+
+    def test_brute_method(self):
+        ''' Test that the blockwise scan matches the index '''
+        tree  = KNearestNeighbors(self.dataset, 'euclidean')
+        brute = KNearestNeighbors(self.dataset, 'euclidean', method='brute')
+        entries = self.dataset[::10]
+        for found, expect in zip(brute.get_neighbors_many(entries, 3),
+            tree.get_neighbors_many(entries, 3)):
+            self.assertTrue(np.allclose([d for d, _ in expect], [d for d, _ in found]))
+        self.assertEqual(tree.get_labels(entries, 5), brute.get_labels(entries, 5))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from bashwork.generators import gen_batches
+from bashwork.ml.features import FeatureHasher
+from bashwork.ml.classify.perceptron import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class PerceptronTest(unittest.TestCase):
+    ''' Code to validate that the perceptron implementations are correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(5)
+        self.dataset = random.randn(400, 4)
+        self.labels  = np.where(self.dataset.dot([1.0, -2.0, 0.5, 0.0]) > 0, 1, -1)
+
+    def test_partial_train_matches_train(self):
+        ''' Test that one streamed pass matches one in memory pass '''
+        dataset = [(entry, label) for entry, label in zip(self.dataset, self.labels)]
+        expected = Perceptron(size=4)
+        expected.train(dataset[:], rounds=1)
+        actual = Perceptron(size=4)
+        for batch in gen_batches(dataset, 64):
+            actual.partial_train(np.array([e for e, _ in batch]), [l for _, l in batch])
+        self.assertTrue(np.allclose(expected.weights, actual.weights))
+        self.assertEqual(400, actual.steps)
+
+    def test_predict_many(self):
+        ''' Test that the perceptron learns a separable dataset '''
+        neuron = Perceptron(size=4)
+        batches = [(self.dataset, self.labels)] * 10
+        neuron.train_stream(batches)
+        labels = neuron.predict_many(self.dataset)
+        self.assertTrue((labels == self.labels).mean() > 0.95)
+        self.assertEqual(labels[3], neuron.predict(self.dataset[3]))
+
+    def test_lazy_averaging(self):
+        ''' Test that the lazy average matches the explicit average '''
+        neuron = AveragedPerceptron(size=4)
+        history = []
+        for entry, label in zip(self.dataset[:50], self.labels[:50]):
+            neuron.partial_train(entry[None, :], [label])
+            history.append((neuron.weights.copy(), neuron.bias))
+        weights, bias = neuron.get_weights()
+        self.assertTrue(np.allclose(np.mean([w for w, _ in history], axis=0), weights))
+        self.assertAlmostEqual(np.mean([b for _, b in history]), bias)
+
+    def test_hashed_features(self):
+        ''' Test that raw features are hashed and trained sparsely '''
+        hasher  = FeatureHasher(size=1 << 16)
+        entries = [{'bias': 1, 'ad=%d' % (i % 10): 1, 'user=%d' % i: 1} for i in range(200)]
+        labels  = [1 if i % 10 < 5 else -1 for i in range(200)]
+        neuron  = AveragedPerceptron(hasher=hasher)
+        for _ in range(5):
+            neuron.partial_fit(entries, labels)
+        self.assertEqual(1 << 16, len(neuron.weights))
+        self.assertEqual(labels, list(neuron.predict_many(entries)))
+
+class KernelPerceptronTest(unittest.TestCase):
+    ''' Code to validate that the kernel perceptron is correct.
+    '''
+
+    def setUp(self):
+        self.dataset = [(np.array([0.0, 0.0]), -1), (np.array([0.0, 1.0]), 1),
+            (np.array([1.0, 0.0]), 1), (np.array([1.0, 1.0]), -1)]
+
+    def test_learns_xor(self):
+        ''' Test that a polynomial kernel can learn xor '''
+        neuron = KernelPerceptron(kernel=kernel.polynomial(2, c=1.0), cache_size=2, block=1)
+        neuron.train(self.dataset, rounds=20)
+        entries = [entry for entry, _ in self.dataset]
+        expect  = [label for _, label in self.dataset]
+        self.assertEqual(expect, list(neuron.predict_many(entries)))
+        self.assertEqual(expect, [neuron.predict(entry) for entry in entries])
+        self.assertEqual(len(neuron.support), len(neuron.coefficients))
+
+    def test_train_larger_than_cache(self):
+        ''' Test that a dataset larger than the cache trains the same '''
+        random  = np.random.RandomState(4)
+        entries = random.normal(size=(60, 2))
+        dataset = [(entry, 1 if entry[0] * entry[1] > 0 else -1) for entry in entries]
+        expected = KernelPerceptron(kernel=kernel.gaussian(1.0))
+        expected.train(dataset, rounds=3)
+        actual = KernelPerceptron(kernel=kernel.gaussian(1.0), cache_size=8, block=2)
+        actual.train(dataset, rounds=3)
+        self.assertTrue(np.allclose(expected.coefficients, actual.coefficients))
+        self.assertEqual(expected.bias, actual.bias)
+
+    def test_partial_train_matches_train(self):
+        ''' Test that one streamed batch matches one round of training '''
+        expected = KernelPerceptron(kernel=kernel.gaussian(0.5))
+        expected.train(self.dataset, rounds=1)
+        actual = KernelPerceptron(kernel=kernel.gaussian(0.5))
+        actual.partial_fit([e for e, _ in self.dataset], [l for _, l in self.dataset])
+        self.assertTrue(np.allclose(expected.support, actual.support))
+        self.assertTrue(np.allclose(expected.coefficients, actual.coefficients))
+        self.assertEqual(expected.bias, actual.bias)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -1,66 +1,350 @@
 #!/usr/bin/env python
 """
-quick implementation of k-nearest neighbors
+K-Means Clustering
+------------------------------------------------------------
+
+Lloyd's algorithm over numpy arrays, seeded with k-means++ and
+accelerated with Elkan's triangle inequality bounds: every point
+keeps an upper bound to its own centroid and a lower bound to every
+other centroid, so after the first few rounds most points skip the
+distance computations entirely::
+
+    model = KMeans(count=8, seed=1)
+    centroids = model.train(dataset)
+    labels = model.classify_many(dataset)
+
+For datasets that do not fit in memory, `MiniBatchKMeans` updates
+the centroids from chunks streamed out of a generator, assigning
+each chunk across a process pool::
+
+    model = MiniBatchKMeans(count=256, processes=8)
+    model.train_stream(iter_embedding_chunks())
+
 http://datasciencelab.wordpress.com/2013/12/27/finding-the-k-in-k-means-clustering/
 """
-from operator import add
-from random import randint
-from itertools import groupby
-
-from common import Entry
-from distance import manhattan_distance as distance
+import numpy as np
+from multiprocessing import Pool
+from bashwork.ml.cluster import Clustering
+from bashwork.ml.utility.distance import pairwise, pairwise_argmin
 
 #------------------------------------------------------------#
 # initialize strategies
-# - 
+# - random rows of the dataset
+# - k-means++ weighted by the squared distance
 #------------------------------------------------------------#
-def random_initialize(database, count):
+def random_initialize(dataset, count, random=np.random):
+    ''' Choose the initial centroids uniformly from the dataset.
+
+    :param dataset: The (n, d) dataset to choose from
+    :param count: The number of centroids to choose
+    :param random: The random state to use
+    :returns: The (count, d) initial centroids
     '''
+    return dataset[random.choice(len(dataset), count, replace=False)].astype(np.float64)
+
+def plus_plus_initialize(dataset, count, random=np.random):
+    ''' Choose the initial centroids with k-means++, where each
+    new centroid is picked with a probability proportional to its
+    squared distance from the closest centroid so far.
+
+    :param dataset: The (n, d) dataset to choose from
+    :param count: The number of centroids to choose
+    :param random: The random state to use
+    :returns: The (count, d) initial centroids
     '''
-    length = len(database)
-    values = [database[randint(0, length)] for _ in range(count)]
-    return [Entry(index, value) for index, value in enumerate(values)]
+    centroids = np.zeros((count, dataset.shape[1]))
+    centroids[0] = dataset[random.randint(len(dataset))]
+    closest = pairwise(dataset, centroids[:1], 'sqeuclidean')[:, 0]
+    for index in xrange(1, count):
+        total = closest.sum()
+        if total > 0:
+            pick = np.searchsorted(np.cumsum(closest), random.rand() * total)
+        else: pick = random.randint(len(dataset))   # every point is a centroid
+        centroids[index] = dataset[min(pick, len(dataset) - 1)]
+        distances = pairwise(dataset, centroids[index:index + 1], 'sqeuclidean')[:, 0]
+        np.minimum(closest, distances, out=closest)
+    return centroids
+
+INITIALIZERS = {
+    'random'   : random_initialize,
+    'k-means++': plus_plus_initialize,
+}
 
 #------------------------------------------------------------#
 # terminate strategies
 # - no/min re-assignment of points
-# - no/min re-assignment of clusters
-# - min decrease of SSE
+# - no/min movement of the centroids
+# - max number of rounds
 #------------------------------------------------------------#
 def count_terminate(rounds):
-    count = rounds
-    def implementation():
-        count -= 1
-        return count == 0
+    ''' Terminate after the supplied number of rounds.
+
+    :param rounds: The number of rounds to run
+    :returns: A terminate function
+    '''
+    count = [rounds]
+    def implementation(*args):
+        count[0] -= 1
+        return count[0] < 0
+    return implementation
+
+def shift_terminate(rounds, tolerance=1e-4):
+    ''' Terminate after the supplied number of rounds or when no
+    centroid moved further than the tolerance.
+
+    :param rounds: The maximum number of rounds to run
+    :param tolerance: The minimum centroid movement
+    :returns: A terminate function
+    '''
+    count = count_terminate(rounds)
+    def implementation(shift, changed):
+        return count() or shift <= tolerance or not changed
     return implementation
 
 #------------------------------------------------------------#
 # implementation
 #------------------------------------------------------------#
-def compute_centroid(dataset):
-    ''' Helper method to recompute the centroids given new
-    dataset entries.
+def compute_centroids(dataset, labels, centroids):
+    ''' Helper method to recompute the centroids as the mean
+    of their assigned points (empty clusters keep their centroid).
+
+    :param dataset: The (n, d) dataset
+    :param labels: The centroid assigned to each point
+    :param centroids: The current (k, d) centroids
+    :returns: The new centroids and the number of points in each
     '''
-    id = dataset[0].label.label
-    data = (entry.values for entry in dataset)
-    values = map(add, *data)
-    return Entry(id, values)
-
-def kmeans(database, count, **kwargs):
-	''' Implementation of kmeans
-
-    :param database: The training database
-    :param count: The number of clusters to find
-	'''
-    initialize = kwargs.get('initialize', random_initialize)
-    terminate  = kwargs.get('terminate', count_terminate(10))
-    centroids  = initialize(database, count)
-
-    while not terminate():
-        for entry in database:
-            weights = [(distance(entry.values, c.values), c) for c in centroids]
-            entry.label = sorted(weights)[0][1]
-        groups = groupby(database, lambda (a,b): 
-        centroids = [compute_centroid(group) for group in groups]
-    return centroids
+    count  = len(centroids)
+    sizes  = np.bincount(labels, minlength=count)
+    sums   = np.column_stack([np.bincount(labels, weights=dataset[:, axis], minlength=count)
+        for axis in xrange(dataset.shape[1])])
+    update = centroids.copy()
+    update[sizes > 0] = sums[sizes > 0] / sizes[sizes > 0, None]
+    return update, sizes
+
+def kmeans(dataset, centroids, **kwargs):
+    ''' Implementation of kmeans with Elkan's bounds. A point is
+    only checked against centroid j when its upper bound is larger
+    than both its lower bound to j and half the distance between
+    its centroid and j.
+
+    :param dataset: The (n, d) training dataset
+    :param centroids: The (k, d) initial centroids
+    :param terminate: The termination strategy (shift, changed) => bool
+    :returns: The (centroids, labels, inertia) of the clustering
+    '''
+    terminate = kwargs.get('terminate', shift_terminate(100))
+    dataset   = np.asarray(dataset, dtype=np.float64)
+    centroids = np.array(centroids, dtype=np.float64)
+    everyone  = np.arange(len(dataset))
+
+    lower  = pairwise(dataset, centroids)
+    labels = lower.argmin(axis=1)
+    upper  = lower[everyone, labels]
+
+    while True:
+        centroids, update = compute_centroids(dataset, labels, centroids)[0], centroids
+        shift = np.sqrt(((centroids - update) ** 2).sum(axis=1))
+        upper += shift[labels]
+        lower  = np.maximum(lower - shift[None, :], 0.0)
+
+        between = pairwise(centroids, centroids)
+        np.fill_diagonal(between, np.inf)
+        closest = 0.5 * between.min(axis=1)
+        np.fill_diagonal(between, 0.0)
+
+        # the points whose bounds can not prove their centroid is closest
+        rows = np.flatnonzero(upper > closest[labels])
+        bounds = np.maximum(lower[rows], 0.5 * between[labels[rows]])
+        bounds[np.arange(len(rows)), labels[rows]] = np.inf # never a candidate
+        rows = rows[(upper[rows, None] > bounds).any(axis=1)]
+
+        changed = 0
+        if len(rows):
+            own   = labels[rows]
+            exact = np.sqrt(((dataset[rows] - centroids[own]) ** 2).sum(axis=1))
+            upper[rows] = lower[rows, own] = exact
+            bounds = np.maximum(lower[rows], 0.5 * between[own])
+            bounds[np.arange(len(rows)), own] = np.inf
+
+            # only the centroids that failed their bound are measured
+            local, columns = np.nonzero(exact[:, None] > bounds)
+            if len(local):
+                found = np.sqrt(((dataset[rows[local]] - centroids[columns]) ** 2).sum(axis=1))
+                lower[rows[local], columns] = found
+                trial = np.full(bounds.shape, np.inf)
+                trial[np.arange(len(rows)), own] = exact
+                trial[local, columns] = found
+                fresh = trial.argmin(axis=1)
+                changed = np.count_nonzero(fresh != own)
+                labels[rows] = fresh
+                upper[rows] = trial[np.arange(len(rows)), fresh]
+        if terminate(shift.max(), changed): break
+
+    inertia = ((dataset - centroids[labels]) ** 2).sum()
+    return centroids, labels, inertia
+
+def assign_chunk(arguments):
+    ''' Assign every point of a chunk to its closest centroid.
+    This is a module function so it can be sent to a process pool.
+
+    :param arguments: The (chunk, centroids) to assign
+    :returns: The (distances, labels) of the chunk
+    '''
+    chunk, centroids = arguments
+    return pairwise_argmin(chunk, centroids)
+
+#------------------------------------------------------------#
+# classes
+#------------------------------------------------------------#
+class KMeans(Clustering):
+    ''' K-Means clustering with k-means++ seeding and
+    Elkan's accelerated assignment.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of KMeans class.
+
+        :param count: The number of centroids to create
+        :param initialize: The initialization function (or name) to use
+        :param centroids: The initial centroids to use
+        :param rounds: The maximum number of rounds (default 100)
+        :param tolerance: The centroid movement to stop at (default 1e-4)
+        :param seed: The seed of the random state
+        '''
+        self.count      = kwargs.get('count', 5)
+        self.initialize = kwargs.get('initialize', 'k-means++')
+        self.centroids  = kwargs.get('centroids', None)
+        self.rounds     = kwargs.get('rounds', 100)
+        self.tolerance  = kwargs.get('tolerance', 1e-4)
+        self.random     = np.random.RandomState(kwargs.get('seed', None))
+        self.inertia    = None
+
+    def get_initial_centroids(self, dataset):
+        ''' Retrieve the centroids to start training from.
+
+        :param dataset: The (n, d) dataset to choose from
+        :returns: The (count, d) initial centroids
+        '''
+        if self.centroids is not None:
+            return np.array(self.centroids, dtype=np.float64)
+        initialize = INITIALIZERS.get(self.initialize, self.initialize)
+        return initialize(dataset, self.count, self.random)
+
+    def train(self, dataset, **kwargs):
+        ''' Given a dataset, cluster it into count clusters.
+
+        :param dataset: The (n, d) dataset to train with
+        :returns: The (count, d) trained centroids
+        '''
+        dataset = np.asarray(dataset, dtype=np.float64)
+        terminate = shift_terminate(self.rounds, self.tolerance)
+        self.centroids, _, self.inertia = kmeans(dataset,
+            self.get_initial_centroids(dataset), terminate=terminate)
+        return self.centroids
+
+    def classify(self, entry, **kwargs):
+        ''' Classify a new entry with the closest centroid.
+
+        :param entry: The entry to classify
+        :returns: The index of the closest centroid
+        '''
+        return int(self.classify_many([entry])[0])
+
+    def classify_many(self, entries):
+        ''' Classify every entry with its closest centroid.
+
+        :param entries: The (n, d) entries to classify
+        :returns: The index of the closest centroid of each entry
+        '''
+        return pairwise_argmin(entries, self.centroids)[1]
+
+
+class MiniBatchKMeans(KMeans):
+    ''' K-Means clustering that updates the centroids from
+    small batches, so it can train from a stream of chunks.
+    Each centroid moves towards the mean of its new points with
+    a learning rate of one over the points it has seen.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of MiniBatchKMeans class.
+
+        :param batch_size: The size of each batch (default 1024)
+        :param processes: The processes to assign with (default none)
+        '''
+        super(MiniBatchKMeans, self).__init__(**kwargs)
+        self.batch_size = kwargs.get('batch_size', 1024)
+        self.processes  = kwargs.get('processes', None)
+        self.counts     = None
+
+    def assign(self, chunk, pool=None):
+        ''' Assign every point of a chunk to its closest centroid,
+        splitting the chunk across the pool if one is supplied.
+
+        :param chunk: The (n, d) chunk to assign
+        :param pool: The process pool to use (default None)
+        :returns: The closest centroid of each point
+        '''
+        if pool is None or len(chunk) < 2 * self.batch_size:
+            return assign_chunk((chunk, self.centroids))[1]
+        pieces = [(piece, self.centroids) for piece in
+            np.array_split(chunk, max(1, len(chunk) // self.batch_size))]
+        return np.concatenate([labels for _, labels in pool.map(assign_chunk, pieces)])
+
+    def partial_train(self, chunk, pool=None):
+        ''' Update the centroids with a single chunk of the dataset.
+
+        :param chunk: The (n, d) chunk to train with
+        :param pool: The process pool to assign with (default None)
+        :returns: The (count, d) current centroids
+        '''
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if self.counts is None:
+            self.centroids = self.get_initial_centroids(chunk)
+            self.counts = np.zeros(self.count)
+
+        labels = self.assign(chunk, pool)
+        sizes  = np.bincount(labels, minlength=self.count)
+        sums   = np.column_stack([np.bincount(labels, weights=chunk[:, axis], minlength=self.count)
+            for axis in xrange(chunk.shape[1])])
+        seen = sizes > 0
+        self.counts[seen] += sizes[seen]
+        rate = (sizes[seen] / self.counts[seen])[:, None]
+        self.centroids[seen] += rate * (sums[seen] / sizes[seen, None] - self.centroids[seen])
+        return self.centroids
+
+    def train_stream(self, chunks, **kwargs):
+        ''' Train the centroids from a stream of chunks, assigning
+        each chunk across a process pool.
+
+        :param chunks: An iterable of (n, d) chunks
+        :returns: The (count, d) trained centroids
+        '''
+        pool = Pool(self.processes) if self.processes else None
+        try:
+            for chunk in chunks:
+                self.partial_train(chunk, pool)
+        finally:
+            if pool:
+                pool.close()
+                pool.join()
+        return self.centroids
+
+    def train(self, dataset, **kwargs):
+        ''' Given a dataset, cluster it by training with random
+        batches for the configured number of rounds.
 
+        :param dataset: The (n, d) dataset to train with
+        :returns: The (count, d) trained centroids
+        '''
+        dataset = np.asarray(dataset, dtype=np.float64)
+        if self.counts is None:
+            self.centroids = self.get_initial_centroids(dataset)
+            self.counts = np.zeros(self.count)
+        size = min(self.batch_size, len(dataset))
+        batches = (dataset[self.random.choice(len(dataset), size, replace=False)]
+            for _ in xrange(self.rounds))
+        self.train_stream(batches)
+        distances, labels = pairwise_argmin(dataset, self.centroids)
+        self.inertia = (distances ** 2).sum()
+        return self.centroids
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from bashwork.ml.cluster.kmeans import *
+from bashwork.ml.cluster.demo import make_blobs
+
+#---------------------------------------------------------------------------#
+# helpers
+#---------------------------------------------------------------------------#
+def lloyd(dataset, centroids, rounds=100):
+    ''' The plain implementation to compare against '''
+    for _ in xrange(rounds):
+        distances = ((dataset[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        labels = distances.argmin(axis=1)
+        update = np.array([dataset[labels == c].mean(axis=0) if (labels == c).any()
+            else centroids[c] for c in xrange(len(centroids))])
+        if np.allclose(update, centroids): break
+        centroids = update
+    return centroids, labels
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class KMeansTest(unittest.TestCase):
+    ''' Code to validate that the kmeans implementation is correct.
+    '''
+
+    def setUp(self):
+        self.dataset = make_blobs(count=2000, centers=5, dims=3, seed=7)
+
+    def test_initialize(self):
+        ''' Test that the initializers pick distinct rows '''
+        random = np.random.RandomState(1)
+        for initialize in [random_initialize, plus_plus_initialize]:
+            centroids = initialize(self.dataset, 5, random)
+            self.assertEqual((5, 3), centroids.shape)
+            self.assertEqual(5, len(set(map(tuple, centroids))))
+        dataset = np.zeros((10, 2))
+        self.assertEqual((3, 2), plus_plus_initialize(dataset, 3, random).shape)
+
+    def test_terminate(self):
+        ''' Test that the terminate strategies work correctly '''
+        terminate = count_terminate(2)
+        self.assertEqual([False, False, True], [terminate() for _ in range(3)])
+        terminate = shift_terminate(10, 0.1)
+        self.assertFalse(terminate(1.0, 5))
+        self.assertTrue(terminate(0.01, 5))
+        self.assertTrue(terminate(1.0, 0))
+
+    def test_elkan_matches_lloyd(self):
+        ''' Test that the pruned kmeans matches the plain version '''
+        initial = random_initialize(self.dataset, 8, np.random.RandomState(3))
+        expected, labels = lloyd(self.dataset, initial)
+        actual, found, inertia = kmeans(self.dataset, initial,
+            terminate=shift_terminate(100, 0.0))
+        self.assertTrue(np.allclose(expected, actual))
+        self.assertTrue((labels == found).all())
+        self.assertAlmostEqual(((self.dataset - actual[found]) ** 2).sum(), inertia)
+
+    def test_elkan_matches_lloyd_uniform(self):
+        ''' Test that the pruning is exact when many points move '''
+        dataset = np.random.RandomState(5).uniform(size=(1500, 2))
+        initial = random_initialize(dataset, 12, np.random.RandomState(2))
+        expected, labels = lloyd(dataset, initial, rounds=300)
+        actual, found, _ = kmeans(dataset, initial, terminate=shift_terminate(300, 0.0))
+        self.assertTrue(np.allclose(expected, actual))
+        self.assertTrue((labels == found).all())
+
+    def test_kmeans_class(self):
+        ''' Test that the kmeans class clusters the blobs '''
+        model = KMeans(count=5, seed=1)
+        centroids = model.train(self.dataset)
+        labels = model.classify_many(self.dataset)
+        self.assertEqual((5, 3), centroids.shape)
+        self.assertEqual(labels[0], model.classify(self.dataset[0]))
+        self.assertTrue(model.inertia / len(self.dataset) < 4.0)
+
+    def test_minibatch(self):
+        ''' Test that the minibatch kmeans approaches the full one '''
+        full = KMeans(count=5, seed=1)
+        full.train(self.dataset)
+        model = MiniBatchKMeans(count=5, seed=1, batch_size=200, rounds=50)
+        model.train(self.dataset)
+        self.assertTrue(model.inertia < 1.2 * full.inertia)
+
+    def test_train_stream(self):
+        ''' Test that a stream of chunks can train the model '''
+        chunks = (self.dataset[start:start + 500] for start in xrange(0, 2000, 500))
+        serial = MiniBatchKMeans(count=5, seed=2, batch_size=100)
+        serial.train_stream(chunks)
+        self.assertEqual(2000, serial.counts.sum())
+
+        chunks = (self.dataset[start:start + 500] for start in xrange(0, 2000, 500))
+        pooled = MiniBatchKMeans(count=5, seed=2, batch_size=100, processes=2)
+        pooled.train_stream(chunks)
+        self.assertTrue(np.allclose(serial.centroids, pooled.centroids))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
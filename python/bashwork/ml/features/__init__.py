@@ -1,7 +1,6 @@
 '''
 .. todo::
    - dictionary vectorize
-   - hashing trick
-   - http://en.wikipedia.org/wiki/Feature_hashing
    - normalize
 '''
+from bashwork.ml.features.hashing import FeatureHasher
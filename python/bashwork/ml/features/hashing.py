@@ -0,0 +1,78 @@
+'''
+Feature Hashing
+------------------------------------------------------------
+
+The hashing trick maps named features straight to the columns
+of a fixed size weight vector without keeping a dictionary of the
+feature names, so the vocabulary of a stream never has to fit in
+memory. A second bit of the hash picks the sign of each feature,
+which keeps collisions unbiased in expectation::
+
+    hasher = FeatureHasher(size=1 << 20)
+    matrix = hasher.transform([
+        {'user=1234': 1, 'ad=55': 1, 'price': 0.99},
+        ['user=4321', 'ad=55'],
+    ])
+
+http://en.wikipedia.org/wiki/Feature_hashing
+'''
+import zlib
+from bashwork.structure.sparse import COOMatrix
+
+class FeatureHasher(object):
+    ''' Converts named features to sparse rows of a fixed
+    number of columns by hashing the feature names.
+    '''
+
+    def __init__(self, size=1 << 20, signed=True):
+        '''
+        :param size: The number of columns to hash into (at most 2**31)
+        :param signed: True to hash the sign of each feature
+        '''
+        self.size   = size
+        self.signed = signed
+
+    def hash_feature(self, name):
+        ''' Hash a single feature name to a column and a sign.
+        This uses crc32 so the columns are the same in every process.
+
+        :param name: The name of the feature to hash
+        :returns: The (column, sign) of the feature
+        '''
+        if isinstance(name, unicode): name = name.encode('utf-8')
+        elif not isinstance(name, str): name = str(name)
+        code = zlib.crc32(name) & 0xffffffff
+        sign = -1.0 if self.signed and code & 0x80000000 else 1.0
+        return (code & 0x7fffffff) % self.size, sign
+
+    def transform_one(self, features):
+        ''' Hash the features of a single entry, which can be a
+        dictionary of name to value, or an iterable of names or of
+        (name, value) pairs.
+
+        :param features: The features of the entry
+        :returns: The (columns, values) of the entry
+        '''
+        if isinstance(features, dict):
+            features = features.iteritems()
+        columns, values = [], []
+        for feature in features:
+            name, value = feature if isinstance(feature, tuple) else (feature, 1.0)
+            column, sign = self.hash_feature(name)
+            columns.append(column)
+            values.append(sign * value)
+        return columns, values
+
+    def transform(self, entries):
+        ''' Hash the features of a batch of entries. Features that
+        collide in the same row are summed.
+
+        :param entries: The features of each entry
+        :returns: A (len(entries), size) CSR matrix
+        '''
+        builder, rows = COOMatrix(), 0
+        for row, features in enumerate(entries):
+            builder.extend_row(row, *self.transform_one(features))
+            rows = row + 1
+        builder.shape = (rows, self.size)
+        return builder.to_csr()
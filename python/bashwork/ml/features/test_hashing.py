@@ -0,0 +1,36 @@
+#!/usr/bin/env python
+import unittest
+from bashwork.ml.features.hashing import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class FeatureHasherTest(unittest.TestCase):
+    ''' Code to validate that the feature hasher is correct.
+    '''
+
+    def test_hash_feature(self):
+        ''' Test that features hash consistently '''
+        hasher = FeatureHasher(size=1024)
+        column, sign = hasher.hash_feature('user=1234')
+        self.assertEqual((column, sign), hasher.hash_feature(u'user=1234'))
+        self.assertTrue(0 <= column < 1024)
+        self.assertTrue(sign in (-1.0, 1.0))
+        self.assertEqual(1.0, FeatureHasher(signed=False).hash_feature('user=1234')[1])
+
+    def test_transform(self):
+        ''' Test that batches of features are hashed to a matrix '''
+        hasher = FeatureHasher(size=1 << 20)
+        matrix = hasher.transform([{'a': 2.0, 'b': 1.0}, ['a', ('c', 3.0)], []])
+        self.assertEqual((3, 1 << 20), matrix.shape)
+        self.assertEqual(4, matrix.nnz)
+        column, sign = hasher.hash_feature('a')
+        self.assertEqual(2.0 * sign, matrix.get_entry(0, column))
+        self.assertEqual(sign, matrix.get_entry(1, column))
+        self.assertEqual((0, 1 << 20), hasher.transform(iter([])).shape)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
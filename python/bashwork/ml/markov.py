@@ -1,6 +1,34 @@
+'''
+Markov Chains
+------------------------------------------------------------
+
+`MarkovChain` keeps the transitions in nested dictionaries keyed by
+the tuples of the previous words, which is simple but needs a lot of
+memory for each transition. `SparseMarkovChain` interns every token
+to an integer id and stores the transitions in flat arrays:
+
+- `contexts[c]` is the 64 bit hash of the ids of context c (sorted)
+- `indptr[c]:indptr[c + 1]` are the transitions of context c
+- `targets[t]` is the token id that transition t leads to
+- `alias_prob[t]` and `alias_index[t]` are the alias table of the context
+- `size` is the order of the chain (the longest context)
+
+A context is found with a binary search of its hash and the next
+token is drawn from the alias table of the context in constant time.
+The chain is trained from a stream of lines, so the corpus never has
+to be in memory, and it can be saved and memory mapped back::
+
+    chain = chain_from_file('corpus.txt', size=3)
+    chain.save('corpus.chain')
+    chain = SparseMarkovChain.load('corpus.chain')
+    print ' '.join(chain.generate())
+'''
+import os
 import sys
 import random
+import numpy as np
 from collections import defaultdict
+from bashwork.statistics.utilities import alias_tables
 
 def recursive_dict(default, level=1):
     ''' Create a two level defaultdict where
@@ -113,6 +141,276 @@ class MarkovChain(object):
             else: return node            # or choose the selected node
         return max_node                  # otherwise return highest probability node
 
+#------------------------------------------------------------
+# sparse chain
+#------------------------------------------------------------
+
+FNV_OFFSET = np.uint64(14695981039346656037)
+FNV_PRIME  = np.uint64(1099511628211)
+
+def context_keys(sequence, order):
+    ''' Hash every window of the supplied size in a sequence
+    of token ids with a word-wise FNV-1a hash that is seeded by the
+    size of the window (so the orders do not share keys).
+
+    :param sequence: The array of token ids to hash
+    :param order: The size of the windows to hash
+    :returns: The hash of every window of the sequence
+    '''
+    sequence = np.asarray(sequence, dtype=np.uint64)
+    count = len(sequence) - order + 1
+    keys  = np.empty(max(0, count), dtype=np.uint64)
+    keys.fill(FNV_OFFSET ^ np.uint64(order))
+    keys *= FNV_PRIME
+    for k in xrange(order):
+        keys ^= sequence[k:k + count]
+        keys *= FNV_PRIME
+    return keys
+
+def count_transitions(keys, targets, counts=None):
+    ''' Merge the duplicate (context, target) pairs of the
+    supplied transitions, summing their counts.
+
+    :param keys: The context hash of every transition
+    :param targets: The target id of every transition
+    :param counts: The count of every transition (default 1)
+    :returns: The unique (keys, targets, counts) sorted by key then target
+    '''
+    if counts is None: counts = np.ones(len(keys), dtype=np.int64)
+    if not len(keys): return keys, targets, counts
+    order   = np.lexsort((targets, keys))
+    keys, targets, counts = keys[order], targets[order], counts[order]
+    starts  = np.flatnonzero(np.r_[True, (keys[1:] != keys[:-1]) | (targets[1:] != targets[:-1])])
+    return keys[starts], targets[starts], np.add.reduceat(counts, starts)
+
+def merge_transitions(left, right):
+    ''' Merge two runs of unique transitions that are sorted by
+    key then target, summing the counts of the shared pairs, without
+    sorting them again.
+
+    :param left: The (keys, targets, counts) of the first run
+    :param right: The (keys, targets, counts) of the second run
+    :returns: The merged (keys, targets, counts) sorted by key then target
+    '''
+    keys, targets, counts = left
+    other_keys, other_targets, other_counts = right
+    if not len(other_keys): return left
+    if not len(keys): return right
+
+    # a pair of the left run is ranked by its key group then its target
+    groups = np.cumsum(np.r_[0, keys[1:] != keys[:-1]]).astype(np.uint64)
+    ranks  = (groups << np.uint64(32)) | targets.astype(np.uint64)
+    places = np.searchsorted(keys, other_keys)
+    known  = places < len(keys)
+    known[known] = keys[places[known]] == other_keys[known]
+    other_ranks = (groups[places[known]] << np.uint64(32)) | other_targets[known].astype(np.uint64)
+    places[known] = np.searchsorted(ranks, other_ranks)
+
+    shared = np.zeros(len(other_keys), dtype=bool)
+    found  = places[known] < len(keys)
+    shared[np.flatnonzero(known)[found]] = ranks[places[known][found]] == other_ranks[found]
+    counts = counts.copy()
+    counts[places[shared]] += other_counts[shared]
+    places = places[~shared]
+    return (np.insert(keys, places, other_keys[~shared]),
+        np.insert(targets, places, other_targets[~shared]),
+        np.insert(counts, places, other_counts[~shared]))
+
+class SparseMarkovChain(object):
+    ''' A markov chain over interned token ids whose transitions
+    are stored in flat arrays indexed by the hash of the context.
+    '''
+
+    ROOT_NODE = MarkovChain.ROOT_NODE
+    ROOT_PATH = MarkovChain.ROOT_PATH
+    ARRAYS = ['contexts', 'indptr', 'targets', 'alias_prob', 'alias_index', 'size']
+
+    @classmethod
+    def train(klass, sources, size=2, chunk=1 << 20):
+        ''' Given a stream of training data, build the transitions
+        of every context of up to the supplied number of previous
+        states. The lines are counted a chunk of tokens at a time
+        and only the merged counts are kept between the chunks. The
+        counted runs are kept on a stack whose runs at least double
+        in size towards the bottom, so every transition is merged
+        a logarithmic number of times.
+
+        :param sources: The source of data to train with (iterable of list)
+        :param size: The number of previous data to use
+        :param chunk: The number of tokens to count at a time
+        :returns: A trained markov chain
+        '''
+        tokens, ids = [klass.ROOT_NODE], { klass.ROOT_NODE: 0 }
+        runs, sequence = [], [0]
+
+        def flush():
+            partials = []
+            seq = np.array(sequence, dtype=np.int64)
+            zeros = np.r_[0, np.cumsum(seq == 0)]
+            for order in xrange(1, size + 1):
+                count = len(seq) - order
+                if count <= 0: break
+                keys  = context_keys(seq[:-1], order)[:count]
+                nexts = seq[order:]
+                if order > 1: # windows may not cross the end of a line
+                    valid = zeros[order:order + count] == zeros[:count]
+                    keys, nexts = keys[valid], nexts[valid]
+                partials.append((keys, nexts))
+            run = count_transitions(*[np.concatenate(p) for p in zip(*partials)])
+            while runs and len(runs[-1][0]) <= 2 * len(run[0]):
+                run = merge_transitions(runs.pop(), run)
+            runs.append(run)
+            del sequence[1:]
+
+        for line in sources:
+            line = [token for token in line if token != klass.ROOT_NODE]
+            if not line: continue
+            for token in line:
+                index = ids.get(token)
+                if index is None:
+                    index = ids[token] = len(tokens)
+                    tokens.append(token)
+                sequence.append(index)
+            sequence.append(0) # the end of the line
+            if len(sequence) >= chunk: flush()
+        if len(sequence) > 1: flush()
+
+        run = (np.array([], dtype=np.uint64), np.array([], dtype=np.int64),
+            np.array([], dtype=np.int64))
+        while runs: run = merge_transitions(runs.pop(), run)
+        return klass.create(tokens, size, *run)
+
+    @classmethod
+    def create(klass, tokens, size, keys, targets, counts):
+        ''' Pack the supplied transition counts into the arrays
+        of the chain, building the alias tables of all the contexts
+        in a single vectorized pass.
+
+        :param tokens: The token of every id
+        :param size: The number of previous data that was used
+        :param keys: The context hash of every transition (sorted)
+        :param targets: The target id of every transition
+        :param counts: The count of every transition
+        :returns: The initialized markov chain
+        '''
+        starts = np.flatnonzero(np.r_[len(keys) > 0, keys[1:] != keys[:-1]])
+        indptr = np.r_[starts, len(keys)].astype(np.int64)
+        alias_prob, alias_index = alias_tables(counts, indptr)
+        return klass({
+            'contexts'   : np.asarray(keys, dtype=np.uint64)[starts],
+            'indptr'     : indptr,
+            'targets'    : np.asarray(targets, dtype=np.int32),
+            'alias_prob' : alias_prob,
+            'alias_index': alias_index.astype(np.int32),
+            'size'       : np.array(size, dtype=np.int64),
+        }, tokens)
+
+    @classmethod
+    def load(klass, path, mmap=True):
+        ''' Load a markov chain that was saved to the supplied
+        directory, memory mapping the arrays by default.
+
+        :param path: The directory the chain was saved to
+        :param mmap: True to memory map the arrays (default True)
+        :returns: The loaded markov chain
+        '''
+        mode   = 'r' if mmap else None
+        arrays = dict((name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mode))
+            for name in klass.ARRAYS)
+        with open(os.path.join(path, 'tokens.txt'), 'r') as handle:
+            tokens = handle.read().split('\n')[:-1]
+        return klass(arrays, tokens)
+
+    def __init__(self, arrays, tokens):
+        ''' Initialize a new instance of the SparseMarkovChain
+        class with the supplied trained arrays.
+
+        :param arrays: A dictionary of the packed arrays
+        :param tokens: The token of every id
+        '''
+        self.arrays = arrays
+        self.tokens = tokens
+        self.ids    = dict((token, index) for index, token in enumerate(tokens))
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+        self.size   = int(arrays['size'])
+
+    def save(self, path):
+        ''' Save the markov chain to the supplied directory
+        so that it can be memory mapped with `load`.
+
+        :param path: The directory to save the chain to
+        '''
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, name + '.npy'), self.arrays[name])
+        with open(os.path.join(path, 'tokens.txt'), 'w') as handle:
+            for token in self.tokens:
+                handle.write(token + '\n')
+
+    def get_context(self, seed):
+        ''' Given a seed, find the longest suffix of it that
+        is a trained context, only looking at the last `size`
+        nodes of the seed.
+
+        :param seed: The path to find the context of
+        :returns: The index of the context or None
+        '''
+        path = []
+        for token in reversed(seed[-self.size:]): # unknown tokens cut the path
+            index = self.ids.get(token)
+            if index is None: break
+            path.append(index)
+        path.reverse()
+
+        for start in xrange(len(path)):
+            key = context_keys(path[start:], len(path) - start)[0]
+            index = np.searchsorted(self.contexts, key)
+            if index < len(self.contexts) and self.contexts[index] == key:
+                return index
+        return None
+
+    def generate(self, seed=None, size=sys.maxint):
+        ''' Generate a random sentence of the supplied size
+        (default until the path ends) starting from the supplied
+        seed or the path root.
+
+        :param seed: The seed to start the path with (default ROOT_PATH)
+        :param size: The maximum size of the generated path (default max)
+        :returns: The genrated path of nodes
+        '''
+        path = list(seed) if seed else []
+        seed = seed or self.ROOT_PATH
+        if self.get_context(seed) is None:
+            raise Exception("cannot create a path without a valid starting node")
+
+        node = self.next_node(seed)
+        while node and (size > 0):
+            path.append(node)
+            node = self.next_node(path)
+            size = size - 1
+        return path
+
+    def next_node(self, seed):
+        ''' Given a seed, return the next possible node from the
+        transitions of its longest trained context.
+
+        :param seed: The seed to pull the next possible node from
+        :returns: The next selected node or None
+        '''
+        context = self.get_context(seed)
+        if context is None: return None
+        start, end = self.indptr[context], self.indptr[context + 1]
+        index = start + int(random.random() * (end - start))
+        if random.random() >= self.alias_prob[index]:
+            index = start + self.alias_index[index]
+        return self.tokens[self.targets[index]]
+
+#------------------------------------------------------------
+# helpers
+#------------------------------------------------------------
+
 def chain_from_text(text, size=2):
     ''' Given a collection of text, generate a
     markov chain from the contents.
@@ -126,13 +424,14 @@ def chain_from_text(text, size=2):
     data = [word_tokenize(sent) for sent in sent_tokenize(text)]
     return MarkovChain.train(data, size=size)
 
-def chain_from_file(path, size=2):
-    ''' Given a file path, open it and genrate a
-    markov chain from the contents.
+def chain_from_file(path, size=2, tokenize=str.split):
+    ''' Given a file path, stream it a line at a time
+    into a sparse markov chain.
 
     :param path: The path to the file to train with
     :param size: The number of previous data to use
+    :param tokenize: The function to split a line with
     :returns: The resulting markov chain
     '''
-    text = open(path, 'r').read()
-    return chain_from_text(text, size=size)
+    with open(path, 'r') as handle:
+        return SparseMarkovChain.train((tokenize(line) for line in handle), size=size)
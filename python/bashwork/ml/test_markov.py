@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+import os
+import random
+import shutil
+import unittest
+import tempfile
+import numpy as np
+from collections import Counter
+from bashwork.ml.markov import *
+from bashwork.statistics.utilities import alias_table, alias_tables
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class SparseMarkovChainTest(unittest.TestCase):
+    ''' Code to validate that the sparse markov chain is correct.
+    '''
+
+    def setUp(self):
+        self.lines = [
+            'the cat sat on the mat'.split(),
+            'the cat ate the rat'.split(),
+            'a dog sat on the cat'.split(),
+        ]
+
+    def test_alias_table(self):
+        ''' test that the alias table keeps the weights '''
+        weights = [1, 2, 3, 10]
+        prob, alias = alias_table(weights)
+        mass = np.zeros(len(weights))
+        for column in xrange(len(weights)):
+            mass[column] += prob[column]
+            mass[alias[column]] += 1.0 - prob[column]
+        expected = np.array(weights, dtype=float) * len(weights) / sum(weights)
+        self.assertTrue(np.allclose(mass, expected))
+
+    def test_count_transitions(self):
+        ''' test that the duplicate transitions are merged '''
+        keys    = np.array([3, 1, 3, 1, 3], dtype=np.uint64)
+        targets = np.array([7, 2, 7, 5, 7])
+        keys, targets, counts = count_transitions(keys, targets)
+        self.assertEqual([1, 1, 3], list(keys))
+        self.assertEqual([2, 5, 7], list(targets))
+        self.assertEqual([1, 1, 3], list(counts))
+
+    def test_alias_tables(self):
+        ''' test that the packed alias tables keep the weights '''
+        weights = np.array([5, 1, 2, 3, 10, 7, 7, 1, 1, 1, 30])
+        indptr  = np.array([0, 1, 5, 7, 11])
+        prob, alias = alias_tables(weights, indptr)
+        for start, end in zip(indptr[:-1], indptr[1:]):
+            mass = np.zeros(end - start)
+            for column in xrange(end - start):
+                mass[column] += prob[start + column]
+                mass[alias[start + column]] += 1.0 - prob[start + column]
+            expected = weights[start:end] * float(end - start) / weights[start:end].sum()
+            self.assertTrue(np.allclose(mass, expected))
+
+    def test_merge_transitions(self):
+        ''' test that sorted runs are merged like a full count '''
+        random.seed(7)
+        keys    = np.array([random.randint(0, 5) for _ in xrange(200)], dtype=np.uint64)
+        targets = np.array([random.randint(0, 9) for _ in xrange(200)])
+        left    = count_transitions(keys[:150], targets[:150])
+        right   = count_transitions(keys[150:], targets[150:])
+        merged  = merge_transitions(left, right)
+        for actual, expected in zip(merged, count_transitions(keys, targets)):
+            self.assertEqual(list(expected), list(actual))
+        empty = count_transitions(keys[:0], targets[:0])
+        self.assertEqual(list(left[2]), list(merge_transitions(empty, left)[2]))
+        self.assertEqual(list(left[2]), list(merge_transitions(left, empty)[2]))
+
+    def test_get_context_order(self):
+        ''' test that only the last size nodes are looked at '''
+        chain = SparseMarkovChain.train(self.lines, size=2, chunk=4)
+        self.assertEqual(2, chain.size)
+        path  = ['unicorn'] * 100 + ['the', 'cat']
+        self.assertEqual(chain.get_context(['the', 'cat']), chain.get_context(path))
+        self.assertEqual(chain.get_context(['cat']), chain.get_context(['unicorn', 'cat']))
+
+    def test_matches_dictionary_chain(self):
+        ''' test that the transitions match the dictionary chain '''
+        dense  = MarkovChain.train(self.lines, size=2)
+        sparse = SparseMarkovChain.train(self.lines, size=2, chunk=8)
+        self.assertEqual(len(dense.moves), len(sparse.contexts))
+        for path, nodes in dense.moves.items():
+            context = sparse.get_context(path)
+            start, end = sparse.indptr[context], sparse.indptr[context + 1]
+            found = set(sparse.tokens[target] for target in sparse.targets[start:end])
+            self.assertEqual(set(node for node, prob in nodes.items() if prob > 0), found)
+
+    def test_next_node_distribution(self):
+        ''' test that the samples follow the counts '''
+        random.seed(3)
+        chain  = SparseMarkovChain.train(self.lines, size=1)
+        counts = Counter(chain.next_node(['the']) for _ in xrange(6000))
+        self.assertEqual(set(['cat', 'mat', 'rat']), set(counts))
+        self.assertAlmostEqual(0.6, counts['cat'] / 6000.0, delta=0.03)
+
+    def test_generate(self):
+        ''' test that the generated paths are valid '''
+        random.seed(5)
+        chain = SparseMarkovChain.train(self.lines, size=2)
+        for _ in xrange(20):
+            path = chain.generate()
+            self.assertTrue(path[0] in ('the', 'a'))
+            self.assertTrue(path[-1] in ('mat', 'rat', 'cat'))
+        self.assertEqual(['a', 'dog', 'sat'], chain.generate(['a', 'dog'], size=1))
+        self.assertEqual(None, chain.next_node(['unicorn']))
+        self.assertRaises(Exception, chain.generate, ['unicorn'])
+
+    def test_save_and_load(self):
+        ''' test that the chain can be memory mapped back '''
+        path = tempfile.mkdtemp()
+        try:
+            source = os.path.join(path, 'corpus.txt')
+            with open(source, 'w') as handle:
+                handle.write('\n'.join(' '.join(line) for line in self.lines) + '\n\n')
+            chain = chain_from_file(source, size=2)
+            chain.save(os.path.join(path, 'chain'))
+            loaded = SparseMarkovChain.load(os.path.join(path, 'chain'))
+            self.assertTrue(isinstance(loaded.targets, np.memmap))
+            self.assertEqual(chain.tokens, loaded.tokens)
+            self.assertEqual(2, loaded.size)
+            for name in SparseMarkovChain.ARRAYS:
+                self.assertTrue(np.array_equal(chain.arrays[name], loaded.arrays[name]))
+            random.seed(1)
+            expected = chain.generate()
+            random.seed(1)
+            self.assertEqual(expected, loaded.generate())
+        finally: shutil.rmtree(path)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,2 @@
+from bashwork.ml.train.bagging import RandomForest
+from bashwork.ml.train.boosting import GradientBoosting
@@ -0,0 +1,124 @@
+'''
+Bagging
+------------------------------------------------------------
+
+A random forest trains every decision tree on a bootstrap sample
+of the dataset, trying a random subset of the fields at each
+split, and classifies by a majority vote of the trees. The trees
+are trained in a process pool that reads the dataset from shared
+memory, and are then compiled into a single set of flat node
+arrays so a batch is classified without touching the tree nodes::
+
+    forest = RandomForest(count=100, bins=64, processes=8, seed=1)
+    forest.train(values, labels)
+    labels = forest.classify_many(tests)
+'''
+import numpy as np
+from bashwork.ml.classify.decision_tree import DecisionTree, TreeBuilder, CompiledForest
+from bashwork.ml.utility.information import encode_labels, bin_dataset
+from bashwork.ml.train.shared import SharedPool, get_shared
+
+def train_bagged_tree(arguments):
+    ''' Train a single tree of the forest on a bootstrap sample
+    of the shared dataset. This is a module function so it can
+    be sent to a process pool.
+
+    :param arguments: The (seed, tree options) of the tree
+    :returns: The trained decision tree
+    '''
+    seed, options = arguments
+    values, codes = get_shared('values'), get_shared('codes')
+    random = np.random.RandomState(seed)
+    rows = random.randint(len(values), size=len(values))
+    if options.get('edges') is not None:
+        options = dict(options, binned=get_shared('binned')[rows])
+    builder = TreeBuilder(DecisionTree, values[rows], codes[rows],
+        range(values.shape[1]), seed=seed, **options)
+    return builder.build_tree()
+
+class RandomForest(object):
+    ''' A bagged ensemble of decision trees with random
+    field sampling at every split.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the RandomForest class.
+
+        :param count: The number of trees to train (default 10)
+        :param max_features: The fields to try at each split (default sqrt)
+        :param bins: The number of quantile bins per field (default exact)
+        :param max_depth: The maximum depth of each tree (default None)
+        :param min_size: The smallest node that can be split (default 2)
+        :param threshold: The gain threshold to cut off at (default 0)
+        :param processes: The processes to train with (default None)
+        :param seed: The seed of the random state
+        '''
+        self.count     = kwargs.get('count', 10)
+        self.features  = kwargs.get('max_features', None)
+        self.processes = kwargs.get('processes', None)
+        self.random    = np.random.RandomState(kwargs.get('seed', None))
+        self.options   = {
+            'bins'     : kwargs.get('bins', None),
+            'max_depth': kwargs.get('max_depth', None),
+            'min_size' : kwargs.get('min_size', 2),
+            'threshold': kwargs.get('threshold', 0.0),
+        }
+        self.classes = None
+        self.forest  = None
+
+    def train(self, dataset, labels):
+        ''' Given a dataset, train a new forest of trees.
+
+        :param dataset: The (n, fields) dataset to train with
+        :param labels: The label of each entry
+        :returns: The compiled forest
+        '''
+        values = np.asarray(dataset, dtype=np.float64)
+        self.classes, codes = encode_labels(labels)
+        options = dict(self.options, max_features=self.features or
+            max(1, int(np.sqrt(values.shape[1]))))
+        shared = { 'values': values, 'codes': codes }
+        if options['bins']: # bin once instead of once per tree
+            options['edges'], shared['binned'] = bin_dataset(values, options['bins'])
+        seeds = self.random.randint(1 << 31, size=self.count)
+        with SharedPool(self.processes, **shared) as pool:
+            trees = pool.map(train_bagged_tree, [(seed, options) for seed in seeds])
+        self.forest = CompiledForest.from_trees(trees)
+        return self.forest
+
+    def get_votes(self, entries):
+        ''' Count the votes of the trees for every class.
+
+        :param entries: The (n, fields) entries to classify
+        :returns: The (n, classes) counts of the votes
+        '''
+        votes  = self.forest.predict(entries)
+        counts = np.zeros((len(votes), len(self.classes)))
+        for code in xrange(len(self.classes)):
+            counts[:, code] = (votes == code).sum(axis=1)
+        return counts
+
+    def predict_proba(self, entries):
+        ''' Compute the fraction of the trees voting for
+        every class.
+
+        :param entries: The (n, fields) entries to classify
+        :returns: The (n, classes) fraction of the votes
+        '''
+        return self.get_votes(entries) / float(len(self.forest))
+
+    def classify_many(self, entries):
+        ''' Classify every entry with the majority vote.
+
+        :param entries: The (n, fields) entries to classify
+        :returns: The label of each entry
+        '''
+        return self.classes[self.get_votes(entries).argmax(axis=1)]
+
+    def classify(self, entry):
+        ''' Classify a new entry with the majority vote.
+
+        :param entry: The entry to classify
+        :returns: The label of the new entry
+        '''
+        return self.classify_many([entry])[0]
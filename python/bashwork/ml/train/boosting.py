@@ -0,0 +1,255 @@
+'''
+Boosting
+------------------------------------------------------------
+
+Gradient boosting fits a sequence of small regression trees, each
+to the gradients of the loss of the trees before it. The trees are
+grown one level at a time from histograms of the binned dataset: a
+single `bincount` per field collects the gradient sums of every
+node of the level, and every threshold is scored from a cumulative
+sum over the bins. The fields are split across a process pool that
+reads the binned dataset, the gradients, and the node of every row
+from shared memory, so only the best split of each node is sent
+between the processes::
+
+    model = GradientBoosting(count=200, max_depth=4, loss='logistic', processes=4)
+    model.train(values, labels)
+    labels = model.classify_many(tests)
+
+The trained trees are kept as a single set of flat node arrays, so
+a batch is scored with a handful of vectorized operations per level.
+'''
+import numpy as np
+from bashwork.ml.classify.decision_tree import CompiledForest
+from bashwork.ml.utility.information import encode_labels, bin_dataset
+from bashwork.ml.train.shared import SharedPool, get_shared
+
+#------------------------------------------------------------
+# losses
+#------------------------------------------------------------
+
+class SquaredLoss(object):
+    ''' The squared error loss for regression.
+    '''
+
+    @staticmethod
+    def initialize(targets): return targets.mean()
+
+    @staticmethod
+    def gradients(targets, scores): return scores - targets, np.ones(len(targets))
+
+    @staticmethod
+    def transform(scores): return scores
+
+
+class LogisticLoss(object):
+    ''' The logistic loss for binary classification.
+    '''
+
+    @staticmethod
+    def initialize(targets):
+        prior = np.clip(targets.mean(), 1e-6, 1 - 1e-6)
+        return np.log(prior / (1 - prior))
+
+    @staticmethod
+    def gradients(targets, scores):
+        probs = LogisticLoss.transform(scores)
+        return probs - targets, probs * (1 - probs)
+
+    @staticmethod
+    def transform(scores): return 1.0 / (1.0 + np.exp(-scores))
+
+
+LOSSES = {
+    'squared' : SquaredLoss,
+    'logistic': LogisticLoss,
+}
+
+#------------------------------------------------------------
+# histogram splits
+#------------------------------------------------------------
+
+def find_level_splits(arguments):
+    ''' Find the best split of every node of a level over a
+    block of the fields. This is a module function so it can be
+    sent to a process pool.
+
+    :param arguments: The (fields, nodes, bins, l2, min_leaf) to search
+    :returns: The best (gain, field, bin) of every node
+    '''
+    fields, nodes, bins, l2, min_leaf = arguments
+    positions = get_shared('positions')
+    active    = np.flatnonzero(positions >= 0)
+    position  = positions[active]
+    gradients = get_shared('gradients')[active]
+    hessians  = get_shared('hessians')[active]
+    binned    = get_shared('binned')
+
+    totals = [np.bincount(position, weights=weights, minlength=nodes)
+        for weights in (gradients, hessians, None)]
+    parent = totals[0] ** 2 / (totals[1] + l2)
+    best   = (np.zeros(nodes), np.zeros(nodes, dtype=np.int32), np.zeros(nodes, dtype=np.int32))
+
+    for field in fields:
+        keys = position * bins + binned[active, field]
+        left = [np.bincount(keys, weights=weights, minlength=nodes * bins)
+            .reshape(nodes, bins).cumsum(axis=1)[:, :-1] for weights in (gradients, hessians, None)]
+        right = [total[:, None] - part for total, part in zip(totals, left)]
+        gains = (left[0] ** 2 / (left[1] + l2) + right[0] ** 2 / (right[1] + l2)) - parent[:, None]
+        gains[(left[2] < min_leaf) | (right[2] < min_leaf)] = -np.inf
+        split = gains.argmax(axis=1)
+        gain  = gains[np.arange(nodes), split]
+        better = gain > best[0]
+        best[0][better], best[1][better], best[2][better] = gain[better], field, split[better]
+    return best
+
+#------------------------------------------------------------
+# gradient boosting
+#------------------------------------------------------------
+
+class GradientBoosting(object):
+    ''' Gradient boosted regression trees grown from
+    histograms of the binned dataset.
+    '''
+
+    def __init__(self, **kwargs):
+        ''' Initialize a new instance of the GradientBoosting class.
+
+        :param count: The number of trees to train (default 100)
+        :param rate: The learning rate of each tree (default 0.1)
+        :param max_depth: The maximum depth of each tree (default 3)
+        :param bins: The number of quantile bins per field (default 255)
+        :param min_leaf: The smallest number of rows in a leaf (default 1)
+        :param l2: The regularization of the leaf values (default 1.0)
+        :param loss: The name of the loss (squared or logistic)
+        :param processes: The processes to search the fields with (default None)
+        '''
+        self.count     = kwargs.get('count', 100)
+        self.rate      = kwargs.get('rate', 0.1)
+        self.max_depth = kwargs.get('max_depth', 3)
+        self.bins      = kwargs.get('bins', 255)
+        self.min_leaf  = max(1, kwargs.get('min_leaf', 1))
+        self.l2        = kwargs.get('l2', 1.0)
+        self.loss      = LOSSES[kwargs.get('loss', 'squared')]
+        self.processes = kwargs.get('processes', None)
+        self.classes   = None
+        self.initial   = 0.0
+        self.forest    = None
+
+    def grow_tree(self, pool, edges, bins):
+        ''' Grow a single tree one level at a time from the
+        gradients that are currently in shared memory.
+
+        :param pool: The shared pool to search the fields with
+        :param edges: The thresholds of the bins of each field
+        :param bins: The number of bins of the widest field
+        :returns: The (feature, threshold, left, right, value) arrays and the leaf of each row
+        '''
+        positions, binned = pool['positions'], pool['binned']
+        gradients, hessians = pool['gradients'], pool['hessians']
+        blocks = [block for block in np.array_split(np.arange(binned.shape[1]),
+            self.processes or 1) if len(block)]
+
+        feature, threshold, left, right, value = [-1], [0.0], [-1], [-1], [0.0]
+        leaves, level = np.zeros(len(positions), dtype=np.int32), [0]
+        positions[:] = 0
+        for depth in xrange(self.max_depth + 1):
+            nodes  = len(level)
+            active = np.flatnonzero(positions >= 0)
+            sums   = [np.bincount(positions[active], weights=weights[active], minlength=nodes)
+                for weights in (gradients, hessians)]
+            gain, field, split = np.zeros(nodes), np.zeros(nodes, dtype=np.int32), np.zeros(nodes, dtype=np.int32)
+            if depth < self.max_depth:
+                tasks = [(block, nodes, bins, self.l2, self.min_leaf) for block in blocks]
+                for found in pool.map(find_level_splits, tasks):
+                    better = found[0] > gain
+                    gain[better], field[better], split[better] = found[0][better], found[1][better], found[2][better]
+
+            children, follow = np.full((nodes, 2), -1, dtype=np.int32), []
+            for local, node in enumerate(level):
+                if gain[local] > 0:
+                    feature[node], threshold[node] = field[local], edges[field[local]][split[local]]
+                    for side, child in ((0, left), (1, right)):
+                        child[node] = len(feature)
+                        children[local, side] = len(follow)
+                        follow.append(len(feature))
+                        for array, empty in ((feature, -1), (threshold, 0.0), (left, -1), (right, -1), (value, 0.0)):
+                            array.append(empty)
+                else: value[node] = -self.rate * sums[0][local] / (sums[1][local] + self.l2)
+
+            local  = positions[active]
+            inner  = children[local, 0] >= 0
+            done   = active[~inner]
+            leaves[done] = np.asarray(level)[local[~inner]]
+            positions[done] = -1
+            moving = active[inner]
+            local  = local[inner]
+            go_left = binned[moving, field[local]] <= split[local]
+            positions[moving] = np.where(go_left, children[local, 0], children[local, 1])
+            level = follow
+            if not level: break
+
+        arrays = (np.array(feature, dtype=np.int32), np.array(threshold),
+            np.array(left, dtype=np.int32), np.array(right, dtype=np.int32), np.array(value))
+        return arrays, leaves
+
+    def train(self, dataset, targets):
+        ''' Given a dataset, train a new sequence of trees.
+
+        :param dataset: The (n, fields) dataset to train with
+        :param targets: The target (or label) of each entry
+        :returns: The compiled forest
+        '''
+        values = np.asarray(dataset, dtype=np.float64)
+        if self.loss is LogisticLoss:
+            self.classes, targets = encode_labels(targets)
+            if len(self.classes) != 2:
+                raise ValueError("logistic loss needs two classes, not %d" % len(self.classes))
+        targets = np.asarray(targets, dtype=np.float64)
+        edges, binned = bin_dataset(values, self.bins)
+        bins = max(len(edge) for edge in edges) + 1
+
+        self.initial = self.loss.initialize(targets)
+        scores, trees = np.zeros(len(values)) + self.initial, []
+        with SharedPool(self.processes, binned=binned, positions=np.zeros(len(values), dtype=np.int32),
+            gradients=np.zeros(len(values)), hessians=np.zeros(len(values))) as pool:
+            for _ in xrange(self.count):
+                pool['gradients'][:], pool['hessians'][:] = self.loss.gradients(targets, scores)
+                arrays, leaves = self.grow_tree(pool, edges, bins)
+                scores += arrays[4][leaves]
+                trees.append(arrays)
+        self.forest = CompiledForest.from_arrays(trees)
+        return self.forest
+
+    def get_scores(self, entries):
+        ''' Compute the raw score of every entry.
+
+        :param entries: The (n, fields) entries to score
+        :returns: The score of each entry
+        '''
+        return self.initial + self.forest.predict(entries).sum(axis=1)
+
+    def predict_many(self, entries):
+        ''' Predict the target of every entry (or the probability
+        of the second class with the logistic loss).
+
+        :param entries: The (n, fields) entries to predict
+        :returns: The prediction of each entry
+        '''
+        return self.loss.transform(self.get_scores(entries))
+
+    def classify_many(self, entries):
+        ''' Classify every entry with the logistic loss.
+
+        :param entries: The (n, fields) entries to classify
+        :returns: The label of each entry
+        '''
+        return self.classes[(self.get_scores(entries) > 0).astype(int)]
+
+    def classify(self, entry):
+        ''' Classify a new entry with the logistic loss.
+
+        :param entry: The entry to classify
+        :returns: The label of the new entry
+        '''
+        return self.classify_many([entry])[0]
@@ -0,0 +1,116 @@
+'''
+Shared Training Data
+------------------------------------------------------------
+
+Sending a training set to a process pool usually pickles it to
+every worker. Instead, `SharedPool` copies the arrays into shared
+memory once and hands the buffers to the workers when they start,
+so every worker reads the same pages. The worker functions find
+the arrays with `get_shared`::
+
+    def train_one(seed):
+        values = get_shared('values')
+        ...
+
+    with SharedPool(4, values=values, labels=labels) as pool:
+        models = pool.map(train_one, seeds)
+
+The arrays stay writable, so the parent can update an array (say
+the gradients of a boosting round) and the workers see the change.
+Without any processes the functions are simply run in this process.
+'''
+import numpy as np
+from multiprocessing import Pool, RawArray
+
+#------------------------------------------------------------
+# shared arrays
+#------------------------------------------------------------
+
+SHARED = {} # the arrays shared with the current process
+
+def share_array(array):
+    ''' Copy an array into a shared memory buffer.
+
+    :param array: The array to share
+    :returns: The (buffer, dtype, shape) of the shared array
+    '''
+    array  = np.ascontiguousarray(array)
+    buffer = RawArray('b', max(1, array.nbytes))
+    np.frombuffer(buffer, dtype=np.uint8, count=array.nbytes)[:] = array.view(np.uint8).ravel()
+    return (buffer, array.dtype.str, array.shape)
+
+def attach_array(shared):
+    ''' Create a numpy view of a shared memory buffer.
+
+    :param shared: The (buffer, dtype, shape) of the shared array
+    :returns: The numpy view of the shared array
+    '''
+    buffer, dtype, shape = shared
+    count = int(np.prod(shape))
+    return np.frombuffer(buffer, dtype=np.dtype(dtype), count=count).reshape(shape)
+
+def attach_arrays(shared):
+    ''' Attach all the supplied shared arrays to this process.
+    This is the initializer of the pool processes.
+
+    :param shared: The dictionary of name to shared array
+    '''
+    SHARED.clear()
+    SHARED.update((name, attach_array(array)) for name, array in shared.items())
+
+def get_shared(name):
+    ''' Retrieve a shared array by name.
+
+    :param name: The name of the shared array
+    :returns: The numpy view of the shared array
+    '''
+    return SHARED[name]
+
+#------------------------------------------------------------
+# pool
+#------------------------------------------------------------
+
+class SharedPool(object):
+    ''' A process pool whose workers can read the supplied
+    arrays from shared memory.
+    '''
+
+    def __init__(self, processes=None, **arrays):
+        '''
+        :param processes: The number of processes (default run inline)
+        :param arrays: The arrays to share by name
+        '''
+        self.processes = processes
+        self.shared    = dict((name, share_array(array)) for name, array in arrays.items())
+        self.pool      = None
+
+    def __getitem__(self, name):
+        ''' Retrieve the parent's view of a shared array.
+
+        :param name: The name of the shared array
+        :returns: The numpy view of the shared array
+        '''
+        return attach_array(self.shared[name])
+
+    def map(self, function, tasks):
+        ''' Call the function with every task in the pool.
+
+        :param function: The module function to call
+        :param tasks: The arguments of each call
+        :returns: The results of every call in order
+        '''
+        if self.pool: return self.pool.map(function, tasks)
+        return map(function, tasks)
+
+    def __enter__(self):
+        attach_arrays(self.shared)
+        if self.processes:
+            self.pool = Pool(self.processes, attach_arrays, (self.shared,))
+        return self
+
+    def __exit__(self, *args):
+        if self.pool:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        SHARED.clear()
@@ -0,0 +1,40 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from bashwork.ml.train.bagging import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class RandomForestTest(unittest.TestCase):
+    ''' Code to validate that the random forest is correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(4)
+        self.values = random.rand(400, 4)
+        self.labels = np.where(self.values[:, 0] + self.values[:, 1] > 1.0, 'up', 'down')
+
+    def test_train(self):
+        ''' Test that the forest learns the dataset '''
+        forest = RandomForest(count=15, max_features=2, seed=3)
+        forest.train(self.values, self.labels)
+        self.assertEqual(15, len(forest.forest))
+        labels = forest.classify_many(self.values)
+        self.assertTrue((labels == self.labels).mean() > 0.95)
+        self.assertEqual(labels[7], forest.classify(self.values[7]))
+        self.assertTrue(np.allclose(1.0, forest.predict_proba(self.values).sum(axis=1)))
+
+    def test_train_parallel(self):
+        ''' Test that the pool trains the same forest '''
+        serial = RandomForest(count=6, bins=16, seed=5)
+        serial.train(self.values, self.labels)
+        pooled = RandomForest(count=6, bins=16, seed=5, processes=2)
+        pooled.train(self.values, self.labels)
+        self.assertTrue((serial.get_votes(self.values) == pooled.get_votes(self.values)).all())
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
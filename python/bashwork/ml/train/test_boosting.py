@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from bashwork.ml.train.boosting import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class GradientBoostingTest(unittest.TestCase):
+    ''' Code to validate that the gradient boosting is correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(8)
+        self.values  = random.rand(500, 3)
+        self.targets = np.sin(4 * self.values[:, 0]) + self.values[:, 1] ** 2
+
+    def test_regression(self):
+        ''' Test that the squared loss fits the targets '''
+        model = GradientBoosting(count=60, rate=0.2, max_depth=3, bins=32)
+        model.train(self.values, self.targets)
+        error = ((model.predict_many(self.values) - self.targets) ** 2).mean()
+        self.assertTrue(error < 0.1 * self.targets.var())
+        self.assertEqual(60, len(model.forest))
+
+    def test_single_stump(self):
+        ''' Test that one stump splits at the best threshold '''
+        values  = np.arange(10.0)[:, None]
+        targets = np.where(values[:, 0] > 3, 5.0, 1.0)
+        model = GradientBoosting(count=1, rate=1.0, max_depth=1, l2=0.0)
+        model.train(values, targets)
+        self.assertEqual(3.0, model.forest.threshold[0])
+        self.assertTrue(np.allclose(targets, model.predict_many(values)))
+
+    def test_classification(self):
+        ''' Test that the logistic loss classifies the labels '''
+        labels = np.where(self.targets > np.median(self.targets), 'high', 'low')
+        model = GradientBoosting(count=40, max_depth=3, loss='logistic', bins=32)
+        model.train(self.values, labels)
+        self.assertTrue((model.classify_many(self.values) == labels).mean() > 0.9)
+        self.assertEqual(model.classify_many(self.values[:1])[0], model.classify(self.values[0]))
+        self.assertRaises(ValueError, lambda: model.train(self.values, np.arange(500) % 3))
+
+    def test_train_parallel(self):
+        ''' Test that the pool grows the same trees '''
+        serial = GradientBoosting(count=10, max_depth=3, bins=16)
+        serial.train(self.values, self.targets)
+        pooled = GradientBoosting(count=10, max_depth=3, bins=16, processes=2)
+        pooled.train(self.values, self.targets)
+        self.assertTrue(np.allclose(serial.predict_many(self.values), pooled.predict_many(self.values)))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
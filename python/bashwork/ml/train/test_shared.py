@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from bashwork.ml.train.shared import *
+
+#---------------------------------------------------------------------------#
+# helpers
+#---------------------------------------------------------------------------#
+def sum_rows(arguments):
+    start, stop = arguments
+    return get_shared('values')[start:stop].sum()
+
+def read_scale(_):
+    return get_shared('scale')[0]
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class SharedTest(unittest.TestCase):
+    ''' Code to validate that the shared arrays are correct.
+    '''
+
+    def test_share_array(self):
+        ''' Test that arrays round trip through shared memory '''
+        for array in [np.arange(12.0).reshape(3, 4), np.arange(5, dtype=np.int32), np.zeros(0)]:
+            shared = attach_array(share_array(array))
+            self.assertEqual(array.dtype, shared.dtype)
+            self.assertTrue((array == shared).all())
+
+    def test_shared_pool(self):
+        ''' Test that the workers read the shared arrays '''
+        values = np.arange(100.0)
+        tasks  = [(start, start + 25) for start in range(0, 100, 25)]
+        for processes in [None, 2]:
+            with SharedPool(processes, values=values, scale=np.ones(1)) as pool:
+                self.assertEqual(values.sum(), sum(pool.map(sum_rows, tasks)))
+                pool['scale'][0] = 3.0
+                self.assertEqual([3.0, 3.0], pool.map(read_scale, [0, 1]))
+        self.assertRaises(KeyError, lambda: get_shared('values'))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
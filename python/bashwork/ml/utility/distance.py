@@ -1,34 +1,238 @@
+'''
+Distance Functions
+------------------------------------------------------------
+
+The distance between two points can be computed with the
+functions named after each metric. They accept any sequence and
+an optional `axis`, so a point can be compared against a whole
+block of points in one call::
+
+    distance.manhattan(block, point, axis=-1)
+
+For the distances between every pair of points in two datasets,
+use `pairwise`, which evaluates the metric in blocks of rows so the
+temporary arrays stay within a memory budget, or `iter_pairwise` to
+consume the blocks one at a time::
+
+    matrix = distance.pairwise(X, Y, metric='euclidean')
+    distances, indexes = distance.pairwise_argmin(X, centroids)
+    distances, indexes = distance.nearest(queries, X, k=5)
+'''
 import numpy as np
 
-def euclidean(l, r):
+#------------------------------------------------------------
+# point distances
+#------------------------------------------------------------
+
+def euclidean(l, r, axis=None):
     '''
     :param l: The left value to compare
     :param r: The right value to compare
+    :param axis: The axis to sum over (default all)
     :return: The distance between the two
     '''
-    return np.sqrt(np.power(l - r, 2).sum())
-	
-def manhattan(l, r):
+    return np.sqrt(sqeuclidean(l, r, axis=axis))
+
+def sqeuclidean(l, r, axis=None):
+    '''
+    :param l: The left value to compare
+    :param r: The right value to compare
+    :param axis: The axis to sum over (default all)
+    :return: The squared distance between the two
+    '''
+    delta = np.subtract(l, r)
+    return np.multiply(delta, delta).sum(axis=axis)
+
+def manhattan(l, r, axis=None):
     '''
     :param l: The left value to compare
     :param r: The right value to compare
+    :param axis: The axis to sum over (default all)
     :return: The distance between the two
     '''
-    return np.abs(l - r).sum()
-	
-def chebyshev(l, r):
+    return np.abs(np.subtract(l, r)).sum(axis=axis)
+
+def chebyshev(l, r, axis=None):
     '''
     :param l: The left value to compare
     :param r: The right value to compare
+    :param axis: The axis to reduce over (default all)
     :return: The distance between the two
     '''
-    return np.abs(l - r).max()
+    return np.abs(np.subtract(l, r)).max(axis=axis)
 
-def minkowski(l, r, p=1):
+def minkowski(l, r, p=1, axis=None):
     '''
     :param l: The left value to compare
     :param r: The right value to compare
     :param p: The order of the equation (default 1)
+    :param axis: The axis to sum over (default all)
     :return: The distance between the two
     '''
-    return np.power(np.power(np.abs(l - r), p).sum(), 1.0/p)
+    return np.power(np.power(np.abs(np.subtract(l, r)), p).sum(axis=axis), 1.0/p)
+
+def hamming(l, r, axis=None):
+    '''
+    :param l: The left value to compare
+    :param r: The right value to compare
+    :param axis: The axis to count over (default all)
+    :return: The number of positions that differ
+    '''
+    return np.not_equal(l, r).sum(axis=axis)
+
+def cosine(l, r, axis=None):
+    '''
+    :param l: The left value to compare
+    :param r: The right value to compare
+    :param axis: The axis to sum over (default all)
+    :return: One minus the cosine similarity of the two
+    '''
+    l, r = np.asarray(l, dtype=np.float64), np.asarray(r, dtype=np.float64)
+    norms = np.sqrt((l * l).sum(axis=axis) * (r * r).sum(axis=axis))
+    return 1.0 - (l * r).sum(axis=axis) / np.where(norms, norms, 1.0)
+
+#------------------------------------------------------------
+# pairwise block kernels
+#------------------------------------------------------------
+
+def _block_dot(X, Y, **kwargs):
+    ''' The metrics that can be computed from the dot products
+    only need a (rows, cols) temporary per block.
+    '''
+    metric = kwargs['metric']
+    if metric == 'cosine':
+        xn = np.sqrt(np.einsum('ij,ij->i', X, X))
+        yn = np.sqrt(np.einsum('ij,ij->i', Y, Y))
+        norms = np.outer(xn, yn)
+        return 1.0 - X.dot(Y.T) / np.where(norms, norms, 1.0)
+
+    block = np.einsum('ij,ij->i', X, X)[:, None] - 2.0 * X.dot(Y.T)
+    block += np.einsum('ij,ij->i', Y, Y)[None, :]
+    np.maximum(block, 0.0, out=block)  # rounding can go negative
+    return np.sqrt(block, out=block) if metric == 'euclidean' else block
+
+def _block_broadcast(X, Y, **kwargs):
+    ''' The other metrics broadcast the rows against each other
+    and need a (rows, cols, dims) temporary per block.
+    '''
+    function = POINT_METRICS[kwargs['metric']]
+    options  = dict((k, v) for k, v in kwargs.items() if k != 'metric')
+    return function(X[:, None, :], Y[None, :, :], axis=-1, **options)
+
+def _block_callable(X, Y, **kwargs):
+    ''' A user supplied metric is called for every pair.
+    '''
+    metric = kwargs.pop('metric')
+    return np.array([[metric(x, y, **kwargs) for y in Y] for x in X], dtype=np.float64)
+
+
+POINT_METRICS = {
+    'euclidean'  : euclidean,
+    'sqeuclidean': sqeuclidean,
+    'manhattan'  : manhattan,
+    'chebyshev'  : chebyshev,
+    'minkowski'  : minkowski,
+    'hamming'    : hamming,
+    'cosine'     : cosine,
+}
+
+POINT_METRIC_NAMES = dict((function, name) for name, function in POINT_METRICS.items())
+
+DOT_METRICS = set(['euclidean', 'sqeuclidean', 'cosine'])
+
+
+def get_block_rows(metric, cols, dims, memory):
+    ''' Retrieve the number of rows that can be computed
+    in a single block within the memory budget.
+
+    :param metric: The metric that will be computed
+    :param cols: The number of columns of the result
+    :param dims: The number of dimensions of each point
+    :param memory: The memory budget in bytes
+    :returns: The number of rows per block
+    '''
+    width = cols if metric in DOT_METRICS or callable(metric) else cols * dims
+    return max(1, int(memory // (8 * max(1, width))))
+
+
+def iter_pairwise(X, Y=None, metric='euclidean', memory=64 << 20, **kwargs):
+    ''' Compute the distance between every row of X and every
+    row of Y, a block of rows of X at a time.
+
+    :param X: The (n, d) left points
+    :param Y: The (m, d) right points (default X)
+    :param metric: The name of the metric or a distance function
+    :param memory: The memory budget of each block (default 64MB)
+    :returns: A generator of (start row, block of distances)
+    '''
+    X = np.atleast_2d(np.asarray(X, dtype=np.float64))
+    Y = X if Y is None else np.atleast_2d(np.asarray(Y, dtype=np.float64))
+    metric = POINT_METRIC_NAMES.get(metric, metric)
+    if callable(metric): compute = _block_callable
+    elif metric in DOT_METRICS: compute = _block_dot
+    elif metric in POINT_METRICS: compute = _block_broadcast
+    else: raise ValueError("unknown metric: %s" % metric)
+
+    step = get_block_rows(metric, len(Y), X.shape[1], memory)
+    for start in xrange(0, len(X), step):
+        yield start, compute(X[start:start + step], Y, metric=metric, **kwargs)
+
+
+def pairwise(X, Y=None, metric='euclidean', memory=64 << 20, **kwargs):
+    ''' Compute the full (n, m) matrix of the distances
+    between the rows of X and the rows of Y.
+
+    :param X: The (n, d) left points
+    :param Y: The (m, d) right points (default X)
+    :param metric: The name of the metric or a distance function
+    :param memory: The memory budget of each block (default 64MB)
+    :returns: The (n, m) matrix of distances
+    '''
+    blocks = [block for _, block in iter_pairwise(X, Y, metric, memory, **kwargs)]
+    return np.vstack(blocks) if blocks else np.zeros((0, 0 if Y is None else len(Y)))
+
+cdist = pairwise
+
+
+def pairwise_argmin(X, Y, metric='euclidean', memory=64 << 20, **kwargs):
+    ''' Find the closest row of Y for every row of X without
+    keeping the full distance matrix.
+
+    :param X: The (n, d) points to assign
+    :param Y: The (m, d) candidates to assign to
+    :param metric: The name of the metric or a distance function
+    :param memory: The memory budget of each block (default 64MB)
+    :returns: The (distances, indexes) of the closest rows
+    '''
+    indexes = np.zeros(len(X), dtype=np.int64)
+    distances = np.zeros(len(X))
+    for start, block in iter_pairwise(X, Y, metric, memory, **kwargs):
+        stop = start + len(block)
+        indexes[start:stop] = block.argmin(axis=1)
+        distances[start:stop] = block[np.arange(len(block)), indexes[start:stop]]
+    return distances, indexes
+
+
+def nearest(X, Y, k=1, metric='euclidean', memory=64 << 20, **kwargs):
+    ''' Find the k closest rows of Y for every row of X without
+    keeping the full distance matrix.
+
+    :param X: The (n, d) points to query
+    :param Y: The (m, d) points to search
+    :param k: The number of neighbors to find
+    :param metric: The name of the metric or a distance function
+    :param memory: The memory budget of each block (default 64MB)
+    :returns: The (n, k) arrays of (distances, indexes) by distance
+    '''
+    k = min(k, len(Y))
+    indexes = np.zeros((len(X), k), dtype=np.int64)
+    distances = np.zeros((len(X), k))
+    for start, block in iter_pairwise(X, Y, metric, memory, **kwargs):
+        rows = np.arange(len(block))[:, None]
+        picked = np.argpartition(block, k - 1, axis=1)[:, :k] if k < len(Y) \
+            else np.tile(np.arange(len(Y)), (len(block), 1))
+        order = np.argsort(block[rows, picked], axis=1, kind='mergesort')
+        picked = picked[rows, order]
+        indexes[start:start + len(block)] = picked
+        distances[start:start + len(block)] = block[rows, picked]
+    return distances, indexes
@@ -1,6 +1,7 @@
 '''
 .. todo:: just inline the various pieces
 '''
+import numpy as np
 from math import log
 from collections import Counter
 
@@ -76,3 +77,110 @@ def best_gain(dataset, fields):
     cache = entropy(dataset)
     gains = (best_value_gain(dataset, field, cache) + (field, ) for field in fields)
     return max(gains) # (gain, value, field)
+
+#------------------------------------------------------------
+# vectorized split finding
+#------------------------------------------------------------
+# Instead of re-partitioning the dataset for every candidate
+# value, the class counts of every candidate split are read off
+# a cumulative sum over the values in sorted (or binned) order,
+# so every threshold of a field is scored in one linear pass.
+#------------------------------------------------------------
+
+def encode_labels(labels):
+    ''' Given a collection of labels, encode them as the
+    index of each label in the sorted unique labels.
+
+    :param labels: The labels to encode
+    :returns: (classes, codes)
+    '''
+    return np.unique(np.asarray(labels), return_inverse=True)
+
+def entropy_counts(counts):
+    ''' Computes the entropy of every row of class counts.
+
+    :param counts: The (..., classes) counts to compute
+    :returns: The entropy of each row of counts
+    '''
+    counts = np.asarray(counts, dtype=np.float64)
+    totals = counts.sum(axis=-1)[..., None]
+    probs  = counts / np.where(totals, totals, 1.0)
+    return -(probs * np.log2(np.where(probs > 0, probs, 1.0))).sum(axis=-1)
+
+def split_gains(left, total):
+    ''' Computes the information gain of a collection of
+    candidate splits from the class counts left of each split.
+
+    :param left: The (splits, classes) counts left of each split
+    :param total: The (classes,) counts of the whole dataset
+    :returns: The information gain of each split
+    '''
+    right = total[None, :] - left
+    size  = float(total.sum())
+    child = left.sum(axis=1) * entropy_counts(left) + right.sum(axis=1) * entropy_counts(right)
+    return entropy_counts(total) - child / size
+
+def best_sorted_split(values, codes, count):
+    ''' Picks the best gain split threshold value from the
+    values of a field that are already in sorted order.
+
+    :param values: The sorted values of the field
+    :param codes: The encoded label of each value
+    :param count: The number of classes
+    :returns: The best (gain, value) or (None, None)
+    '''
+    cuts = np.flatnonzero(values[:-1] != values[1:])
+    if not len(cuts): return (None, None)
+    left = np.zeros((len(values), count))
+    left[np.arange(len(values)), codes] = 1.0
+    left = np.cumsum(left, axis=0)
+    gains = split_gains(left[cuts], left[-1])
+    best  = gains.argmax()
+    return (gains[best], values[cuts[best]])
+
+def quantile_edges(values, bins):
+    ''' Computes the candidate thresholds of a field, which
+    are the unique values if there are few of them or the
+    quantiles of the values otherwise.
+
+    :param values: The values of the field
+    :param bins: The maximum number of bins
+    :returns: The sorted candidate thresholds
+    '''
+    unique = np.unique(values)
+    if len(unique) <= bins: return unique[:-1]
+    return np.unique(np.percentile(values, np.linspace(0, 100, bins + 1)[1:-1]))
+
+def bin_dataset(dataset, bins):
+    ''' Bin every field of a dataset so that a value is at
+    most the edge k of its field when its bin is at most k.
+
+    :param dataset: The (n, fields) dataset to bin
+    :param bins: The maximum number of bins per field
+    :returns: (edges of each field, (n, fields) bins)
+    '''
+    edges  = [quantile_edges(dataset[:, field], bins) for field in xrange(dataset.shape[1])]
+    binned = np.empty(dataset.shape, dtype=np.int32)
+    for field, edge in enumerate(edges):
+        binned[:, field] = np.searchsorted(edge, dataset[:, field], side='left')
+    return edges, binned
+
+def best_binned_split(bins, codes, edges, count):
+    ''' Picks the best gain split threshold value from the
+    binned values of a field with a histogram of the classes.
+
+    :param bins: The bin of each value of the field
+    :param codes: The encoded label of each value
+    :param edges: The thresholds of the bins of the field
+    :param count: The number of classes
+    :returns: The best (gain, value) or (None, None)
+    '''
+    if not len(edges): return (None, None)
+    hist  = np.bincount(bins * count + codes, minlength=(len(edges) + 1) * count)
+    left  = np.cumsum(hist.reshape(-1, count), axis=0)
+    sizes = left.sum(axis=1)
+    cuts  = np.flatnonzero((sizes[:-1] > 0) & (sizes[:-1] < sizes[-1]))
+    if not len(cuts): return (None, None)
+    gains = split_gains(left[cuts], left[-1])
+    best  = gains.argmax()
+    return (gains[best], edges[cuts[best]])
@@ -25,6 +25,47 @@ class DistanceTest(unittest.TestCase):
         b = np.arange(10, 20)
         self.assertEqual(100, distance.minkowski(a, b))
 
+    def test_hamming(self):
+        a = np.arange(0, 10)
+        b = np.array([0, 1, 2, 0, 0, 5, 6, 7, 0, 9])
+        self.assertEqual(3, distance.hamming(a, b))
+
+    def test_axis(self):
+        block = np.arange(12).reshape(4, 3)
+        point = np.array([1, 1, 1])
+        self.assertEqual([2, 9, 18, 27], distance.manhattan(block, point, axis=-1).tolist())
+        self.assertEqual([1, 4, 7, 10], distance.chebyshev(block, point, axis=-1).tolist())
+
+    def test_pairwise(self):
+        random = np.random.RandomState(1)
+        X, Y = random.rand(13, 4), random.rand(7, 4)
+        for metric in ['euclidean', 'sqeuclidean', 'manhattan', 'chebyshev', 'hamming', 'cosine']:
+            function = distance.POINT_METRICS[metric]
+            expect = np.array([[function(x, y) for y in Y] for x in X])
+            self.assertTrue(np.allclose(expect, distance.pairwise(X, Y, metric)))
+            self.assertTrue(np.allclose(expect, distance.pairwise(X, Y, metric, memory=64)))
+            self.assertTrue(np.allclose(expect, distance.pairwise(X, Y, function)))
+        expect = [[distance.minkowski(x, y, p=3) for y in Y] for x in X]
+        self.assertTrue(np.allclose(expect, distance.pairwise(X, Y, 'minkowski', p=3)))
+        metric = lambda x, y: np.abs(x - y).sum() * 2
+        self.assertTrue(np.allclose(2 * distance.pairwise(X, Y, 'manhattan'),
+            distance.pairwise(X, Y, metric)))
+        self.assertEqual((13, 13), distance.pairwise(X).shape)
+        self.assertRaises(ValueError, lambda: distance.pairwise(X, Y, 'unknown'))
+
+    def test_pairwise_reductions(self):
+        random = np.random.RandomState(2)
+        X, Y = random.rand(50, 3), random.rand(20, 3)
+        matrix = distance.pairwise(X, Y)
+        distances, indexes = distance.pairwise_argmin(X, Y, memory=256)
+        self.assertEqual(matrix.argmin(axis=1).tolist(), indexes.tolist())
+        self.assertTrue(np.allclose(matrix.min(axis=1), distances))
+        distances, indexes = distance.nearest(X, Y, k=4, metric='manhattan', memory=256)
+        expect = np.sort(distance.pairwise(X, Y, 'manhattan'), axis=1)[:, :4]
+        self.assertTrue(np.allclose(expect, distances))
+        distances, indexes = distance.nearest(X, Y, k=50)
+        self.assertEqual((50, 20), indexes.shape)
+
 #---------------------------------------------------------------------------#
 # main
 #---------------------------------------------------------------------------#
@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from bashwork.ml.utility.information import *
+
+#---------------------------------------------------------------------------#
+# helpers
+#---------------------------------------------------------------------------#
+def brute_split(values, labels):
+    ''' Score every threshold by partitioning the dataset '''
+    best = (None, None)
+    for value in np.unique(values)[:-1]:
+        left, right = labels[values <= value], labels[values > value]
+        score = entropy(labels) - (len(left) * entropy(left)
+            + len(right) * entropy(right)) / float(len(labels))
+        if best[0] is None or score > best[0] + 1e-12: best = (score, value)
+    return best
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class InformationTest(unittest.TestCase):
+    ''' Code to validate that the information methods are correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(2)
+        self.values = random.randint(20, size=300).astype(float)
+        self.labels = np.where(self.values + random.randn(300) * 3 > 9, 'yes', 'no')
+
+    def test_entropy(self):
+        ''' Test that the entropy methods agree '''
+        self.assertAlmostEqual(1.0, entropy(['a', 'b']))
+        self.assertAlmostEqual(entropy(list('aabbbc')), entropy_counts([2, 3, 1]))
+        self.assertTrue(np.allclose([0.0, 1.0], entropy_counts([[4, 0], [2, 2]])))
+        classes, codes = encode_labels(['b', 'a', 'b'])
+        self.assertEqual(['a', 'b'], list(classes))
+        self.assertEqual([1, 0, 1], list(codes))
+
+    def test_best_sorted_split(self):
+        ''' Test that the sorted scan matches the brute force split '''
+        classes, codes = encode_labels(self.labels)
+        order = np.argsort(self.values, kind='mergesort')
+        gain, value = best_sorted_split(self.values[order], codes[order], len(classes))
+        expect = brute_split(self.values, self.labels)
+        self.assertAlmostEqual(expect[0], gain)
+        self.assertEqual(expect[1], value)
+        self.assertEqual((None, None), best_sorted_split(np.ones(4), codes[:4], 2))
+
+    def test_best_binned_split(self):
+        ''' Test that the binned scan matches the sorted scan '''
+        classes, codes = encode_labels(self.labels)
+        edges, binned = bin_dataset(self.values[:, None], 64)
+        self.assertEqual(19, len(edges[0]))
+        gain, value = best_binned_split(binned[:, 0], codes, edges[0], len(classes))
+        expect = brute_split(self.values, self.labels)
+        self.assertAlmostEqual(expect[0], gain)
+        self.assertEqual(expect[1], value)
+        self.assertEqual(4, len(quantile_edges(np.arange(100.0), 5)))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,30 @@
 import math
-import sys
+import heapq
 import random
-from bashwork.security.hashing import Hashing
+import struct
+import numpy as np
+from bashwork.algorithm.hashing.bloom_filter import double_hasher, get_stride
 
 class CountMinSketch(object):
     ''' A simple count min sketch implementation
     based on: http://en.wikipedia.org/wiki/Count-Min_sketch
+
+    The counters are stored in a single depth x width numpy
+    matrix and the row indexes for a value are generated from
+    a single digest with double hashing. Sketches of the same
+    shape can be merged by summing their counters, which allows
+    each worker to keep its own sketch and ship it in bytes::
+
+        sketch = CountMinSketch.create(0.001, 0.01, top=10)
+        sketch.update_many(values)
+        payload = sketch.to_bytes()
+        total = CountMinSketch.from_bytes(payload) + other
     '''
 
+    __header = struct.Struct('<IIBI')
+
     @classmethod
-    def create(klass, epsilon, delta):
+    def create(klass, epsilon, delta, **kwargs):
         ''' Create a new instance of the CountMinSketch class
         with the supplied epsilon and delta tuning parameters
 
@@ -22,18 +37,53 @@ class CountMinSketch(object):
 
         depth = int(math.log(1.0 / delta) + 0.5)
         width = int((math.e / epsilon) + 0.5)
-        return klass(width, depth)
+        return klass(width, depth, **kwargs)
 
-    def __init__(self, width, depth):
+    def __init__(self, width, depth, conservative=False, top=0):
         ''' Initialize a new instance of the CountMinSketch class
 
-        :param weight:
-        :param depth:
+        :param width: The number of counters in each row
+        :param depth: The number of rows (hash functions)
+        :param conservative: True to only increment the minimum counters
+        :param top: The number of heavy hitters to track (default none)
         '''
         self.width   = width
-        self.depth   = depth
-        self.count   = [[0] * width for _ in range(depth)]
-        self.hashers = [self.get_hash_method(seed) for seed in range(depth)]
+        self.depth   = max(1, depth)
+        self.rows    = np.arange(self.depth)
+        self.count   = np.zeros((self.depth, width), dtype=np.int64)
+        self.conservative = conservative
+        self.top     = top
+        self.hitters = {} # value => estimate
+        self.heap    = [] # (estimate, value) possibly stale
+
+    #------------------------------------------------------------
+    # hashing methods
+    #------------------------------------------------------------
+
+    def get_hash_keys(self, value):
+        ''' Given a value, return the column index of that value
+        for each row of the sketch.
+
+        :param value: The value to get the indexes of
+        :returns: A numpy array of the column for each row
+        '''
+        if not isinstance(value, basestring): value = str(value)
+        h1, h2 = double_hasher(value)
+        width  = self.width
+        return (h1 % width + self.rows * get_stride(h2, width)) % width
+
+    def copy_empty(self, **kwargs):
+        ''' Create an empty sketch of the same shape that hashes
+        the values the same way as this sketch.
+
+        :param kwargs: The options of the new sketch
+        :returns: The new empty sketch
+        '''
+        return self.__class__(self.width, self.depth, **kwargs)
+
+    #------------------------------------------------------------
+    # update methods
+    #------------------------------------------------------------
 
     def update(self, value, count=1):
         ''' Update the cardinality estimate of the supplied value
@@ -42,46 +92,250 @@ class CountMinSketch(object):
         :param value: The new value to update with
         :param count: The count to update the value with (default 1)
         '''
-        for index, hasher in enumerate(self.hashers):
-            hashed = hasher(value) % self.width
-            self.count[index][hashed] += count
+        index = self.get_hash_keys(value)
+        if self.conservative:
+            current = self.count[self.rows, index]
+            self.count[self.rows, index] = np.maximum(current, current.min() + count)
+        else: self.count[self.rows, index] += count
+        if self.top: self.__update_hitter(value, self.count[self.rows, index].min())
+
+    def update_many(self, values, counts=None):
+        ''' Update the cardinality estimates of all the supplied
+        values at once. In the default mode all of the counters are
+        updated with a single vectorized operation.
+
+        :param values: The collection of values to update with
+        :param counts: The count for each value (default 1 each)
+        '''
+        values = list(values)
+        if not values: return
+        counts = np.ones(len(values), dtype=np.int64) if counts is None \
+            else np.asarray(counts, dtype=np.int64)
+
+        if self.conservative: # updates depend on the previous ones
+            for value, count in zip(values, counts):
+                self.update(value, count)
+            return
+
+        index = np.array([self.get_hash_keys(value) for value in values])
+        rows  = np.broadcast_to(self.rows, index.shape)
+        np.add.at(self.count, (rows, index), counts[:, np.newaxis])
+        if self.top:
+            estimates = self.count[rows, index].min(axis=1)
+            for value, estimate in zip(values, estimates):
+                self.__update_hitter(value, estimate)
+
+    #------------------------------------------------------------
+    # query methods
+    #------------------------------------------------------------
 
     def query(self, value):
         '''
         :param value: The value to get the cardinality of
         :returns: The estimated cardinality of the value
         '''
-        estimate = sys.maxint
-        for index, hasher in enumerate(self.hashers):
-            hashed = hasher(value) % self.width
-            estimate = min(self.count[index][hashed], estimate)
-        return estimate
+        return int(self.count[self.rows, self.get_hash_keys(value)].min())
+
+    def query_many(self, values):
+        ''' Retrieve the cardinality estimates of all the
+        supplied values at once.
+
+        :param values: The values to get the cardinality of
+        :returns: A numpy array of the estimated cardinalities
+        '''
+        index = np.array([self.get_hash_keys(value) for value in values])
+        if not len(index): return np.zeros(0, dtype=np.int64)
+        return self.count[np.broadcast_to(self.rows, index.shape), index].min(axis=1)
+
+    def heavy_hitters(self):
+        ''' Retrieve the current top heavy hitters.
+
+        :returns: A list of (value, estimate) sorted by estimate
+        '''
+        return sorted(self.hitters.items(), key=lambda e: (-e[1], e[0]))
+
+    def __update_hitter(self, value, estimate):
+        ''' Update the heavy hitter heap with the new estimate of
+        the supplied value. Stale heap entries are skipped lazily
+        and the heap is rebuilt when they start to dominate.
+
+        :param value: The value that was updated
+        :param estimate: The current estimate of the value
+        '''
+        estimate = int(estimate)
+        if value in self.hitters:
+            self.hitters[value] = estimate
+            heapq.heappush(self.heap, (estimate, value))
+        elif len(self.hitters) < self.top:
+            self.hitters[value] = estimate
+            heapq.heappush(self.heap, (estimate, value))
+        else:
+            while self.heap[0][0] != self.hitters.get(self.heap[0][1]):
+                heapq.heappop(self.heap)
+            if estimate <= self.heap[0][0]: return
+            del self.hitters[heapq.heappop(self.heap)[1]]
+            self.hitters[value] = estimate
+            heapq.heappush(self.heap, (estimate, value))
+
+        if len(self.heap) > 4 * self.top:
+            self.heap = [(e, v) for v, e in self.hitters.items()]
+            heapq.heapify(self.heap)
+
+    #------------------------------------------------------------
+    # merge methods
+    #------------------------------------------------------------
+
+    def merge(self, other):
+        ''' Merge the supplied sketch into a new sketch that
+        contains the counts of both sketches.
+
+        :param other: The sketch to merge with
+        :returns: The newly merged sketch
+        '''
+        assert self.count.shape == other.count.shape, "sketches must be the same shape"
 
-    def get_hash_method(self, index):
-        ''' Supply the CountMinSketch with the hash function at
-        the supplied index. This can be overloaded to supply different
-        hash functions to tune the system.
+        merged = self.copy_empty(conservative=self.conservative, top=max(self.top, other.top))
+        merged.count = self.count + other.count
+        if merged.top:
+            for value in set(self.hitters) | set(other.hitters):
+                merged.__update_hitter(value, merged.query(value))
+        return merged
 
-        :param index: The index of the hash function to retrieve
-        :returns: The hash function at the supplied index
+    def to_bytes(self):
+        ''' Serialize the current sketch into a compact byte
+        string that can be shipped to be merged elsewhere.
+
+        ..note:: The heavy hitter values are serialized as strings
+
+        :returns: The serialized sketch
+        '''
+        hitters = ''.join(struct.pack('<I', len(v)) + v for v in
+            (str(value) for value in self.hitters))
+        header  = self.__header.pack(self.width, self.depth,
+            int(self.conservative), self.top)
+        return header + self.count.astype('<i8').tobytes() + hitters
+
+    @classmethod
+    def from_bytes(klass, payload, **kwargs):
+        ''' Given a serialized sketch, convert it to a new
+        instance of the current type.
+
+        :param payload: The serialized sketch
+        :param kwargs: The extra options of the new sketch
+        :returns: An instance of the current type
         '''
-        hasher = Hashing.murmur3_32()
-        hasher.seed = index
-        return hasher
+        width, depth, conservative, top = klass.__header.unpack_from(payload)
+        offset = klass.__header.size
+        length = width * depth * 8
+        sketch = klass(width, depth, conservative=bool(conservative), top=top, **kwargs)
+        sketch.count = np.frombuffer(payload[offset:offset + length],
+            dtype='<i8').astype(np.int64).reshape(depth, width)
+
+        offset += length
+        while offset < len(payload):
+            size, = struct.unpack_from('<I', payload, offset)
+            value = payload[offset + 4:offset + 4 + size]
+            sketch.__update_hitter(value, sketch.query(value))
+            offset += 4 + size
+        return sketch
+
+    def __add__(self, other): return self.merge(other)
 
 
 class PairWiseCountMinSketch(CountMinSketch):
     ''' An implementation of the count min sketch algorithm
     using N pair-wise independent hashing functions as
     shown in: http://en.wikipedia.org/wiki/Universal_hashing
+
+    This only works with integer values (so it cannot track
+    the heavy hitters, which are serialized as strings) and the
+    sketches can only be merged with sketches that share the same
+    hash parameters, which are serialized with the counters.
     '''
 
     BIG_PRIME = 9223372036854775783
 
-    def get_hash_method(self, index):
+    def __init__(self, width, depth, params=None, **kwargs):
+        ''' Initialize a new instance of the PairWiseCountMinSketch class
+
+        :param width: The number of counters in each row
+        :param depth: The number of rows (hash functions)
+        :param params: The (a, b) of each row (default random)
+        '''
+        if kwargs.get('top'):
+            raise ValueError("pair-wise sketches cannot track heavy hitters")
+        super(PairWiseCountMinSketch, self).__init__(width, depth, **kwargs)
+        self.params  = tuple((int(a), int(b)) for a, b in params) if params \
+            else tuple(self.get_hash_params() for _ in range(self.depth))
+        assert len(self.params) == self.depth, "there must be a hasher per row"
+        self.hashers = [self.get_hash_method(a, b) for a, b in self.params]
+
+    def get_hash_keys(self, value):
+        ''' Given a value, return the column index of that value
+        for each row of the sketch.
+
+        :param value: The value to get the indexes of
+        :returns: A numpy array of the column for each row
+        '''
+        return np.array([hasher(value) % self.width for hasher in self.hashers],
+            dtype=np.int64)
+
+    def get_hash_params(self):
+        ''' Returns the random (a, b) parameters of a hash
+        function from the pairwise-independent family.
+        '''
+        return (random.randrange(0, self.BIG_PRIME - 1),
+                random.randrange(0, self.BIG_PRIME - 1))
+
+    def get_hash_method(self, a, b):
         ''' Returns a hash function from a family of
         pairwise-independent hash functions
+
+        :param a: The multiplier of the hash function
+        :param b: The offset of the hash function
         '''
-        a = random.randrange(0, self.BIG_PRIME - 1)
-        b = random.randrange(0, self.BIG_PRIME - 1)
         return lambda v: (a * v + b) % self.BIG_PRIME
+
+    def copy_empty(self, **kwargs):
+        ''' Create an empty sketch of the same shape that shares
+        the hash functions of this sketch.
+
+        :param kwargs: The options of the new sketch
+        :returns: The new empty sketch
+        '''
+        return super(PairWiseCountMinSketch, self).copy_empty(params=self.params, **kwargs)
+
+    def merge(self, other):
+        ''' Merge the supplied sketch into a new sketch that
+        contains the counts of both sketches.
+
+        :param other: The sketch to merge with
+        :returns: The newly merged sketch
+        '''
+        if getattr(other, 'params', None) != self.params:
+            raise ValueError("sketches must share the same hash parameters")
+        return super(PairWiseCountMinSketch, self).merge(other)
+
+    def to_bytes(self):
+        ''' Serialize the current sketch and its hash parameters
+        into a compact byte string.
+
+        :returns: The serialized sketch
+        '''
+        params = [value for pair in self.params for value in pair]
+        return struct.pack('<I%dQ' % len(params), len(self.params), *params) \
+            + super(PairWiseCountMinSketch, self).to_bytes()
+
+    @classmethod
+    def from_bytes(klass, payload):
+        ''' Given a serialized sketch, convert it to a new
+        instance of the current type with the same hashers.
+
+        :param payload: The serialized sketch
+        :returns: An instance of the current type
+        '''
+        depth, = struct.unpack_from('<I', payload)
+        values = struct.unpack_from('<%dQ' % (2 * depth), payload, 4)
+        params = zip(values[0::2], values[1::2])
+        offset = 4 + 16 * depth
+        return super(PairWiseCountMinSketch, klass).from_bytes(payload[offset:], params=params)
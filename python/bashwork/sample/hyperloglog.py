@@ -0,0 +1,342 @@
+'''
+HyperLogLog
+------------------------------------------------------------
+
+This is a cardinality estimator that counts the number of
+distinct items in a stream in a fixed amount of memory based
+on: http://en.wikipedia.org/wiki/HyperLogLog
+
+Each value is hashed to 64 bits; the top `p` bits select one
+of `2^p` registers and the register stores the maximum number
+of leading zeros (plus one) seen in the remaining bits. The
+estimator follows the HLL++ layout:
+
+* small cardinalities are kept in a sorted array of packed 32 bit
+  `(index << 6) | rank` entries at a precision of 25 bits and are
+  estimated with linear counting; new entries are collected in a
+  small buffer that is merged into the array when it fills up
+* once the sparse array would use more than a quarter of the
+  memory of the dense form it is converted to a dense array of
+  `2^p` byte registers
+* the dense estimate uses the improved raw estimator from Ertl
+  (New cardinality estimation algorithms for HyperLogLog
+  sketches) which corrects the small and large range bias
+  without the empirical HLL++ bias tables
+
+Estimators can be merged and shipped in a compact form::
+
+    counter = HyperLogLog.create(error_rate=0.01)
+    counter.add_many(users)
+    payload = counter.to_bytes()
+    total = HyperLogLog.from_bytes(payload) | other
+    print len(total)
+'''
+import math
+import struct
+import numpy as np
+from bashwork.security.hashing import Hashing
+
+#------------------------------------------------------------
+# helper methods
+#------------------------------------------------------------
+
+def get_rank(value, bits):
+    ''' Given a value of the supplied bit width, return the
+    position of the first set bit from the left (1 based).
+
+    :param value: The value to get the rank of
+    :param bits: The bit width of the value
+    :returns: The rank of the value
+    '''
+    return bits - value.bit_length() + 1
+
+
+def encode_varints(values):
+    ''' Given a sorted collection of integers, encode the deltas
+    between them as a string of variable length integers.
+
+    :param values: The sorted integers to encode
+    :returns: The encoded string
+    '''
+    encoded, last = bytearray(), 0
+    for value in values:
+        delta, last = value - last, value
+        while delta >= 0x80:
+            encoded.append((delta & 0x7f) | 0x80)
+            delta >>= 7
+        encoded.append(delta)
+    return str(encoded)
+
+
+def decode_varints(encoded):
+    ''' Given a string of delta encoded variable length integers,
+    decode the original sorted integers.
+
+    :param encoded: The encoded string
+    :returns: A generator of the decoded integers
+    '''
+    value, shift, last = 0, 0, 0
+    for byte in bytearray(encoded):
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            last += value
+            yield last
+            value, shift = 0, 0
+
+
+def merge_sparse(*entries):
+    ''' Given collections of packed `(index << 6) | rank` sparse
+    entries, merge them into a single sorted array that keeps the
+    highest rank of every index.
+
+    :param entries: The collections of packed entries to merge
+    :returns: The sorted uint32 array of the merged entries
+    '''
+    values = np.sort(np.concatenate([np.asarray(e, dtype=np.uint32) for e in entries]))
+    if not len(values): return values
+    indexes = values >> 6
+    return values[np.r_[indexes[1:] != indexes[:-1], True]]
+
+
+def sigma(x):
+    ''' The sigma function of the improved estimator which
+    corrects for the empty registers.
+    '''
+    if x == 1.0: return float('inf')
+    y, z = 1.0, x
+    while True:
+        x *= x
+        last, z = z, z + x * y
+        y += y
+        if z == last: return z
+
+
+def tau(x):
+    ''' The tau function of the improved estimator which
+    corrects for the saturated registers.
+    '''
+    if x == 0.0 or x == 1.0: return 0.0
+    y, z = 1.0, 1.0 - x
+    while True:
+        x = math.sqrt(x)
+        last = z
+        y *= 0.5
+        z -= (1.0 - x) ** 2 * y
+        if z == last: return z / 3.0
+
+#------------------------------------------------------------
+# classes
+#------------------------------------------------------------
+
+class HyperLogLog(object):
+    ''' A HyperLogLog cardinality estimator with a sparse
+    and a dense register representation.
+    '''
+
+    SPARSE_PRECISION = 25
+    __header = struct.Struct('<BBI')
+
+    @classmethod
+    def create(klass, error_rate, **kwargs):
+        ''' Create a new instance of the HyperLogLog class with
+        the precision required for the supplied standard error.
+
+        :param error_rate: The requested relative standard error
+        :returns: An initialized HyperLogLog instance
+        '''
+        assert (0 < error_rate < 1)
+
+        precision = int(math.ceil(math.log((1.04 / error_rate) ** 2, 2)))
+        return klass(precision=min(18, max(4, precision)), **kwargs)
+
+    def __init__(self, precision=14, hasher=None, sparse=True):
+        ''' Initialize a new instance of the HyperLogLog class
+
+        :param precision: The number of index bits (4 to 18, default 14)
+        :param hasher: The HashFunction to hash values with (default sha1)
+        :param sparse: True to start in the sparse representation
+        '''
+        assert (4 <= precision <= 18)
+
+        self.precision = precision
+        self.size      = 1 << precision
+        self.hasher    = hasher or Hashing.sha1()
+        self.threshold = self.size // 16 # 4 byte entries, a quarter of the dense size
+        self.limit     = max(16, self.threshold // 16)
+        self.sparse    = np.zeros(0, dtype=np.uint32) if sparse else None
+        self.buffer    = []
+        self.registers = None if sparse else bytearray(self.size)
+
+    #------------------------------------------------------------
+    # update methods
+    #------------------------------------------------------------
+
+    def get_hash(self, value):
+        ''' Given a value, return the 64 bit hash of that value.
+
+        :param value: The value to hash
+        :returns: The 64 bit hash of the value
+        '''
+        if not isinstance(value, basestring): value = str(value)
+        digest = self.hasher.hash(value).to_string()
+        return struct.unpack('>Q', digest[:8].ljust(8, '\x00'))[0]
+
+    def add(self, value):
+        ''' Add the supplied value to the estimator.
+
+        :param value: The value to add
+        '''
+        hashed = self.get_hash(value)
+        if self.sparse is not None:
+            bits  = 64 - self.SPARSE_PRECISION
+            index = hashed >> bits
+            rank  = get_rank(hashed & ((1 << bits) - 1), bits)
+            self.buffer.append((index << 6) | rank)
+            if len(self.buffer) >= self.limit:
+                self.flush()
+        else:
+            bits  = 64 - self.precision
+            index = hashed >> bits
+            rank  = get_rank(hashed & ((1 << bits) - 1), bits)
+            if rank > self.registers[index]:
+                self.registers[index] = rank
+
+    def add_many(self, values):
+        ''' Add all of the supplied values to the estimator.
+
+        :param values: The collection of values to add
+        '''
+        for value in values:
+            self.add(value)
+
+    def flush(self):
+        ''' Merge the buffered sparse entries into the sorted
+        sparse array, converting to the dense representation if
+        the array grows past the threshold.
+        '''
+        if self.sparse is None or not self.buffer: return
+        self.sparse, self.buffer = merge_sparse(self.sparse, self.buffer), []
+        if len(self.sparse) > self.threshold:
+            self.to_dense()
+
+    def to_dense(self):
+        ''' Convert the current estimator from the sparse to
+        the dense representation.
+        '''
+        if self.sparse is None: return
+
+        shift   = self.SPARSE_PRECISION - self.precision
+        entries = merge_sparse(self.sparse, self.buffer).astype(np.int64)
+        index, rank = entries >> 6, entries & 0x3f
+        extra   = index & ((1 << shift) - 1)
+        length  = np.zeros(len(extra), dtype=np.int64) # the bit length of extra
+        length[extra > 0] = np.floor(np.log2(extra[extra > 0])).astype(np.int64) + 1
+        rank    = np.where(extra > 0, shift - length + 1, shift + rank)
+        registers = np.zeros(self.size, dtype=np.uint8)
+        np.maximum.at(registers, index >> shift, rank.astype(np.uint8))
+        self.registers, self.sparse, self.buffer = bytearray(registers.tobytes()), None, []
+
+    #------------------------------------------------------------
+    # query methods
+    #------------------------------------------------------------
+
+    def cardinality(self):
+        ''' Retrieve the estimated number of distinct values.
+
+        :returns: The estimated cardinality
+        '''
+        self.flush()
+        if self.sparse is not None:
+            size = float(1 << self.SPARSE_PRECISION)
+            return size * math.log(size / (size - len(self.sparse)))
+
+        bits   = 64 - self.precision
+        size   = float(self.size)
+        counts = np.bincount(np.frombuffer(bytes(self.registers), dtype=np.uint8),
+            minlength=bits + 2)
+        total  = size * tau(1.0 - counts[bits + 1] / size)
+        for rank in xrange(bits, 0, -1):
+            total = 0.5 * (total + counts[rank])
+        total += size * sigma(counts[0] / size)
+        return size * size / (2.0 * math.log(2) * total)
+
+    #------------------------------------------------------------
+    # merge methods
+    #------------------------------------------------------------
+
+    def merge(self, other):
+        ''' Merge the supplied estimator into a new estimator
+        that counts the union of both streams.
+
+        :param other: The estimator to merge with
+        :returns: The newly merged estimator
+        '''
+        assert self.precision == other.precision, "estimators must have the same precision"
+
+        merged = self.__class__(self.precision, hasher=self.hasher)
+        if self.sparse is not None and other.sparse is not None:
+            merged.sparse = merge_sparse(self.sparse, self.buffer, other.sparse, other.buffer)
+            if len(merged.sparse) > merged.threshold:
+                merged.to_dense()
+            return merged
+
+        this, that = self.copy(), other.copy()
+        this.to_dense(), that.to_dense()
+        registers = np.maximum(
+            np.frombuffer(bytes(this.registers), dtype=np.uint8),
+            np.frombuffer(bytes(that.registers), dtype=np.uint8))
+        merged.registers, merged.sparse = bytearray(registers.tobytes()), None
+        return merged
+
+    def copy(self):
+        ''' Create a copy of the current estimator.
+
+        :returns: A copy of the current estimator
+        '''
+        result = self.__class__(self.precision, hasher=self.hasher)
+        result.sparse    = self.sparse.copy() if self.sparse is not None else None
+        result.buffer    = list(self.buffer)
+        result.registers = bytearray(self.registers) if self.registers is not None else None
+        return result
+
+    def to_bytes(self):
+        ''' Serialize the current estimator into a compact byte
+        string. Sparse estimators are stored as delta encoded
+        varints and dense estimators pack each register in 6 bits.
+
+        :returns: The serialized estimator
+        '''
+        self.flush()
+        if self.sparse is not None:
+            values = self.sparse.tolist()
+            header = self.__header.pack(1, self.precision, len(values))
+            return header + encode_varints(values)
+
+        registers = np.frombuffer(bytes(self.registers), dtype=np.uint8)
+        bits = np.unpackbits(registers[:, np.newaxis], axis=1)[:, 2:]
+        header = self.__header.pack(0, self.precision, self.size)
+        return header + np.packbits(bits.ravel()).tobytes()
+
+    @classmethod
+    def from_bytes(klass, payload, **kwargs):
+        ''' Given a serialized estimator, convert it to a new
+        instance of the current type.
+
+        :param payload: The serialized estimator
+        :returns: An instance of the current type
+        '''
+        sparse, precision, count = klass.__header.unpack_from(payload)
+        payload = payload[klass.__header.size:]
+        result  = klass(precision, sparse=bool(sparse), **kwargs)
+        if sparse:
+            result.sparse = np.fromiter(decode_varints(payload), dtype=np.uint32, count=count)
+        else:
+            bits = np.unpackbits(np.frombuffer(payload, dtype=np.uint8))
+            bits = bits[:count * 6].reshape(count, 6)
+            bits = np.hstack([np.zeros((count, 2), dtype=np.uint8), bits])
+            result.registers = bytearray(np.packbits(bits, axis=1).tobytes())
+        return result
+
+    def __len__(self): return int(round(self.cardinality()))
+    def __or__(self, other): return self.merge(other)
@@ -5,10 +5,86 @@ from bashwork.sample.count_min_sketch import *
 class CountMinSketchTest(unittest.TestCase):
 
     def test_count_min_sketch(self):
-        pass
+        sketch = CountMinSketch.create(0.01, 0.01)
+        self.assertEqual((5, 272), sketch.count.shape)
+        for value in range(100):
+            sketch.update(value, value)
+        for value in range(100):
+            self.assertTrue(sketch.query(value) >= value)
+        self.assertTrue(sketch.query('missing') <= 0.01 * sum(range(100)))
+
+    def test_count_min_sketch_update_many(self):
+        sketch1 = CountMinSketch(100, 4)
+        sketch2 = CountMinSketch(100, 4)
+        values  = [str(i % 37) for i in range(1000)]
+        sketch1.update_many(values)
+        for value in values:
+            sketch2.update(value)
+        self.assertTrue((sketch1.count == sketch2.count).all())
+        self.assertEqual([sketch1.query(v) for v in values],
+            list(sketch1.query_many(values)))
+
+        sketch1.update_many(['a', 'b'], [5, 7])
+        self.assertTrue(sketch1.query('a') >= 5)
+        self.assertTrue(sketch1.query('b') >= 7)
+
+    def test_hash_keys_spread(self):
+        sketch = CountMinSketch(4, 4)
+        for value in range(200):
+            columns = sketch.get_hash_keys(value)
+            self.assertTrue(len(set(columns)) > 1)
+
+    def test_conservative_update(self):
+        sketch1 = CountMinSketch(20, 3)
+        sketch2 = CountMinSketch(20, 3, conservative=True)
+        values  = [str(i) for i in range(200)]
+        sketch1.update_many(values)
+        sketch2.update_many(values)
+        self.assertTrue((sketch2.count <= sketch1.count).all())
+        for value in values:
+            self.assertTrue(sketch2.query(value) >= 1)
+            self.assertTrue(sketch2.query(value) <= sketch1.query(value))
+
+    def test_heavy_hitters(self):
+        sketch = CountMinSketch(1000, 5, top=3)
+        values = ['a'] * 50 + ['b'] * 40 + ['c'] * 30 + [str(i) for i in range(500)]
+        sketch.update_many(values)
+        self.assertEqual([('a', 50), ('b', 40), ('c', 30)], sketch.heavy_hitters())
+
+    def test_merge_and_serialize(self):
+        sketch1 = CountMinSketch(100, 4, top=2)
+        sketch2 = CountMinSketch(100, 4, top=2)
+        sketch1.update_many(['a'] * 10 + ['b'] * 3)
+        sketch2.update_many(['c'] * 8 + ['b'] * 9)
+
+        merged = CountMinSketch.from_bytes(sketch1.to_bytes()) + sketch2
+        self.assertEqual(10, merged.query('a'))
+        self.assertEqual(12, merged.query('b'))
+        self.assertEqual(8, merged.query('c'))
+        self.assertEqual([('b', 12), ('a', 10)], merged.heavy_hitters())
 
     def test_pair_wise_count_min_sketch(self):
-        pass
+        sketch = PairWiseCountMinSketch(100, 4)
+        sketch.update_many(range(50), range(50))
+        for value in range(50):
+            self.assertTrue(sketch.query(value) >= value)
+
+        self.assertFalse(hasattr(CountMinSketch(100, 4), 'hashers'))
+        self.assertRaises(ValueError, PairWiseCountMinSketch, 100, 4, top=3)
+
+    def test_pair_wise_merge_and_serialize(self):
+        sketch = PairWiseCountMinSketch(100, 4)
+        sketch.update_many([7] * 100 + range(50))
+        loaded = PairWiseCountMinSketch.from_bytes(sketch.to_bytes())
+        self.assertEqual(sketch.params, loaded.params)
+        self.assertTrue((sketch.count == loaded.count).all())
+        self.assertTrue(loaded.query(7) >= 101)
+
+        other = sketch.copy_empty()
+        other.update(7, 5)
+        self.assertTrue((loaded + other).query(7) >= 106)
+        self.assertRaises(ValueError, sketch.merge, PairWiseCountMinSketch(100, 4))
+        self.assertRaises(ValueError, sketch.merge, CountMinSketch(100, 4))
 
 #---------------------------------------------------------------------------#
 # main
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+import unittest
+from bashwork.sample.hyperloglog import *
+
+class HyperLogLogTest(unittest.TestCase):
+
+    def test_create(self):
+        self.assertEqual(14, HyperLogLog.create(0.01).precision)
+        self.assertEqual(11, HyperLogLog.create(0.025).precision)
+
+    def test_varints(self):
+        values = [0, 1, 127, 128, 300, 2 ** 31]
+        self.assertEqual(values, list(decode_varints(encode_varints(values))))
+
+    def test_sparse_cardinality(self):
+        counter = HyperLogLog(precision=14)
+        counter.add_many(range(500) * 3)
+        self.assertTrue(counter.sparse is not None)
+        self.assertEqual(500, len(counter))
+        self.assertEqual(500, len(counter.sparse))
+        self.assertTrue(counter.sparse.nbytes < counter.size // 4)
+
+    def test_dense_cardinality(self):
+        for count in [100, 5000, 100000]:
+            counter = HyperLogLog(precision=12, sparse=False)
+            counter.add_many(xrange(count))
+            error = abs(len(counter) - count) / float(count)
+            self.assertTrue(error < 0.05, "%d: %d" % (count, len(counter)))
+
+    def test_sparse_to_dense(self):
+        sparse = HyperLogLog(precision=10)
+        dense  = HyperLogLog(precision=10, sparse=False)
+        sparse.add_many(xrange(50))
+        dense.add_many(xrange(50))
+        self.assertTrue(sparse.sparse is not None)
+        sparse.to_dense()
+        self.assertEqual(dense.registers, sparse.registers)
+
+        sparse = HyperLogLog(precision=10)
+        sparse.add_many(xrange(5000))
+        dense.add_many(xrange(50, 5000))
+        self.assertTrue(sparse.sparse is None)
+        self.assertEqual(dense.registers, sparse.registers)
+
+    def test_merge(self):
+        counter1 = HyperLogLog(precision=14)
+        counter2 = HyperLogLog(precision=14)
+        counter1.add_many(xrange(0, 300))
+        counter2.add_many(xrange(200, 400))
+        self.assertEqual(400, len(counter1 | counter2))
+
+        counter2.add_many(xrange(400, 20000))
+        merged = counter1 | counter2
+        self.assertTrue(merged.sparse is None)
+        self.assertTrue(abs(len(merged) - 20000) < 1000)
+
+    def test_serialize(self):
+        counter = HyperLogLog(precision=12)
+        counter.add_many(xrange(200))
+        payload = counter.to_bytes()
+        self.assertTrue(counter.sparse is not None)
+        self.assertEqual(list(counter.sparse), list(HyperLogLog.from_bytes(payload).sparse))
+
+        counter.add_many(xrange(300, 20000))
+        payload = counter.to_bytes()
+        self.assertEqual(6 + 4096 * 6 // 8, len(payload))
+        self.assertEqual(counter.registers, HyperLogLog.from_bytes(payload).registers)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
@@ -4,31 +4,42 @@
    - document the distributions (what do they all mean)
    - http://en.wikipedia.org/wiki/List_of_probability_distributions
 '''
-import random
 import numpy as np
 from bashwork.statistics.distribution import Distribution
 
 class ContinuousDistribution(Distribution):
     ''' A simple wrapper around some continuous distribution
-    generator to match the Distribution interface.
+    generator to match the Distribution interface. The sampler
+    is called with the random state of the distribution and the
+    number of samples, so single draws and batches come from the
+    same generator::
+
+        dist = ContinuousDistribution(sampler=lambda state, count: state.normal(0, 1, count))
     '''
 
-    def __init__(self, generator):
+    def __init__(self, generator=None, sampler=None, random_state=None):
         ''' Initialize a new instance of the ContinuousDistribution class
 
-        :param generator: The underlying random generator
+        :param generator: The underlying random generator of a single sample
+        :param sampler: The generator of a numpy array of samples
+        :param random_state: The numpy RandomState to sample with (default np.random)
         '''
         self.generator = generator
+        self.sampler   = sampler
+        self.random_state = np.random if random_state is None else random_state
 
     def sample(self, count=1):
         ''' Sample the existing distribution the supplied
         number of times.
 
         :param count: The number of samples to retrieve (default 1)
-        :returns: The requested number of samples
+        :returns: The requested number of samples (as a numpy array)
         '''
-        samples = [self.generator() for _ in range(count)]
-        return samples[0] if count == 1 else samples
+        if self.sampler:
+            samples = self.sampler(self.random_state, count)
+            return samples[0] if count == 1 else samples
+        if count == 1: return self.generator()
+        return np.fromiter((self.generator() for _ in xrange(count)), np.float64, count)
 
     def is_valid(self):
         ''' Check if the underlying distribution correctly
@@ -48,26 +59,31 @@ class ContinuousDistribution(Distribution):
 # Continuous Distributions
 #------------------------------------------------------------
 
-def constant(value):
+def constant(value, random_state=None):
     '''
     :param value: The value to always sample from
+    :param random_state: The numpy RandomState to sample with
     '''
-    return Distribution.create([value])
+    return Distribution.create([value], random_state=random_state)
 
-def uniform(low=0.0, high=1.0):
+def uniform(low=0.0, high=1.0, random_state=None):
     '''
     :param low: The low value of the distribution
     :param high: The high value of the distribution
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(random.uniform(low, high))
+    return ContinuousDistribution(sampler=lambda state, count: state.uniform(low, high, count),
+        random_state=random_state)
 
-def exponential(lam):
+def exponential(lam, random_state=None):
     '''
     :param lam: The lambda parameter for the distribution
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(random.expovariate(lam))
+    return ContinuousDistribution(sampler=lambda state, count: state.exponential(1.0 / lam, count),
+        random_state=random_state)
 
-def gaussian(mu=0.0, sigma=1.0):
+def gaussian(mu=0.0, sigma=1.0, random_state=None):
     '''
     The distribution is modeled as:
 
@@ -77,26 +93,32 @@ def gaussian(mu=0.0, sigma=1.0):
 
     :param mu: The mean of the distribution
     :param sigma: The standard deviation of the distribution
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.gauss(mu, sigma))
+    return ContinuousDistribution(sampler=lambda state, count: state.normal(mu, sigma, count),
+        random_state=random_state)
 
-def vonmises(mu=0.0, kappa=1.0):
+def vonmises(mu=0.0, kappa=1.0, random_state=None):
     '''
 
     :param mu: The mean angle in randians between 0 and 2*pi
     :param kappa: The concentration parameter
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.vonmisesvariate(mu, kappa))
+    return ContinuousDistribution(sampler=lambda state, count: np.mod(state.vonmises(mu, kappa, count), 2 * np.pi),
+        random_state=random_state)
 
-def log(mu=0.0, sigma=1.0):
+def log(mu=0.0, sigma=1.0, random_state=None):
     '''
 
     :param mu: The mean of the distribution
     :param sigma: The standard deviation of the distribution
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.lognormvariate(mu, sigma))
+    return ContinuousDistribution(sampler=lambda state, count: state.lognormal(mu, sigma, count),
+        random_state=random_state)
 
-def normal(mu=0.0, sigma=1.0):
+def normal(mu=0.0, sigma=1.0, random_state=None):
     '''
     Some features of this distribution:
 
@@ -112,42 +134,53 @@ def normal(mu=0.0, sigma=1.0):
 
     :param mu: The mean of the distribution
     :param sigma: The standard deviation of the distribution
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.normalvariate(mu, sigma))
+    return ContinuousDistribution(sampler=lambda state, count: state.normal(mu, sigma, count),
+        random_state=random_state)
 
-def beta(alpha, beta):
+def beta(alpha, beta, random_state=None):
     '''
 
     :param alpha: The alpha parameter
     :param beta: The beta parameter
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.betavariate(alpha, beta))
+    return ContinuousDistribution(sampler=lambda state, count: state.beta(alpha, beta, count),
+        random_state=random_state)
 
-def weibull(alpha, beta):
+def weibull(alpha, beta, random_state=None):
     '''
 
     :param alpha: The scale parameter
     :param beta: The shape parameter
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.weibullvariate(alpha, beta))
+    return ContinuousDistribution(sampler=lambda state, count: alpha * state.weibull(beta, count),
+        random_state=random_state)
 
-def pareto(alpha):
+def pareto(alpha, random_state=None):
     '''
 
     :param alpha: The shape parameter
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.paretovariate(alpha))
+    return ContinuousDistribution(sampler=lambda state, count: state.pareto(alpha, count) + 1.0,
+        random_state=random_state)
 
-def triangular(low=0.0, high=1.0, mode=None):
+def triangular(low=0.0, high=1.0, mode=None, random_state=None):
     '''
 
     :param low: The low value of the distribution (default 0.0)
     :param high: The high value of the distribution (default 1.0)
     :param mode: The mode between these bounds (default midpoint)
+    :param random_state: The numpy RandomState to sample with
     '''
-    return ContinuousDistribution(lambda: random.triangular(low, high, mode))
+    mode = (low + high) / 2.0 if mode is None else mode
+    return ContinuousDistribution(sampler=lambda state, count: state.triangular(low, mode, high, count),
+        random_state=random_state)
 
-def gamma(alpha, beta):
+def gamma(alpha, beta, random_state=None):
     ''' The probability distribution function is::
 
                   x ** (alpha - 1) * math.exp(-x / beta)
@@ -156,6 +189,8 @@ def gamma(alpha, beta):
 
     :param alpha: The alpha parameter
     :param beta: The beta parameter
+    :param random_state: The numpy RandomState to sample with
     '''
     assert( alpha > 0 and beta > 0 )
-    return ContinuousDistribution(lambda: random.gammavariate(alpha, beta))
+    return ContinuousDistribution(sampler=lambda state, count: state.gamma(alpha, beta, count),
+        random_state=random_state)
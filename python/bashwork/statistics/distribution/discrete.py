@@ -7,7 +7,6 @@
 - conditional distribution P(a|b) = P(a,b) / P(b)
   - normalization trick
 '''
-import random
 from collections import Counter
 import numpy as np
 import pandas as pd
@@ -24,44 +23,72 @@ class Distribution(object):
     '''
 
     @classmethod
-    def create(klass, values, name=None):
+    def create(klass, values, name=None, random_state=None):
         ''' Given a collection of values, create a
         distribution of those values with the supplied name
         of the variable.
 
         :param values: The values to create a distribution of
         :param name: The name of the variable
+        :param random_state: The numpy RandomState to sample with
         :returns: An initialized distribution over those values
         '''
         counts = normalize(Counter(values))
         counts = pd.Series(counts, name=name or 'X')
-        return klass(counts)
+        return klass(counts, random_state)
 
-    def __init__(self, table):
+    SEARCH_SIZE = 4096 # batches this large are drawn by searchsorted
+
+    def __init__(self, table, random_state=None):
         ''' Initialize a new instance of the Distribution class
 
         :param table: A mapping of value to its probability
-        :param name: The name of the distribution variable
+        :param random_state: The numpy RandomState to sample with (default np.random)
         '''
         self.table  = table
         self.cumsum = self.table.cumsum()
+        self.values = np.asarray(self.table.index)
+        self.alias  = None
+        self.random_state = np.random if random_state is None else random_state
+
+    def get_alias(self):
+        ''' Retrieve the alias table of the distribution,
+        building it on the first call.
+
+        :returns: The (probability, alias) of every value
+        '''
+        if self.alias is None:
+            self.alias = alias_table(self.table.values)
+        return self.alias
 
     def sample(self, count=1):
         ''' Sample the existing distribution the supplied
-        number of times.
+        number of times. A single sample (or a small batch) is
+        drawn from the alias table in constant time per draw, and
+        a large batch is drawn with a binary search of the
+        cumulative probabilities. Every draw comes from the
+        random state of the distribution.
 
         :param count: The number of samples to retrieve (default 1)
         :returns: The requested number of samples
         '''
-        rands = sorted(random.random() for _ in range(count))
-        samid, ranid = 0, 0
-        results = []
-        while len(results) < count:
-            if rands[ranid] < self.cumsum[samid]:
-                results.append(self.cumsum.index[samid])
-                ranid += 1
-            else: samid += 1
-        return results[0] if count == 1 else results
+        state = self.random_state
+        if count == 1:
+            prob, alias = self.get_alias()
+            index = state.randint(len(prob))
+            if state.random_sample() >= prob[index]: index = alias[index]
+            return self.values[index]
+
+        if count >= self.SEARCH_SIZE:
+            bounds  = self.cumsum.values
+            indexes = np.searchsorted(bounds, state.random_sample(count) * bounds[-1], side='right')
+            indexes = np.minimum(indexes, len(bounds) - 1)
+        else:
+            prob, alias = self.get_alias()
+            indexes = state.randint(len(prob), size=count)
+            flips   = state.random_sample(count) >= prob[indexes]
+            indexes[flips] = alias[indexes[flips]]
+        return self.values[indexes]
 
     def is_valid(self):
         ''' Check if the underlying distribution correctly
@@ -102,28 +129,40 @@ class Distribution(object):
     __call__ = get
 
 class JointDistribution(object):
-    '''
+    ''' Models a joint probability distribution of a
+    number of variables, keyed by the tuple of their values::
+
+        P(A, B)
+        ------------
+        P(0, 0) -> 0.25
+        P(0, 1) -> 0.75
+
+    The marginal tables are computed the first time they
+    are asked for and cached.
     '''
 
     @classmethod
     def create(klass, values, names=None):
+        ''' Given a collection of value tuples, create a
+        joint distribution of those values.
+
+        :param values: The value tuples to create a distribution of
+        :param names: The names of the variables
+        :returns: An initialized distribution over those values
         '''
-        '''
-        count = Counter(values)
-        total = float(sum(count.values()))
-        value = { k: v / total for k, v in count.items() }
-        return klass(value, names)
+        return klass(normalize(Counter(values)), names)
 
     def __init__(self, table, names=None):
         ''' Initialize a new instance of the JointDistribution class
 
-        :param table: A mapping of value to its probability
+        :param table: A mapping of value tuple to its probability
+        :param names: The names of the variables (default A, B, ...)
         '''
-        #TODO [x][y]...[z]
         self.table = table
-        self.count = 0
-        self.names = names or [chr(65 + i) for i in range(self.count)]
-        self.names = { n:i for i, n in enumerate(names) }
+        self.count = len(next(iter(table))) if table else 0
+        self.names = list(names or [chr(65 + i) for i in range(self.count)])
+        self.index = { n:i for i, n in enumerate(self.names) }
+        self.marginals = {}
 
     def is_valid(self):
         ''' Check if the underlying distribution correctly
@@ -131,33 +170,63 @@ class JointDistribution(object):
 
         :returns: True if the values sum to 1, else False
         '''
-        # TODO
         return (all(v >= 0 for v in self.table.values())
            and (0.999 <= sum(self.table.values()) <= 1.0))
 
+    def get_marginal(self, names):
+        ''' Retrieve the marginal table of the supplied
+        variables, summing out the others on the first call.
+
+        :param names: The names of the variables to keep
+        :returns: A mapping of value tuple to its probability
+        '''
+        names = tuple(names)
+        if names not in self.marginals:
+            columns  = [self.index[name] for name in names]
+            marginal = Counter()
+            for key, prob in self.table.items():
+                marginal[tuple(key[c] for c in columns)] += prob
+            self.marginals[names] = dict(marginal)
+        return self.marginals[names]
+
+    def marginal(self, name):
+        ''' Reduce the joint distribution to the distribution
+        of a single variable.
+
+        :param name: The name of the variable to keep
+        :returns: The distribution of that variable
+        '''
+        table = self.get_marginal([name])
+        table = pd.Series({ k[0]: v for k, v in table.items() }, name=name)
+        return Distribution(table)
+
     def get(self, *args, **kwargs):
         ''' Retrieve the probability of the specified conditions::
 
-            dist.get(1)      # probability that X is 1
-            dist.get(1,2,3)  # probability that X is 1, 2, or 3
-            dist.get(X=3)    # probability that X is 3
+            dist.get(1, 2)     # probability that A is 1 and B is 2
+            dist.get(A=1)      # probability that A is 1
+            dist.get(1, B=2)   # probability that A is 1 and B is 2
 
-        :param args: The variables to test
-        :param kwargs: The named variable to test (only matching name)
+        :param args: The values of the variables in order
+        :param kwargs: The values of the named variables
         :returns: The joint probability of the variables
         '''
-        keys = zip(self.names, args) if args else kwargs
-        if self.name in kwargs: keys += (kwargs[self.name],)
-        return sum(self.table[k] for k in keys)
+        values = dict(zip(self.names, args))
+        values.update(kwargs)
+        if len(values) == self.count:
+            return self.table.get(tuple(values[n] for n in self.names), 0.0)
+        names = sorted(values, key=self.index.get)
+        table = self.get_marginal(names)
+        return table.get(tuple(values[n] for n in names), 0.0)
 
     def __str__(self):
         ''' Output a table representing the probability
-        distribution of this variable.
+        distribution of these variables.
         '''
-        #TODO [x][y]...[z]
-        output = ['P({})'.format(self.name)]
-        for key, prob in self.table.items():
-            output.append('P({}) -> {:.2f}'.format(key, prob))
+        output = ['P({})'.format(', '.join(self.names))]
+        for key, prob in sorted(self.table.items()):
+            output.append('P({}) -> {:.2f}'.format(', '.join(map(str, key)), prob))
         return '\n'.join(output)
 
     __repr__ = __str__
+    __call__ = get
@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+import random
+import unittest
+import numpy as np
+from bashwork.statistics.distribution.continuous import *
+
+class ContinuousDistributionTest(unittest.TestCase):
+
+    def test_sample(self):
+        random.seed(1)
+        np.random.seed(1)
+        for dist, mean in [
+            (uniform(2.0, 4.0), 3.0),
+            (exponential(2.0), 0.5),
+            (gaussian(1.0, 2.0), 1.0),
+            (normal(-1.0, 0.5), -1.0),
+            (log(0.0, 0.5), np.exp(0.125)),
+            (beta(2.0, 6.0), 0.25),
+            (weibull(2.0, 1.0), 2.0),
+            (pareto(3.0), 1.5),
+            (triangular(0.0, 3.0), 1.5),
+            (gamma(2.0, 3.0), 6.0)]:
+            samples = dist.sample(20000)
+            self.assertTrue(isinstance(samples, np.ndarray))
+            self.assertEqual(20000, len(samples))
+            self.assertAlmostEqual(mean, samples.mean(), delta=0.1 * max(1.0, abs(mean)))
+            generated = np.array([dist.sample() for _ in xrange(5000)])
+            self.assertAlmostEqual(mean, generated.mean(), delta=0.15 * max(1.0, abs(mean)))
+
+        angles = vonmises(1.0, 4.0).sample(1000)
+        self.assertTrue(((angles >= 0) & (angles < 2 * np.pi)).all())
+
+    def test_sample_without_sampler(self):
+        dist = ContinuousDistribution(lambda: 1.0)
+        self.assertEqual(1.0, dist.sample())
+        self.assertEqual([1.0, 1.0], list(dist.sample(2)))
+
+    def test_random_state(self):
+        for factory, args in [(uniform, ()), (exponential, (2.0,)), (gaussian, ()),
+            (vonmises, ()), (log, ()), (normal, ()), (beta, (2.0, 6.0)),
+            (weibull, (2.0, 1.0)), (pareto, (3.0,)), (triangular, ()), (gamma, (2.0, 3.0))]:
+            first  = factory(*args, random_state=np.random.RandomState(7))
+            second = factory(*args, random_state=np.random.RandomState(7))
+            self.assertEqual(first.sample(), second.sample())
+            self.assertTrue(np.array_equal(first.sample(10), second.sample(10)))
+
+            state = np.random.RandomState(3)
+            dist  = factory(*args, random_state=state)
+            singles = [dist.sample() for _ in xrange(5)]
+            state.seed(3)
+            self.assertEqual(singles, list(dist.sample(5)))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
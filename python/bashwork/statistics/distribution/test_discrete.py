@@ -1,7 +1,10 @@
 #!/usr/bin/env python
+import random
 import unittest
+import numpy as np
 import pandas as pd
 from bashwork.statistics.distribution.discrete import *
+from bashwork.statistics.distribution.truthtable import TruthTable
 
 class DiscreteDistributionTest(unittest.TestCase):
 
@@ -21,6 +24,64 @@ class DiscreteDistributionTest(unittest.TestCase):
         prob = pd.Series({'a': 0.2, 'b': 0.2, 'c': 0.2, 'd': 0.6, 'e': -0.2})
         self.assertFalse(Distribution(prob).is_valid())
 
+    def test_sample(self):
+        random.seed(1)
+        np.random.seed(1)
+        dist = Distribution(pd.Series({'a': 0.1, 'b': 0.2, 'c': 0.7, 'd': 0.0}))
+        self.assertTrue(dist.sample() in ('a', 'b', 'c'))
+
+        for count in (2000, Distribution.SEARCH_SIZE * 4):
+            samples = dist.sample(count)
+            self.assertEqual(count, len(samples))
+            for key, prob in dist.table.iteritems():
+                self.assertAlmostEqual(prob, (samples == key).mean(), delta=0.04)
+
+    def test_random_state(self):
+        table  = pd.Series({'a': 0.1, 'b': 0.2, 'c': 0.7})
+        first  = Distribution(table, np.random.RandomState(5))
+        second = Distribution(table, np.random.RandomState(5))
+        self.assertEqual([first.sample() for _ in xrange(20)], [second.sample() for _ in xrange(20)])
+        for count in (20, Distribution.SEARCH_SIZE):
+            self.assertTrue(np.array_equal(first.sample(count), second.sample(count)))
+
+        dist = Distribution.create('aabbbc', random_state=np.random.RandomState(2))
+        expected = [dist.sample() for _ in xrange(20)]
+        random.seed(9) # the single draws do not use the random module
+        dist.random_state.seed(2)
+        self.assertEqual(expected, [dist.sample() for _ in xrange(20)])
+
+class JointDistributionTest(unittest.TestCase):
+
+    def setUp(self):
+        values = [(0, 0), (0, 1), (0, 1), (1, 1)]
+        self.dist = JointDistribution.create(values, names=['A', 'B'])
+
+    def test_is_valid(self):
+        self.assertTrue(self.dist.is_valid())
+        self.assertEqual(['A', 'B'], JointDistribution({(1, 2): 1.0}).names)
+
+    def test_get(self):
+        self.assertEqual(0.5, self.dist.get(0, 1))
+        self.assertEqual(0.0, self.dist.get(1, 0))
+        self.assertEqual(0.25, self.dist(A=1, B=1))
+        self.assertEqual(0.75, self.dist.get(A=0))
+        self.assertEqual(0.75, self.dist.get(B=1))
+        self.assertEqual({ (0,): 0.25, (1,): 0.75 }, self.dist.marginals[('B',)])
+
+    def test_marginal(self):
+        marginal = self.dist.marginal('B')
+        self.assertEqual(0.25, marginal.get(0))
+        self.assertTrue(marginal.is_valid())
+
+class TruthTableTest(unittest.TestCase):
+
+    def test_get(self):
+        table = TruthTable([[0,0,0],[0,1,0],[1,0,0], [1,1,1]], ['a', 'b', 'y'])
+        self.assertTrue(table(a=1, b=1))
+        self.assertFalse(table(a=1, b=0))
+        self.assertTrue(table.get(a=1, b=1) is table.get(b=1, a=1))
+        self.assertTrue(table(a=1)(b=1))
+
 #---------------------------------------------------------------------------#
 # main
 #---------------------------------------------------------------------------#
@@ -10,7 +10,7 @@ class TruthTable(object):
         table(a=0, b=0) # False
     ''' 
 
-    def __init__(self, table, labels):
+    def __init__(self, table, labels=None):
         ''' Initialize a new instance of a TruthTable.
         The supplied table can be an array like value or
         a pandas DataFrame which will be used directly.
@@ -18,24 +18,31 @@ class TruthTable(object):
         :param table: The table of values to map to a frame
         :param labels: The labels to assign to the table
         '''
-        if not isinstance(table, pd.DataFrame)
+        if not isinstance(table, pd.DataFrame):
             self.table = pd.DataFrame(table, columns=labels)
         else: self.table = table
+        self.cache = {}
 
     def get(self, *args, **kwargs):
-        ''' Retrieve the probability of the specified conditions::
+        ''' Retrieve the value of the specified conditions::
 
-            dist.get(A=1, B=1)      # probability that X is 1
-            dist.get(1,2,3)  # probability that X is 1, 2, or 3
-            dist.get(X=3)    # probability that X is 3
+            table.get(a=1, b=1)  # the output when a and b are 1
+            table.get(a=1)       # the table of the rest when a is 1
 
-        :param args: The variables to test
-        :param kwargs: The named variable to test (only matching name)
-        :returns: The joint probability of the variables
+        The result of each set of conditions is cached.
+
+        :param args: Unused
+        :param kwargs: The value of each named input
+        :returns: The output value or the reduced truth table
         '''
-        method = lambda B, n: B[B[n[0]] == n[1]].drop(n[0], axis=1)
-        values = reduce(method, kwargs.items(), self.table)
-        return bool(values.irow(0)) if len(values) == 1 else TruthTable(values)
+        key = tuple(sorted(kwargs.items()))
+        if key not in self.cache:
+            method = lambda B, n: B[B[n[0]] == n[1]].drop(n[0], axis=1)
+            values = reduce(method, kwargs.items(), self.table)
+            if len(values) == 1 and len(values.columns) == 1:
+                self.cache[key] = bool(values.iloc[0, 0])
+            else: self.cache[key] = TruthTable(values)
+        return self.cache[key]
 
     def __str__(self): return str(self.table)
 
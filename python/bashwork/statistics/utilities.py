@@ -1,4 +1,5 @@
 import random
+import numpy as np
 from collections import Counter
 
 def histogram(iterable):
@@ -29,3 +30,66 @@ def normalize(mapping):
     total = float(sum(mapping.values()))
     assert ( total > 0.0 )
     return { k: v / total for k, v in mapping.items() }
+
+def alias_table(weights):
+    ''' Build the Walker alias table of the supplied weights
+    with Vose's method, so that a draw is a single uniform column
+    and a single biased coin flip.
+
+    :param weights: The weights of the outcomes
+    :returns: The (probability, alias) of every column
+    '''
+    count  = len(weights)
+    scaled = np.asarray(weights, dtype=np.float64) * count / np.sum(weights)
+    prob, alias = np.ones(count), np.zeros(count, dtype=np.int64)
+    small = [i for i in xrange(count) if scaled[i] < 1.0]
+    large = [i for i in xrange(count) if scaled[i] >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less], alias[less] = scaled[less], more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    for index in small + large: # numerical leftovers are certain
+        prob[index], alias[index] = 1.0, index
+    return prob, alias
+
+def alias_tables(weights, indptr):
+    ''' Build the alias tables of many rows of weights at once,
+    where row r is `weights[indptr[r]:indptr[r + 1]]`. The weights
+    of each row are sorted so the small columns are taken from the
+    front and the large columns from the back, and every row pairs
+    one small column with one large column per pass.
+
+    :param weights: The flat weights of every row
+    :param indptr: The start of every row and the end of the last
+    :returns: The (probability, alias in the row) of every column
+    '''
+    weights = np.asarray(weights, dtype=np.float64)
+    indptr  = np.asarray(indptr, dtype=np.int64)
+    lengths = np.diff(indptr)
+    rows    = np.repeat(np.arange(len(lengths)), lengths)
+    totals  = np.bincount(rows, weights, minlength=len(lengths))
+    scaled  = weights * lengths[rows] / totals[rows]
+    order   = np.lexsort((scaled, rows)) # the rows stay in place
+    scaled  = scaled[order]
+    prob, alias = np.ones(len(weights)), np.arange(len(weights)) # leftovers are certain
+
+    small  = indptr[:-1].copy()    # the column being paid for
+    after  = indptr[:-1] + 1       # the next unused small column
+    large  = indptr[1:] - 1        # the column paying for it
+    active = np.flatnonzero(lengths > 1)
+    while len(active):
+        less, more = small[active], large[active]
+        valid = (more >= after[active]) & (scaled[less] < 1.0)
+        active, less, more = active[valid], less[valid], more[valid]
+        prob[less], alias[less] = scaled[less], more
+        scaled[more] -= 1.0 - scaled[less]
+        spent = scaled[more] < 1.0 # the large column is small now
+        small[active] = np.where(spent, more, after[active])
+        large[active] = np.where(spent, more - 1, more)
+        after[active] += ~spent
+
+    result_prob, result_alias = np.empty(len(weights)), np.empty(len(weights), dtype=np.int64)
+    result_prob[order]  = prob
+    result_alias[order] = order[alias] - indptr[rows]
+    return result_prob, result_alias
@@ -1,4 +1,6 @@
 import math
+import binascii
+import numpy as np
 
 #------------------------------------------------------------
 # helper methods
@@ -432,3 +434,459 @@ class BitArray(object):
     def __invert__(self):         return BitArray(self.__blk, array=[~x & self.__set for x in self.array]) 
     def __neg__(self):            return BitArray(self.__blk, array=[-x & self.__set for x in self.array]) 
     def __pos__(self):            return self
+
+
+#------------------------------------------------------------
+# buffer backed bit array
+#------------------------------------------------------------
+class BufferBitArray(object):
+    ''' This is a bit array that is backed by a contiguous
+    numpy array of little endian 64 bit words, so every bulk
+    operation runs in numpy instead of the interpreter.
+
+    The underlying memory is exposed with `to_buffer`, so it can
+    be written to a socket or file without a copy, and an array can
+    be created over an existing buffer (say a memory map) with::
+
+        barray = BufferBitArray(buffer=mmap.mmap(...))
+        barray.set_many([1, 5, 1000])
+        handle.write(barray.to_buffer())
+
+    ..note:: an array over a read only buffer cannot be updated, and
+       growing the array past its buffer copies it to new memory.
+    '''
+
+    __msk_to_cnt = np.array(generate_bit_count_table(256), dtype=np.uint8)
+    __blk = 64
+    __one = np.uint64(1)
+    __set = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+    def __init__(self, size=64, buffer=None):
+        ''' Initialize a new instance of the bit array
+
+        :param size: The initial size of the bit array (default 64 bits)
+        :param buffer: The buffer to use as the words (default None)
+        '''
+        if buffer is not None:
+            self.words = np.frombuffer(buffer, dtype='<u8')
+        else: self.words = np.zeros(max(1, -(-size // self.__blk)), dtype='<u8')
+
+    #------------------------------------------------------------
+    # internal helpers
+    #------------------------------------------------------------
+
+    def __word_index(self, bit):
+        if bit < 0:
+            raise IndexError("bit position < 0: %d" % bit)
+        return bit >> 6, self.__one << np.uint64(bit & 63)
+
+    def __word_indexes(self, positions):
+        positions = np.asarray(positions, dtype=np.int64).ravel()
+        if positions.size and positions.min() < 0:
+            raise IndexError("bit position < 0: %d" % positions.min())
+        return positions >> 6, np.left_shift(self.__one, (positions & 63).astype(np.uint64))
+
+    def __check_range(self, start, end):
+        if start < 0: raise IndexError("start position < 0: %d" % start)
+        if end < 0: raise IndexError("end position < 0: %d" % end)
+        if start > end: raise IndexError("start[%d] > end[%d]" % (start, end))
+
+    def __expand_array(self, size):
+        ''' Grow the words (at least doubling them) so that
+        there are at least the supplied number of words.
+        '''
+        if size > len(self.words):
+            words = np.zeros(max(size, 2 * len(self.words)), dtype='<u8')
+            words[:len(self.words)] = self.words
+            self.words = words
+
+    def __range_update(self, start, end, operation):
+        ''' Apply the supplied in place operation to the
+        words covering the (inclusive) range with the masks
+        of the bits in the range.
+        '''
+        self.__check_range(start, end)
+        sidx, eidx = start >> 6, end >> 6
+        self.__expand_array(eidx + 1)
+        smask = self.__set << np.uint64(start & 63)
+        emask = self.__set >> np.uint64(63 - (end & 63))
+        if sidx == eidx:
+            operation(self.words[sidx:sidx + 1], smask & emask)
+        else:
+            operation(self.words[sidx:sidx + 1], smask)
+            operation(self.words[sidx + 1:eidx], self.__set)
+            operation(self.words[eidx:eidx + 1], emask)
+
+    def __trimmed(self):
+        ''' Return the words without the trailing cleared words.
+        '''
+        used = np.flatnonzero(self.words)
+        return self.words[:used[-1] + 1] if used.size else self.words[:0]
+
+    #------------------------------------------------------------
+    # information methods
+    #------------------------------------------------------------
+
+    @property
+    def first_set_bit(self):
+        ''' Return the index of the next set bit.
+
+        :returns: The index of the next set bit.
+        '''
+        used = np.flatnonzero(self.words)
+        if not used.size: return None
+        bits = int(self.words[used[0]])
+        return (bits & -bits).bit_length() - 1 + int(used[0]) * self.__blk
+
+    @property
+    def last_set_bit(self):
+        ''' Return the index of the last set bit.
+
+        :returns: The index of the last set bit.
+        '''
+        used = np.flatnonzero(self.words)
+        if not used.size: return None
+        bits = int(self.words[used[-1]])
+        return bits.bit_length() - 1 + int(used[-1]) * self.__blk
+
+    @property
+    def first_clear_bit(self):
+        ''' Return the index of the first cleared bit.
+
+        :returns: The index of the first cleared bit.
+        '''
+        free = np.flatnonzero(self.words != self.__set)
+        if not free.size: return None # no bits are cleared
+        bits = int(self.words[free[0]])
+        return (~bits & bits + 1).bit_length() - 1 + int(free[0]) * self.__blk
+
+    @property
+    def cardinality(self):
+        ''' Returns the cardinality of the bit array.
+
+        :returns: The number of set bits in the bit array.
+        '''
+        return int(self.__msk_to_cnt[self.words.view(np.uint8)].sum())
+
+    @property
+    def parity(self):
+        ''' Return the parity of the bit array.
+
+        - Even parity will be 0x0
+        - Odd  parity will be 0x1.
+
+        :returns: The parity of the bit array
+        '''
+        return self.cardinality & 0x1
+
+    @property
+    def length_of_bits(self):
+        ''' Returns the length of the currently used
+        bit space (the last set bit)
+
+        :returns: The current bit length
+        '''
+        bit = self.last_set_bit
+        return 0 if bit == None else bit + 1
+
+    @property
+    def length_of_bytes(self):
+        ''' Returns the length of the currently
+        allocated number of bytes.
+
+        :returns: The current bytes length
+        '''
+        return self.words.nbytes
+
+    @property
+    def length_of_buffer(self):
+        ''' Returns the length of the currently
+        allocated buffer.
+
+        :returns: The current buffer length
+        '''
+        return len(self.words) * self.__blk
+
+    #------------------------------------------------------------
+    # set methods
+    #------------------------------------------------------------
+
+    def set(self, pos):
+        ''' Set the value at the specified bit
+        position to 1.
+
+        :param pos: The position to set the value for
+        '''
+        idx, bit = self.__word_index(pos)
+        self.__expand_array(idx + 1)
+        self.words[idx] |= bit
+
+    def set_many(self, positions):
+        ''' Set the values at all the specified bit
+        positions to 1.
+
+        :param positions: The positions to set the values for
+        '''
+        idxs, bits = self.__word_indexes(positions)
+        if not idxs.size: return
+        self.__expand_array(int(idxs.max()) + 1)
+        np.bitwise_or.at(self.words, idxs, bits)
+
+    def set_range(self, start, end):
+        ''' Set the values in the specified (inclusive)
+        range to 1.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        '''
+        def operation(words, mask): words |= mask
+        self.__range_update(start, end, operation)
+
+    def set_all(self):
+        ''' Sets the value of all the underlying bits to 1.
+        '''
+        self.words[:] = self.__set
+
+    #------------------------------------------------------------
+    # clear methods
+    #------------------------------------------------------------
+
+    def clear(self, pos):
+        ''' Set the value at the specified bit
+        position to 0.
+
+        :param pos: The position to set the value for
+        '''
+        idx, bit = self.__word_index(pos)
+        if idx < len(self.words):
+            self.words[idx] &= ~bit
+
+    def clear_many(self, positions):
+        ''' Set the values at all the specified bit
+        positions to 0.
+
+        :param positions: The positions to set the values for
+        '''
+        idxs, bits = self.__word_indexes(positions)
+        inside = idxs < len(self.words)
+        np.bitwise_and.at(self.words, idxs[inside], ~bits[inside])
+
+    def clear_range(self, start, end):
+        ''' Sets the value of the bits in the (inclusive)
+        range to 0.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        '''
+        def operation(words, mask): words &= ~mask
+        self.__range_update(start, end, operation)
+
+    def clear_all(self):
+        ''' Sets the value of all the underlying bits to 0.
+        '''
+        self.words[:] = 0
+
+    #------------------------------------------------------------
+    # flip methods
+    #------------------------------------------------------------
+
+    def flip(self, pos):
+        ''' Flip the value at the specified bit
+        position.
+
+        :param pos: The position to flip the value for
+        '''
+        idx, bit = self.__word_index(pos)
+        self.__expand_array(idx + 1)
+        self.words[idx] ^= bit
+
+    def flip_many(self, positions):
+        ''' Flip the values at all the specified bit
+        positions (repeated positions flip repeatedly).
+
+        :param positions: The positions to flip the values for
+        '''
+        idxs, bits = self.__word_indexes(positions)
+        if not idxs.size: return
+        self.__expand_array(int(idxs.max()) + 1)
+        np.bitwise_xor.at(self.words, idxs, bits)
+
+    def flip_range(self, start, end):
+        ''' Flip the values in the specified (inclusive)
+        bit range.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        '''
+        def operation(words, mask): words ^= mask
+        self.__range_update(start, end, operation)
+
+    def flip_all(self):
+        ''' Flip the value of all the underlying bits.
+        '''
+        np.invert(self.words, out=self.words)
+
+    #------------------------------------------------------------
+    # get methods
+    #------------------------------------------------------------
+
+    def get(self, pos):
+        ''' Get the value at the specified bit
+        position.
+
+        :param pos: The position to get the value for
+        :returns: True if the value is set, false otherwise
+        '''
+        idx, bit = self.__word_index(pos)
+        return idx < len(self.words) and bool(self.words[idx] & bit)
+
+    def get_many(self, positions):
+        ''' Get the values at all the specified bit
+        positions.
+
+        :param positions: The positions to get the values for
+        :returns: A boolean array of the values
+        '''
+        idxs, bits = self.__word_indexes(positions)
+        values = np.zeros(len(idxs), dtype=bool)
+        inside = idxs < len(self.words)
+        values[inside] = (self.words[idxs[inside]] & bits[inside]) != 0
+        return values
+
+    def get_range(self, start, end):
+        ''' Get the values in the specified (inclusive)
+        range.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        :returns: The bit values in the specified range.
+        '''
+        self.__check_range(start, end)
+        words = self.words[start >> 6:(end >> 6) + 1]
+        if not words.size: return 0
+        bits = int(binascii.hexlify(words.tobytes()[::-1]), 16) >> (start & 63)
+        return bits & ((1 << (end - start + 1)) - 1)
+
+    #------------------------------------------------------------
+    # format methods
+    #------------------------------------------------------------
+
+    def to_buffer(self):
+        ''' Return a zero copy view of the underlying words
+
+        :returns: A read only buffer of the words
+        '''
+        return buffer(self.words)
+
+    def to_bool_array(self):
+        ''' Return the bit array represented as a numpy
+        boolean array (of the whole allocated buffer).
+
+        :returns: The bit array as a boolean array
+        '''
+        bits = np.unpackbits(self.words.view(np.uint8)).reshape(-1, 8)
+        return bits[:, ::-1].ravel().astype(bool)
+
+    def to_positions(self):
+        ''' Return the positions of all the set bits
+
+        :returns: A numpy array of the set bit positions
+        '''
+        return np.flatnonzero(self.to_bool_array())
+
+    def to_byte_string(self):
+        ''' Return the bit array represented as a hex string
+
+        :returns: The bit array represented as a hex string
+        '''
+        return '0x' + ''.join('%016X' % x for x in reversed(self.words.tolist()))
+
+    def to_bit_string(self):
+        ''' Return the bit array represented as a bit string
+
+        :returns: The bit array represented as a bit string
+        '''
+        return '0b' + ''.join('{0:064b}'.format(x) for x in reversed(self.words.tolist()))
+
+    def to_byte_list(self):
+        ''' Return the bit array represented as a list of words
+
+        :returns: The bit array represented as a list of words
+        '''
+        return self.words.tolist()
+
+    def to_bit_list(self):
+        ''' Return the bit array represented as a list of bits
+
+        :returns: The bit array represented as a list of bits
+        '''
+        return self.to_bool_array()[:len(self)].tolist()
+
+    def iter_by_bit(self):
+        ''' Return the bit array represented as a bit iterator
+
+        :returns: The bit array represented as a bit iterator
+        '''
+        return iter(self.to_bit_list())
+
+    def copy(self):
+        ''' Return a copy of the current bit array
+
+        :returns: A copy of the current bit array
+        '''
+        result = BufferBitArray(size=0)
+        result.words = self.words.copy()
+        return result
+
+    #------------------------------------------------------------
+    # in place operations
+    #------------------------------------------------------------
+
+    def __iand__(self, other):
+        size = min(len(self.words), len(other.words))
+        np.bitwise_and(self.words[:size], other.words[:size], out=self.words[:size])
+        self.words[size:] = 0
+        return self
+
+    def __ior__(self, other):
+        size = len(other.words)
+        self.__expand_array(size)
+        np.bitwise_or(self.words[:size], other.words, out=self.words[:size])
+        return self
+
+    def __ixor__(self, other):
+        size = len(other.words)
+        self.__expand_array(size)
+        np.bitwise_xor(self.words[:size], other.words, out=self.words[:size])
+        return self
+
+    def __isub__(self, other):
+        size = min(len(self.words), len(other.words))
+        self.words[:size] &= ~other.words[:size]
+        return self
+
+    #------------------------------------------------------------
+    # magic methods
+    #------------------------------------------------------------
+
+    def __array__(self):          return self.words
+    def __iter__(self):           return self.iter_by_bit()
+    def __reversed__(self):       return reversed(self.to_bit_list())
+    def __contains__(self, pos):  return self.get(pos)
+    def __nonzero__(self):        return bool(self.words.any())
+    def __hash__(self):           return hash(self.__trimmed().tobytes())
+    def __repr__(self):           return self.to_byte_string()
+    def __str__(self):            return self.to_byte_string()
+    def __len__(self):            return self.length_of_bits
+    def __eq__(self, other):      return np.array_equal(self.__trimmed(), other.__trimmed())
+    def __ne__(self, other):      return not self == other
+    def __and__(self, other):     return self.copy().__iand__(other)
+    def __or__(self, other):      return self.copy().__ior__(other)
+    def __xor__(self, other):     return self.copy().__ixor__(other)
+    def __sub__(self, other):     return self.copy().__isub__(other)
+    def __pos__(self):            return self
+
+    def __invert__(self):
+        result = self.copy()
+        result.flip_all()
+        return result
@@ -0,0 +1,659 @@
+'''
+Roaring Bit Array
+------------------------------------------------------------
+
+This is a compressed bit array based on Roaring bitmaps
+(http://roaringbitmap.org). The bit space is split into chunks of
+2^16 bits which are keyed by the high 16 bits of the position. Only
+the chunks that contain set bits are stored, and each chunk is held
+in whichever of the following containers is the smallest:
+
+* `ArrayContainer` - a sorted array of the low 16 bits (sparse chunks)
+* `BitmapContainer` - a single 2^16 bit integer (dense chunks)
+* `RunContainer` - a sorted array of (start, end) runs (clustered chunks)
+
+It keeps the same interface as `BitArray`, so it can be used in its
+place when the set bits are sparse over a very large range::
+
+    users = RoaringBitArray([12, 10000000, 400000000])
+    users.set_range(1000, 5000)
+    users &= segment
+    print users.cardinality, users.rank(5000), users.select(10)
+
+..note:: `in` tests for the bit position, not for a word value
+'''
+import re
+import binascii
+import operator
+from array import array
+from bisect import bisect_left, bisect_right, insort_left
+
+#------------------------------------------------------------
+# helper methods
+#------------------------------------------------------------
+
+CHUNK_BITS  = 16
+CHUNK_SIZE  = 1 << CHUNK_BITS
+CHUNK_MASK  = CHUNK_SIZE - 1
+ARRAY_LIMIT = 4096
+RUN_REGEX = re.compile('1+')
+
+
+def popcount(bits):
+    ''' Count the number of set bits in the supplied integer.
+
+    :param bits: The integer to count the bits of
+    :returns: The number of set bits
+    '''
+    return bin(bits).count('1')
+
+
+def bits_to_values(bits):
+    ''' Given an integer bitmap, return the sorted set positions.
+
+    :param bits: The integer bitmap
+    :returns: The sorted list of set positions
+    '''
+    string = bin(bits)[:1:-1]
+    return [i for i, c in enumerate(string) if c == '1']
+
+
+def bits_to_runs(bits):
+    ''' Given an integer bitmap, return the runs of set bits.
+
+    :param bits: The integer bitmap
+    :returns: The sorted list of inclusive (start, end) runs
+    '''
+    string = bin(bits)[:1:-1]
+    return [(m.start(), m.end() - 1) for m in RUN_REGEX.finditer(string)]
+
+
+def values_to_bits(values):
+    ''' Given a collection of positions below 2^16, return
+    the integer bitmap with those positions set.
+
+    :param values: The positions to set
+    :returns: The integer bitmap
+    '''
+    buffer = bytearray(CHUNK_SIZE >> 3)
+    for value in values:
+        buffer[value >> 3] |= 1 << (value & 7)
+    return int(binascii.hexlify(bytes(buffer[::-1])), 16)
+
+
+def make_container(bits):
+    ''' Given an integer bitmap of a chunk, return the smallest
+    container that can hold it (or None if it is empty).
+
+    :param bits: The integer bitmap of the chunk
+    :returns: The best container for the chunk
+    '''
+    if not bits: return None
+    runs = bits_to_runs(bits)
+    card = sum(end - start + 1 for start, end in runs)
+    size = min(2 * card, CHUNK_SIZE >> 3)
+    if 4 * len(runs) < size:
+        return RunContainer(runs)
+    if card <= ARRAY_LIMIT:
+        return ArrayContainer(bits_to_values(bits))
+    return BitmapContainer(bits, card)
+
+#------------------------------------------------------------
+# containers
+#------------------------------------------------------------
+
+class Container(object):
+    ''' The interface for a container of the low 16 bits
+    of the positions in a single chunk. The update methods
+    return the container that should replace the current one
+    (or None if the chunk is now empty).
+    '''
+
+    def to_bits(self):       raise NotImplementedError("to_bits")
+    def contains(self, low): raise NotImplementedError("contains")
+    def values(self):        return bits_to_values(self.to_bits())
+    def add(self, low):      return make_container(self.to_bits() | (1 << low))
+    def remove(self, low):   return make_container(self.to_bits() & ~(1 << low))
+    def rank(self, low):     return popcount(self.to_bits() & ((2 << low) - 1))
+    def select(self, index): return self.values()[index]
+    def minimum(self):       return self.select(0)
+    def maximum(self):       return self.to_bits().bit_length() - 1
+    def copy(self):          return make_container(self.to_bits())
+    def __iter__(self):      return iter(self.values())
+    def __eq__(self, other): return self.to_bits() == other.to_bits()
+    def __ne__(self, other): return not self == other
+
+
+class ArrayContainer(Container):
+    ''' A container for sparse chunks that stores the sorted
+    low 16 bits of each position.
+    '''
+
+    __slots__ = ['array']
+
+    def __init__(self, values):
+        self.array = array('H', values)
+
+    @property
+    def cardinality(self): return len(self.array)
+    def values(self):      return list(self.array)
+    def to_bits(self):     return values_to_bits(self.array)
+    def select(self, idx): return self.array[idx]
+    def maximum(self):     return self.array[-1]
+    def copy(self):        return ArrayContainer(self.array)
+    def rank(self, low):   return bisect_right(self.array, low)
+
+    def contains(self, low):
+        index = bisect_left(self.array, low)
+        return index < len(self.array) and self.array[index] == low
+
+    def add(self, low):
+        if self.contains(low): return self
+        if len(self.array) >= ARRAY_LIMIT:
+            return BitmapContainer(self.to_bits() | (1 << low), len(self.array) + 1)
+        insort_left(self.array, low)
+        return self
+
+    def remove(self, low):
+        index = bisect_left(self.array, low)
+        if index < len(self.array) and self.array[index] == low:
+            del self.array[index]
+        return self if self.array else None
+
+
+class BitmapContainer(Container):
+    ''' A container for dense chunks that stores a single
+    2^16 bit integer bitmap.
+    '''
+
+    __slots__ = ['bits', 'cardinality']
+
+    def __init__(self, bits, cardinality=None):
+        self.bits = bits
+        self.cardinality = popcount(bits) if cardinality is None else cardinality
+
+    def to_bits(self):       return self.bits
+    def contains(self, low): return bool((self.bits >> low) & 1)
+    def copy(self):          return BitmapContainer(self.bits, self.cardinality)
+
+    def minimum(self):
+        return (self.bits & -self.bits).bit_length() - 1
+
+    def add(self, low):
+        if not self.contains(low):
+            self.bits |= 1 << low
+            self.cardinality += 1
+        return self
+
+    def remove(self, low):
+        if not self.contains(low): return self
+        if self.cardinality - 1 <= ARRAY_LIMIT:
+            return make_container(self.bits & ~(1 << low))
+        self.bits &= ~(1 << low)
+        self.cardinality -= 1
+        return self
+
+
+class RunContainer(Container):
+    ''' A container for clustered chunks that stores the sorted
+    inclusive runs of the set bits.
+    '''
+
+    __slots__ = ['starts', 'ends']
+
+    def __init__(self, runs):
+        self.starts = array('H', (start for start, _ in runs))
+        self.ends   = array('H', (end for _, end in runs))
+
+    @property
+    def cardinality(self):
+        return sum(self.ends) - sum(self.starts) + len(self.starts)
+
+    def runs(self):    return zip(self.starts, self.ends)
+    def minimum(self): return self.starts[0]
+    def maximum(self): return self.ends[-1]
+    def copy(self):    return RunContainer(self.runs())
+
+    def to_bits(self):
+        return sum(((1 << (end - start + 1)) - 1) << start
+            for start, end in self.runs())
+
+    def values(self):
+        return [v for start, end in self.runs() for v in xrange(start, end + 1)]
+
+    def contains(self, low):
+        index = bisect_right(self.starts, low) - 1
+        return index >= 0 and low <= self.ends[index]
+
+    def rank(self, low):
+        index = bisect_right(self.starts, low)
+        total = sum(self.ends[:index]) - sum(self.starts[:index]) + index
+        if index and self.ends[index - 1] > low:
+            total -= self.ends[index - 1] - low
+        return total
+
+    def select(self, index):
+        for start, end in self.runs():
+            if index <= end - start: return start + index
+            index -= end - start + 1
+        raise IndexError("select index out of range")
+
+#------------------------------------------------------------
+# classes
+#------------------------------------------------------------
+
+class RoaringBitArray(object):
+    ''' A compressed bit array that keeps the `BitArray` interface
+    and stores each 2^16 chunk in its most compact container.
+    '''
+
+    def __init__(self, positions=None):
+        ''' Initialize a new instance of the bit array
+
+        :param positions: The initial positions to set (default None)
+        '''
+        self.keys = []       # sorted high 16 bits
+        self.containers = [] # container for each key
+        chunk, high = [], None
+        for position in sorted(set(positions or [])):
+            if position < 0:
+                raise IndexError("bit position < 0: %d" % position)
+            if position >> CHUNK_BITS != high:
+                self.__append(high, chunk)
+                chunk, high = [], position >> CHUNK_BITS
+            chunk.append(position & CHUNK_MASK)
+        self.__append(high, chunk)
+
+    #------------------------------------------------------------
+    # internal helpers
+    #------------------------------------------------------------
+
+    def __append(self, high, values):
+        if not values: return
+        self.keys.append(high)
+        if len(values) <= ARRAY_LIMIT:
+            self.containers.append(ArrayContainer(values))
+        else: self.containers.append(make_container(values_to_bits(values)))
+
+    def __split(self, pos):
+        if pos < 0:
+            raise IndexError("bit position < 0: %d" % pos)
+        return pos >> CHUNK_BITS, pos & CHUNK_MASK
+
+    def __check_range(self, start, end):
+        if start < 0: raise IndexError("start position < 0: %d" % start)
+        if end < 0: raise IndexError("end position < 0: %d" % end)
+        if start > end: raise IndexError("start[%d] > end[%d]" % (start, end))
+
+    def __find(self, high):
+        index = bisect_left(self.keys, high)
+        found = index < len(self.keys) and self.keys[index] == high
+        return index, found
+
+    def __replace(self, index, found, high, container):
+        ''' Store the supplied container for the chunk, adding or
+        removing the chunk as needed.
+        '''
+        if container is None:
+            if found:
+                del self.keys[index]
+                del self.containers[index]
+        elif found: self.containers[index] = container
+        else:
+            self.keys.insert(index, high)
+            self.containers.insert(index, container)
+
+    def __range_update(self, start, end, operation):
+        ''' Apply the supplied operation with a mask of the bits
+        in the (inclusive) range to every chunk in the range.
+        '''
+        self.__check_range(start, end)
+        for high in xrange(start >> CHUNK_BITS, (end >> CHUNK_BITS) + 1):
+            lo = start & CHUNK_MASK if high == start >> CHUNK_BITS else 0
+            hi = end & CHUNK_MASK if high == end >> CHUNK_BITS else CHUNK_MASK
+            mask = ((1 << (hi - lo + 1)) - 1) << lo
+            index, found = self.__find(high)
+            bits = self.containers[index].to_bits() if found else 0
+            self.__replace(index, found, high, make_container(operation(bits, mask)))
+
+    def __merge(self, other, operation, keep_left, keep_right):
+        ''' Merge the chunks of the two bit arrays with the supplied
+        bitmap operation. Chunks only in one array are kept based on
+        the supplied flags.
+        '''
+        keys, containers = [], []
+        i, j = 0, 0
+        while i < len(self.keys) or j < len(other.keys):
+            left  = self.keys[i] if i < len(self.keys) else None
+            right = other.keys[j] if j < len(other.keys) else None
+            if right is None or (left is not None and left < right):
+                if keep_left:
+                    keys.append(left)
+                    containers.append(self.containers[i])
+                i += 1
+            elif left is None or right < left:
+                if keep_right:
+                    keys.append(right)
+                    containers.append(other.containers[j].copy())
+                j += 1
+            else:
+                this, that = self.containers[i], other.containers[j]
+                if isinstance(this, ArrayContainer) and isinstance(that, ArrayContainer) \
+                    and operation is operator.and_:
+                    values = sorted(set(this.array).intersection(that.array))
+                    container = ArrayContainer(values) if values else None
+                else: container = make_container(operation(this.to_bits(), that.to_bits()))
+                if container is not None:
+                    keys.append(left)
+                    containers.append(container)
+                i, j = i + 1, j + 1
+        self.keys, self.containers = keys, containers
+        return self
+
+    #------------------------------------------------------------
+    # information methods
+    #------------------------------------------------------------
+
+    @property
+    def first_set_bit(self):
+        ''' Return the index of the next set bit.
+
+        :returns: The index of the next set bit.
+        '''
+        if not self.keys: return None
+        return (self.keys[0] << CHUNK_BITS) | self.containers[0].minimum()
+
+    @property
+    def last_set_bit(self):
+        ''' Return the index of the last set bit.
+
+        :returns: The index of the last set bit.
+        '''
+        if not self.keys: return None
+        return (self.keys[-1] << CHUNK_BITS) | self.containers[-1].maximum()
+
+    @property
+    def first_clear_bit(self):
+        ''' Return the index of the first cleared bit.
+
+        :returns: The index of the first cleared bit.
+        '''
+        for index, (high, container) in enumerate(zip(self.keys, self.containers)):
+            if high != index:
+                return index << CHUNK_BITS
+            if container.cardinality < CHUNK_SIZE:
+                bits = container.to_bits()
+                return (high << CHUNK_BITS) | ((~bits & (bits + 1)).bit_length() - 1)
+        return len(self.keys) << CHUNK_BITS
+
+    @property
+    def cardinality(self):
+        ''' Returns the cardinality of the bit array.
+
+        :returns: The number of set bits in the bit array.
+        '''
+        return sum(container.cardinality for container in self.containers)
+
+    @property
+    def parity(self):
+        ''' Return the parity of the bit array.
+
+        - Even parity will be 0x0
+        - Odd  parity will be 0x1.
+
+        :returns: The parity of the bit array
+        '''
+        return self.cardinality & 0x1
+
+    @property
+    def length_of_bits(self):
+        ''' Returns the length of the currently used
+        bit space (the last set bit)
+
+        :returns: The current bit length
+        '''
+        bit = self.last_set_bit
+        return 0 if bit == None else bit + 1
+
+    @property
+    def length_of_bytes(self):
+        ''' Returns the approximate number of bytes used
+        by the containers.
+
+        :returns: The current bytes length
+        '''
+        total = 0
+        for container in self.containers:
+            if isinstance(container, ArrayContainer): total += 2 * container.cardinality
+            elif isinstance(container, RunContainer): total += 4 * len(container.starts)
+            else: total += CHUNK_SIZE >> 3
+        return total
+
+    def rank(self, pos):
+        ''' Return the number of set bits at or before the
+        supplied position.
+
+        :param pos: The position to get the rank of
+        :returns: The number of set bits up to pos
+        '''
+        high, low = self.__split(pos)
+        index, found = self.__find(high)
+        total = sum(c.cardinality for c in self.containers[:index])
+        if found: total += self.containers[index].rank(low)
+        return total
+
+    def select(self, rank):
+        ''' Return the position of the set bit with the supplied
+        rank (the first set bit has a rank of 0).
+
+        :param rank: The rank of the set bit to find
+        :returns: The position of the set bit
+        '''
+        if rank < 0: raise IndexError("rank < 0: %d" % rank)
+        for high, container in zip(self.keys, self.containers):
+            if rank < container.cardinality:
+                return (high << CHUNK_BITS) | container.select(rank)
+            rank -= container.cardinality
+        raise IndexError("rank out of range")
+
+    def optimize(self):
+        ''' Convert every container to its most compact form,
+        which may be a run container after many single updates.
+        '''
+        self.containers = [make_container(c.to_bits()) for c in self.containers]
+
+    #------------------------------------------------------------
+    # set methods
+    #------------------------------------------------------------
+
+    def set(self, pos):
+        ''' Set the value at the specified bit
+        position to 1.
+
+        :param pos: The position to set the value for
+        '''
+        high, low = self.__split(pos)
+        index, found = self.__find(high)
+        container = self.containers[index].add(low) if found else ArrayContainer([low])
+        self.__replace(index, found, high, container)
+
+    def set_range(self, start, end):
+        ''' Set the values in the specified (inclusive) range to 1.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        '''
+        self.__range_update(start, end, lambda bits, mask: bits | mask)
+
+    def set_all(self):
+        ''' Sets the value of all the bits up to the last set bit to 1.
+        '''
+        if self.keys: self.set_range(0, self.last_set_bit)
+
+    #------------------------------------------------------------
+    # clear methods
+    #------------------------------------------------------------
+
+    def clear(self, pos):
+        ''' Set the value at the specified bit
+        position to 0.
+
+        :param pos: The position to set the value for
+        '''
+        high, low = self.__split(pos)
+        index, found = self.__find(high)
+        if found:
+            self.__replace(index, found, high, self.containers[index].remove(low))
+
+    def clear_range(self, start, end):
+        ''' Sets the value of the bits in the (inclusive) range to 0.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        '''
+        self.__range_update(start, end, lambda bits, mask: bits & ~mask)
+
+    def clear_all(self):
+        ''' Sets the value of all the underlying bits to 0.
+        '''
+        self.keys, self.containers = [], []
+
+    #------------------------------------------------------------
+    # flip methods
+    #------------------------------------------------------------
+
+    def flip(self, pos):
+        ''' Flip the value at the specified bit
+        position.
+
+        :param pos: The position to flip the value for
+        '''
+        if self.get(pos): self.clear(pos)
+        else: self.set(pos)
+
+    def flip_range(self, start, end):
+        ''' Flip the values in the specified (inclusive) bit range.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        '''
+        self.__range_update(start, end, lambda bits, mask: bits ^ mask)
+
+    def flip_all(self):
+        ''' Flip the value of all the bits up to the last set bit.
+        '''
+        if self.keys: self.flip_range(0, self.last_set_bit)
+
+    #------------------------------------------------------------
+    # get methods
+    #------------------------------------------------------------
+
+    def get(self, pos):
+        ''' Get the value at the specified bit
+        position.
+
+        :param pos: The position to get the value for
+        :returns: True if the value is set, false otherwise
+        '''
+        high, low = self.__split(pos)
+        index, found = self.__find(high)
+        return found and self.containers[index].contains(low)
+
+    def get_range(self, start, end):
+        ''' Get the values in the specified (inclusive) range.
+
+        :param start: The position to start from
+        :param end: The position to end at
+        :returns: The bit values in the specified range.
+        '''
+        self.__check_range(start, end)
+        bits, first = 0, start >> CHUNK_BITS
+        lower = bisect_left(self.keys, first)
+        upper = bisect_right(self.keys, end >> CHUNK_BITS)
+        for high, container in zip(self.keys[lower:upper], self.containers[lower:upper]):
+            bits |= container.to_bits() << ((high - first) << CHUNK_BITS)
+        bits >>= start & CHUNK_MASK
+        return bits & ((1 << (end - start + 1)) - 1)
+
+    #------------------------------------------------------------
+    # format methods
+    #------------------------------------------------------------
+
+    def to_long(self):
+        ''' Return the bit array represented as a single integer
+
+        :returns: The bit array as an integer
+        '''
+        return sum(c.to_bits() << (high << CHUNK_BITS)
+            for high, c in zip(self.keys, self.containers))
+
+    def to_byte_string(self):
+        ''' Return the bit array represented as a hex string
+
+        :returns: The bit array represented as a hex string
+        '''
+        return '0x%X' % self.to_long()
+
+    def to_bit_string(self):
+        ''' Return the bit array represented as a bit string
+
+        :returns: The bit array represented as a bit string
+        '''
+        return bin(self.to_long())
+
+    def to_bit_list(self):
+        ''' Return the bit array represented as a list of bits
+
+        :returns: The bit array represented as a list of bits
+        '''
+        return list(self.iter_by_bit())
+
+    def iter_set_bits(self):
+        ''' Return an iterator over the positions of the set bits
+
+        :returns: An iterator of the set bit positions
+        '''
+        for high, container in zip(self.keys, self.containers):
+            base = high << CHUNK_BITS
+            for low in container:
+                yield base | low
+
+    def iter_by_bit(self):
+        ''' Return the bit array represented as a bit iterator
+
+        :returns: The bit array represented as a bit iterator
+        '''
+        for i in xrange(len(self)): yield self.get(i)
+
+    def copy(self):
+        ''' Return a copy of the current bit array
+
+        :returns: A copy of the current bit array
+        '''
+        result = RoaringBitArray()
+        result.keys = list(self.keys)
+        result.containers = [c.copy() for c in self.containers]
+        return result
+
+    #------------------------------------------------------------
+    # magic methods
+    #------------------------------------------------------------
+
+    def __iter__(self):           return self.iter_by_bit()
+    def __reversed__(self):       return reversed(self.to_bit_list())
+    def __contains__(self, pos):  return self.get(pos)
+    def __nonzero__(self):        return bool(self.keys)
+    def __hash__(self):           return hash(self.to_long())
+    def __repr__(self):           return self.to_byte_string()
+    def __str__(self):            return self.to_byte_string()
+    def __len__(self):            return self.length_of_bits
+    def __eq__(self, other):      return self.keys == other.keys and self.containers == other.containers
+    def __ne__(self, other):      return not self == other
+    def __iand__(self, other):    return self.__merge(other, operator.and_, False, False)
+    def __ior__(self, other):     return self.__merge(other, operator.or_, True, True)
+    def __ixor__(self, other):    return self.__merge(other, operator.xor, True, True)
+    def __isub__(self, other):    return self.__merge(other, lambda a, b: a & ~b, True, False)
+    def __and__(self, other):     return self.copy().__iand__(other)
+    def __or__(self, other):      return self.copy().__ior__(other)
+    def __xor__(self, other):     return self.copy().__ixor__(other)
+    def __sub__(self, other):     return self.copy().__isub__(other)
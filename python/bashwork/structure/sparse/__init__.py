@@ -0,0 +1,2 @@
+from bashwork.structure.sparse.sparse import SparseVector, SparseMatrix
+from bashwork.structure.sparse.sparse import COOMatrix, CSRMatrix, CSCMatrix, distance
@@ -16,8 +16,20 @@ following are better representations:
 * compresses sparse row (CSR)
 * compresses sparse column (CSC)
 * Yale format
+
+Large matrices should be built with the `COOMatrix` builder and
+then converted in bulk to a `CSRMatrix` (for row access and
+matrix vector products) or a `CSCMatrix` (for column access)::
+
+    builder = COOMatrix(shape=(len(documents), 1 << 20))
+    for row, document in enumerate(documents):
+        builder.extend_row(row, document.indices, document.counts)
+    matrix = builder.to_csr()
+    scores = matrix.dot(weights)
 '''
 import math
+import numpy as np
+from array import array
 from bisect import bisect_left
 
 class SparseVector(object):
@@ -33,9 +45,16 @@ class SparseVector(object):
         self.default = default
 
     def __setitem__(self, key, value):
+        if not self.index or key > self.index[-1]: # appending in order
+            self.index.append(key)
+            self.values.append(value)
+            return
         idx = bisect_left(self.index, key)
-        self.index.insert(idx, key)
-        self.values.insert(idx, value)
+        if self.index[idx] == key:
+            self.values[idx] = value
+        else:
+            self.index.insert(idx, key)
+            self.values.insert(idx, value)
 
     def __getitem__(self, key):
         idx = bisect_left(self.index, key)
@@ -81,18 +100,466 @@ class SparseMatrix(object):
         pass
 
 
+#------------------------------------------------------------
+# compressed matrices
+#------------------------------------------------------------
+
+class COOMatrix(object):
+    ''' A coordinate list builder for sparse matrices that
+    appends the entries to flat arrays in constant time. The
+    entries can be added in any order and duplicate entries
+    are summed when the matrix is compressed.
+    '''
+
+    def __init__(self, shape=None):
+        '''
+        :param shape: The (rows, cols) of the matrix (default the max index)
+        '''
+        self.shape  = shape
+        self.rows   = array('l')
+        self.cols   = array('l')
+        self.values = array('d')
+
+    def add(self, row, col, value):
+        ''' Add a single entry to the matrix.
+
+        :param row: The row of the entry
+        :param col: The column of the entry
+        :param value: The value of the entry
+        '''
+        self.rows.append(row)
+        self.cols.append(col)
+        self.values.append(value)
+
+    def extend(self, rows, cols, values):
+        ''' Add a collection of entries to the matrix.
+
+        :param rows: The rows of the entries
+        :param cols: The columns of the entries
+        :param values: The values of the entries
+        '''
+        self.rows.extend(rows)
+        self.cols.extend(cols)
+        self.values.extend(values)
+
+    def extend_row(self, row, cols, values):
+        ''' Add a collection of entries to a single row.
+
+        :param row: The row of the entries
+        :param cols: The columns of the entries
+        :param values: The values of the entries
+        '''
+        start = len(self.cols)
+        self.cols.extend(cols)
+        self.values.extend(values)
+        self.rows.extend([row] * (len(self.cols) - start))
+
+    def get_shape(self):
+        ''' Retrieve the shape of the matrix.
+
+        :returns: The (rows, cols) of the matrix
+        '''
+        if self.shape: return self.shape
+        if not self.rows: return (0, 0)
+        return (max(self.rows) + 1, max(self.cols) + 1)
+
+    def to_arrays(self):
+        ''' Retrieve the entries as numpy arrays.
+
+        :returns: The (rows, cols, values) arrays
+        '''
+        return (np.frombuffer(self.rows, dtype=np.int_).astype(np.int64),
+            np.frombuffer(self.cols, dtype=np.int_).astype(np.int64),
+            np.frombuffer(self.values, dtype=np.float64).copy())
+
+    def to_csr(self):
+        ''' Convert the entries to a compressed sparse row matrix.
+
+        :returns: The CSR matrix of the entries
+        '''
+        rows, cols, values = self.to_arrays()
+        return CSRMatrix.from_coo(rows, cols, values, self.get_shape())
+
+    def to_csc(self):
+        ''' Convert the entries to a compressed sparse column matrix.
+
+        :returns: The CSC matrix of the entries
+        '''
+        rows, cols, values = self.to_arrays()
+        return CSCMatrix.from_coo(rows, cols, values, self.get_shape())
+
+    def __setitem__(self, key, value): self.add(key[0], key[1], value)
+    def __len__(self): return len(self.values)
+
+
+def compress(major, minor, values, size):
+    ''' Given coordinate arrays, sort them by the major then
+    minor index, sum the duplicates, and compress the major index.
+
+    :param major: The index to compress (rows for CSR)
+    :param minor: The index to keep (columns for CSR)
+    :param values: The values of the entries
+    :param size: The number of major entries
+    :returns: The (indptr, indices, data) arrays
+    '''
+    order  = np.lexsort((minor, major))
+    major, minor, values = major[order], minor[order], values[order]
+    if len(values):
+        first  = np.ones(len(values), dtype=bool)
+        first[1:] = (major[1:] != major[:-1]) | (minor[1:] != minor[:-1])
+        starts = np.flatnonzero(first)
+        values = np.add.reduceat(values, starts)
+        major, minor = major[starts], minor[starts]
+    indptr = np.zeros(size + 1, dtype=np.int64)
+    np.cumsum(np.bincount(major, minlength=size), out=indptr[1:])
+    return indptr, minor, values
+
+
+class CompressedMatrix(object):
+    ''' The common storage of the CSR and CSC matrices which
+    is the same compressed layout along a different axis:
+
+    - `indptr[i]:indptr[i + 1]` are the entries of the major index i
+    - `indices` are the minor indexes of those entries (sorted)
+    - `data` are the values of those entries
+    '''
+
+    @classmethod
+    def from_dense(klass, matrix):
+        ''' Create a new matrix from the non zero entries of
+        the supplied dense matrix.
+
+        :param matrix: The dense matrix to compress
+        :returns: The compressed matrix
+        '''
+        matrix = np.asarray(matrix, dtype=np.float64)
+        rows, cols = np.nonzero(matrix)
+        return klass.from_coo(rows, cols, matrix[rows, cols], matrix.shape)
+
+    def __init__(self, indptr, indices, data, shape):
+        '''
+        :param indptr: The offsets of each major index
+        :param indices: The minor indexes of the entries
+        :param data: The values of the entries
+        :param shape: The (rows, cols) of the matrix
+        '''
+        self.indptr  = np.asarray(indptr, dtype=np.int64)
+        self.indices = np.asarray(indices, dtype=np.int64)
+        self.data    = np.asarray(data)
+        self.shape   = tuple(shape)
+
+    @property
+    def nnz(self):
+        ''' Returns the number of stored entries.
+
+        :returns: The number of stored entries
+        '''
+        return len(self.data)
+
+    def get_major_ids(self):
+        ''' Retrieve the major index of every entry, which
+        expands the compressed index back to coordinates.
+
+        :returns: The major index of each entry
+        '''
+        size = len(self.indptr) - 1
+        return np.repeat(np.arange(size), np.diff(self.indptr))
+
+    def get_entry(self, major, minor):
+        ''' Retrieve the value at the supplied indexes.
+
+        :param major: The major index of the entry
+        :param minor: The minor index of the entry
+        :returns: The value of the entry (or 0)
+        '''
+        lo, hi = self.indptr[major], self.indptr[major + 1]
+        idx = lo + np.searchsorted(self.indices[lo:hi], minor)
+        return self.data[idx] if idx < hi and self.indices[idx] == minor else 0.0
+
+    def get_vector(self, major):
+        ''' Retrieve a zero copy view of the supplied major index.
+
+        :param major: The major index to retrieve
+        :returns: The (indices, values) of that index
+        '''
+        lo, hi = self.indptr[major], self.indptr[major + 1]
+        return self.indices[lo:hi], self.data[lo:hi]
+
+    def get_slice(self, majors):
+        ''' Retrieve the supplied major indexes as arrays. A
+        contiguous slice is a zero copy view of the entries.
+
+        :param majors: The slice or list of major indexes
+        :returns: The (indptr, indices, data) of the selection
+        '''
+        if isinstance(majors, slice):
+            start, stop, step = majors.indices(len(self.indptr) - 1)
+            if step == 1:
+                lo, hi = self.indptr[start], self.indptr[max(start, stop)]
+                indptr = self.indptr[start:max(start, stop) + 1] - lo
+                return indptr, self.indices[lo:hi], self.data[lo:hi]
+            majors = np.arange(start, stop, step)
+
+        majors = np.asarray(majors, dtype=np.int64)
+        starts = self.indptr[majors]
+        counts = self.indptr[majors + 1] - starts
+        indptr = np.zeros(len(majors) + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        offset = np.arange(indptr[-1]) - np.repeat(indptr[:-1], counts)
+        picked = np.repeat(starts, counts) + offset
+        return indptr, self.indices[picked], self.data[picked]
+
+    def major_dot(self, vector):
+        ''' Compute the dot product of each major index with the
+        supplied dense vector over the minor index.
+
+        :param vector: The dense vector to multiply with
+        :returns: The dense product for each major index
+        '''
+        size = len(self.indptr) - 1
+        products = self.data * vector[self.indices]
+        return np.bincount(self.get_major_ids(), weights=products, minlength=size)
+
+    def minor_dot(self, vector):
+        ''' Compute the product of the transposed layout with the
+        supplied dense vector over the major index.
+
+        :param vector: The dense vector to multiply with
+        :returns: The dense product for each minor index
+        '''
+        products = self.data * vector[self.get_major_ids()]
+        return np.bincount(self.indices, weights=products, minlength=self.minor_size)
+
+    def get_norms(self):
+        ''' Retrieve the euclidean norm of every major index.
+
+        :returns: The norm of each major index
+        '''
+        size = len(self.indptr) - 1
+        return np.sqrt(np.bincount(self.get_major_ids(),
+            weights=self.data ** 2, minlength=size))
+
+    def __repr__(self):
+        return "<{} shape={} nnz={}>".format(
+            self.__class__.__name__, self.shape, self.nnz)
+
+
+class CSRMatrix(CompressedMatrix):
+    ''' A compressed sparse row matrix which supports fast
+    row slicing and matrix products.
+    '''
+
+    @classmethod
+    def from_coo(klass, rows, cols, values, shape):
+        ''' Create a new matrix from the supplied coordinates.
+
+        :param rows: The rows of the entries
+        :param cols: The columns of the entries
+        :param values: The values of the entries
+        :param shape: The (rows, cols) of the matrix
+        :returns: The compressed matrix
+        '''
+        indptr, indices, data = compress(np.asarray(rows, dtype=np.int64),
+            np.asarray(cols, dtype=np.int64), np.asarray(values), shape[0])
+        return klass(indptr, indices, data, shape)
+
+    @property
+    def minor_size(self): return self.shape[1]
+
+    def get_row(self, row):
+        ''' Retrieve a zero copy view of the supplied row.
+
+        :param row: The row to retrieve
+        :returns: The (columns, values) of the row
+        '''
+        return self.get_vector(row)
+
+    def dot(self, other):
+        ''' Multiply this matrix with a dense vector, a dense
+        matrix, or another sparse matrix.
+
+        :param other: The vector or matrix to multiply with
+        :returns: The dense product (or a CSR matrix for sparse)
+        '''
+        if isinstance(other, CompressedMatrix):
+            return self.dot_sparse(other.to_csr())
+        other = np.asarray(other)
+        if other.ndim == 1:
+            return self.major_dot(other)
+        result = np.zeros((self.shape[0], other.shape[1]))
+        np.add.at(result, self.get_major_ids(), self.data[:, None] * other[self.indices])
+        return result
+
+    def dot_sparse(self, other):
+        ''' Multiply this matrix with another CSR matrix by
+        expanding every product of an entry with the matching
+        row of the other matrix and compressing the result.
+
+        :param other: The CSR matrix to multiply with
+        :returns: The CSR product of the two matrices
+        '''
+        starts = other.indptr[self.indices]
+        counts = other.indptr[self.indices + 1] - starts
+        firsts = np.cumsum(counts) - counts
+        picked = np.repeat(starts, counts) + np.arange(counts.sum()) - np.repeat(firsts, counts)
+        rows   = np.repeat(self.get_major_ids(), counts)
+        values = np.repeat(self.data, counts) * other.data[picked]
+        return CSRMatrix.from_coo(rows, other.indices[picked], values,
+            (self.shape[0], other.shape[1]))
+
+    def to_csr(self): return self
+
+    def to_csc(self):
+        ''' Convert this matrix to a compressed sparse column matrix.
+
+        :returns: The CSC version of this matrix
+        '''
+        return CSCMatrix.from_coo(self.get_major_ids(), self.indices, self.data, self.shape)
+
+    def to_dense(self):
+        ''' Convert this matrix to a dense numpy matrix.
+
+        :returns: The dense version of this matrix
+        '''
+        result = np.zeros(self.shape, dtype=self.data.dtype)
+        result[self.get_major_ids(), self.indices] = self.data
+        return result
+
+    def transpose(self):
+        ''' Return the transpose of this matrix, which is a
+        CSC matrix sharing the same arrays.
+
+        :returns: The transposed matrix
+        '''
+        return CSCMatrix(self.indptr, self.indices, self.data, self.shape[::-1])
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple): return self.get_entry(*key)
+        if isinstance(key, (int, long, np.integer)): return self.get_row(key)
+        indptr, indices, data = self.get_slice(key)
+        return CSRMatrix(indptr, indices, data, (len(indptr) - 1, self.shape[1]))
+
+    def __len__(self): return self.shape[0]
+
+
+class CSCMatrix(CompressedMatrix):
+    ''' A compressed sparse column matrix which supports fast
+    column slicing and transposed products.
+    '''
+
+    @classmethod
+    def from_coo(klass, rows, cols, values, shape):
+        ''' Create a new matrix from the supplied coordinates.
+
+        :param rows: The rows of the entries
+        :param cols: The columns of the entries
+        :param values: The values of the entries
+        :param shape: The (rows, cols) of the matrix
+        :returns: The compressed matrix
+        '''
+        indptr, indices, data = compress(np.asarray(cols, dtype=np.int64),
+            np.asarray(rows, dtype=np.int64), np.asarray(values), shape[1])
+        return klass(indptr, indices, data, shape)
+
+    @property
+    def minor_size(self): return self.shape[0]
+
+    def get_column(self, col):
+        ''' Retrieve a zero copy view of the supplied column.
+
+        :param col: The column to retrieve
+        :returns: The (rows, values) of the column
+        '''
+        return self.get_vector(col)
+
+    def dot(self, other):
+        ''' Multiply this matrix with a dense vector, a dense
+        matrix, or another sparse matrix.
+
+        :param other: The vector or matrix to multiply with
+        :returns: The dense product (or a CSR matrix for sparse)
+        '''
+        if isinstance(other, CompressedMatrix):
+            return self.to_csr().dot(other)
+        other = np.asarray(other)
+        if other.ndim == 1:
+            return self.minor_dot(other)
+        result = np.zeros((self.shape[0], other.shape[1]))
+        np.add.at(result, self.indices, self.data[:, None] * other[self.get_major_ids()])
+        return result
+
+    def to_csc(self): return self
+
+    def to_csr(self):
+        ''' Convert this matrix to a compressed sparse row matrix.
+
+        :returns: The CSR version of this matrix
+        '''
+        return CSRMatrix.from_coo(self.indices, self.get_major_ids(), self.data, self.shape)
+
+    def to_dense(self):
+        ''' Convert this matrix to a dense numpy matrix.
+
+        :returns: The dense version of this matrix
+        '''
+        result = np.zeros(self.shape, dtype=self.data.dtype)
+        result[self.indices, self.get_major_ids()] = self.data
+        return result
+
+    def transpose(self):
+        ''' Return the transpose of this matrix, which is a
+        CSR matrix sharing the same arrays.
+
+        :returns: The transposed matrix
+        '''
+        return CSRMatrix(self.indptr, self.indices, self.data, self.shape[::-1])
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple): return self.get_entry(key[1], key[0])
+        if isinstance(key, (int, long, np.integer)): return self.get_column(key)
+        indptr, indices, data = self.get_slice(key)
+        return CSCMatrix(indptr, indices, data, (self.shape[0], len(indptr) - 1))
+
+    def __len__(self): return self.shape[1]
+
+#------------------------------------------------------------
+# helper methods
+#------------------------------------------------------------
+
+def to_sparse_arrays(vector):
+    ''' Given a sparse vector, return its sorted index and
+    value arrays.
+
+    :param vector: A SparseVector or an (indices, values) pair
+    :returns: The (indices, values) numpy arrays
+    '''
+    if isinstance(vector, SparseVector):
+        vector = (vector.index, vector.values)
+    indices, values = vector
+    return np.asarray(indices, dtype=np.int64), np.asarray(values, dtype=np.float64)
+
+
 def distance(this, that):
-    ''' Compute the distance between two sparse arrays.
+    ''' Compute the euclidean distance between two sparse arrays
+    without expanding them:
     math.sqrt(sum(math.pow(x - y, 2) for x, y in zip(this, that)))
 
-
-    .. todo:: implement this
+    The indexes of both arrays are merged with a single stable sort
+    and the values of the shared indexes are combined before the
+    squares are summed.
 
     :param this: The left array to compute with
     :param that: The right array to compute with
     :returns: The distance between the two arrays
     '''
-    total  = 0
-    lx, rx = 0, 0
+    lx, lv = to_sparse_arrays(this)
+    rx, rv = to_sparse_arrays(that)
+    index  = np.concatenate((lx, rx))
+    values = np.concatenate((lv, -rv))
+    if not len(index): return 0.0
 
+    order  = np.argsort(index, kind='mergesort')
+    index, values = index[order], values[order]
+    starts = np.flatnonzero(np.r_[True, index[1:] != index[:-1]])
+    total  = np.sum(np.add.reduceat(values, starts) ** 2)
     return math.sqrt(total)
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
+import math
 import unittest
-from bashwork.structure.sparse import SparseVector
+import numpy as np
+from bashwork.structure.sparse import *
 
 #---------------------------------------------------------------------------#
 # fixture
@@ -29,6 +31,102 @@ class SparseVectorTest(unittest.TestCase):
         actual = list(vector)
         self.assertEqual(expect, actual)
 
+    def test_set_existing_item(self):
+        ''' Test that setting an existing key replaces it '''
+        vector = SparseVector(default=0)
+        for key in [5, 1, 3, 1]: vector[key] = key * 10
+        self.assertEqual([1, 3, 5], vector.index)
+        self.assertEqual([(1, 10), (3, 30), (5, 50)], vector.iter_sparse())
+
+    def test_distance(self):
+        ''' Test that the sparse distance is correct '''
+        this, that = SparseVector(0), SparseVector(0)
+        this[1], this[4], this[9] = 1.0, 2.0, 3.0
+        that[0], that[4] = 5.0, 1.0
+        expect = math.sqrt(sum(math.pow(x - y, 2) for x, y in
+            zip(list(this) + [0] * 10, list(that) + [0] * 10)))
+        self.assertAlmostEqual(expect, distance(this, that))
+        self.assertAlmostEqual(0.0, distance(this, this))
+        self.assertAlmostEqual(5.0, distance(([2], [3.0]), ([7], [4.0])))
+        self.assertAlmostEqual(0.0, distance(([], []), ([], [])))
+
+
+class CompressedMatrixTest(unittest.TestCase):
+    ''' Code to validate that the compressed matrices are correct.
+    '''
+
+    def setUp(self):
+        ''' Initialize the test fixtures '''
+        random = np.random.RandomState(11)
+        self.dense = random.rand(7, 5) * (random.rand(7, 5) > 0.6)
+        self.dense[3] = 0.0 # an empty row
+
+    def test_coo_builder(self):
+        ''' Test that the coordinate builder sums duplicates '''
+        builder = COOMatrix()
+        builder[2, 1] = 1.0
+        builder.add(0, 3, 2.0)
+        builder.extend([2, 0], [1, 0], [4.0, 3.0])
+        builder.extend_row(1, [2, 0], [6.0, 7.0])
+        self.assertEqual(6, len(builder))
+        self.assertEqual((3, 4), builder.get_shape())
+
+        expect = [[3, 0, 0, 2], [7, 0, 6, 0], [0, 5, 0, 0]]
+        csr = builder.to_csr()
+        self.assertEqual(5, csr.nnz)
+        self.assertEqual(expect, csr.to_dense().tolist())
+        self.assertEqual(expect, builder.to_csc().to_dense().tolist())
+        self.assertEqual([0, 2, 4, 5], csr.indptr.tolist())
+
+    def test_conversions(self):
+        ''' Test that the matrices convert between layouts '''
+        csr = CSRMatrix.from_dense(self.dense)
+        csc = CSCMatrix.from_dense(self.dense)
+        self.assertTrue(np.allclose(self.dense, csr.to_dense()))
+        self.assertTrue(np.allclose(self.dense, csc.to_dense()))
+        self.assertTrue(np.allclose(self.dense, csr.to_csc().to_dense()))
+        self.assertTrue(np.allclose(self.dense, csc.to_csr().to_dense()))
+        self.assertTrue(np.allclose(self.dense.T, csr.transpose().to_dense()))
+        self.assertTrue(np.allclose(self.dense.T, csc.transpose().to_dense()))
+
+    def test_indexing(self):
+        ''' Test that rows, columns and slices are correct '''
+        csr = CSRMatrix.from_dense(self.dense)
+        csc = CSCMatrix.from_dense(self.dense)
+        for row in range(7):
+            cols, values = csr[row]
+            self.assertTrue(np.allclose(self.dense[row, cols], values))
+            for col in range(5):
+                self.assertEqual(self.dense[row, col], csr[row, col])
+                self.assertEqual(self.dense[row, col], csc[row, col])
+        rows, values = csc.get_column(2)
+        self.assertTrue(np.allclose(self.dense[rows, 2], values))
+
+        self.assertTrue(np.allclose(self.dense[2:5], csr[2:5].to_dense()))
+        self.assertTrue(np.allclose(self.dense[::2], csr[::2].to_dense()))
+        self.assertTrue(np.allclose(self.dense[[6, 0, 3]], csr[[6, 0, 3]].to_dense()))
+        self.assertTrue(np.allclose(self.dense[:, 1:4], csc[1:4].to_dense()))
+        self.assertTrue(np.may_share_memory(csr.data, csr[2:5].data))
+
+    def test_products(self):
+        ''' Test that the matrix products are correct '''
+        random = np.random.RandomState(5)
+        vector = random.rand(5)
+        matrix = random.rand(5, 3)
+        other  = random.rand(5, 4) * (random.rand(5, 4) > 0.5)
+        for sparse in [CSRMatrix.from_dense(self.dense), CSCMatrix.from_dense(self.dense)]:
+            self.assertTrue(np.allclose(self.dense.dot(vector), sparse.dot(vector)))
+            self.assertTrue(np.allclose(self.dense.dot(matrix), sparse.dot(matrix)))
+            product = sparse.dot(CSRMatrix.from_dense(other))
+            self.assertTrue(isinstance(product, CSRMatrix))
+            self.assertTrue(np.allclose(self.dense.dot(other), product.to_dense()))
+
+    def test_norms(self):
+        ''' Test that the row norms are correct '''
+        csr = CSRMatrix.from_dense(self.dense)
+        self.assertTrue(np.allclose(np.sqrt((self.dense ** 2).sum(axis=1)), csr.get_norms()))
+        self.assertAlmostEqual(np.linalg.norm(self.dense[0] - self.dense[1]),
+            distance(csr[0], csr[1]))
 
 #---------------------------------------------------------------------------#
 # main
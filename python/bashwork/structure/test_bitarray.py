@@ -1,6 +1,9 @@
 #!/usr/bin/env python
+import mmap
 import unittest
-from bashwork.structure.bitarray import BitArray
+import tempfile
+import numpy as np
+from bashwork.structure.bitarray import BitArray, BufferBitArray
 
 #---------------------------------------------------------------------------#
 # fixture
@@ -251,6 +254,111 @@ class BitArrayTest(unittest.TestCase):
             #print "expectd: %s %s" %( hex(expected), hex(barray.get_range(sidx, eidx)))
             self.assertEqual(expected, barray.get_range(sidx, eidx))
 
+
+class BufferBitArrayTest(unittest.TestCase):
+    ''' Code to validate that the buffer bitarray implementation is correct.
+    '''
+
+    def test_init(self):
+        ''' Test that the bit array is inited correctly '''
+        self.assertEqual(64,  BufferBitArray().length_of_buffer)
+        self.assertEqual(128, BufferBitArray(size=65).length_of_buffer)
+        self.assertEqual(16,  BufferBitArray(size=65).length_of_bytes)
+        barray = BufferBitArray(buffer=bytearray('\x13' + '\x00' * 15))
+        self.assertEqual([0, 1, 4], barray.to_positions().tolist())
+
+    def test_single_methods(self):
+        ''' Test that the single bit methods work correctly '''
+        barray = BufferBitArray()
+        for pos in [0, 1, 4, 200]: barray.set(pos)
+        self.assertEqual(256, barray.length_of_buffer)
+        self.assertTrue(barray.get(200))
+        self.assertFalse(barray.get(5000))
+        barray.clear(1)
+        barray.flip(4)
+        barray.flip(5)
+        self.assertEqual([0, 5, 200], barray.to_positions().tolist())
+        self.assertEqual(0, barray.first_set_bit)
+        self.assertEqual(200, barray.last_set_bit)
+        self.assertEqual(1, barray.first_clear_bit)
+        self.assertEqual(3, barray.cardinality)
+        self.assertEqual(1, barray.parity)
+        self.assertRaises(IndexError, lambda: barray.set(-1))
+
+    def test_many_methods(self):
+        ''' Test that the batch methods work correctly '''
+        positions = np.random.RandomState(7).randint(0, 100000, 5000)
+        barray = BufferBitArray()
+        barray.set_many(positions)
+        self.assertEqual(len(set(positions)), barray.cardinality)
+        self.assertTrue(barray.get_many(positions).all())
+        self.assertEqual([False, False], barray.get_many([100001, 10 ** 7]).tolist())
+        self.assertEqual(sorted(set(positions)), barray.to_positions().tolist())
+        barray.clear_many(positions[:100])
+        self.assertFalse(barray.get_many(positions[:100]).any())
+        barray.clear_all()
+        barray.flip_many([3, 3, 9])
+        self.assertEqual([9], barray.to_positions().tolist())
+
+    def test_range_methods(self):
+        ''' Test that the range methods work correctly '''
+        barray = BufferBitArray()
+        barray.set_range(60, 200)
+        self.assertEqual(141, barray.cardinality)
+        self.assertEqual((60, 200), (barray.first_set_bit, barray.last_set_bit))
+        barray.clear_range(64, 127)
+        self.assertEqual(0xF, barray.get_range(60, 66))
+        barray.flip_range(0, 3)
+        self.assertEqual(0b1111, barray.get_range(0, 5))
+        self.assertEqual(0x7E238, BufferBitArray(buffer=bytearray(
+            '\x38\xe2\xc7' + '\x00' * 5)).get_range(0, 18))
+        self.assertRaises(IndexError, lambda: barray.set_range(5, 1))
+
+    def test_set_algebra(self):
+        ''' Test that the in place set operations work correctly '''
+        left, right = BufferBitArray(), BufferBitArray()
+        left.set_many(range(0, 1000, 3))
+        right.set_many(range(0, 2000, 5))
+        lset, rset = set(range(0, 1000, 3)), set(range(0, 2000, 5))
+        self.assertEqual(sorted(lset & rset), (left & right).to_positions().tolist())
+        self.assertEqual(sorted(lset | rset), (left | right).to_positions().tolist())
+        self.assertEqual(sorted(lset ^ rset), (left ^ right).to_positions().tolist())
+        self.assertEqual(sorted(lset - rset), (left - right).to_positions().tolist())
+
+        left |= right
+        left &= right
+        self.assertTrue(left == right)
+        left ^= right
+        self.assertFalse(left)
+        self.assertEqual(~~right, right)
+
+    def test_buffer(self):
+        ''' Test that the buffer can be shared without copies '''
+        barray = BufferBitArray(size=128)
+        barray.set_many([1, 70, 127])
+        with tempfile.TemporaryFile() as handle:
+            handle.write(barray.to_buffer())
+            handle.flush()
+            mapped = mmap.mmap(handle.fileno(), 0)
+            shared = BufferBitArray(buffer=mapped)
+            self.assertEqual(barray, shared)
+            shared.set(2)
+            self.assertEqual('\x06', mapped[0])
+            del shared
+
+    def test_magic_methods(self):
+        ''' Test that the magic methods work correctly '''
+        barray = BufferBitArray()
+        barray.set_many([0, 2, 3])
+        self.assertEqual(4, len(barray))
+        self.assertTrue(2 in barray)
+        self.assertEqual([True, False, True, True], list(iter(barray)))
+        self.assertEqual([True, True, False, True], list(reversed(barray)))
+        self.assertEqual('0x000000000000000D', str(barray))
+        self.assertEqual([0xD], barray.to_byte_list())
+        self.assertEqual(hash(barray), hash(barray | BufferBitArray(size=512)))
+        self.assertEqual(barray.words.ctypes.data, np.asarray(barray).ctypes.data)
+
 #---------------------------------------------------------------------------#
 # main
 #---------------------------------------------------------------------------#
@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+import unittest
+from bashwork.structure.roaring import *
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class RoaringBitArrayTest(unittest.TestCase):
+    ''' Code to validate that the roaring bitarray implementation is correct.
+    '''
+
+    def test_helpers(self):
+        ''' Test that the container helpers work correctly '''
+        bits = values_to_bits([0, 3, 4, 5, 100])
+        self.assertEqual([0, 3, 4, 5, 100], bits_to_values(bits))
+        self.assertEqual([(0, 0), (3, 5), (100, 100)], bits_to_runs(bits))
+        self.assertEqual(5, popcount(bits))
+        self.assertEqual(None, make_container(0))
+        self.assertTrue(isinstance(make_container(bits), ArrayContainer))
+        self.assertTrue(isinstance(make_container((1 << 5000) - 1), RunContainer))
+        dense = values_to_bits(range(0, CHUNK_SIZE, 2))
+        self.assertTrue(isinstance(make_container(dense), BitmapContainer))
+
+    def test_containers(self):
+        ''' Test that the containers agree with each other '''
+        values = [1, 2, 3, 10, 11, 500, 65535]
+        bits   = values_to_bits(values)
+        for container in [ArrayContainer(values), BitmapContainer(bits),
+            RunContainer(bits_to_runs(bits))]:
+            self.assertEqual(values, list(container))
+            self.assertEqual(7, container.cardinality)
+            self.assertEqual(1, container.minimum())
+            self.assertEqual(65535, container.maximum())
+            self.assertEqual(4, container.rank(10))
+            self.assertEqual(3, container.rank(9))
+            self.assertEqual(500, container.select(5))
+            self.assertTrue(container.contains(11))
+            self.assertFalse(container.contains(12))
+            self.assertEqual(bits, container.to_bits())
+
+    def test_container_conversion(self):
+        ''' Test that the containers convert as they grow '''
+        container = ArrayContainer(range(0, 2 * ARRAY_LIMIT, 2))
+        container = container.add(1)
+        self.assertTrue(isinstance(container, BitmapContainer))
+        container = container.remove(1)
+        self.assertTrue(isinstance(container, ArrayContainer))
+        self.assertEqual(None, ArrayContainer([5]).remove(5))
+
+    def test_set_and_clear(self):
+        ''' Test that single bits can be updated '''
+        barray = RoaringBitArray([5, 70000])
+        barray.set(1 << 32)
+        self.assertTrue(barray.get(5))
+        self.assertTrue(1 << 32 in barray)
+        self.assertFalse(barray.get(6))
+        self.assertEqual(3, barray.cardinality)
+        self.assertEqual([0, 1, 65536], barray.keys)
+        barray.clear(70000)
+        barray.clear(70001)
+        self.assertEqual([0, 65536], barray.keys)
+        barray.flip(5)
+        barray.flip(6)
+        self.assertEqual([6, 1 << 32], list(barray.iter_set_bits()))
+        self.assertRaises(IndexError, lambda: barray.set(-1))
+
+    def test_range_methods(self):
+        ''' Test that the range methods work correctly '''
+        barray = RoaringBitArray()
+        barray.set_range(10, 200000)
+        self.assertEqual(200000 - 10 + 1, barray.cardinality)
+        self.assertTrue(all(isinstance(c, RunContainer) for c in barray.containers))
+        self.assertEqual(10, barray.first_set_bit)
+        self.assertEqual(200000, barray.last_set_bit)
+        self.assertEqual(0, barray.first_clear_bit)
+        barray.clear_range(100, 150000)
+        self.assertEqual(90 + 50000, barray.cardinality)
+        self.assertEqual(0b0111, barray.get_range(97, 100))
+        barray.flip_range(0, 9)
+        self.assertEqual(100, barray.first_clear_bit)
+        self.assertEqual(0b11, barray.get_range(150000, 150002) >> 1)
+        barray.clear_all()
+        self.assertEqual(0, barray.cardinality)
+        self.assertEqual(None, barray.first_set_bit)
+        self.assertRaises(IndexError, lambda: barray.set_range(5, 1))
+
+    def test_rank_and_select(self):
+        ''' Test that the rank and select methods work correctly '''
+        positions = [3, 9, 65536, 65540, 200000, 1 << 30]
+        barray = RoaringBitArray(positions)
+        for rank, position in enumerate(positions):
+            self.assertEqual(position, barray.select(rank))
+            self.assertEqual(rank + 1, barray.rank(position))
+        self.assertEqual(0, barray.rank(2))
+        self.assertEqual(2, barray.rank(65535))
+        self.assertRaises(IndexError, lambda: barray.select(len(positions)))
+
+    def test_set_algebra(self):
+        ''' Test that the set operations work correctly '''
+        left  = RoaringBitArray(range(0, 100000, 3))
+        right = RoaringBitArray(range(0, 200000, 5))
+        lset, rset = set(range(0, 100000, 3)), set(range(0, 200000, 5))
+        self.assertEqual(sorted(lset & rset), list((left & right).iter_set_bits()))
+        self.assertEqual(sorted(lset | rset), list((left | right).iter_set_bits()))
+        self.assertEqual(sorted(lset ^ rset), list((left ^ right).iter_set_bits()))
+        self.assertEqual(sorted(lset - rset), list((left - right).iter_set_bits()))
+        self.assertEqual(len(lset), left.cardinality) # unchanged
+
+        result = left.copy()
+        result &= right
+        self.assertEqual(len(lset & rset), result.cardinality)
+        result |= right
+        self.assertEqual(result, right)
+        result ^= right
+        self.assertFalse(result)
+
+    def test_magic_methods(self):
+        ''' Test that the magic methods work correctly '''
+        barray = RoaringBitArray([0, 2, 3])
+        self.assertEqual(4, len(barray))
+        self.assertEqual([True, False, True, True], list(iter(barray)))
+        self.assertEqual([True, True, False, True], list(reversed(barray)))
+        self.assertEqual('0xD', str(barray))
+        self.assertEqual('0b1101', barray.to_bit_string())
+        self.assertEqual(1, barray.parity)
+        self.assertTrue(barray == RoaringBitArray([3, 2, 0]))
+        self.assertTrue(barray != RoaringBitArray([3]))
+        barray.flip_all()
+        self.assertEqual([1], list(barray.iter_set_bits()))
+
+    def test_optimize(self):
+        ''' Test that optimize picks the smallest containers '''
+        barray = RoaringBitArray()
+        for position in xrange(1000): barray.set(position)
+        self.assertTrue(isinstance(barray.containers[0], ArrayContainer))
+        barray.optimize()
+        self.assertTrue(isinstance(barray.containers[0], RunContainer))
+        self.assertEqual(4, barray.length_of_bytes)
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
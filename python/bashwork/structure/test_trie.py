@@ -1,6 +1,10 @@
 #!/usr/bin/env python
+import shutil
+import pickle
 import unittest
-from bashwork.structure.trie import Trie
+import numpy as np
+import tempfile
+from bashwork.structure.trie import Trie, FrozenTrie
 
 #---------------------------------------------------------------------------#
 # fixture
@@ -47,6 +51,87 @@ class TrieTest(unittest.TestCase):
         trie.clean()
         self.assertFalse(word in trie)
 
+    def test_compact(self):
+        ''' Test that the trie is compacted to a radix trie '''
+        words = ['romane', 'romanus', 'romulus', 'rubens']
+        trie = Trie.create(words)
+        trie.compact()
+        self.assertEqual(['r'], trie.root.keys())
+        self.assertEqual(set(['om', 'ubens']), set(trie.root['r'].keys()))
+        self.assertEqual(set(['an', 'ulus']), set(trie.root['r']['om'].keys()))
+        for word in words:
+            self.assertTrue(word in trie)
+        self.assertTrue(trie.has_path('roma'))
+        self.assertFalse(trie.has_path('romx'))
+        self.assertFalse('roma' in trie)
+
+    def test_compact_updates(self):
+        ''' Test that a compacted trie can still be updated '''
+        trie = Trie.create(['romane', 'romulus'])
+        trie.compact()
+        trie.add_word('romanus')
+        trie.add_word('rom')
+        self.assertEqual(set(['e', 'us']), set(trie.root['rom']['an'].keys()))
+        self.assertTrue('rom' in trie)
+        self.assertTrue('romanus' in trie)
+        trie.remove_word('romulus')
+        self.assertFalse('romulus' in trie)
+        self.assertTrue('romane' in trie)
+
+    def test_iter_prefix(self):
+        ''' Test that the words under a prefix are iterated '''
+        words = ['romane', 'romanus', 'romulus', 'rubens', 'ruber']
+        for compact in [False, True]:
+            trie = Trie.create(words)
+            if compact: trie.compact()
+            self.assertEqual(words, list(trie.iter_prefix('')))
+            self.assertEqual(['romane', 'romanus'], list(trie.iter_prefix('roma')))
+            self.assertEqual(['rubens', 'ruber'], list(trie.iter_prefix('rube')))
+            self.assertEqual(['ruber'], list(trie.iter_prefix('ruber')))
+            self.assertEqual([], list(trie.iter_prefix('x')))
+
+    def test_freeze(self):
+        ''' Test that the frozen trie matches the trie '''
+        words  = ['romane', 'romanus', 'romulus', 'rubens', 'ruber', 'rom']
+        frozen = Trie.create(words).freeze()
+        self.assertEqual(len(words), len(frozen))
+        for value, word in enumerate(words):
+            self.assertTrue(word in frozen)
+            self.assertEqual(value or len(word), frozen.get(word))
+        self.assertFalse('roma' in frozen)
+        self.assertEqual(None, frozen.get('roma'))
+        self.assertTrue(frozen.has_path('roma'))
+        self.assertFalse(frozen.has_path('rx'))
+        self.assertEqual(sorted(words), list(frozen.iter_prefix('')))
+        self.assertEqual(['romane', 'romanus'], list(frozen.iter_prefix('roma')))
+        self.assertEqual([], list(frozen.iter_prefix('x')))
+        self.assertEqual(np.uint8, frozen.chars.dtype)
+        self.assertEqual(np.uint8, frozen.edge_first.dtype)
+        self.assertFalse(u'r\u6771' in frozen)
+
+        copied = pickle.loads(pickle.dumps(frozen, pickle.HIGHEST_PROTOCOL))
+        self.assertEqual(list(frozen.iter_prefix('')), list(copied.iter_prefix('')))
+
+    def test_freeze_unicode(self):
+        ''' Test that the frozen trie supports unicode words '''
+        words  = [u'caf\xe9', u'cafe', u'\u6771\u4eac']
+        frozen = Trie.create(words).freeze()
+        for word in words:
+            self.assertTrue(word in frozen)
+        self.assertEqual([u'cafe', u'caf\xe9'], list(frozen.iter_prefix(u'caf')))
+        self.assertEqual(np.dtype('<u4'), frozen.chars.dtype)
+
+    def test_frozen_save_load(self):
+        ''' Test that the frozen trie can be memory mapped '''
+        path = tempfile.mkdtemp()
+        try:
+            words = ['hello', 'help', 'world']
+            Trie.create(words).freeze().save(path)
+            frozen = FrozenTrie.load(path)
+            self.assertEqual(words, list(frozen.iter_prefix('')))
+            self.assertEqual(1, frozen.get('help'))
+        finally: shutil.rmtree(path)
+
 #---------------------------------------------------------------------------#
 # main
 #---------------------------------------------------------------------------#
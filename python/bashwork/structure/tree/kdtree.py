@@ -1,6 +1,24 @@
+'''
+KD Tree
+------------------------------------------------------------
+
+`KDNode` is a simple node per point kd-tree that can be updated
+in place. `KDTree` is a static, bulk loaded kd-tree for larger
+datasets that stores the points of each leaf contiguously and the
+nodes in an implicit array (the children of node i are 2i+1 and
+2i+2), so queries never touch a python object per point::
+
+    tree = KDTree(points, leaf_size=32)
+    distances, indexes = tree.query(point, k=5)
+    inside = tree.query_radius(point, radius=0.5)
+    inside = tree.query_box(lower, upper)
+    distances, indexes = tree.query_many(points, k=5)
+'''
+import heapq
+import numpy as np
 from bashwork.structure.tree.binary import BinaryNode
 
-#TODO
+
 class KDNode(BinaryNode):
 
     def __init__(self, value, axis=0, left=None, right=None):
@@ -26,7 +44,7 @@ class KDNode(BinaryNode):
         if not ys: return None      # recursion base case
         k = len(ys[0])              # find the number of axis
         x = depth % k               # choose the correct axis
-        ys.sort(key=lambda y: y[x]) # sort by current axis
+        ys = sorted(ys, key=lambda y: y[x]) # sort by current axis
         m = len(ys) // 2            # select mid point
         node = klass(ys[m], axis=x) # create mid point node
         node.left  = klass.create(ys[:m], depth + 1)
@@ -40,7 +58,6 @@ class KDNode(BinaryNode):
         '''
         curr = self
         while curr:
-            print curr.value, point
             xn = (curr.x + 1) % curr.k
             if curr.value == point: break
             if curr.value[curr.x] > point[curr.x]:
@@ -48,7 +65,7 @@ class KDNode(BinaryNode):
                     curr.left = type(self)(point, axis=xn)
                     break
                 else: curr = curr.left
-            elif curr.value[curr.x] < point[curr.x]:
+            else: # ties go to the right
                 if not curr.right:
                     curr.right = type(self)(point, axis=xn)
                     break
@@ -62,26 +79,222 @@ class KDNode(BinaryNode):
         :param k: The number of neighbors to return
         :returns: The k-nearest neighbors
         '''
-        pass
+        heap, nodes = [], [self]   # max heap of (-distance, point)
+        while nodes:
+            node = nodes.pop()
+            if not node: continue
+            distance = sum((a - b) ** 2 for a, b in zip(node.value, point))
+            if len(heap) < k: heapq.heappush(heap, (-distance, node.value))
+            elif distance < -heap[0][0]: heapq.heapreplace(heap, (-distance, node.value))
+
+            delta = point[node.x] - node.value[node.x]
+            near, far = (node.left, node.right) if delta < 0 else (node.right, node.left)
+            if len(heap) < k or delta ** 2 < -heap[0][0]:
+                nodes.append(far)  # the other side may still be closer
+            nodes.append(near)
+        return [value for _, value in sorted(heap, reverse=True)]
+
+    def search(self, region):
+        ''' Given a region of (lower, upper) bounds, return
+        all the points in the tree that are in the region.
 
-    def __in_region(self, region, bound):
+        :param region: The (lower, upper) bounds of the region
+        :returns: The points in the region
         '''
+        lower, upper = region
+        found, nodes = [], [self]
+        while nodes:
+            node = nodes.pop()
+            if not node: continue
+            if all(l <= v <= u for l, v, u in zip(lower, node.value, upper)):
+                found.append(node.value)
+            if lower[node.x] <= node.value[node.x]: nodes.append(node.left)
+            if upper[node.x] >= node.value[node.x]: nodes.append(node.right)
+        return found
+
+#------------------------------------------------------------
+# Implement points in leaf only tree
+#------------------------------------------------------------
+
+class KDTree(object):
+    ''' A bulk loaded kd-tree that splits each node at the
+    median of its widest axis until the leaves hold at most
+    `leaf_size` points. The points are reordered so that every
+    node covers a contiguous range of `data`, and the nodes are
+    stored in flat arrays indexed by their implicit position.
+    '''
+
+    def __init__(self, points, leaf_size=16):
+        ''' Initializes a new instance of the kdtree
+
+        :param points: The (n, k) array of points to index
+        :param leaf_size: The maximum points in a leaf (default 16)
         '''
-        k = self.k // 2
-        return (all(r <= b for r, b in zip(region[:k], bound[:k])) 
-            and all(r >= b for r, b in zip(region[k+1:], bound[k+1:])))
+        points = np.asarray(points, dtype=np.float64)
+        if points.ndim != 2:
+            raise ValueError("expected an (n, k) array of points")
+        self.size, self.k = points.shape
+        self.leaf_size = max(1, leaf_size)
 
-    def search(self, region):
-        ''' Given a point and a number k, return
-        the k nearest neighbors of the given point.
+        depth, count = 0, self.size
+        while count > self.leaf_size:
+            depth, count = depth + 1, (count + 1) // 2
+        self.count  = (2 << depth) - 1            # the number of nodes
+        self.leaves = (1 << depth) - 1            # the first leaf node
+        self.starts = np.zeros(self.count, dtype=np.int64)
+        self.ends   = np.zeros(self.count, dtype=np.int64)
+        self.lower  = np.zeros((self.count, self.k))
+        self.upper  = np.zeros((self.count, self.k))
+        self.order  = np.arange(self.size)
+        self.__build(points)
+        self.data   = points[self.order]
+
+    def __build(self, points):
+        ''' Partition the points level by level, splitting each
+        range at its middle position along the widest axis.
+        '''
+        self.ends[0] = self.size
+        for node in xrange(self.count):
+            start, end = self.starts[node], self.ends[node]
+            if start < end:
+                block = points[self.order[start:end]]
+                self.lower[node] = block.min(axis=0)
+                self.upper[node] = block.max(axis=0)
+            if node >= self.leaves: continue
+
+            middle = (start + end) // 2
+            if end - start > 1:
+                axis  = np.argmax(self.upper[node] - self.lower[node])
+                split = np.argpartition(block[:, axis], middle - start)
+                self.order[start:end] = self.order[start:end][split]
+            left, right = 2 * node + 1, 2 * node + 2
+            self.starts[left],  self.ends[left]  = start, middle
+            self.starts[right], self.ends[right] = middle, end
+
+    def __box_distance(self, node, point):
+        ''' The squared distance from the point to the node's box.
+        '''
+        delta = np.maximum(self.lower[node] - point, 0) + np.maximum(point - self.upper[node], 0)
+        return np.dot(delta, delta)
+
+    def __far_distance(self, node, point):
+        ''' The squared distance from the point to the farthest
+        corner of the node's box.
+        '''
+        delta = np.maximum(np.abs(point - self.lower[node]), np.abs(point - self.upper[node]))
+        return np.dot(delta, delta)
+
+    def __leaf_distances(self, node, point):
+        block = self.data[self.starts[node]:self.ends[node]] - point
+        return np.einsum('ij,ij->i', block, block)
+
+    def query(self, point, k=1):
+        ''' Given a point and a number k, return the k nearest
+        neighbors of the point with a bounded priority queue.
 
         :param point: The point to find the neighbors of
         :param k: The number of neighbors to return
-        :returns: The k-nearest neighbors
+        :returns: The (distances, indexes) sorted by distance
         '''
-        pass
+        point = np.asarray(point, dtype=np.float64)
+        k = min(k, self.size)
+        if k < 1: return np.array([]), np.array([], dtype=np.int64)
+        heap, nodes = [], [(0.0, 0)]    # max heap of (-distance, index)
+        while nodes:
+            bound, node = nodes.pop()
+            if len(heap) == k and bound >= -heap[0][0]: continue
+            if self.starts[node] == self.ends[node]: continue
 
+            if node >= self.leaves:
+                distances = self.__leaf_distances(node, point)
+                for offset in np.argsort(distances)[:k]:
+                    distance = distances[offset]
+                    if len(heap) == k and distance >= -heap[0][0]: break
+                    entry = (-distance, self.starts[node] + offset)
+                    if len(heap) < k: heapq.heappush(heap, entry)
+                    else: heapq.heapreplace(heap, entry)
+                continue
 
-#------------------------------------------------------------
-# Implement points in leaf only tree
-#------------------------------------------------------------
+            children = [(self.__box_distance(child, point), child)
+                for child in (2 * node + 1, 2 * node + 2)]
+            nodes.extend(sorted(children, reverse=True)) # nearest on top
+
+        found = sorted((-distance, index) for distance, index in heap)
+        distances = np.sqrt(np.array([d for d, _ in found]))
+        indexes = self.order[np.array([i for _, i in found], dtype=np.int64)]
+        return distances, indexes
+
+    def query_radius(self, point, radius):
+        ''' Given a point and a radius, return the indexes of
+        all the points within the radius of the point.
+
+        :param point: The point to search around
+        :param radius: The radius to search within
+        :returns: The indexes of the points in the radius
+        '''
+        point, limit = np.asarray(point, dtype=np.float64), radius ** 2
+        found, nodes = [], [0]
+        while nodes:
+            node = nodes.pop()
+            start, end = self.starts[node], self.ends[node]
+            if start == end or self.__box_distance(node, point) > limit: continue
+            if self.__far_distance(node, point) <= limit:
+                found.append(self.order[start:end])  # the whole node is inside
+            elif node >= self.leaves:
+                inside = self.__leaf_distances(node, point) <= limit
+                found.append(self.order[start:end][inside])
+            else: nodes.extend((2 * node + 2, 2 * node + 1))
+        return np.concatenate(found) if found else np.array([], dtype=np.int64)
+
+    def query_box(self, lower, upper):
+        ''' Given the bounds of an axis aligned box, return the
+        indexes of all the points inside the box (inclusive).
+
+        :param lower: The lower corner of the box
+        :param upper: The upper corner of the box
+        :returns: The indexes of the points in the box
+        '''
+        lower = np.asarray(lower, dtype=np.float64)
+        upper = np.asarray(upper, dtype=np.float64)
+        found, nodes = [], [0]
+        while nodes:
+            node = nodes.pop()
+            start, end = self.starts[node], self.ends[node]
+            if start == end: continue
+            if np.any(self.upper[node] < lower) or np.any(self.lower[node] > upper): continue
+            if np.all(self.lower[node] >= lower) and np.all(self.upper[node] <= upper):
+                found.append(self.order[start:end])  # the whole node is inside
+            elif node >= self.leaves:
+                block  = self.data[start:end]
+                inside = np.all((block >= lower) & (block <= upper), axis=1)
+                found.append(self.order[start:end][inside])
+            else: nodes.extend((2 * node + 2, 2 * node + 1))
+        return np.concatenate(found) if found else np.array([], dtype=np.int64)
+
+    def query_many(self, points, k=1):
+        ''' Given a collection of points, return the k nearest
+        neighbors of each of them.
+
+        :param points: The (m, k) array of points to query
+        :param k: The number of neighbors to return
+        :returns: The (m, k) arrays of (distances, indexes)
+        '''
+        points = np.asarray(points, dtype=np.float64)
+        k = min(k, self.size)
+        distances = np.zeros((len(points), k))
+        indexes = np.zeros((len(points), k), dtype=np.int64)
+        for row, point in enumerate(points):
+            distances[row], indexes[row] = self.query(point, k)
+        return distances, indexes
+
+    def query_radius_many(self, points, radius):
+        ''' Given a collection of points, return the indexes of
+        the points within the radius of each of them.
+
+        :param points: The (m, k) array of points to query
+        :param radius: The radius to search within
+        :returns: A list of the index arrays for each point
+        '''
+        return [self.query_radius(point, radius) for point in points]
+
+    def __len__(self): return self.size
@@ -1,7 +1,7 @@
 #!/usr/bin/env python
 import unittest
-from kdtree import KDNode
-from binary import dfs_inorder_iter
+import numpy as np
+from bashwork.structure.tree.kdtree import KDNode, KDTree
 
 #---------------------------------------------------------------------------#
 # helper methods
@@ -19,6 +19,20 @@ def is_valid(tree):
     return is_valid(tree.left) and is_valid(tree.right) # all children should be valid
 
 
+def brute_force(points, point, k):
+    ''' Given a collection of points, find the k nearest
+    neighbors of the point by checking every point.
+
+    :param points: The points to search
+    :param point: The point to find the neighbors of
+    :param k: The number of neighbors to find
+    :returns: The sorted (distances, indexes)
+    '''
+    distances = np.sqrt(((points - point) ** 2).sum(axis=1))
+    indexes = np.argsort(distances, kind='mergesort')[:k]
+    return distances[indexes], indexes
+
+
 #---------------------------------------------------------------------------#
 # fixture
 #---------------------------------------------------------------------------#
@@ -42,10 +56,82 @@ class KDNodeTest(unittest.TestCase):
             self.tree.add((point, self.size + 1))
         self.assertTrue(is_valid(self.tree))
 
+    def test_neighbors(self):
+        ''' Test that we can find the nearest neighbors '''
+        self.assertEqual([(2, 2)], self.tree.neighbors((2.2, 1.9), 1))
+        neighbors = self.tree.neighbors((0, 0), 3)
+        self.assertEqual((0, 0), neighbors[0])
+        self.assertEqual(set([(0, 1), (1, 0)]), set(neighbors[1:]))
+
+    def test_search(self):
+        ''' Test that we can find the points in a region '''
+        found = self.tree.search(((1, 1), (2, 3)))
+        self.assertEqual([(1, 1), (1, 2), (1, 3), (2, 1), (2, 2), (2, 3)], sorted(found))
+
+
+class KDTreeTest(unittest.TestCase):
+    ''' Code to validate that the bulk loaded kdtree is correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(3)
+        self.points = random.rand(500, 3)
+        self.tree   = KDTree(self.points, leaf_size=8)
+        self.query  = random.rand(20, 3)
+
+    def test_layout(self):
+        ''' Test that the tree layout covers every point '''
+        self.assertEqual(500, len(self.tree))
+        self.assertEqual(list(range(500)), sorted(self.tree.order))
+        leaves = range(self.tree.leaves, self.tree.count)
+        self.assertTrue(all(self.tree.ends[n] - self.tree.starts[n] <= 8 for n in leaves))
+        self.assertTrue(np.array_equal(self.points[self.tree.order], self.tree.data))
+
+    def test_query(self):
+        ''' Test that the k nearest neighbors are correct '''
+        for point in self.query:
+            distances, indexes = self.tree.query(point, k=5)
+            expected, expects  = brute_force(self.points, point, 5)
+            self.assertTrue(np.allclose(expected, distances))
+            self.assertEqual(sorted(expects), sorted(indexes))
+        distances, indexes = KDTree(self.points[:3]).query(self.query[0], k=10)
+        self.assertEqual(3, len(indexes))
+
+    def test_query_many(self):
+        ''' Test that the batch queries are correct '''
+        distances, indexes = self.tree.query_many(self.query, k=3)
+        self.assertEqual((20, 3), indexes.shape)
+        for row, point in enumerate(self.query):
+            expected, _ = brute_force(self.points, point, 3)
+            self.assertTrue(np.allclose(expected, distances[row]))
+        found = self.tree.query_radius_many(self.query[:2], 0.2)
+        self.assertEqual(2, len(found))
+
+    def test_query_radius(self):
+        ''' Test that the radius queries are correct '''
+        for radius in [0.0, 0.1, 0.3, 2.0]:
+            for point in self.query[:5]:
+                distances = np.sqrt(((self.points - point) ** 2).sum(axis=1))
+                expected = np.flatnonzero(distances <= radius)
+                self.assertEqual(sorted(expected), sorted(self.tree.query_radius(point, radius)))
+
+    def test_query_box(self):
+        ''' Test that the box queries are correct '''
+        for lower, upper in [([0.2] * 3, [0.5] * 3), ([0, 0, 0], [1, 1, 1]), ([2] * 3, [3] * 3)]:
+            inside = np.all((self.points >= lower) & (self.points <= upper), axis=1)
+            self.assertEqual(sorted(np.flatnonzero(inside)),
+                sorted(self.tree.query_box(lower, upper)))
+
+    def test_duplicates(self):
+        ''' Test that duplicate points are handled '''
+        points = np.zeros((50, 2))
+        tree = KDTree(points, leaf_size=4)
+        distances, indexes = tree.query([0, 0], k=50)
+        self.assertEqual(list(range(50)), sorted(indexes))
+        self.assertEqual(50, len(tree.query_radius([0, 0], 0)))
 
 #---------------------------------------------------------------------------#
 # main
 #---------------------------------------------------------------------------#
-raise unittest.SkipTest("broken tests")
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+import unittest
+import numpy as np
+from functools import partial
+from bashwork.ml.utility import distance
+from bashwork.utility.distance import chebyshev
+from bashwork.structure.tree.vptree import VPTree
+
+#---------------------------------------------------------------------------#
+# fixture
+#---------------------------------------------------------------------------#
+class VPTreeTest(unittest.TestCase):
+    ''' Code to validate that the vptree implementation is correct.
+    '''
+
+    def setUp(self):
+        random = np.random.RandomState(9)
+        self.points = random.rand(400, 4)
+        self.query  = random.rand(10, 4)
+
+    def check_metric(self, metric, tree):
+        ''' Check the tree queries against a linear scan '''
+        for point in self.query:
+            expect = np.array([metric(row, point) for row in self.points])
+            distances, indexes = tree.query(point, k=7)
+            self.assertTrue(np.allclose(np.sort(expect)[:7], distances))
+            self.assertTrue(np.allclose(expect[indexes], distances))
+            radius = np.sort(expect)[30]
+            self.assertEqual(sorted(np.flatnonzero(expect <= radius)),
+                sorted(tree.query_radius(point, radius)))
+
+    def test_batched_metrics(self):
+        ''' Test that the tree works with the vectorized metrics '''
+        for metric in [distance.euclidean, distance.manhattan, distance.chebyshev]:
+            tree = VPTree(self.points, metric, leaf_size=8, seed=1)
+            self.assertTrue(tree.batched)
+            self.check_metric(metric, tree)
+
+    def test_plain_metrics(self):
+        ''' Test that the tree works with any distance function '''
+        metric = partial(distance.minkowski, p=3)
+        tree = VPTree(self.points, metric, leaf_size=4, seed=2)
+        self.assertFalse(tree.batched)
+        self.check_metric(metric, tree)
+        self.check_metric(chebyshev, VPTree(self.points, chebyshev, seed=3))
+
+    def test_hamming(self):
+        ''' Test that the tree works with the hamming distance '''
+        points = np.random.RandomState(4).randint(0, 2, (200, 16))
+        tree = VPTree(points, distance.hamming, leaf_size=4, seed=5)
+        distances, indexes = tree.query(points[17], k=1)
+        self.assertEqual(0, distances[0])
+        expect = (points != points[17]).sum(axis=1)
+        distances, indexes = tree.query(points[17], k=10)
+        self.assertEqual(sorted(expect)[:10], distances.tolist())
+
+    def test_query_many(self):
+        ''' Test that the batch queries are correct '''
+        tree = VPTree(self.points, distance.euclidean, seed=6)
+        distances, indexes = tree.query_many(self.query, k=3)
+        self.assertEqual((10, 3), indexes.shape)
+        for row, point in enumerate(self.query):
+            self.assertEqual(tree.query(point, 3)[1].tolist(), indexes[row].tolist())
+        self.assertEqual(0, len(VPTree(self.points[:0], distance.euclidean).query(self.query[0])[1]))
+
+#---------------------------------------------------------------------------#
+# main
+#---------------------------------------------------------------------------#
+if __name__ == "__main__":
+    unittest.main()
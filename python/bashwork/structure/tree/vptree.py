@@ -0,0 +1,171 @@
+'''
+Vantage Point Tree
+------------------------------------------------------------
+
+A vantage point tree is a metric tree: it only needs a distance
+function that obeys the triangle inequality, so it can index points
+under any metric (manhattan, chebyshev, minkowski, hamming, ...)
+where a kd-tree only works for axis aligned distances.
+
+Each node picks a vantage point and splits the rest of its points
+at the median distance `mu` to the vantage point: the inside child
+holds the points within `mu` and the outside child the rest. While
+searching with a current worst distance `tau`, a child can be
+skipped if `|d(q, v) - mu| > tau`::
+
+    tree = VPTree(points, distance=manhattan)
+    distances, indexes = tree.query(point, k=5)
+    inside = tree.query_radius(point, radius=2.0)
+
+The tree is stored as a permutation of the point indexes, where each
+node covers a contiguous range with its vantage point first, so there
+is no python object per node. If the distance accepts an `axis`
+argument (like those in `bashwork.ml.utility.distance`), it is called
+once per leaf with a whole block of points.
+'''
+import heapq
+import inspect
+import numpy as np
+
+
+class VPTree(object):
+    ''' A vantage point tree over a collection of points
+    with an arbitrary metric distance.
+    '''
+
+    def __init__(self, points, distance, leaf_size=16, seed=None):
+        ''' Initializes a new instance of the vptree
+
+        :param points: The (n, k) array of points to index
+        :param distance: The metric distance between two points
+        :param leaf_size: The maximum points in a leaf (default 16)
+        :param seed: The seed used to choose the vantage points
+        '''
+        self.data      = np.asarray(points)
+        self.size      = len(self.data)
+        self.distance  = distance
+        self.leaf_size = max(1, leaf_size)
+        self.order     = np.arange(self.size)
+        self.radius    = np.zeros(self.size)                 # start => mu
+        self.middle    = np.full(self.size, -1, dtype=np.int64) # start => outside start
+        try:
+            self.batched = 'axis' in inspect.getargspec(distance).args
+        except TypeError: self.batched = False
+        self.__build(np.random.RandomState(seed))
+
+    def get_distances(self, point, rows):
+        ''' Compute the distance from the point to each of the
+        supplied rows of the dataset.
+
+        :param point: The point to compute the distances from
+        :param rows: The indexes of the rows to compute to
+        :returns: An array of the distances
+        '''
+        block = self.data[rows]
+        if self.batched:
+            return np.asarray(self.distance(block, point, axis=-1), dtype=np.float64)
+        return np.array([self.distance(row, point) for row in block], dtype=np.float64)
+
+    def __build(self, random):
+        ''' Split every node at the median distance to a random
+        vantage point until the nodes fit in a leaf.
+        '''
+        nodes = [(0, self.size)]
+        while nodes:
+            start, end = nodes.pop()
+            if end - start <= self.leaf_size: continue
+
+            pick = random.randint(start, end)
+            self.order[[start, pick]] = self.order[[pick, start]]
+            distances = self.get_distances(self.data[self.order[start]], self.order[start + 1:end])
+            median = len(distances) // 2
+            split  = np.argpartition(distances, median)
+            self.order[start + 1:end] = self.order[start + 1:end][split]
+            self.radius[start] = distances[split[median]]
+            self.middle[start] = start + 1 + median
+            nodes.append((start + 1, start + 1 + median))
+            nodes.append((start + 1 + median, end))
+
+    def __search(self, point, visit, get_limit):
+        ''' Walk the tree with the supplied visitor, skipping any
+        node that cannot hold a point within the current limit.
+
+        :param point: The point to search around
+        :param visit: A callback with the (distances, rows) found
+        :param get_limit: A callback for the current search limit
+        '''
+        nodes = [(0.0, 0, self.size)]
+        while nodes:
+            bound, start, end = nodes.pop()
+            if start >= end or bound > get_limit(): continue
+            if self.middle[start] < 0:
+                rows = self.order[start:end]
+                visit(self.get_distances(point, rows), rows)
+                continue
+
+            vantage  = self.order[start:start + 1]
+            distance = self.get_distances(point, vantage)[0]
+            visit(np.array([distance]), vantage)
+            mu, middle = self.radius[start], self.middle[start]
+            inside  = (max(distance - mu, 0.0), start + 1, middle)
+            outside = (max(mu - distance, 0.0), middle, end)
+            nodes.extend([outside, inside] if distance <= mu else [inside, outside])
+
+    def query(self, point, k=1):
+        ''' Given a point and a number k, return the k nearest
+        neighbors of the point with a bounded priority queue.
+
+        :param point: The point to find the neighbors of
+        :param k: The number of neighbors to return
+        :returns: The (distances, indexes) sorted by distance
+        '''
+        k, heap = min(k, self.size), []  # max heap of (-distance, index)
+        if k < 1: return np.array([]), np.array([], dtype=np.int64)
+
+        def visit(distances, rows):
+            for offset in np.argsort(distances)[:k]:
+                distance = distances[offset]
+                if len(heap) == k and distance >= -heap[0][0]: break
+                entry = (-distance, rows[offset])
+                if len(heap) < k: heapq.heappush(heap, entry)
+                else: heapq.heapreplace(heap, entry)
+
+        def get_limit():
+            return -heap[0][0] if len(heap) == k else np.inf
+
+        self.__search(np.asarray(point), visit, get_limit)
+        found = sorted((-distance, index) for distance, index in heap)
+        return (np.array([d for d, _ in found]),
+            np.array([i for _, i in found], dtype=np.int64))
+
+    def query_radius(self, point, radius):
+        ''' Given a point and a radius, return the indexes of
+        all the points within the radius of the point.
+
+        :param point: The point to search around
+        :param radius: The radius to search within
+        :returns: The indexes of the points in the radius
+        '''
+        found = []
+        def visit(distances, rows):
+            found.append(rows[distances <= radius])
+
+        self.__search(np.asarray(point), visit, lambda: radius)
+        return np.concatenate(found) if found else np.array([], dtype=np.int64)
+
+    def query_many(self, points, k=1):
+        ''' Given a collection of points, return the k nearest
+        neighbors of each of them.
+
+        :param points: The (m, k) array of points to query
+        :param k: The number of neighbors to return
+        :returns: The (m, k) arrays of (distances, indexes)
+        '''
+        k = min(k, self.size)
+        distances = np.zeros((len(points), k))
+        indexes = np.zeros((len(points), k), dtype=np.int64)
+        for row, point in enumerate(points):
+            distances[row], indexes[row] = self.query(point, k)
+        return distances, indexes
+
+    def __len__(self): return self.size
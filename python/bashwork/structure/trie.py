@@ -1,5 +1,25 @@
 #!/usr/bin/env python
 # -*- coding: latin-1 -*-
+'''
+Trie
+------------------------------------------------------------
+
+A trie of nested dictionaries keyed by the edge labels. Each
+label is a single character until `compact` is called, which
+collapses every chain of single child nodes into one edge so the
+trie becomes a radix (PATRICIA) trie::
+
+    trie = Trie.create(['romane', 'romanus', 'romulus'])
+    trie.compact()           # {'rom': {'an': {'e': .., 'us': ..}, 'ulus': ..}}
+    list(trie.iter_prefix('roman'))
+
+For large read only dictionaries, `freeze` packs the trie into
+a handful of flat numpy arrays which can be pickled or saved and
+memory mapped back with `FrozenTrie.load`.
+'''
+import os
+import numpy as np
+
 
 class Trie(object):
     ''' A simple trie using dictionaries
@@ -27,6 +47,22 @@ class Trie(object):
         '''
         self.root = root or dict()
         self.skip = skip or Trie.SKIP
+        self.compacted = False
+
+    def __find_edge(self, root, word):
+        ''' Find the edge label in the supplied node that
+        starts with the first letter of the word. In a radix
+        trie there can only be one such edge.
+
+        :param root: The node to search the edges of
+        :param word: The word to find the next edge for
+        :returns: The matching edge label or None
+        '''
+        if word[0] in root: return word[0]
+        for key in root:
+            if key is not Trie.VALUE and key[0] == word[0]:
+                return key
+        return None
 
     def add_words(self, words):
         ''' Add a collection of words to the Trie
@@ -42,20 +78,50 @@ class Trie(object):
         :param word: The word to add to the trie
         :param value: The value to store at the word
         '''
-        root = self.root
-        for letter in word:
-            if letter in self.skip: continue
-            if letter not in root:
-                root[letter] = dict()
-            root = root[letter]
-        root[Trie.VALUE] = value or len(word)
+        root, size = self.root, len(word)
+        word = word[:0].join(l for l in word if l not in self.skip)
+        while word:
+            key = self.__find_edge(root, word)
+            if key is None:                        # no path exists, so create it
+                letters = [word] if self.compacted else word
+                for letter in letters:
+                    root[letter] = root = dict()
+                break
+
+            common = 1                             # the first letter always matches
+            while common < min(len(key), len(word)) and key[common] == word[common]:
+                common += 1
+            if common < len(key):                  # split the edge at the mismatch
+                root[key[:common]] = { key[common:]: root.pop(key) }
+            root, word = root[key[:common]], word[common:]
+        root[Trie.VALUE] = value or size
 
     def compact(self):
         ''' Compact the Trie to make single paths
         resolve down to single hash lookups:
         `a->b->c->` compacted to `abc->`
         '''
-        pass # TODO
+        def recurse(root):
+            for key in [k for k in root if k is not Trie.VALUE]:
+                label, child = key, root[key]
+                while len(child) == 1 and Trie.VALUE not in child:
+                    (letter, child), = child.items() # follow the single path
+                    label += letter
+                recurse(child)
+                if label != key:
+                    del root[key]
+                    root[label] = child
+
+        recurse(self.root)
+        self.compacted = True
+
+    def freeze(self):
+        ''' Pack the Trie into a read only `FrozenTrie`
+        of flat arrays.
+
+        :returns: The frozen version of this trie
+        '''
+        return FrozenTrie.create(self.root)
 
     def clean(self):
         ''' Remove any empty nodes in the trie.
@@ -82,9 +148,11 @@ class Trie(object):
                 root.pop(Trie.VALUE, None) # unmark this node as a leaf word
                 return not bool(root)      # return if this node is empty
 
-            leaf = root.get(word[0], None) # get next child node
-            if recurse(leaf, word[1:]):    # check if we can delete this node
-                del root[word[0]]          # if so, delete the unused node
+            key = self.__find_edge(root, word)
+            if key is None or not word.startswith(key):
+                return False               # the word does not exist, exit
+            if recurse(root[key], word[len(key):]):
+                del root[key]              # if so, delete the unused node
             return not bool(root)          # return if this node is empty
 
         recurse(self.root, word)           # recurse down the trie
@@ -107,11 +175,30 @@ class Trie(object):
         :returns: a new Trie instance of the given path, or None
         '''
         root = self.root
-        for letter in path:
-            root = root.get(letter, None)
-            if not root: return Trie(None)
+        while path:
+            key = self.__find_edge(root, path)
+            if key is None: return Trie(None)
+            if path.startswith(key):
+                root, path = root[key], path[len(key):]
+            elif key.startswith(path):       # the path ends inside an edge
+                return Trie({ key[len(path):]: root[key] })
+            else: return Trie(None)
         return Trie(root)
 
+    def iter_prefix(self, prefix):
+        ''' Iterate over every word in the Trie that starts
+        with the supplied prefix in sorted order.
+
+        :param prefix: The prefix to find the words of
+        :returns: A generator of the matching words
+        '''
+        stack = [(prefix, self.get_path(prefix).root)]
+        while stack:
+            word, root = stack.pop()
+            if Trie.VALUE in root: yield word
+            keys = sorted((k for k in root if k is not Trie.VALUE), reverse=True)
+            stack.extend((word + key, root[key]) for key in keys)
+
     def has_a_word(self):
         ''' Check if the current root level has a
         word entered at its root level or is this a
@@ -143,3 +230,188 @@ class Trie(object):
         :returns: True if the word exists, False otherwise
         '''
         return Trie.VALUE in self.get_path(word).root
+
+
+class FrozenTrie(object):
+    ''' A read only radix trie packed into flat arrays.
+    The nodes are numbered in breadth first order and the
+    edges of each node are stored contiguously, sorted by
+    their first letter so they can be binary searched:
+
+    - `node_edges[n]:node_edges[n + 1]` are the edges of node n
+    - `edge_first[e]` is the first letter of the label of edge e
+    - `edge_labels[e]:edge_labels[e + 1]` is the label in `chars`
+    - `edge_targets[e]` is the node that edge e leads to
+    - `terminal[n]` and `values[n]` are the word marker and value
+
+    The letters of byte string labels are stored in a byte each and
+    those of unicode labels as utf-32 code points. The values of the
+    words must be integers.
+    '''
+
+    ARRAYS = ['node_edges', 'edge_first', 'edge_labels',
+        'edge_targets', 'chars', 'terminal', 'values']
+
+    @classmethod
+    def create(klass, root):
+        ''' Pack the supplied trie dictionary into arrays,
+        collapsing the single paths as they are found.
+
+        :param root: The root dictionary of the trie to pack
+        :returns: The initialized frozen trie
+        '''
+        nodes, labels = [root], []
+        node_edges, edge_first, edge_labels, edge_targets = [0], [], [0], []
+        terminal, values = [], []
+
+        for node in nodes: # nodes is extended as we walk
+            terminal.append(Trie.VALUE in node)
+            values.append(int(node.get(Trie.VALUE) or 0))
+            edges = []
+            for label, child in node.iteritems():
+                if label is Trie.VALUE: continue
+                while len(child) == 1 and Trie.VALUE not in child:
+                    (letter, child), = child.items()
+                    label += letter
+                edges.append((label, child))
+
+            for label, child in sorted(edges):
+                labels.append(label)
+                edge_first.append(ord(label[0]))
+                edge_labels.append(edge_labels[-1] + len(label))
+                edge_targets.append(len(nodes))
+                nodes.append(child)
+            node_edges.append(len(edge_first))
+
+        is_unicode = any(isinstance(label, unicode) for label in labels)
+        if is_unicode:
+            chars = np.frombuffer(u''.join(labels).encode('utf-32-le'), dtype='<u4')
+        else: chars = np.frombuffer(''.join(labels), dtype=np.uint8)
+        letter = '<u4' if is_unicode else np.uint8
+
+        return klass({
+            'node_edges'  : np.array(node_edges, dtype=np.int64),
+            'edge_first'  : np.array(edge_first, dtype=letter),
+            'edge_labels' : np.array(edge_labels, dtype=np.int64),
+            'edge_targets': np.array(edge_targets, dtype=np.int64),
+            'chars'       : chars.copy(),
+            'terminal'    : np.array(terminal, dtype=bool),
+            'values'      : np.array(values, dtype=np.int64),
+        }, is_unicode)
+
+    @classmethod
+    def load(klass, path, mmap=True):
+        ''' Load a frozen trie that was saved to the supplied
+        directory, memory mapping the arrays by default.
+
+        :param path: The directory the trie was saved to
+        :param mmap: True to memory map the arrays (default True)
+        :returns: The loaded frozen trie
+        '''
+        mode   = 'r' if mmap else None
+        arrays = dict((name, np.load(os.path.join(path, name + '.npy'), mmap_mode=mode))
+            for name in klass.ARRAYS)
+        is_unicode = bool(np.load(os.path.join(path, 'unicode.npy')))
+        return klass(arrays, is_unicode)
+
+    def __init__(self, arrays, is_unicode=False):
+        ''' Initialize a new instance of the frozen trie
+
+        :param arrays: A dictionary of the packed arrays
+        :param is_unicode: True if the labels are unicode
+        '''
+        self.arrays = arrays
+        self.is_unicode = is_unicode
+        for name in self.ARRAYS:
+            setattr(self, name, arrays[name])
+
+    def __getstate__(self):
+        return (dict((name, np.asarray(array)) for name, array in self.arrays.items()),
+            self.is_unicode)
+
+    def __setstate__(self, state):
+        self.__init__(*state)
+
+    def save(self, path):
+        ''' Save the frozen trie to the supplied directory
+        so that it can be memory mapped with `load`.
+
+        :param path: The directory to save the trie to
+        '''
+        if not os.path.exists(path):
+            os.makedirs(path)
+        for name in self.ARRAYS:
+            np.save(os.path.join(path, name + '.npy'), self.arrays[name])
+        np.save(os.path.join(path, 'unicode.npy'), np.array(self.is_unicode))
+
+    def __label(self, edge):
+        ''' Retrieve the label of the supplied edge.
+        '''
+        chars = self.chars[self.edge_labels[edge]:self.edge_labels[edge + 1]]
+        if self.is_unicode:
+            return chars.astype('<u4').tobytes().decode('utf-32-le')
+        return chars.astype(np.uint8, copy=False).tobytes()
+
+    def __walk(self, word):
+        ''' Walk the supplied word down the trie.
+
+        :param word: The word to walk down the trie
+        :returns: (node, rest of the edge if the word ends inside one) or None
+        '''
+        node, index = 0, 0
+        while index < len(word):
+            lo, hi = self.node_edges[node], self.node_edges[node + 1]
+            letter = ord(word[index])
+            edge = lo + np.searchsorted(self.edge_first[lo:hi], letter)
+            if edge >= hi or self.edge_first[edge] != letter: return None
+            label = self.__label(edge)
+            part  = word[index:index + len(label)]
+            if part == label:
+                node, index = int(self.edge_targets[edge]), index + len(label)
+            elif label.startswith(part):
+                return int(self.edge_targets[edge]), label[len(part):]
+            else: return None
+        return node, word[:0]
+
+    def has_path(self, path):
+        ''' Test if the supplied path exists in the Trie.
+
+        :param path: The path to test for existance of
+        :returns: True if the path exists, False otherwise
+        '''
+        return self.__walk(path) is not None
+
+    def get(self, word, default=None):
+        ''' Retrieve the value stored at the supplied word.
+
+        :param word: The word to get the value of
+        :param default: The value to return if the word is missing
+        :returns: The value of the word or the default
+        '''
+        found = self.__walk(word)
+        if found is None or found[1] or not self.terminal[found[0]]:
+            return default
+        return int(self.values[found[0]])
+
+    def iter_prefix(self, prefix):
+        ''' Iterate over every word in the Trie that starts
+        with the supplied prefix in sorted order.
+
+        :param prefix: The prefix to find the words of
+        :returns: A generator of the matching words
+        '''
+        found = self.__walk(prefix)
+        if found is None: return
+        stack = [(prefix + found[1], found[0])]
+        while stack:
+            word, node = stack.pop()
+            if self.terminal[node]: yield word
+            edges = xrange(self.node_edges[node + 1] - 1, self.node_edges[node] - 1, -1)
+            stack.extend((word + self.__label(e), int(self.edge_targets[e])) for e in edges)
+
+    def __len__(self):
+        return int(self.terminal.sum())
+
+    def __contains__(self, word):
+        found = self.__walk(word)
+        return found is not None and not found[1] and bool(self.terminal[found[0]])
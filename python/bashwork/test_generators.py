@@ -1,5 +1,7 @@
 #!/usr/bin/env python
 import unittest
+import pickle
+from StringIO import StringIO
 from bashwork.generators import *
 
 class GeneratorTest(unittest.TestCase):
@@ -31,6 +33,18 @@ class GeneratorTest(unittest.TestCase):
         actual = list(reversed(list(stream)))
         self.assertEqual(actual, stream.history)
 
+    def test_gen_batches(self):
+        actual = list(gen_batches(xrange(7), 3))
+        expect = [[0, 1, 2], [3, 4, 5], [6]]
+        self.assertEqual(actual, expect)
+
+    def test_gen_deserialized_file(self):
+        handle = StringIO()
+        for entry in range(3): pickle.dump(entry, handle)
+        handle.seek(0)
+        actual = list(gen_deserialized_file(handle))
+        self.assertEqual(actual, range(3))
+
     def test_gen_concat(self):
         stream = gen_concat([xrange(0,4), xrange(4,8), xrange(8, 11)])
         actual = list(stream)
@@ -77,7 +91,6 @@ class GeneratorTest(unittest.TestCase):
 #def gen_file_follower(handle):
 #def gen_structs(handle, struct_format):
 #def gen_lines_from_path(path, pattern="*"):
-#def gen_deserialized_file(handle, deserializer=pickle.load):
 #def gen_dictionaries(stream, columns, formats=None):
 #def gen_named_tuples(stream, columns, formats=None):
 #def gen_tcp_connections(address, connections=5):